@@ -0,0 +1,60 @@
+"""
+Command line archival for the Cafe Management System.
+Moves closed months of sales, expenses and stock history into per-year
+archive databases. Reports keep reading archived months, so this can run on
+a schedule; back up the archive directory along with the database.
+
+Example:
+    python archive_data.py run --vacuum
+"""
+
+import argparse
+import sys
+
+from utils.archive import ArchiveManager
+
+
+def print_archived(period, moved):
+    """Print the rows moved for one month."""
+    print(f"- {period}: " + ", ".join(f"{rows} {table}" for table, rows in moved.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed months of cafe data")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Archive every month that is due")
+    run.add_argument("--dry-run", action="store_true", help="Only list the months that are due")
+    run.add_argument("--vacuum", action="store_true", help="Shrink the database file afterwards")
+    commands.add_parser("list", help="List archived months")
+    args = parser.parse_args()
+
+    archive = ArchiveManager()
+
+    if args.command == "list":
+        for period, year, sales, sale_items, expenses, stock, archived_at in archive.get_archived_periods():
+            print(
+                f"{period}  {sales:>7} sales {sale_items:>8} items {expenses:>6} expenses "
+                f"{stock:>7} stock  -> {archive.archive_path(year)} ({archived_at})"
+            )
+        return
+
+    if args.dry_run:
+        for period in archive.closed_months():
+            print(f"- {period}")
+        return
+
+    try:
+        results = archive.run(progress=print_archived)
+        if args.vacuum and results:
+            archive.vacuum()
+    except Exception as e:
+        print(f"Archiving failed: {e}")
+        sys.exit(1)
+
+    if not results:
+        print("Nothing to archive")
+
+
+if __name__ == "__main__":
+    main()
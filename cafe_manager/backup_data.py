@@ -0,0 +1,79 @@
+"""
+Command line backups for the Cafe Management System.
+Takes online backups while the app is running, lists and verifies them, and
+restores one over the live database.
+
+Example:
+    python backup_data.py create --label before-audit
+    python backup_data.py restore backups/cafe_manager-20250301-230000-auto.db.gz
+"""
+
+import argparse
+import sys
+
+from utils.backup import BackupManager
+
+
+def print_progress(status, remaining, total):
+    """Print a single updating progress line."""
+    done = total - remaining
+    percent = (done / total * 100) if total else 100
+    sys.stdout.write(f"\rCopied {done}/{total} pages ({percent:.0f}%)")
+    if remaining == 0:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up and restore cafe data")
+    parser.add_argument("--directory", help="Backup directory (default: backups next to the database)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Take a backup now")
+    create.add_argument("--label", default="manual")
+    commands.add_parser("list", help="List backups, newest first")
+    verify = commands.add_parser("verify", help="Check a backup")
+    verify.add_argument("path")
+    restore = commands.add_parser("restore", help="Replace the database with a backup")
+    restore.add_argument("path")
+    restore.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+
+    backups = BackupManager(directory=args.directory)
+
+    if args.command == "create":
+        try:
+            path = backups.create(args.label, progress=print_progress)
+        except Exception as e:
+            print(f"Backup failed: {e}")
+            sys.exit(1)
+        print(f"Backup written to {path}")
+
+    elif args.command == "list":
+        for backup in backups.list_backups():
+            print(
+                f"{backup['created']:%Y-%m-%d %H:%M:%S}  {backup['label']:<12}"
+                f"{backup['size'] / 1024:>10.0f} KB  {backup['path']}"
+            )
+
+    elif args.command == "verify":
+        ok, message = backups.verify(args.path)
+        print(message)
+        sys.exit(0 if ok else 1)
+
+    elif args.command == "restore":
+        if not args.yes:
+            answer = input("This replaces all current data. Continue? [y/N] ")
+            if answer.strip().lower() != "y":
+                print("Restore cancelled")
+                sys.exit(1)
+        try:
+            safety = backups.restore(args.path)
+        except Exception as e:
+            print(f"Restore failed: {e}")
+            sys.exit(1)
+        print(f"Database restored. The previous data was saved to {safety}")
+
+
+if __name__ == "__main__":
+    main()
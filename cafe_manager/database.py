@@ -7,8 +7,14 @@ import datetime
 import logging
 import os
 import sqlite3
+from pathlib import Path
 from sqlite3 import Error
 
+import migrations
+from utils.app_logging import setup_logging
+from utils.constants import QUERY_CONFIG
+from utils.query_stats import TimedConnection
+
 class DatabaseManager:
     """Manages database operations for the cafe management system."""
     
@@ -17,196 +23,33 @@ class DatabaseManager:
         # Get absolute path to database in root directory
         root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.db_path = os.path.join(root_dir, db_file)
-        print(f"Connecting to database at: {self.db_path}")
         self.conn = None
         self.setup_logging()
+        logging.debug(f"Using database at {self.db_path}")
     
     def setup_logging(self):
-        """Setup logging configuration."""
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-            
-        logging.basicConfig(
-            filename='logs/database.log',
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        """Start application logging (once per process)."""
+        setup_logging()
 
     def connect(self):
-        """Create a database connection."""
+        """Create a database connection, timing its statements if QUERY_CONFIG enables it."""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            factory = TimedConnection if QUERY_CONFIG["enabled"] else sqlite3.Connection
+            # Opened as a URI so archives can be attached read-only
+            self.conn = sqlite3.connect(Path(self.db_path).resolve().as_uri(), uri=True, factory=factory)
             self.conn.execute("PRAGMA foreign_keys = ON")
-            logging.info(f"Successfully connected to database at {self.db_path}")
+            logging.debug(f"Successfully connected to database at {self.db_path}")
             return self.conn
         except Error as e:
             logging.error(f"Error connecting to database: {str(e)}")
-            print(f"Database connection error: {e}")
             return None
     
     def create_tables(self):
-        """Create all required tables for the cafe management system."""
+        """Create or upgrade all tables by applying pending schema migrations."""
         try:
-            cursor = self.conn.cursor()
-            
-            # 1. Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT NOT NULL UNIQUE,
-                    password TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 2. Menu categories table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS menu_categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE
-                )
-            ''')
-            
-            # 3. Menu items table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS menu_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    category_id INTEGER,
-                    price REAL NOT NULL,
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (category_id) REFERENCES menu_categories(id),
-                    UNIQUE (name, category_id)
-                )
-            ''')
-            
-            # 4. Tables table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tables (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    table_number INTEGER UNIQUE NOT NULL,
-                    status TEXT CHECK(status IN ('vacant', 'occupied')) DEFAULT 'vacant',
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 5. Sales table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sales (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    table_number INTEGER,
-                    subtotal REAL NOT NULL,
-                    discount_type TEXT CHECK(discount_type IN ('percentage', 'amount')),
-                    discount_value REAL DEFAULT 0,
-                    total_amount REAL NOT NULL,
-                    payment_status TEXT CHECK(payment_status IN ('pending', 'completed')) DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (table_number) REFERENCES tables(table_number)
-                )
-            ''')
-            
-            # 6. Sale items table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sale_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    sale_id INTEGER,
-                    menu_item_id INTEGER,
-                    quantity INTEGER NOT NULL,
-                    price_per_unit REAL NOT NULL,
-                    total_price REAL NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
-                    FOREIGN KEY (menu_item_id) REFERENCES menu_items(id)
-                )
-            ''')
-            
-            # 7. Temporary bills table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS temporary_bills (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    table_number INTEGER NOT NULL,
-                    menu_item_id INTEGER NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    price_per_unit REAL NOT NULL,
-                    total_price REAL NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (table_number) REFERENCES tables(table_number),
-                    FOREIGN KEY (menu_item_id) REFERENCES menu_items(id)
-                )
-            ''')
-            
-            # 8. Expenses table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS expenses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    price_per_unit REAL NOT NULL,
-                    total_price REAL NOT NULL,
-                    expense_date DATE DEFAULT CURRENT_DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 9. Staff table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS staff (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    contact TEXT NOT NULL,
-                    salary REAL NOT NULL,
-                    join_date DATE NOT NULL,
-                    last_paid_date DATE,
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 10. Staff payments table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS staff_payments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    staff_id INTEGER,
-                    amount REAL NOT NULL,
-                    payment_date DATE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (staff_id) REFERENCES staff(id)
-                )
-            ''')
-            
-            # 11. Bar stock table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS bar_stock (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    item_name TEXT NOT NULL UNIQUE,
-                    quantity INTEGER NOT NULL,
-                    min_threshold INTEGER NOT NULL,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 12. Stock history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stock_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    item_id INTEGER,
-                    change_quantity INTEGER NOT NULL,
-                    operation_type TEXT CHECK(operation_type IN ('add', 'remove')),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (item_id) REFERENCES bar_stock(id)
-                )
-            ''')
-            
-            # Create indexes for frequently queried columns
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_menu_items_category ON menu_items(category_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_stock_history_item ON stock_history(item_id)')
-            
-            self.conn.commit()
-            logging.info("Successfully created all tables")
+            applied = migrations.migrate(self.conn)
+            logging.info(f"Database schema at version {migrations.get_version(self.conn)} "
+                         f"({len(applied)} migrations applied)")
             return True
         except Error as e:
             logging.error(f"Error creating tables: {str(e)}")
@@ -245,11 +88,14 @@ class DatabaseManager:
                 ('Ice Cream', 'Desserts', 100.0)
             ]
             
-            for name, category, price in menu_items:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO menu_items (name, category_id, price)
-                    VALUES (?, ?, ?)
-                ''', (name, category_map[category], price))
+            # Sample menu for a new install only; upgraded databases keep theirs
+            cursor.execute('SELECT COUNT(*) FROM menu_items')
+            if cursor.fetchone()[0] == 0:
+                for name, category, price in menu_items:
+                    cursor.execute('''
+                        INSERT INTO menu_items (name, category_id, price)
+                        VALUES (?, ?, ?)
+                    ''', (name, category_map[category], price))
             
             # Create 15 default tables
             for table_num in range(1, 16):
@@ -266,37 +112,21 @@ class DatabaseManager:
             return False
     
     def verify_tables(self):
-        """Verify that all required tables exist."""
+        """Check that the schema is at the latest migration."""
         try:
-            cursor = self.conn.cursor()
-            
-            # Check all required tables
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name IN (
-                    'sales', 'sale_items', 'menu_items', 
-                    'menu_categories', 'expenses', 'bar_stock',
-                    'staff', 'tables', 'users', 'temporary_bills'
-                )
-            """)
-            
-            existing_tables = cursor.fetchall()
-            print("Existing tables:", [table[0] for table in existing_tables])
-            
-            if len(existing_tables) < 10:
-                print("Some tables are missing. Reinitializing database...")
-                return False
-            return True
+            version = migrations.get_version(self.conn)
+            logging.info(f"Schema version: {version} (latest {migrations.LATEST_VERSION})")
+            return version >= migrations.LATEST_VERSION
             
         except Exception as e:
-            print(f"Error verifying tables: {e}")
+            logging.error(f"Error verifying tables: {str(e)}")
             return False
     
     def close(self):
         """Close the database connection."""
         if self.conn:
             self.conn.close()
-            logging.info("Database connection closed")
+            logging.debug("Database connection closed")
     
     def get_db_version(self):
         """Return the SQLite version."""
@@ -315,25 +145,26 @@ def initialize_database():
     db_manager = DatabaseManager()
     
     if db_manager.connect():
-        print("Successfully connected to database")
+        logging.info("Successfully connected to database")
         
         # Verify tables first
         if not db_manager.verify_tables():
             if db_manager.create_tables():
-                print("Successfully created tables")
+                logging.info("Successfully created tables")
                 
                 if db_manager.insert_default_data():
-                    print("Successfully inserted default data")
+                    logging.info("Successfully inserted default data")
                 else:
-                    print("Failed to insert default data")
+                    logging.error("Failed to insert default data")
             else:
-                print("Failed to create tables")
+                logging.error("Failed to create tables")
         else:
-            print("All required tables exist")
+            logging.info("All required tables exist")
     else:
-        print("Failed to connect to database")
+        logging.error("Failed to connect to database")
     
     db_manager.close()
 
 if __name__ == "__main__":
+    setup_logging(console=True)
     initialize_database()
@@ -0,0 +1,58 @@
+"""
+Command line export for the Cafe Management System.
+Streams sales, sale items, expenses and stock history to files for accounting.
+
+Example:
+    python export_data.py exports --format csv --start 2024-04-01 --end 2025-03-31
+"""
+
+import argparse
+import sys
+
+from utils.export import DataExporter, EXPORT_DATASETS, available_formats
+
+
+def print_progress(dataset, written, total):
+    """Print a single updating progress line."""
+    percent = (written / total * 100) if total else 100
+    sys.stdout.write(f"\r{dataset}: {written}/{total} rows ({percent:.0f}%)")
+    if written >= total:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export cafe data")
+    parser.add_argument("directory", help="Directory to write export files into")
+    parser.add_argument("--format", choices=available_formats(), default="csv")
+    parser.add_argument("--start", help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument(
+        "--dataset",
+        action="append",
+        choices=list(EXPORT_DATASETS),
+        help="Dataset to export (repeatable, default: all)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    exporter = DataExporter(chunk_size=args.chunk_size)
+    try:
+        results = exporter.export_all(
+            args.directory,
+            fmt=args.format,
+            start_date=args.start,
+            end_date=args.end,
+            datasets=args.dataset,
+            progress=print_progress
+        )
+    except Exception as e:
+        print(f"Export failed: {e}")
+        sys.exit(1)
+
+    for dataset, (path, rows) in results.items():
+        print(f"- {dataset}: {rows} rows -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Command line bulk import for the Cafe Management System.
+Loads menu items, expenses or opening stock from a CSV file in one transaction.
+
+Example:
+    python import_data.py menu_items new_menu.csv --dry-run
+"""
+
+import argparse
+import sys
+
+from utils.bulk_import import BulkImporter, IMPORT_TYPES
+
+
+def print_plan(plan):
+    """Print the import counts, row errors and changes."""
+    for line, message in plan["errors"]:
+        print(f"! line {line}: {message}")
+    for action, key, before, after in plan["diff"]:
+        if action == "insert":
+            print(f"+ {key}: {after}")
+        else:
+            print(f"~ {key}: {before} -> {after}")
+    if plan["new_categories"]:
+        print(f"New categories: {', '.join(plan['new_categories'])}")
+
+    print(
+        f"{plan['rows']} rows: {len(plan['inserts'])} new, {len(plan['updates'])} changed, "
+        f"{plan['unchanged']} unchanged, {len(plan['errors'])} with errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import cafe data from CSV")
+    parser.add_argument("kind", choices=list(IMPORT_TYPES))
+    parser.add_argument("path", help="CSV file to import")
+    parser.add_argument("--dry-run", action="store_true", help="Show changes without writing")
+    args = parser.parse_args()
+
+    try:
+        plan = BulkImporter().import_file(args.kind, args.path, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"Import failed: {e}")
+        sys.exit(1)
+
+    print_plan(plan)
+    if args.dry_run:
+        print("Dry run: nothing was written")
+    sys.exit(1 if plan["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
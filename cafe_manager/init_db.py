@@ -4,49 +4,24 @@ Verifies and creates all required tables.
 """
 
 from database import DatabaseManager, initialize_database
+import migrations
 import sqlite3
 
 def verify_and_create_tables():
-    """Verify all required tables exist and create if missing"""
+    """Apply pending schema migrations if the database is behind"""
     try:
         db = DatabaseManager()
         conn = db.connect()
-        cursor = conn.cursor()
 
-        # Check existing tables
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table'
-        """)
-        
-        existing_tables = [table[0] for table in cursor.fetchall()]
-        print("Existing tables:", existing_tables)
+        version = migrations.get_version(conn)
+        print(f"Schema version: {version} (latest {migrations.LATEST_VERSION})")
 
-        # List of required tables
-        required_tables = [
-            'users',
-            'sales',
-            'sale_items',
-            'menu_items',
-            'menu_categories',
-            'tables',
-            'expenses',
-            'bar_stock',
-            'stock_history',
-            'staff',
-            'staff_payments'
-        ]
-
-        # Check for missing tables
-        missing_tables = [table for table in required_tables if table not in existing_tables]
-
-        if missing_tables:
-            print("Missing tables:", missing_tables)
-            print("Initializing database...")
+        if version < migrations.LATEST_VERSION:
+            print("Applying schema migrations...")
             initialize_database()
             print("Database initialized successfully!")
         else:
-            print("All required tables exist!")
+            print("Database schema is up to date!")
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
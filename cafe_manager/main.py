@@ -4,8 +4,14 @@ Handles the core UI and navigation between different pages.
 """
 
 import customtkinter as ctk
+import logging
 from utils.constants import *
 from database import DatabaseManager
+import migrations
+from utils.stock_alerts import StockAlerts
+from utils.backup import BackupManager
+from utils.query_stats import query_stats
+from utils.ui_monitor import UIMonitor
 from datetime import datetime
 import sqlite3
 from tkinter import messagebox
@@ -34,41 +40,79 @@ class NotificationManager:
             parent: Parent window reference
         """
         self.parent = parent
-        self.notifications = []
-        self.last_check = None
+        self.alerts = StockAlerts(parent.db)
+        self.active = {}        # item_id -> latest open alert
+        self.last_id = 0        # Last alert read from the queue
+        self.pending = False    # A read is already scheduled for this tick
+        self.poll_job = None    # Next check for alerts raised by other processes
         
+    @property
+    def notifications(self):
+        """Messages for every item currently at or below its threshold."""
+        return [self.format_alert(alert) for alert in self.active.values()]
+    
+    @staticmethod
+    def format_alert(alert):
+        _, _, item_name, kind, quantity, _, _ = alert
+        if kind == "out":
+            return f"Out of Stock: {item_name}"
+        return f"Low Stock: {item_name} ({quantity:g} remaining)"
+    
+    def start(self):
+        """Load open alerts and listen for stock changes."""
+        try:
+            alerts, self.last_id = self.alerts.get_active()
+            self.active = {alert[1]: alert for alert in alerts}
+            self.parent.update_notification_icon(bool(self.active))
+        except Exception as e:
+            logging.error(f"Notification check failed: {e}")
+        
+        StockAlerts.subscribe(self.on_stock_changed)
+        self.poll_job = self.parent.after(NOTIFICATION_CONFIG["poll_interval"], self.poll)
+    
+    def stop(self):
+        StockAlerts.unsubscribe(self.on_stock_changed)
+        if self.poll_job:
+            self.parent.after_cancel(self.poll_job)
+            self.poll_job = None
+    
+    def poll(self):
+        """Read alerts other processes raised; publish only reaches this one."""
+        try:
+            if self.alerts.latest_id() > self.last_id:
+                self.on_stock_changed()
+        except Exception as e:
+            logging.error(f"Notification check failed: {e}")
+        self.poll_job = self.parent.after(NOTIFICATION_CONFIG["poll_interval"], self.poll)
+    
+    def on_stock_changed(self):
+        """Read new alerts once the current event handler returns."""
+        if not self.pending:
+            self.pending = True
+            self.parent.after_idle(self.check_notifications)
+    
     def check_notifications(self):
-        """Check for system notifications (low stock, etc.)."""
+        """Apply alerts raised since the last read."""
+        self.pending = False
         try:
-            db = DatabaseManager()
-            conn = db.connect()
-            cursor = conn.cursor()
-            
-            # Check bar stock
-            cursor.execute("""
-                SELECT item_name, quantity, min_threshold 
-                FROM bar_stock 
-                WHERE quantity <= min_threshold
-            """)
-            low_stock = cursor.fetchall()
-            
-            # Update notifications
-            self.notifications = [
-                f"Low Stock: {item[0]} ({item[1]} remaining)"
-                for item in low_stock
-            ]
+            raised = []
+            for alert in self.alerts.get_since(self.last_id):
+                self.last_id = alert[0]
+                if alert[3] == "cleared":
+                    self.active.pop(alert[1], None)
+                else:
+                    self.active[alert[1]] = alert
+                    raised.append(alert)
             
             # Update notification icon
-            self.parent.update_notification_icon(bool(self.notifications))
+            self.parent.update_notification_icon(bool(self.active))
+            if raised:
+                self.parent.show_alert_banner(
+                    "  ".join(self.format_alert(alert) for alert in raised)
+                )
             
         except Exception as e:
-            print(f"Notification check failed: {e}")
-        finally:
-            if 'conn' in locals() and conn:
-                conn.close()
-            
-        # Schedule next check
-        self.parent.after(NOTIFICATION_CHECK_INTERVAL, self.check_notifications)
+            logging.error(f"Notification check failed: {e}")
 
 class CafeManager(ctk.CTk):
     """Main application window for the Cafe Management System."""
@@ -87,9 +131,15 @@ class CafeManager(ctk.CTk):
         self.nav_buttons = {}
         self.pages = {}
         self.db = DatabaseManager()
+        self.prepare_database()
         
         # Initialize managers
         self.notification_manager = NotificationManager(self)
+        self.backups = BackupManager(self.db)
+        
+        # Time UI callbacks registered from here on
+        self.ui_monitor = UIMonitor(self)
+        self.ui_monitor.start()
         
         # Window setup
         self.title(WINDOW_CONFIG["main"]["title"])
@@ -123,6 +173,18 @@ class CafeManager(ctk.CTk):
         # Start background tasks
         self.start_background_tasks()
 
+    def prepare_database(self):
+        """Apply pending schema migrations before any page reads or writes."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to prepare database: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
     def setup_ui(self):
         """Create and arrange all UI components."""
         # Create main sections
@@ -212,7 +274,17 @@ class CafeManager(ctk.CTk):
             hover_color=COLORS["background"],
             command=self.show_notifications
         )
-        self.notification_btn.grid(row=0, column=1, padx=PADDING["medium"])
+        self.notification_btn.grid(row=0, column=2, padx=PADDING["medium"])
+        
+        # Banner for alerts raised while working
+        self.alert_banner = ctk.CTkLabel(
+            self.header,
+            text="",
+            font=FONTS["body"],
+            text_color=COLORS["error"]
+        )
+        self.alert_banner.grid(row=0, column=1, padx=PADDING["medium"], sticky="e")
+        self.alert_banner_job = None
 
     def create_main_frame(self):
         """Create the main content area."""
@@ -252,6 +324,8 @@ class CafeManager(ctk.CTk):
     def switch_page(self, page_id):
         """Switch to the specified page."""
         try:
+            started = time.perf_counter()
+            
             # Clear current page
             if self.current_page:
                 self.current_page.destroy()
@@ -284,6 +358,7 @@ class CafeManager(ctk.CTk):
             
             # Display new page
             self.current_page.grid(row=0, column=0, sticky="nsew")
+            self.ui_monitor.page_shown(page_id, self.current_page, time.perf_counter() - started)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load page: {str(e)}")
@@ -309,14 +384,39 @@ class CafeManager(ctk.CTk):
             text="🔔" if has_notifications else "🔕"
         )
 
+    def show_alert_banner(self, text):
+        """Show new stock alerts in the header for a few seconds.
+        
+        Args:
+            text: Alert text
+        """
+        if self.alert_banner_job:
+            self.after_cancel(self.alert_banner_job)
+        self.alert_banner.configure(text=text)
+        self.alert_banner_job = self.after(
+            NOTIFICATION_CONFIG["display_time"],
+            lambda: self.alert_banner.configure(text="")
+        )
+
     def start_background_tasks(self):
         """Start background tasks like notification checking."""
-        # Start notification checker
-        self.notification_manager.check_notifications()
+        # Start listening for stock alerts
+        self.notification_manager.start()
+        
+        # Take automatic backups off the UI thread
+        self.backups.start()
+
+        # Write query timing summaries to the logs
+        query_stats.start()
 
     def logout(self):
         """Handle user logout."""
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
+            self.notification_manager.stop()
+            self.backups.stop()
+            query_stats.stop()
+            self.ui_monitor.stop()
+            
             # Clean up resources
             if self.db.conn:
                 self.db.close()
@@ -334,6 +434,11 @@ class CafeManager(ctk.CTk):
     def on_closing(self):
         """Handle window closing."""
         if messagebox.askyesno("Quit", "Are you sure you want to quit?"):
+            self.notification_manager.stop()
+            self.backups.stop()
+            query_stats.stop()
+            self.ui_monitor.stop()
+            
             # Clean up resources
             if self.db.conn:
                 self.db.close()
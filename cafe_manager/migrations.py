@@ -0,0 +1,336 @@
+"""
+Schema migrations for the Cafe Management System.
+The schema is built by numbered migrations applied in order, each in its own
+transaction, and the applied version is recorded in schema_version and the
+database header. Opening an up-to-date database costs one header read.
+
+Migrations are append-only: once a migration has shipped, change the schema by
+adding a new one rather than editing it (this includes the create_tables of
+the engines that earlier migrations call).
+"""
+
+import logging
+import sqlite3
+
+
+def add_column(cursor, table, column, definition):
+    """Add a column unless the table already has it.
+
+    Returns:
+        bool: True if the column was added
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column in [row[1] for row in cursor.fetchall()]:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def _base_tables(cursor):
+    """Core tables, as the application reads and writes them."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS staff (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            title TEXT NOT NULL,
+            contact TEXT NOT NULL,
+            salary REAL NOT NULL,
+            join_date DATE NOT NULL,
+            last_paid_date DATE,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS staff_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            staff_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            payment_date DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (staff_id) REFERENCES staff (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number INTEGER UNIQUE NOT NULL,
+            status TEXT CHECK(status IN ('vacant', 'occupied')) DEFAULT 'vacant',
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS menu_categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS menu_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            price REAL NOT NULL,
+            FOREIGN KEY (category_id) REFERENCES menu_categories (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bar_stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL UNIQUE,
+            unit_type TEXT NOT NULL CHECK(unit_type IN ('ML', 'PIECE', 'PACKET')),
+            pieces_per_packet INTEGER,     -- For cigarettes (20 pieces per packet)
+            quantity REAL NOT NULL,        -- Current quantity
+            original_quantity REAL NOT NULL, -- Initial quantity when added
+            min_threshold REAL NOT NULL,   -- Warning threshold
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            change_quantity REAL NOT NULL,
+            operation_type TEXT CHECK(operation_type IN ('add', 'remove')),
+            source TEXT NOT NULL,  -- 'sale' or 'expense'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (item_id) REFERENCES bar_stock (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expense_categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            title TEXT NOT NULL,
+            category TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            price_per_unit REAL NOT NULL,
+            total_price REAL NOT NULL,
+            expense_date DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS temporary_bills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number INTEGER NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            price_per_unit REAL NOT NULL,
+            total_price REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (table_number) REFERENCES tables (table_number),
+            FOREIGN KEY (menu_item_id) REFERENCES menu_items (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number INTEGER NOT NULL,
+            subtotal REAL NOT NULL,
+            discount_type TEXT CHECK(discount_type IN ('percentage', 'amount')),
+            discount_value REAL DEFAULT 0,
+            total_amount REAL NOT NULL,
+            payment_status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (table_number) REFERENCES tables (table_number)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sale_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            price_per_unit REAL NOT NULL,
+            total_price REAL NOT NULL,
+            FOREIGN KEY (sale_id) REFERENCES sales (id) ON DELETE CASCADE,
+            FOREIGN KEY (menu_item_id) REFERENCES menu_items (id)
+        )
+    """)
+
+    # Reference data every install needs
+    cursor.executemany(
+        "INSERT OR IGNORE INTO tables (table_number) VALUES (?)",
+        [(number,) for number in range(1, 16)]
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO expense_categories (name) VALUES (?)",
+        [(name,) for name in ('Management', 'Miscellaneous', 'Bar', 'Kitchen')]
+    )
+    cursor.execute("""
+        INSERT INTO users (username, password)
+        SELECT 'admin', 'admin123'
+        WHERE NOT EXISTS (SELECT 1 FROM users)
+    """)
+
+
+def _legacy_columns(cursor):
+    """Bring databases made by the older setup scripts in line with the base tables."""
+    if add_column(cursor, "bar_stock", "unit_type",
+                  "TEXT NOT NULL DEFAULT 'PIECE' CHECK(unit_type IN ('ML', 'PIECE', 'PACKET'))"):
+        logging.info("Added bar_stock.unit_type; existing items default to PIECE")
+    add_column(cursor, "bar_stock", "pieces_per_packet", "INTEGER")
+    if add_column(cursor, "bar_stock", "original_quantity", "REAL NOT NULL DEFAULT 0"):
+        cursor.execute("UPDATE bar_stock SET original_quantity = quantity")
+
+    add_column(cursor, "stock_history", "source", "TEXT NOT NULL DEFAULT 'manual'")
+    add_column(cursor, "expenses", "category", "TEXT NOT NULL DEFAULT 'Miscellaneous'")
+    add_column(cursor, "staff_payments", "created_at", "TIMESTAMP")
+
+    # One script tracked staff with status/last_paid instead
+    cursor.execute("PRAGMA table_info(staff)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if add_column(cursor, "staff", "is_active", "INTEGER DEFAULT 1") and "status" in columns:
+        cursor.execute("UPDATE staff SET is_active = (status = 'active')")
+    if add_column(cursor, "staff", "last_paid_date", "DATE") and "last_paid" in columns:
+        cursor.execute("UPDATE staff SET last_paid_date = last_paid")
+    add_column(cursor, "staff", "created_at", "TIMESTAMP")
+
+
+def _base_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_menu_items_category ON menu_items(category_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_stock_history_item ON stock_history(item_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales(created_at)')
+
+
+def _engine(module, name, step="create_tables"):
+    """Migration that applies an engine's create_tables, or a later schema step."""
+    def apply(cursor):
+        engine = getattr(__import__(module, fromlist=[name]), name)
+        getattr(engine, step)(cursor)
+    return apply
+
+
+# (version, name, apply(cursor)), in the order they are applied
+MIGRATIONS = [
+    (1, "base tables", _base_tables),
+    (2, "legacy setup script columns", _legacy_columns),
+    (3, "base indexes", _base_indexes),
+    (4, "menu item costs", _engine("utils.menu_engineering", "MenuEngineering")),
+    (5, "daily close", _engine("utils.day_close", "DayCloseManager")),
+    (6, "expense ledger indexes", _engine("utils.expense_ledger", "ExpenseLedger")),
+    (7, "stock ledger", _engine("utils.stock_ledger", "StockLedger")),
+    (8, "recipes", _engine("utils.recipes", "RecipeBook")),
+    (9, "stock alerts", _engine("utils.stock_alerts", "StockAlerts")),
+    (10, "reorder state", _engine("utils.reorder", "ReorderEngine")),
+    (11, "stock valuation", _engine("utils.stock_valuation", "StockValuation")),
+    (12, "payroll", _engine("utils.payroll", "PayrollManager")),
+    (13, "attendance", _engine("utils.attendance", "AttendanceManager")),
+    (14, "menu prices", _engine("utils.menu_prices", "MenuPrices")),
+    (15, "archived periods", _engine("utils.archive", "ArchiveManager")),
+    (16, "bill events", _engine("utils.bill_service", "BillService")),
+    (17, "replicated operations", _engine("utils.replication", "ReplicationLog")),
+    (18, "bill sessions and invoice numbers", _engine("utils.bill_sessions", "BillSessions")),
+    (19, "order events", _engine("utils.order_events", "OrderEvents")),
+    (20, "daily close row markers", _engine("utils.day_close", "DayCloseManager", "add_row_markers")),
+    (21, "stock checkpoint history markers", _engine("utils.stock_ledger", "StockLedger", "add_history_marker")),
+    (22, "change counters", _engine("utils.change_counters", "ChangeCounters")),
+    (23, "recipe change counter", _engine("utils.recipes", "RecipeBook", "add_change_counter")),
+    (24, "stock shrinkage", _engine("utils.stock_valuation", "StockValuation", "add_shrinkage")),
+    (25, "menu engineering change counter", _engine("utils.menu_engineering", "MenuEngineering", "add_change_counter")),
+    (26, "sales edit counter", _engine("utils.change_counters", "ChangeCounters", "add_sales_edits")),
+    (27, "single bill session opener", _engine("utils.order_events", "OrderEvents", "merge_session_open")),
+    (28, "reorder usage from sales only", _engine("utils.reorder", "ReorderEngine", "reset_usage")),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Databases already checked in this process, by file
+_up_to_date = set()
+
+
+def get_version(conn):
+    """Return the schema version recorded in the database header."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Apply every pending migration up to target (default: the latest).
+
+    Each migration runs in its own transaction together with its
+    schema_version row, so a failure leaves the database at the last
+    version that applied cleanly. The version is re-read under the write
+    lock, so two processes starting together do not both migrate.
+
+    Returns:
+        list: Versions applied
+    """
+    target = LATEST_VERSION if target is None else target
+    if conn.in_transaction:
+        conn.commit()
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+        )
+    """)
+    conn.commit()
+
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        if version > target:
+            break
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if cursor.fetchone():
+                conn.rollback()
+                continue
+
+            apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(version)
+            logging.info(f"Applied migration {version}: {name}")
+
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Migration {version} ({name}) failed: {str(e)}")
+            raise
+
+    return applied
+
+
+def ensure_schema(conn):
+    """Make sure the database is at the latest version; once per process per file.
+
+    Call before starting a transaction on the connection.
+    """
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    if path in _up_to_date:
+        return
+    if get_version(conn) < LATEST_VERSION:
+        migrate(conn)
+    _up_to_date.add(path)
+
+
+def get_history(conn):
+    """Return applied migrations as (version, name, applied_at), oldest first."""
+    try:
+        return conn.execute(
+            "SELECT version, name, applied_at FROM schema_version ORDER BY version"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
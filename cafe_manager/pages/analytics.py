@@ -4,8 +4,11 @@ Provides detailed business insights and trends through interactive visualization
 """
 
 import customtkinter as ctk
+import logging
 from utils.constants import *
 from database import DatabaseManager
+from utils.menu_engineering import MenuEngineering, CLASSIFICATIONS
+from utils.order_events import OrderEvents
 import sqlite3
 from datetime import datetime, timedelta
 import pytz
@@ -17,6 +20,22 @@ matplotlib.use('TkAgg')
 # Get local timezone
 LOCAL_TZ = pytz.timezone('Asia/Kathmandu')  # Nepal Time (UTC+5:45)
 
+# Menu engineering periods (days of history, None for all time)
+ENGINEERING_PERIODS = {
+    "Last 7 Days": 7,
+    "Last 30 Days": 30,
+    "Last 90 Days": 90,
+    "Last Year": 365,
+    "All Time": None
+}
+
+ENGINEERING_COLORS = {
+    "star": "#10B981",
+    "plowhorse": "#3B82F6",
+    "puzzle": "#F59E0B",
+    "dog": "#EF4444"
+}
+
 class InsightCard(ctk.CTkFrame):
     """Custom widget for displaying business insights."""
     
@@ -68,6 +87,9 @@ class AnalyticsPage(ctk.CTkFrame):
         
         # Initialize database
         self.db = DatabaseManager()
+        self.menu_engineering = MenuEngineering(self.db)
+        self.order_events = OrderEvents(self.db)
+        self.engineering_period = ctk.StringVar(value="Last 30 Days")
         
         # Configure grid
         self.grid_columnconfigure(0, weight=1)
@@ -111,6 +133,9 @@ class AnalyticsPage(ctk.CTkFrame):
         
         # Inventory Analysis Section
         self.create_inventory_analysis(content_frame)
+        
+        # Menu Engineering Section
+        self.create_menu_engineering(content_frame)
     
     def create_key_metrics(self, parent):
         """Create the key metrics section."""
@@ -213,6 +238,16 @@ class AnalyticsPage(ctk.CTkFrame):
         
         self.table_usage_card = InsightCard(insights_frame, "Table Usage")
         self.table_usage_card.grid(row=0, column=2, padx=(PADDING["small"], 0), sticky="ew")
+        
+        # Table turn and void cards, read from the order event log
+        self.table_turn_card = InsightCard(insights_frame, "Table Turn")
+        self.table_turn_card.grid(row=1, column=0, padx=(0, PADDING["small"]), pady=(PADDING["medium"], 0), sticky="ew")
+        
+        self.turns_card = InsightCard(insights_frame, "Turns per Table")
+        self.turns_card.grid(row=1, column=1, padx=PADDING["small"], pady=(PADDING["medium"], 0), sticky="ew")
+        
+        self.voids_card = InsightCard(insights_frame, "Voided Items")
+        self.voids_card.grid(row=1, column=2, padx=(PADDING["small"], 0), pady=(PADDING["medium"], 0), sticky="ew")
     
     def create_inventory_analysis(self, parent):
         """Create the inventory analysis section."""
@@ -233,6 +268,45 @@ class AnalyticsPage(ctk.CTkFrame):
         self.inventory_canvas = FigureCanvasTkAgg(self.inventory_figure, master=chart_frame)
         self.inventory_canvas.get_tk_widget().pack(padx=PADDING["medium"], pady=PADDING["medium"], fill="both", expand=True)
     
+    def create_menu_engineering(self, parent):
+        """Create the menu engineering (popularity x margin) section."""
+        # Section Title with period selection
+        header_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        header_frame.grid(row=10, column=0, pady=(PADDING["large"], PADDING["medium"]), sticky="ew")
+        
+        ctk.CTkLabel(
+            header_frame,
+            text="Menu Engineering",
+            font=FONTS["subheading"],
+            text_color=COLORS["text"]["primary"]
+        ).pack(side="left")
+        
+        ctk.CTkOptionMenu(
+            header_frame,
+            values=list(ENGINEERING_PERIODS.keys()),
+            variable=self.engineering_period,
+            command=lambda _: self.update_menu_engineering(),
+            font=FONTS["default"]
+        ).pack(side="right")
+        
+        # Matrix Chart
+        chart_frame = ctk.CTkFrame(parent, fg_color="white", corner_radius=10)
+        chart_frame.grid(row=11, column=0, sticky="ew")
+        
+        self.engineering_figure = matplotlib.figure.Figure(figsize=(12, 6))
+        self.engineering_ax = self.engineering_figure.add_subplot(111)
+        self.engineering_canvas = FigureCanvasTkAgg(self.engineering_figure, master=chart_frame)
+        self.engineering_canvas.get_tk_widget().pack(padx=PADDING["medium"], pady=PADDING["medium"], fill="both", expand=True)
+        
+        # Classification counts
+        self.engineering_summary = ctk.CTkLabel(
+            parent,
+            text="",
+            font=FONTS["default"],
+            text_color=COLORS["text"]["primary"]
+        )
+        self.engineering_summary.grid(row=12, column=0, pady=(PADDING["small"], 0), sticky="w")
+    
     def update_key_metrics(self):
         """Update key business metrics."""
         try:
@@ -276,7 +350,7 @@ class AnalyticsPage(ctk.CTkFrame):
             self.orders_card.update(str(orders), "Orders Today")
             
         except Exception as e:
-            print(f"Error updating key metrics: {e}")
+            logging.error(f"Error updating key metrics: {e}")
         finally:
             if 'conn' in locals() and conn:
                 conn.close()
@@ -341,7 +415,7 @@ class AnalyticsPage(ctk.CTkFrame):
                 self.sales_canvas.draw()
             
         except Exception as e:
-            print(f"Error updating sales chart: {e}")
+            logging.error(f"Error updating sales chart: {e}")
         finally:
             if 'conn' in locals() and conn:
                 conn.close()
@@ -446,7 +520,7 @@ class AnalyticsPage(ctk.CTkFrame):
                 self.category_canvas.draw()
             
         except Exception as e:
-            print(f"Error updating menu charts: {e}")
+            logging.error(f"Error updating menu charts: {e}")
         finally:
             if 'conn' in locals() and conn:
                 conn.close()
@@ -493,13 +567,31 @@ class AnalyticsPage(ctk.CTkFrame):
             else:
                 table_usage = "No data"
             
+            # Table turns and voids today
+            today = datetime.now(LOCAL_TZ).strftime('%Y-%m-%d')
+            sessions = [s for s in self.order_events.get_sessions(today) if s["status"] == "paid"]
+            seated = [s["minutes_seated"] for s in sessions]
+            voids = self.order_events.voids(today)
+            
             # Update cards
             self.avg_order_card.update(f"₹{avg_order:,.2f}", "Per Order Average")
             self.peak_hours_card.update(peak_hour, "Busiest Time Today")
             self.table_usage_card.update(table_usage, "Current Occupancy")
+            self.table_turn_card.update(
+                f"{sum(seated) / len(seated):.0f} min" if seated else "No data",
+                f"Average Seating, {len(sessions)} Bills Today"
+            )
+            self.turns_card.update(
+                f"{len(sessions) / table_data[0]:.1f}" if table_data and table_data[0] else "No data",
+                "Paid Bills per Table Today"
+            )
+            self.voids_card.update(
+                f"₹{voids['value']:,.2f}",
+                f"{voids['quantity']} Items Removed, {voids['voided_bills']} Bills Voided"
+            )
             
         except Exception as e:
-            print(f"Error updating customer insights: {e}")
+            logging.error(f"Error updating customer insights: {e}")
         finally:
             if 'conn' in locals() and conn:
                 conn.close()
@@ -566,11 +658,84 @@ class AnalyticsPage(ctk.CTkFrame):
                 self.inventory_canvas.draw()
             
         except Exception as e:
-            print(f"Error updating inventory chart: {e}")
+            logging.error(f"Error updating inventory chart: {e}")
         finally:
             if 'conn' in locals() and conn:
                 conn.close()
     
+    def update_menu_engineering(self):
+        """Update the menu engineering matrix chart."""
+        try:
+            days = ENGINEERING_PERIODS[self.engineering_period.get()]
+            now = datetime.now(LOCAL_TZ)
+            start_date = (now - timedelta(days=days)).strftime('%Y-%m-%d') if days else None
+            
+            # Report is cached until sales or costs change, so refreshing is cheap
+            report = self.menu_engineering.analyze(start_date, now.strftime('%Y-%m-%d'))
+            if report is getattr(self, '_engineering_report', None):
+                return
+            self._engineering_report = report
+            
+            items = report["items"]
+            self.engineering_ax.clear()
+            
+            for classification in CLASSIFICATIONS:
+                group = [i for i in items if i["classification"] == classification]
+                if not group:
+                    continue
+                self.engineering_ax.scatter(
+                    [i["mix_share"] * 100 for i in group],
+                    [i["unit_margin"] for i in group],
+                    color=ENGINEERING_COLORS[classification],
+                    label=classification.capitalize(),
+                    s=60,
+                    alpha=0.8
+                )
+                for i in group:
+                    self.engineering_ax.annotate(
+                        i["name"],
+                        (i["mix_share"] * 100, i["unit_margin"]),
+                        fontsize=8,
+                        xytext=(4, 4),
+                        textcoords="offset points"
+                    )
+            
+            # Threshold lines split the chart into the four quadrants
+            self.engineering_ax.axvline(
+                report["popularity_threshold"] * 100, color='#9CA3AF', linestyle='--'
+            )
+            self.engineering_ax.axhline(
+                report["margin_threshold"], color='#9CA3AF', linestyle='--'
+            )
+            
+            # Customize chart
+            self.engineering_ax.set_facecolor('white')
+            self.engineering_ax.grid(True, linestyle='--', alpha=0.3)
+            self.engineering_ax.set_title('Popularity vs Contribution Margin', pad=20)
+            self.engineering_ax.set_xlabel('Menu Mix (%)')
+            self.engineering_ax.set_ylabel('Contribution Margin per Unit (₹)')
+            if items:
+                self.engineering_ax.legend(loc='upper right')
+            
+            counts = {c: 0 for c in CLASSIFICATIONS}
+            missing_costs = 0
+            for item in items:
+                counts[item["classification"]] += 1
+                if not item["has_cost"]:
+                    missing_costs += 1
+            
+            summary = "   ".join(f"{c.capitalize()}s: {n}" for c, n in counts.items())
+            if missing_costs:
+                summary += f"   ({missing_costs} items have no cost recorded)"
+            self.engineering_summary.configure(text=summary)
+            
+            # Update canvas
+            self.engineering_figure.tight_layout()
+            self.engineering_canvas.draw()
+            
+        except Exception as e:
+            logging.error(f"Error updating menu engineering: {e}")
+    
     def update_all(self):
         """Update all analytics components."""
         self.update_key_metrics()
@@ -578,6 +743,7 @@ class AnalyticsPage(ctk.CTkFrame):
         self.update_menu_charts()
         self.update_customer_insights()
         self.update_inventory_chart()
+        self.update_menu_engineering()
     
     def start_auto_refresh(self):
         """Start auto-refresh timer."""
@@ -590,4 +756,5 @@ class AnalyticsPage(ctk.CTkFrame):
         plt.close(self.top_items_figure)
         plt.close(self.category_figure)
         plt.close(self.inventory_figure)
+        plt.close(self.engineering_figure)
         super().destroy() 
\ No newline at end of file
@@ -6,9 +6,18 @@ Handles bar inventory management and tracking.
 import customtkinter as ctk
 from utils.constants import *
 from database import DatabaseManager
+from pages.import_dialog import ImportDialog
+from utils.data_grid import DataGrid
+from utils.stock_ledger import StockLedger
+from utils.stock_alerts import StockAlerts
+from utils.app_logging import log_event
+from utils.reorder import ReorderEngine
+from utils.stock_valuation import StockValuation
 from datetime import datetime
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
+from tkcalendar import DateEntry
 import sqlite3
+import csv
 
 class AddBarItemDialog(ctk.CTkToplevel):
     def __init__(self, parent):
@@ -136,6 +145,8 @@ class AddBarItemDialog(ctk.CTkToplevel):
             ))
             
             conn.commit()
+            StockAlerts.publish()
+            log_event("stock_adjusted", item=name, change=quantity, unit=unit_type, reason="new item")
             messagebox.showinfo("Success", "Item added successfully!")
             
             self.parent.load_stock_data()
@@ -259,6 +270,8 @@ class AddStockDialog(ctk.CTkToplevel):
             """, (self.item_id, quantity))
             
             conn.commit()
+            StockAlerts.publish()
+            log_event("stock_adjusted", item_id=self.item_id, change=quantity, reason="restock")
             messagebox.showinfo("Success", "Stock added successfully!")
             
             self.parent.load_stock_data()
@@ -279,6 +292,360 @@ class AddStockDialog(ctk.CTkToplevel):
         y = (self.winfo_screenheight() // 2) - (height // 2)
         self.geometry(f'{width}x{height}+{x}+{y}')
 
+class StockLedgerDialog(ctk.CTkToplevel):
+    """Stock at any moment, the day's movement, and ledger reconciliation."""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.ledger = StockLedger(parent.db)
+        
+        # Window setup
+        self.title("Stock Ledger")
+        self.geometry("760x520")
+        
+        self.setup_ui()
+        self.center_window()
+        self.show_stock()
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        # Moment selection
+        controls = ctk.CTkFrame(main_frame, fg_color="transparent")
+        controls.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(controls, text="Stock at:").pack(side="left", padx=(0, 5))
+        self.date_entry = DateEntry(controls, width=12, date_pattern='yyyy-mm-dd')
+        self.date_entry.pack(side="left", padx=(0, 5))
+        
+        self.time_entry = ctk.CTkEntry(controls, width=70)
+        self.time_entry.insert(0, datetime.now().strftime('%H:%M'))
+        self.time_entry.pack(side="left", padx=(0, 10))
+        
+        ctk.CTkButton(
+            controls,
+            text="Show",
+            command=self.show_stock,
+            width=80
+        ).pack(side="left")
+        
+        ctk.CTkButton(
+            controls,
+            text="Reconcile",
+            command=self.show_reconciliation,
+            width=100,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right")
+        
+        # Balance at the chosen moment and movement over its day
+        self.grid_view = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Item Name", "value": 1, "width": 160, "weight": 2},
+                {"title": "Unit Type", "value": 2, "width": 80, "weight": 0},
+                {"title": "Balance", "value": 3, "width": 100,
+                 "format": lambda v: "-" if v is None else f"{v:g}"},
+                {"title": "Opening", "value": 4, "width": 90, "format": lambda v: f"{v:g}"},
+                {"title": "Added", "value": 5, "width": 90, "format": lambda v: f"{v:g}"},
+                {"title": "Removed", "value": 6, "width": 90, "format": lambda v: f"{v:g}"}
+            ],
+            empty_text="No bar items"
+        )
+        self.grid_view.pack(fill="both", expand=True)
+        
+        ctk.CTkLabel(
+            main_frame,
+            text="Opening, Added and Removed cover the selected day up to its end.",
+            text_color="gray"
+        ).pack(pady=(5, 0))
+    
+    def show_stock(self):
+        """Load balances at the chosen moment and movement over that day."""
+        day = self.date_entry.get_date().strftime('%Y-%m-%d')
+        try:
+            at = datetime.strptime(f"{day} {self.time_entry.get().strip()}", '%Y-%m-%d %H:%M')
+        except ValueError:
+            messagebox.showerror("Error", "Please enter the time as HH:MM")
+            return
+        
+        try:
+            balances = {row[0]: row[3] for row in self.ledger.stock_at(at)}
+            rows = []
+            for item_id, name, unit_type, movement in self.ledger.movements(day, day):
+                rows.append((
+                    item_id, name, unit_type, balances.get(item_id),
+                    movement["opening"], movement["added"], movement["removed"]
+                ))
+            self.grid_view.set_rows(rows)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load stock ledger: {str(e)}")
+    
+    def show_reconciliation(self):
+        """Replay stock history against current stock."""
+        try:
+            report = self.ledger.reconcile()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to reconcile stock: {str(e)}")
+            return
+        
+        problems = [item for item in report if item["issues"]]
+        if not problems:
+            messagebox.showinfo(
+                "Reconciliation",
+                f"All {len(report)} items match their stock history."
+            )
+            return
+        
+        lines = []
+        for item in problems:
+            lines.append(f"{item['item_name']}:")
+            lines.extend(f"  - {issue}" for issue in item["issues"])
+        messagebox.showwarning("Reconciliation", "\n".join(lines))
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
+class ReorderDialog(ctk.CTkToplevel):
+    """Usage-based days of cover and a suggested purchase order."""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.engine = ReorderEngine(parent.db)
+        self.suggestions = []
+        
+        # Window setup
+        self.title("Reorder Suggestions")
+        self.geometry("760x520")
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_suggestions()
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        controls = ctk.CTkFrame(main_frame, fg_color="transparent")
+        controls.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(controls, text="Lead time (days):").pack(side="left", padx=(0, 5))
+        self.lead_time_entry = ctk.CTkEntry(controls, width=50)
+        self.lead_time_entry.insert(0, str(REORDER_CONFIG["lead_time_days"]))
+        self.lead_time_entry.pack(side="left", padx=(0, 10))
+        
+        ctk.CTkLabel(controls, text="Cover (days):").pack(side="left", padx=(0, 5))
+        self.review_entry = ctk.CTkEntry(controls, width=50)
+        self.review_entry.insert(0, str(REORDER_CONFIG["review_days"]))
+        self.review_entry.pack(side="left", padx=(0, 10))
+        
+        ctk.CTkButton(
+            controls,
+            text="Calculate",
+            command=self.load_suggestions,
+            width=90
+        ).pack(side="left")
+        
+        ctk.CTkButton(
+            controls,
+            text="Save Order",
+            command=self.save_order,
+            width=100,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right")
+        
+        def days(value):
+            return "-" if value is None else f"{value:.1f}"
+        
+        self.grid_view = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Item Name", "value": lambda s: s["item_name"], "width": 160, "weight": 2},
+                {"title": "In Stock", "value": lambda s: s["quantity"], "width": 150,
+                 "text": lambda s: BarStockPage.quantity_text(s["quantity"], s["unit_type"])},
+                {"title": "Used / Day", "value": lambda s: s["velocity"], "width": 90,
+                 "format": lambda v: f"{v:.2f}"},
+                {"title": "Days Left", "value": lambda s: s["days_of_cover"], "width": 80,
+                 "format": days,
+                 "color": lambda s: "#EF4444" if s["order_quantity"] else None},
+                {"title": "Order", "value": lambda s: s["order_quantity"], "width": 120,
+                 "text": lambda s: f"{s['order_quantity']} {s['unit_type']}" if s["order_quantity"] else "-",
+                 "font": ("Helvetica", 12, "bold")}
+            ],
+            empty_text="No bar items"
+        )
+        self.grid_view.pack(fill="both", expand=True)
+        
+        ctk.CTkLabel(
+            main_frame,
+            text="Usage is a smoothed daily average of stock removed. Orders cover the "
+                 "lead time and cover days on top of the warning level.",
+            text_color="gray",
+            wraplength=700
+        ).pack(pady=(5, 0))
+    
+    def load_suggestions(self):
+        """Refresh usage and recalculate suggestions."""
+        try:
+            lead_time = float(self.lead_time_entry.get().strip())
+            review = float(self.review_entry.get().strip())
+            if lead_time < 0 or review < 0:
+                raise ValueError()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numbers of days")
+            return
+        
+        try:
+            self.suggestions = self.engine.get_suggestions(lead_time, review)
+            self.grid_view.set_rows(self.suggestions)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to calculate reorder suggestions: {str(e)}")
+    
+    def save_order(self):
+        """Save the items to order as a CSV purchase order."""
+        order = [s for s in self.suggestions if s["order_quantity"] > 0]
+        if not order:
+            messagebox.showinfo("Reorder", "Nothing needs ordering right now.")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".csv",
+            initialfile=f"purchase_order_{datetime.now().strftime('%Y%m%d')}.csv",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if not path:
+            return
+        
+        try:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["item_name", "unit_type", "order_quantity", "in_stock", "used_per_day"])
+                for s in order:
+                    writer.writerow([
+                        s["item_name"], s["unit_type"], s["order_quantity"],
+                        s["quantity"], round(s["velocity"], 2)
+                    ])
+            messagebox.showinfo("Reorder", f"Saved purchase order for {len(order)} items.")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save purchase order: {str(e)}")
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
+class ValuationDialog(ctk.CTkToplevel):
+    """Inventory value on hand, cost of goods sold and shrinkage for a period."""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.valuation = StockValuation(parent.db)
+        
+        # Window setup
+        self.title(f"Stock Valuation ({self.valuation.method.upper()})")
+        self.geometry("860x560")
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_valuation()
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        controls = ctk.CTkFrame(main_frame, fg_color="transparent")
+        controls.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(controls, text="COGS from:").pack(side="left", padx=(0, 5))
+        self.start_entry = DateEntry(controls, width=12, date_pattern='yyyy-mm-dd')
+        self.start_entry.set_date(datetime.now().replace(day=1))
+        self.start_entry.pack(side="left", padx=(0, 5))
+        
+        ctk.CTkLabel(controls, text="to:").pack(side="left", padx=(0, 5))
+        self.end_entry = DateEntry(controls, width=12, date_pattern='yyyy-mm-dd')
+        self.end_entry.pack(side="left", padx=(0, 10))
+        
+        ctk.CTkButton(
+            controls,
+            text="Show",
+            command=self.load_valuation,
+            width=80
+        ).pack(side="left")
+        
+        self.grid_view = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Item Name", "value": 1, "width": 160, "weight": 2},
+                {"title": "On Hand", "value": 3, "width": 130,
+                 "text": lambda row: BarStockPage.quantity_text(row[3], row[2])},
+                {"title": "Unit Cost", "value": 4, "width": 90, "format": lambda v: f"₹{v:.2f}"},
+                {"title": "Value", "value": 5, "width": 100, "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Sold", "value": 6, "width": 80, "format": lambda v: f"{v:g}"},
+                {"title": "COGS", "value": 7, "width": 100, "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Shrinkage", "value": 8, "width": 100, "format": lambda v: f"₹{v:,.2f}"}
+            ],
+            sort_column=5,
+            sort_reverse=True,
+            empty_text="No bar items"
+        )
+        self.grid_view.pack(fill="both", expand=True)
+        
+        self.totals_label = ctk.CTkLabel(
+            main_frame,
+            text="",
+            font=("Helvetica", 14, "bold")
+        )
+        self.totals_label.pack(pady=(10, 0))
+    
+    def load_valuation(self):
+        """Load inventory value and the period's cost of goods sold and shrinkage."""
+        start = self.start_entry.get_date().strftime('%Y-%m-%d')
+        end = self.end_entry.get_date().strftime('%Y-%m-%d')
+        if start > end:
+            messagebox.showerror("Error", "Start date must be before end date")
+            return
+        
+        try:
+            inventory = self.valuation.get_inventory_value()
+            cogs = self.valuation.get_cogs(start, end)
+            shrinkage = self.valuation.get_shrinkage(start, end)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load stock valuation: {str(e)}")
+            return
+        
+        sold = {item[0]: (item[3], item[4]) for item in cogs["items"]}
+        lost = {item[0]: item[4] for item in shrinkage["items"]}
+        self.grid_view.set_rows([
+            (item_id, name, unit_type, quantity, unit_cost, value)
+            + sold.get(item_id, (0, 0)) + (lost.get(item_id, 0),)
+            for item_id, name, unit_type, quantity, unit_cost, value in inventory["items"]
+        ])
+        self.totals_label.configure(
+            text=f"Inventory Value: ₹{inventory['total']:,.2f}    "
+                 f"COGS ({start} to {end}): ₹{cogs['total']:,.2f}    "
+                 f"Shrinkage: ₹{shrinkage['total']:,.2f}"
+        )
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
 class BarStockPage(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color="transparent")
@@ -308,52 +675,97 @@ class BarStockPage(ctk.CTkFrame):
             font=("Helvetica", 24, "bold")
         ).grid(row=0, column=0, sticky="w")
         
+        # Buttons frame
+        buttons_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
+        buttons_frame.grid(row=0, column=1, sticky="e")
+        
+        # Stock Valuation Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Valuation",
+            command=self.show_valuation_dialog,
+            width=120,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
+        # Reorder Suggestions Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Reorder",
+            command=self.show_reorder_dialog,
+            width=120,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
+        # Stock Ledger Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Stock Ledger",
+            command=self.show_ledger_dialog,
+            width=120,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
+        # Import Opening Stock Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Import CSV",
+            command=self.show_import_dialog,
+            width=120,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
         # Add Bar Item Button
         ctk.CTkButton(
-            header_frame,
+            buttons_frame,
             text="+ Add Bar Item",
             command=self.show_add_dialog,
             width=120
-        ).grid(row=0, column=1, sticky="e")
-        
-        # Table container frame
-        self.table_container = ctk.CTkFrame(self)
-        self.table_container.grid(row=1, column=0, padx=20, pady=(0,20), sticky="nsew")
-        self.table_container.grid_columnconfigure(0, weight=1)
-        self.table_container.grid_rowconfigure(1, weight=1)
-        
-        # Headers frame
-        headers_frame = ctk.CTkFrame(self.table_container, fg_color="transparent")
-        headers_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=5)
-        
-        # Configure header columns
-        headers = ["Item Name", "Unit Type", "Original", "Remaining", "Warning Level", "Status", "Actions"]
-        for i in range(len(headers)):
-            headers_frame.grid_columnconfigure(i, weight=1)
-        
-        # Create headers
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(
-                headers_frame,
-                text=header,
-                font=("Helvetica", 12, "bold")
-            ).grid(row=0, column=i, padx=5, pady=5, sticky="w")
-        
-        # Create scrollable frame for stock items
-        self.stock_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.stock_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=(0,10))
-        
-        # Configure columns in stock frame
-        for i in range(len(headers)):
-            self.stock_frame.grid_columnconfigure(i, weight=1)
+        ).pack(side="right", padx=5)
+        
+        # Stock table
+        self.stock_grid = DataGrid(
+            self,
+            columns=[
+                {"title": "Item Name", "value": 1, "width": 140, "weight": 2},
+                {"title": "Unit Type", "value": 2, "width": 80, "weight": 0},
+                {"title": "Original", "value": 4,
+                 "text": lambda row: self.quantity_text(row[4], row[2]), "width": 150},
+                {"title": "Remaining", "value": 5,
+                 "text": lambda row: self.quantity_text(row[5], row[2]), "width": 150},
+                {"title": "Warning Level", "value": 6,
+                 "text": lambda row: self.quantity_text(row[6], row[2]), "width": 150},
+                {
+                    "title": "Status",
+                    "value": lambda row: "Low Stock" if row[5] <= row[6] else "OK",
+                    "width": 90,
+                    "weight": 0,
+                    "font": ("Helvetica", 12, "bold"),
+                    "color": lambda row: "#EF4444" if row[5] <= row[6] else "#10B981"
+                }
+            ],
+            actions=[
+                {
+                    "text": "Add Stock",
+                    "command": lambda row: self.show_add_stock_dialog(row[0]),
+                    "width": 90,
+                    "fg_color": "#2563EB"
+                },
+                {
+                    "text": "×",
+                    "command": lambda row: self.delete_item(row[0]),
+                    "width": 30,
+                    "fg_color": "#EF4444"
+                }
+            ],
+            empty_text="No bar items yet"
+        )
+        self.stock_grid.grid(row=1, column=0, padx=20, pady=(0,20), sticky="nsew")
     
     def load_stock_data(self):
         """Load and display stock data"""
+        conn = None
         try:
-            # Clear existing items
-            for widget in self.stock_frame.winfo_children():
-                widget.destroy()
-            
             conn = self.db.connect()
             cursor = conn.cursor()
             
@@ -365,82 +777,7 @@ class BarStockPage(ctk.CTkFrame):
                 ORDER BY item_name
             """)
             
-            for i, row in enumerate(cursor.fetchall()):
-                item_id, name, unit_type, pieces, original, remaining, threshold = row
-                
-                # Item name
-                ctk.CTkLabel(
-                    self.stock_frame,
-                    text=name
-                ).grid(row=i, column=0, padx=5, pady=5, sticky="w")
-                
-                # Unit type
-                ctk.CTkLabel(
-                    self.stock_frame,
-                    text=unit_type
-                ).grid(row=i, column=1, padx=5, pady=5, sticky="w")
-                
-                # Original quantity
-                if unit_type == "PACKET":
-                    original_text = f"{original} packets ({original * 20} pieces)"
-                    remaining_text = f"{remaining} packets ({remaining * 20} pieces)"
-                    threshold_text = f"{threshold} packets ({threshold * 20} pieces)"
-                else:
-                    original_text = f"{original} {unit_type}"
-                    remaining_text = f"{remaining} {unit_type}"
-                    threshold_text = f"{threshold} {unit_type}"
-                
-                ctk.CTkLabel(
-                    self.stock_frame,
-                    text=original_text
-                ).grid(row=i, column=2, padx=5, pady=5, sticky="w")
-                
-                # Remaining quantity
-                ctk.CTkLabel(
-                    self.stock_frame,
-                    text=remaining_text
-                ).grid(row=i, column=3, padx=5, pady=5, sticky="w")
-                
-                # Warning threshold
-                ctk.CTkLabel(
-                    self.stock_frame,
-                    text=threshold_text
-                ).grid(row=i, column=4, padx=5, pady=5, sticky="w")
-                
-                # Status
-                status_color = "#EF4444" if remaining <= threshold else "#10B981"
-                status_text = "Low Stock" if remaining <= threshold else "OK"
-                
-                ctk.CTkLabel(
-                    self.stock_frame,
-                    text=status_text,
-                    text_color=status_color,
-                    font=("Helvetica", 12, "bold")
-                ).grid(row=i, column=5, padx=5, pady=5, sticky="w")
-                
-                # Actions frame
-                actions_frame = ctk.CTkFrame(self.stock_frame, fg_color="transparent")
-                actions_frame.grid(row=i, column=6, padx=5, pady=5, sticky="w")
-                
-                # Add Stock button
-                ctk.CTkButton(
-                    actions_frame,
-                    text="Add Stock",
-                    command=lambda x=item_id: self.show_add_stock_dialog(x),
-                    width=90,
-                    height=30,
-                    fg_color="#2563EB"
-                ).pack(side="left", padx=5)
-                
-                # Delete button
-                ctk.CTkButton(
-                    actions_frame,
-                    text="×",
-                    command=lambda x=item_id: self.delete_item(x),
-                    width=30,
-                    height=30,
-                    fg_color="#EF4444"
-                ).pack(side="left", padx=5)
+            self.stock_grid.set_rows(cursor.fetchall())
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load stock data: {str(e)}")
@@ -448,11 +785,38 @@ class BarStockPage(ctk.CTkFrame):
             if conn:
                 conn.close()
     
+    @staticmethod
+    def quantity_text(quantity, unit_type):
+        """Format a stock quantity in its unit"""
+        if unit_type == "PACKET":
+            return f"{quantity} packets ({quantity * 20} pieces)"
+        return f"{quantity} {unit_type}"
+    
     def show_add_dialog(self):
         """Show dialog to add new bar item"""
         dialog = AddBarItemDialog(self)
         dialog.grab_set()
     
+    def show_ledger_dialog(self):
+        """Show stock balances over time and reconciliation"""
+        dialog = StockLedgerDialog(self)
+        dialog.grab_set()
+    
+    def show_valuation_dialog(self):
+        """Show inventory value and cost of goods sold"""
+        dialog = ValuationDialog(self)
+        dialog.grab_set()
+    
+    def show_reorder_dialog(self):
+        """Show usage-based reorder suggestions"""
+        dialog = ReorderDialog(self)
+        dialog.grab_set()
+    
+    def show_import_dialog(self):
+        """Show dialog to import opening stock from CSV"""
+        dialog = ImportDialog(self, "opening_stock", on_complete=self.load_stock_data)
+        dialog.grab_set()
+    
     def show_add_stock_dialog(self, item_id):
         """Show dialog to add stock to existing item"""
         dialog = AddStockDialog(self, item_id)
@@ -474,6 +838,8 @@ class BarStockPage(ctk.CTkFrame):
             ):
                 cursor.execute("DELETE FROM bar_stock WHERE id = ?", (item_id,))
                 conn.commit()
+                StockAlerts.publish()
+                log_event("stock_adjusted", item_id=item_id, item=item_name, reason="deleted")
                 
                 self.load_stock_data()
                 messagebox.showinfo("Success", "Item deleted successfully")
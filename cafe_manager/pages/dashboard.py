@@ -4,18 +4,36 @@ Provides analytics and insights through charts and statistics.
 """
 
 import customtkinter as ctk
+import logging
 from utils.constants import *
 from database import DatabaseManager
+from utils.timeseries import build_series
+from utils.day_close import DayCloseManager
+from utils.archive import ArchiveManager
+from utils.payroll import PayrollManager
+from utils.stock_ledger import StockLedger
+from utils.change_counters import ChangeCounters, SALES_EDITS
+from tkinter import messagebox
 import sqlite3
 from datetime import datetime, timedelta
-import pytz  # Add timezone support
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib
+import matplotlib.dates as mdates
 matplotlib.use('TkAgg')
 
-# Get local timezone
-LOCAL_TZ = pytz.timezone('Asia/Kathmandu')  # Nepal Time (UTC+5:45)
+# Timestamps are stored in local time, so a day runs from midnight to midnight
+# of the raw column, as in daily_close and the chart buckets. Takes the first
+# and last day as parameters.
+IN_DAYS = "{0} >= ? AND {0} < DATE(?, '+1 day')"
+
+# Days of history covered by each period (daily starts at midnight)
+PERIOD_DAYS = {
+    "daily": 0,
+    "weekly": 7,
+    "monthly": 30,
+    "yearly": 365
+}
 
 # Chart style configuration
 CHART_STYLE = {
@@ -107,11 +125,16 @@ class DashboardPage(ctk.CTkFrame):
         
         # Initialize database
         self.db = DatabaseManager()
+        self.day_close = DayCloseManager(self.db)
+        self.archive = ArchiveManager(self.db)
+        self.payroll = PayrollManager(self.db)
         
         # Store both sales and expense data
         self.sales_data = []
         self.expense_data = []
         self.current_period = "daily"
+        self.sales_bucket = 60
+        self._sales_cache = None
         
         # Initialize stat cards dictionary
         self.stat_cards = {}
@@ -147,7 +170,7 @@ class DashboardPage(ctk.CTkFrame):
         period_frame = ctk.CTkFrame(chart_frame, fg_color="transparent")
         period_frame.grid(row=0, column=0, columnspan=2, padx=PADDING["medium"], pady=PADDING["medium"], sticky="ew")
         
-        periods = ["daily", "weekly", "monthly"]
+        periods = ["daily", "weekly", "monthly", "yearly"]
         for i, period in enumerate(periods):
             btn = ctk.CTkButton(
                 period_frame,
@@ -159,6 +182,21 @@ class DashboardPage(ctk.CTkFrame):
             btn.grid(row=0, column=i, padx=(0, PADDING["small"]))
             self.period_buttons[period] = btn
         
+        # Close Day (Z-report) button
+        period_frame.grid_columnconfigure(len(periods), weight=1)
+        ctk.CTkButton(
+            period_frame,
+            text="Close Day",
+            fg_color=COLORS["secondary"],
+            command=self.close_day
+        ).grid(row=0, column=len(periods), sticky="e")
+        ctk.CTkButton(
+            period_frame,
+            text="Audit Closed Days",
+            fg_color=COLORS["secondary"],
+            command=self.audit_days
+        ).grid(row=0, column=len(periods) + 1, padx=(PADDING["small"], 0), sticky="e")
+        
         # Create figures without pyplot - Make figures square and larger
         self.figure1 = matplotlib.figure.Figure(figsize=(8, 6))
         self.ax1 = self.figure1.add_subplot(111)
@@ -203,12 +241,15 @@ class DashboardPage(ctk.CTkFrame):
         self.stat_cards["Today's Expenses"] = StatCard(stats_frame, "Today's Expenses", "₹0.00")
         self.stat_cards["Today's Expenses"].grid(row=1, column=0, pady=(0, PADDING["medium"]), sticky="ew")
         
+        self.stat_cards["Salaries"] = StatCard(stats_frame, "Salaries", "₹0.00")
+        self.stat_cards["Salaries"].grid(row=2, column=0, pady=(0, PADDING["medium"]), sticky="ew")
+        
         self.stat_cards["Net Profit"] = StatCard(stats_frame, "Net Profit", "₹0.00")
-        self.stat_cards["Net Profit"].grid(row=2, column=0, pady=(0, PADDING["medium"]), sticky="ew")
+        self.stat_cards["Net Profit"].grid(row=3, column=0, pady=(0, PADDING["medium"]), sticky="ew")
         
         # Create popular items card
         self.popular_items_card = PopularItemsCard(stats_frame)
-        self.popular_items_card.grid(row=3, column=0, sticky="ew")
+        self.popular_items_card.grid(row=4, column=0, sticky="ew")
     
     def update_chart(self):
         """Update both charts with current data"""
@@ -223,18 +264,25 @@ class DashboardPage(ctk.CTkFrame):
             times = [row[0] for row in self.sales_data]
             sales = [float(row[1]) for row in self.sales_data]
             
-            if self.current_period == "daily":
-                times.reverse()
-                sales.reverse()
+            # Markers only help when points are sparse enough to see
+            marker = 'o' if len(times) <= 60 else None
             
             # Plot revenue line
             self.ax1.plot(times, sales, 
                          color='#3B82F6',  # Blue
                          label='Revenue',
                          linewidth=2,
-                         marker='o',
+                         marker=marker,
                          markersize=6)
             
+            # Label the time axis to match the bucket size
+            if self.sales_bucket < 24 * 60 * 60:
+                date_format = '%I:%M %p' if self.current_period == "daily" else '%b %d %I %p'
+            else:
+                date_format = '%b %d'
+            self.ax1.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=10))
+            self.ax1.xaxis.set_major_formatter(mdates.DateFormatter(date_format))
+            
             # Customize revenue chart
             self.ax1.tick_params(colors=CHART_STYLE['text_color'], labelrotation=45)
             self.ax1.set_title('Revenue Overview',
@@ -295,7 +343,8 @@ class DashboardPage(ctk.CTkFrame):
             period_text = {
                 "daily": "Today's",
                 "weekly": "This Week's",
-                "monthly": "This Month's"
+                "monthly": "This Month's",
+                "yearly": "This Year's"
             }
             self.ax2.set_title(f"{period_text[self.current_period]} Expenses\nTotal: ₹{int(total_expenses):,}",
                               pad=20, color=CHART_STYLE['title_color'], fontsize=12, y=1.05)
@@ -323,52 +372,52 @@ class DashboardPage(ctk.CTkFrame):
             conn = self.db.connect()
             cursor = conn.cursor()
             
-            now = datetime.now(LOCAL_TZ)
+            now = datetime.now()
             today = now.strftime('%Y-%m-%d')
             
             if period == "daily":
-                query = """
+                query = f"""
                     SELECT 
                         COALESCE(category, 'Other') as expense_category,
                         SUM(total_price) as total_expenses,
                         COUNT(*) as expense_count
                     FROM expenses
-                    WHERE DATE(expense_date, '+5 hours', '45 minutes', 'localtime') = ?
+                    WHERE {IN_DAYS.format('expense_date')}
                     GROUP BY category
                     ORDER BY total_expenses DESC
                 """
-                cursor.execute(query, (today,))
+                cursor.execute(query, (today, today))
             elif period == "weekly":
                 week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
-                query = """
+                query = f"""
                     SELECT 
                         COALESCE(category, 'Other') as expense_category,
                         SUM(total_price) as total_expenses,
                         COUNT(*) as expense_count
                     FROM expenses
-                    WHERE DATE(expense_date, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
+                    WHERE {IN_DAYS.format('expense_date')}
                     GROUP BY category
                     ORDER BY total_expenses DESC
                 """
                 cursor.execute(query, (week_ago, today))
-            else:  # monthly
-                month_ago = (now - timedelta(days=30)).strftime('%Y-%m-%d')
-                query = """
+            else:  # monthly / yearly
+                period_start = (now - timedelta(days=PERIOD_DAYS[period])).strftime('%Y-%m-%d')
+                query = f"""
                     SELECT 
                         COALESCE(category, 'Other') as expense_category,
                         SUM(total_price) as total_expenses,
                         COUNT(*) as expense_count
                     FROM expenses
-                    WHERE DATE(expense_date, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
+                    WHERE {IN_DAYS.format('expense_date')}
                     GROUP BY category
                     ORDER BY total_expenses DESC
                 """
-                cursor.execute(query, (month_ago, today))
+                cursor.execute(query, (period_start, today))
             
             return cursor.fetchall()
             
         except Exception as e:
-            print(f"Error fetching expenses data: {e}")
+            logging.error(f"Error fetching expenses data: {e}")
             return []
         finally:
             if 'conn' in locals() and conn:
@@ -384,62 +433,49 @@ class DashboardPage(ctk.CTkFrame):
             self.update_stats()
             
         except Exception as e:
-            print(f"Error loading dashboard data: {e}")
+            logging.error(f"Error loading dashboard data: {e}")
+    
+    def get_period_range(self, period):
+        """Return the (start, end) datetimes shown for a period."""
+        now = datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = midnight - timedelta(days=PERIOD_DAYS[period])
+        return start, midnight + timedelta(days=1)
     
     def fetch_sales_data(self, period="daily"):
-        """Fetch sales data for the specified period."""
+        """Fetch sales data for the specified period.
+        
+        The bucket size follows the period length and chart width, so long
+        periods are aggregated in SQL and decimated instead of truncated.
+        """
         try:
-            conn = self.db.connect()
+            start, end = self.get_period_range(period)
+            conn = self.archive.connect(start, end)
             cursor = conn.cursor()
             
-            # Get current time in local timezone
-            now = datetime.now(LOCAL_TZ)
-            today = now.strftime('%Y-%m-%d')
+            width = self.canvas1.get_tk_widget().winfo_width()
             
-            if period == "daily":
-                query = """
-                    SELECT 
-                        strftime('%I:%M %p', datetime(created_at, '+5 hours', '45 minutes', 'localtime')) as time_period,
-                        SUM(total_amount) as total_sales,
-                        COUNT(*) as transaction_count
-                    FROM sales
-                    WHERE DATE(created_at, '+5 hours', '45 minutes', 'localtime') = ?
-                    GROUP BY strftime('%H:%M', datetime(created_at, '+5 hours', '45 minutes', 'localtime'))
-                    ORDER BY strftime('%H:%M', datetime(created_at, '+5 hours', '45 minutes', 'localtime')) DESC
-                    LIMIT 30
-                """
-                cursor.execute(query, (today,))
-            elif period == "weekly":
-                week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
-                query = """
-                    SELECT 
-                        DATE(created_at, '+5 hours', '45 minutes', 'localtime') as date,
-                        SUM(total_amount) as total_sales,
-                        COUNT(*) as transaction_count
-                    FROM sales
-                    WHERE DATE(created_at, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
-                    GROUP BY DATE(created_at, '+5 hours', '45 minutes', 'localtime')
-                    ORDER BY date
-                """
-                cursor.execute(query, (week_ago, today))
-            else:  # monthly
-                month_ago = (now - timedelta(days=30)).strftime('%Y-%m-%d')
-                query = """
-                    SELECT 
-                        strftime('%Y-%m-%d', datetime(created_at, '+5 hours', '45 minutes', 'localtime')) as month,
-                        SUM(total_amount) as total_sales,
-                        COUNT(*) as transaction_count
-                    FROM sales
-                    WHERE DATE(created_at, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
-                    GROUP BY strftime('%Y-%m-%d', datetime(created_at, '+5 hours', '45 minutes', 'localtime'))
-                    ORDER BY month
-                """
-                cursor.execute(query, (month_ago, today))
+            # Skip the query when nothing that affects the chart has changed:
+            # new sales raise MAX(id) (one seek on the live table), edits and
+            # deletes bump the counter
+            cursor.execute("SELECT MAX(id) FROM main.sales")
+            cache_key = (
+                period, start, width, cursor.fetchone()[0],
+                ChangeCounters.version(cursor, SALES_EDITS)
+            )
+            if self._sales_cache and self._sales_cache[0] == cache_key:
+                return self._sales_cache[1]
             
-            return cursor.fetchall()
+            points, self.sales_bucket = build_series(
+                cursor, "sales", "created_at", "total_amount",
+                start, end, width
+            )
+            
+            self._sales_cache = (cache_key, points)
+            return points
             
         except Exception as e:
-            print(f"Error fetching sales data: {e}")
+            logging.error(f"Error fetching sales data: {e}")
             return []
         finally:
             if 'conn' in locals() and conn:
@@ -451,7 +487,7 @@ class DashboardPage(ctk.CTkFrame):
             conn = self.db.connect()
             cursor = conn.cursor()
             
-            query = """
+            query = f"""
                 SELECT 
                     m.name,
                     COUNT(*) as order_count,
@@ -459,17 +495,18 @@ class DashboardPage(ctk.CTkFrame):
                 FROM sale_items si
                 JOIN menu_items m ON si.menu_item_id = m.id
                 JOIN sales s ON si.sale_id = s.id
-                WHERE DATE(s.created_at) = DATE('now', 'localtime')
+                WHERE {IN_DAYS.format('s.created_at')}
                 GROUP BY m.id
                 ORDER BY order_count DESC
                 LIMIT 5
             """
             
-            cursor.execute(query)
+            today = datetime.now().strftime('%Y-%m-%d')
+            cursor.execute(query, (today, today))
             return cursor.fetchall()
             
         except Exception as e:
-            print(f"Error fetching popular items: {e}")
+            logging.error(f"Error fetching popular items: {e}")
             return []
         finally:
             if 'conn' in locals() and conn:
@@ -482,67 +519,44 @@ class DashboardPage(ctk.CTkFrame):
             cursor = conn.cursor()
             
             # Get current time in local timezone
-            now = datetime.now(LOCAL_TZ)
+            now = datetime.now()
             today = now.strftime('%Y-%m-%d')
             week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
-            month_ago = (now - timedelta(days=30)).strftime('%Y-%m-%d')
+            period_start = (now - timedelta(days=PERIOD_DAYS[self.current_period])).strftime('%Y-%m-%d')
             
             # Get period-specific labels
             period_labels = {
                 "daily": "Today's",
                 "weekly": "This Week's",
-                "monthly": "This Month's"
+                "monthly": "This Month's",
+                "yearly": "This Year's"
             }
             
-            # Fetch sales based on period
             if self.current_period == "daily":
-                sales_query = """
+                # Today is still open, so read it from the raw rows
+                cursor.execute(f"""
                     SELECT COALESCE(SUM(total_amount), 0)
                     FROM sales
-                    WHERE DATE(created_at, '+5 hours', '45 minutes', 'localtime') = ?
-                """
-                cursor.execute(sales_query, (today,))
-            elif self.current_period == "weekly":
-                sales_query = """
-                    SELECT COALESCE(SUM(total_amount), 0)
-                    FROM sales
-                    WHERE DATE(created_at, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
-                """
-                cursor.execute(sales_query, (week_ago, today))
-            else:  # monthly
-                sales_query = """
-                    SELECT COALESCE(SUM(total_amount), 0)
-                    FROM sales
-                    WHERE DATE(created_at, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
-                """
-                cursor.execute(sales_query, (month_ago, today))
-            
-            period_sales = cursor.fetchone()[0]
-            
-            # Fetch expenses based on period
-            if self.current_period == "daily":
-                expenses_query = """
+                    WHERE {IN_DAYS.format('created_at')}
+                """, (today, today))
+                period_sales = cursor.fetchone()[0]
+                
+                cursor.execute(f"""
                     SELECT COALESCE(SUM(total_price), 0)
                     FROM expenses
-                    WHERE DATE(expense_date, '+5 hours', '45 minutes', 'localtime') = ?
-                """
-                cursor.execute(expenses_query, (today,))
-            elif self.current_period == "weekly":
-                expenses_query = """
-                    SELECT COALESCE(SUM(total_price), 0)
-                    FROM expenses
-                    WHERE DATE(expense_date, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
-                """
-                cursor.execute(expenses_query, (week_ago, today))
-            else:  # monthly
-                expenses_query = """
-                    SELECT COALESCE(SUM(total_price), 0)
-                    FROM expenses
-                    WHERE DATE(expense_date, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
-                """
-                cursor.execute(expenses_query, (month_ago, today))
-            
-            period_expenses = cursor.fetchone()[0]
+                    WHERE {IN_DAYS.format('expense_date')}
+                """, (today, today))
+                period_expenses = cursor.fetchone()[0]
+            else:
+                # Closed days are read from their daily_close snapshots
+                period_sales, period_expenses, _ = self.day_close.get_period_totals(
+                    period_start, today
+                )
+            
+            # Salaries are already in expenses; show how much of them is payroll
+            period_salaries = self.payroll.get_salary_cost(
+                today if self.current_period == "daily" else period_start, today
+            )
             
             # Update stat cards with period-specific titles
             self.stat_cards["Today's Revenue"].title_label.configure(
@@ -555,6 +569,11 @@ class DashboardPage(ctk.CTkFrame):
             )
             self.stat_cards["Today's Expenses"].update_value(f"₹{period_expenses:,.2f}")
             
+            self.stat_cards["Salaries"].title_label.configure(
+                text=f"{period_labels[self.current_period]} Salaries"
+            )
+            self.stat_cards["Salaries"].update_value(f"₹{period_salaries:,.2f}")
+            
             self.stat_cards["Net Profit"].title_label.configure(
                 text=f"{period_labels[self.current_period]} Net Profit"
             )
@@ -562,7 +581,7 @@ class DashboardPage(ctk.CTkFrame):
             
             # Fetch popular items based on period
             if self.current_period == "daily":
-                popular_query = """
+                popular_query = f"""
                     SELECT 
                         m.name,
                         COUNT(*) as order_count,
@@ -570,14 +589,14 @@ class DashboardPage(ctk.CTkFrame):
                     FROM sale_items si
                     JOIN menu_items m ON m.id = si.menu_item_id
                     JOIN sales s ON s.id = si.sale_id
-                    WHERE DATE(s.created_at, '+5 hours', '45 minutes', 'localtime') = ?
+                    WHERE {IN_DAYS.format('s.created_at')}
                     GROUP BY m.id
                     ORDER BY order_count DESC
                     LIMIT 5
                 """
-                cursor.execute(popular_query, (today,))
+                cursor.execute(popular_query, (today, today))
             elif self.current_period == "weekly":
-                popular_query = """
+                popular_query = f"""
                     SELECT 
                         m.name,
                         COUNT(*) as order_count,
@@ -585,14 +604,14 @@ class DashboardPage(ctk.CTkFrame):
                     FROM sale_items si
                     JOIN menu_items m ON m.id = si.menu_item_id
                     JOIN sales s ON s.id = si.sale_id
-                    WHERE DATE(s.created_at, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
+                    WHERE {IN_DAYS.format('s.created_at')}
                     GROUP BY m.id
                     ORDER BY order_count DESC
                     LIMIT 5
                 """
                 cursor.execute(popular_query, (week_ago, today))
-            else:  # monthly
-                popular_query = """
+            else:  # monthly / yearly
+                popular_query = f"""
                     SELECT 
                         m.name,
                         COUNT(*) as order_count,
@@ -600,12 +619,12 @@ class DashboardPage(ctk.CTkFrame):
                     FROM sale_items si
                     JOIN menu_items m ON m.id = si.menu_item_id
                     JOIN sales s ON s.id = si.sale_id
-                    WHERE DATE(s.created_at, '+5 hours', '45 minutes', 'localtime') BETWEEN ? AND ?
+                    WHERE {IN_DAYS.format('s.created_at')}
                     GROUP BY m.id
                     ORDER BY order_count DESC
                     LIMIT 5
                 """
-                cursor.execute(popular_query, (month_ago, today))
+                cursor.execute(popular_query, (period_start, today))
             
             popular_items = cursor.fetchall()
             self.popular_items_card.title_label.configure(
@@ -614,11 +633,70 @@ class DashboardPage(ctk.CTkFrame):
             self.popular_items_card.update_items(popular_items)
             
         except Exception as e:
-            print(f"Error updating stats: {e}")
+            logging.error(f"Error updating stats: {e}")
         finally:
             if 'conn' in locals() and conn:
                 conn.close()
     
+    def close_day(self):
+        """Close the days that have ended into daily_close snapshots."""
+        try:
+            days = sorted(self.day_close.get_open_days())
+            if not days:
+                messagebox.showinfo(
+                    "Close Day",
+                    "There are no ended days to close. Today can be closed once it has ended."
+                )
+                return
+            
+            if not messagebox.askyesno(
+                "Close Day",
+                f"Close {len(days)} day(s) ending {days[-1]}?\n"
+                "Closed totals are frozen; later edits show up under Audit Closed Days."
+            ):
+                return
+            
+            lines = []
+            for day in days:
+                snapshot = self.day_close.close_day(day)
+                lines.append(
+                    f"{day}: ₹{snapshot['revenue']:,.2f} revenue, "
+                    f"{snapshot['sale_count']} sales, "
+                    f"₹{snapshot['expenses']:,.2f} expenses"
+                )
+            
+            # Checkpoint stock balances so reconciliation starts from the close
+            StockLedger(self.db).checkpoint()
+            
+            messagebox.showinfo("Day Closed", "\n".join(lines))
+            self.load_data()
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to close day: {str(e)}")
+    
+    def audit_days(self):
+        """Show closed days in the current period whose rows changed after closing."""
+        try:
+            now = datetime.now()
+            start = (now - timedelta(days=max(PERIOD_DAYS[self.current_period], 1))).strftime('%Y-%m-%d')
+            changed = self.day_close.audit_period(start, now.strftime('%Y-%m-%d'))
+            
+            if not changed:
+                messagebox.showinfo("Audit Closed Days", f"No closed day since {start} has changed.")
+                return
+            
+            lines = []
+            for day, differences in changed.items():
+                lines.append(f"{day}:")
+                for field, frozen, current in differences[:8]:
+                    lines.append(f"  {field}: closed {frozen}, now {current}")
+                if len(differences) > 8:
+                    lines.append(f"  ... {len(differences) - 8} more")
+            messagebox.showwarning("Audit Closed Days", "\n".join(lines))
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to audit closed days: {str(e)}")
+    
     def change_period(self, period):
         """Change the chart period."""
         self.current_period = period
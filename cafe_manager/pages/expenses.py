@@ -4,11 +4,23 @@ Handles expense tracking and management.
 """
 
 import customtkinter as ctk
+import logging
 from utils.constants import *
 from database import DatabaseManager
-from datetime import datetime
-from tkinter import messagebox
+import migrations
+from utils.menu_engineering import MenuEngineering
+from utils.export import DataExporter, EXPORT_DATASETS, available_formats
+from utils.expense_ledger import ExpenseLedger
+from utils.stock_alerts import StockAlerts
+from utils.app_logging import log_event
+from utils.data_grid import DataGrid
+from utils.sync import get_bill_service
+from pages.import_dialog import ImportDialog
+from datetime import datetime, timedelta
+from tkinter import messagebox, filedialog
+from tkcalendar import DateEntry
 import sqlite3
+import threading
 
 class AddExpenseDialog(ctk.CTkToplevel):
     """Dialog for adding new expenses."""
@@ -32,7 +44,7 @@ class AddExpenseDialog(ctk.CTkToplevel):
 
     def on_category_change(self, choice):
         """Handle category selection changes"""
-        print(f"Selected category: {choice}")
+        logging.debug(f"Selected category: {choice}")
         # You can add specific behavior for different categories here
         if choice == "Bar":
             # Maybe show additional fields or change validation rules
@@ -154,41 +166,17 @@ class AddExpenseDialog(ctk.CTkToplevel):
             if not title:
                 title = name
             
-            conn = self.parent.db.connect()
-            cursor = conn.cursor()
-            
-            # Start transaction
-            cursor.execute("BEGIN")
+            # Goes through the sync server's operation log on a terminal
+            get_bill_service(self.parent.db).add_expense(
+                name, title, category, quantity, price
+            )
+            messagebox.showinfo("Success", "Expense saved successfully")
             
-            try:
-                # Save expense
-                cursor.execute("""
-                    INSERT INTO expenses (
-                        name, title, category,
-                        quantity, price_per_unit,
-                        total_price, expense_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, DATE('now', 'localtime'))
-                """, (
-                    name, title, category,
-                    quantity, price,
-                    quantity * price
-                ))
-
-                conn.commit()
-                messagebox.showinfo("Success", "Expense saved successfully")
-                
-                self.parent.load_expenses()
-                self.destroy()
-                
-            except Exception as e:
-                conn.rollback()
-                raise e
+            self.parent.load_expenses()
+            self.destroy()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save expense: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def center_window(self):
         """Center the window on screen"""
@@ -288,6 +276,7 @@ class AddBarExpenseDialog(ctk.CTkToplevel):
             
             conn = self.db.connect()
             cursor = conn.cursor()
+            migrations.ensure_schema(conn)
             
             try:
                 cursor.execute("BEGIN")
@@ -342,15 +331,22 @@ class AddBarExpenseDialog(ctk.CTkToplevel):
                     cost
                 ))
                 
+                # Bar items are sold per ML, so the purchase cost per ML is the item cost
+                MenuEngineering.record_purchase_cost(
+                    cursor, name, "Bar", cost/quantity, cursor.lastrowid
+                )
+                
                 # Record in history
                 cursor.execute("""
                     INSERT INTO stock_history (
                         item_id, change_quantity, operation_type,
-                        source, created_at
-                    ) VALUES (?, ?, 'add', 'expense', DATETIME('now', 'localtime'))
-                """, (stock_id, quantity))
+                        source, created_at, unit_cost
+                    ) VALUES (?, ?, 'add', 'expense', DATETIME('now', 'localtime'), ?)
+                """, (stock_id, quantity, cost/quantity))
                 
                 conn.commit()
+                StockAlerts.publish()
+                log_event("stock_adjusted", item=name, change=quantity, unit="ML", reason="bar purchase")
                 messagebox.showinfo("Success", f"Added {quantity}ML of {name}")
                 
                 if hasattr(self.parent, 'load_expenses'):
@@ -426,12 +422,12 @@ class AddCigaretteExpenseDialog(ctk.CTkToplevel):
             self.cigarettes = cursor.fetchall()
             
             if not self.cigarettes:
-                print("No cigarette items found in the database")
+                logging.warning("No cigarette items found in the database")
             else:
-                print(f"Found {len(self.cigarettes)} cigarette items:", self.cigarettes)
+                logging.debug(f"Found {len(self.cigarettes)} cigarette items")
                 
         except Exception as e:
-            print(f"Error fetching cigarette items: {str(e)}")
+            logging.error(f"Error fetching cigarette items: {str(e)}")
             self.cigarettes = []
         finally:
             if conn:
@@ -572,6 +568,7 @@ class AddCigaretteExpenseDialog(ctk.CTkToplevel):
             
             conn = self.db.connect()
             cursor = conn.cursor()
+            migrations.ensure_schema(conn)
             
             try:
                 cursor.execute("BEGIN")
@@ -640,15 +637,22 @@ class AddCigaretteExpenseDialog(ctk.CTkToplevel):
                     total_cost
                 ))
                 
+                # Cigarettes are sold per piece
+                MenuEngineering.record_purchase_cost(
+                    cursor, name, "Cigarette", price_per_packet / 20, cursor.lastrowid
+                )
+                
                 # Record in history
                 cursor.execute("""
                     INSERT INTO stock_history (
                         item_id, change_quantity, operation_type,
-                        source, created_at
-                    ) VALUES (?, ?, 'add', 'expense', DATETIME('now', 'localtime'))
-                """, (stock_id, packets))
+                        source, created_at, unit_cost
+                    ) VALUES (?, ?, 'add', 'expense', DATETIME('now', 'localtime'), ?)
+                """, (stock_id, packets, price_per_packet))
                 
                 conn.commit()
+                StockAlerts.publish()
+                log_event("stock_adjusted", item=name, change=packets, unit="PACKET", reason="cigarette purchase")
                 messagebox.showinfo(
                     "Success", 
                     f"Added {packets} packets ({packets * 20} pieces)\n" +
@@ -702,16 +706,193 @@ class AddCigaretteExpenseDialog(ctk.CTkToplevel):
             self.quantity_entry.insert(0, "0")
             self.calculate_total()
 
+class ExportDialog(ctk.CTkToplevel):
+    """Dialog for exporting sales, expenses and stock history to files."""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.exporter = None
+        self.worker = None
+        self.progress_state = None
+        self.result = None
+        
+        # Window setup
+        self.title("Export Data")
+        self.geometry("420x520")
+        self.resizable(False, False)
+        
+        self.setup_ui()
+        self.center_window()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        # Title
+        ctk.CTkLabel(
+            main_frame,
+            text="Export Data",
+            font=("Helvetica", 20, "bold")
+        ).pack(pady=(0, 20))
+        
+        # Date range
+        ctk.CTkLabel(main_frame, text="From:").pack(anchor="w")
+        self.start_entry = DateEntry(main_frame, width=30, date_pattern='yyyy-mm-dd')
+        self.start_entry.set_date(datetime.now().replace(day=1))
+        self.start_entry.pack(pady=(0, 10))
+        
+        ctk.CTkLabel(main_frame, text="To:").pack(anchor="w")
+        self.end_entry = DateEntry(main_frame, width=30, date_pattern='yyyy-mm-dd')
+        self.end_entry.pack(pady=(0, 10))
+        
+        # Datasets
+        ctk.CTkLabel(main_frame, text="Include:").pack(anchor="w")
+        self.dataset_vars = {}
+        for dataset in EXPORT_DATASETS:
+            var = ctk.BooleanVar(value=True)
+            ctk.CTkCheckBox(
+                main_frame,
+                text=dataset.replace("_", " ").title(),
+                variable=var
+            ).pack(anchor="w", padx=10, pady=2)
+            self.dataset_vars[dataset] = var
+        
+        # Format
+        ctk.CTkLabel(main_frame, text="Format:").pack(anchor="w", pady=(10, 0))
+        self.format_var = ctk.StringVar(value="csv")
+        ctk.CTkOptionMenu(
+            main_frame,
+            values=available_formats(),
+            variable=self.format_var,
+            width=300
+        ).pack(pady=(0, 10))
+        
+        # Progress
+        self.progress_bar = ctk.CTkProgressBar(main_frame, width=300)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(pady=(10, 5))
+        self.progress_label = ctk.CTkLabel(main_frame, text="", text_color="gray")
+        self.progress_label.pack()
+        
+        # Buttons
+        buttons_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        buttons_frame.pack(fill="x", pady=10)
+        
+        self.export_button = ctk.CTkButton(
+            buttons_frame,
+            text="Export",
+            command=self.start_export,
+            width=140,
+            fg_color="#10B981",
+            hover_color="#059669"
+        )
+        self.export_button.pack(side="left", padx=10, expand=True)
+        
+        ctk.CTkButton(
+            buttons_frame,
+            text="Cancel",
+            command=self.on_close,
+            width=140,
+            fg_color="#EF4444",
+            hover_color="#DC2626"
+        ).pack(side="right", padx=10, expand=True)
+    
+    def start_export(self):
+        """Run the export on a worker thread so the UI stays responsive."""
+        datasets = [d for d, var in self.dataset_vars.items() if var.get()]
+        if not datasets:
+            messagebox.showerror("Error", "Please select at least one dataset")
+            return
+        
+        start_date = self.start_entry.get_date().strftime('%Y-%m-%d')
+        end_date = self.end_entry.get_date().strftime('%Y-%m-%d')
+        if start_date > end_date:
+            messagebox.showerror("Error", "Start date must be before end date")
+            return
+        
+        directory = filedialog.askdirectory(title="Export to folder")
+        if not directory:
+            return
+        
+        self.export_button.configure(state="disabled")
+        self.exporter = DataExporter()
+        self.progress_state = ("", 0, 0)
+        self.result = None
+        
+        def run():
+            try:
+                self.result = self.exporter.export_all(
+                    directory,
+                    fmt=self.format_var.get(),
+                    start_date=start_date,
+                    end_date=end_date,
+                    datasets=datasets,
+                    progress=self.on_progress
+                )
+            except Exception as e:
+                self.result = e
+        
+        self.worker = threading.Thread(target=run, daemon=True)
+        self.worker.start()
+        self.poll_progress()
+    
+    def on_progress(self, dataset, written, total):
+        """Store progress from the worker thread; the UI reads it when polling."""
+        self.progress_state = (dataset, written, total)
+    
+    def poll_progress(self):
+        """Update the progress bar from the Tk thread."""
+        dataset, written, total = self.progress_state
+        self.progress_bar.set(written / total if total else 0)
+        if dataset:
+            self.progress_label.configure(text=f"{dataset}: {written:,} / {total:,} rows")
+        
+        if self.worker and self.worker.is_alive():
+            self.after(100, self.poll_progress)
+            return
+        
+        self.export_button.configure(state="normal")
+        if isinstance(self.result, Exception):
+            messagebox.showerror("Error", f"Export failed: {str(self.result)}")
+        elif self.result is not None and not self.exporter.cancelled:
+            summary = "\n".join(
+                f"{dataset}: {rows:,} rows" for dataset, (path, rows) in self.result.items()
+            )
+            messagebox.showinfo("Export Complete", summary)
+            self.destroy()
+    
+    def on_close(self):
+        """Cancel any running export and close."""
+        if self.exporter:
+            self.exporter.cancel()
+        self.destroy()
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
 class ExpensesPage(ctk.CTkFrame):
     """Expenses page showing expense tracking and management."""
     
     def __init__(self, parent):
         super().__init__(parent, fg_color="transparent")
         self.db = DatabaseManager()
+        self.ledger = ExpenseLedger(self.db)
         
         # Initialize variables
         self.expenses = []
         self.total_expenses = 0.0
+        self.summary = None
+        
+        # Keyset cursors of the pages visited so far; the last one is shown
+        self.page_cursors = [None]
+        self.next_cursor = None
         
         # Setup UI
         self.setup_ui()
@@ -723,11 +904,14 @@ class ExpensesPage(ctk.CTkFrame):
         """Create and arrange all UI components."""
         # Configure grid
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(1, weight=1)  # Give table row the most weight
+        self.grid_rowconfigure(2, weight=1)  # Give table row the most weight
         
         # Create header frame
         self.create_header()
         
+        # Create date range and category filters
+        self.create_filters()
+        
         # Create expense table
         self.create_expense_table()
         
@@ -751,6 +935,24 @@ class ExpensesPage(ctk.CTkFrame):
         buttons_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
         buttons_frame.grid(row=0, column=1, sticky="e")
         
+        # Import Expenses Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Import CSV",
+            command=self.show_import_dialog,
+            width=120,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
+        # Export Data Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Export Data",
+            command=self.show_export_dialog,
+            width=120,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
         # Add General Expense Button
         ctk.CTkButton(
             buttons_frame,
@@ -775,74 +977,181 @@ class ExpensesPage(ctk.CTkFrame):
             width=120
         ).pack(side="right", padx=5)
     
-    def create_expense_table(self):
-        """Create scrollable expense table."""
-        # Table container
-        self.table_frame = ctk.CTkFrame(self)
-        self.table_frame.grid(row=1, column=0, padx=20, pady=5, sticky="nsew")
-        self.table_frame.grid_columnconfigure(0, weight=1)
-        self.table_frame.grid_rowconfigure(1, weight=1)
-        
-        # Table headers
-        headers = ["Name", "Category", "Title", "Quantity", "Price/Unit", "Total", "Date", "Actions"]
-        header_frame = ctk.CTkFrame(self.table_frame, fg_color="transparent")
-        header_frame.grid(row=0, column=0, sticky="ew", padx=5, pady=5)
-        
-        # Configure header columns
-        for i in range(len(headers)):
-            header_frame.grid_columnconfigure(i, weight=1 if i < 3 else 0)  # Give more space to Name, Category, and Title
-        
-        # Create header labels
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(
-                header_frame,
-                text=header,
-                font=FONTS["body"]
-            ).grid(row=0, column=i, padx=10, pady=5, sticky="w")
+    def create_filters(self):
+        """Create date range and category filters."""
+        filter_frame = ctk.CTkFrame(self, fg_color="transparent")
+        filter_frame.grid(row=1, column=0, padx=20, pady=(10, 0), sticky="ew")
         
-        # Scrollable frame for expenses
-        self.expense_frame = ctk.CTkScrollableFrame(self.table_frame)
-        self.expense_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+        ctk.CTkLabel(filter_frame, text="From:").pack(side="left", padx=(0, 5))
+        self.start_date_entry = DateEntry(filter_frame, width=12, date_pattern='yyyy-mm-dd')
+        self.start_date_entry.pack(side="left", padx=(0, 10))
         
-        # Configure columns in expense frame
-        for i in range(len(headers)):
-            self.expense_frame.grid_columnconfigure(i, weight=1 if i < 3 else 0)
+        ctk.CTkLabel(filter_frame, text="To:").pack(side="left", padx=(0, 5))
+        self.end_date_entry = DateEntry(filter_frame, width=12, date_pattern='yyyy-mm-dd')
+        self.end_date_entry.pack(side="left", padx=(0, 10))
+        
+        self.filter_category_var = ctk.StringVar(value="All Categories")
+        ctk.CTkOptionMenu(
+            filter_frame,
+            variable=self.filter_category_var,
+            values=["All Categories"] + EXPENSE_CATEGORIES,
+            width=150,
+            command=lambda _: self.load_expenses()
+        ).pack(side="left", padx=(0, 10))
+        
+        ctk.CTkButton(
+            filter_frame,
+            text="Apply",
+            command=self.load_expenses,
+            width=80
+        ).pack(side="left", padx=(0, 10))
+        
+        # Quick ranges
+        for label, days in [("Today", 0), ("7 Days", 6), ("30 Days", 29)]:
+            ctk.CTkButton(
+                filter_frame,
+                text=label,
+                command=lambda d=days: self.set_range(d),
+                width=70,
+                fg_color=COLORS["secondary"]
+            ).pack(side="left", padx=2)
+    
+    def set_range(self, days):
+        """Show the last `days` days up to today."""
+        today = datetime.now().date()
+        self.start_date_entry.set_date(today - timedelta(days=days))
+        self.end_date_entry.set_date(today)
+        self.load_expenses()
+    
+    def get_filters(self):
+        """Return (start_date, end_date, category) from the filter bar."""
+        start_date = self.start_date_entry.get_date().strftime('%Y-%m-%d')
+        end_date = self.end_date_entry.get_date().strftime('%Y-%m-%d')
+        category = self.filter_category_var.get()
+        if category == "All Categories":
+            category = None
+        return start_date, end_date, category
+    
+    def create_expense_table(self):
+        """Create the expense table."""
+        def rupees(value):
+            return f"₹{value:,.2f}"
+        
+        self.expense_grid = DataGrid(
+            self,
+            columns=[
+                {"title": "Name", "value": 1, "width": 120, "weight": 2},
+                {"title": "Category", "value": 2, "width": 100, "weight": 1},
+                {"title": "Title", "value": 3, "width": 140, "weight": 3},
+                {"title": "Quantity", "value": 4, "width": 70, "weight": 0},
+                {"title": "Price/Unit", "value": 5, "format": rupees, "width": 100, "weight": 0},
+                {"title": "Total", "value": 6, "format": rupees, "width": 100, "weight": 0},
+                {"title": "Date", "value": 7, "width": 90, "weight": 0},
+                {"title": "Running", "value": 8, "format": rupees, "width": 110, "weight": 0}
+            ],
+            actions=[{
+                "text": "Delete",
+                "command": lambda row: self.delete_expense(row[0]),
+                "width": 80,
+                "fg_color": COLORS["error"],
+                "hover_color": "#D32F2F"
+            }],
+            empty_text="No expenses in this period"
+        )
+        self.expense_grid.grid(row=2, column=0, padx=20, pady=5, sticky="nsew")
     
     def create_total_section(self):
         """Create total expenses display."""
         total_frame = ctk.CTkFrame(self)
-        total_frame.grid(row=2, column=0, padx=20, pady=10, sticky="ew")
+        total_frame.grid(row=3, column=0, padx=20, pady=10, sticky="ew")
+        
+        # Pagination
+        self.prev_button = ctk.CTkButton(
+            total_frame,
+            text="< Newer",
+            command=self.prev_page,
+            width=90,
+            state="disabled"
+        )
+        self.prev_button.pack(side="left", padx=10, pady=5)
+        
+        self.next_button = ctk.CTkButton(
+            total_frame,
+            text="Older >",
+            command=self.next_page,
+            width=90,
+            state="disabled"
+        )
+        self.next_button.pack(side="right", padx=10, pady=5)
         
         self.total_label = ctk.CTkLabel(
             total_frame,
             text="Total Expenses Today: ₹0.00",
             font=FONTS["subheading"]
         )
-        self.total_label.pack(pady=5)
+        self.total_label.pack(pady=(5, 0))
+        
+        self.page_label = ctk.CTkLabel(total_frame, text="", text_color="gray")
+        self.page_label.pack(pady=(0, 5))
     
     def load_expenses(self):
-        """Load expenses from database."""
+        """Load the first page of expenses for the current filters."""
+        start_date, end_date, category = self.get_filters()
+        if start_date > end_date:
+            messagebox.showerror("Error", "Start date must be before end date")
+            return
+        
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, name, category, title, quantity, price_per_unit, 
-                       total_price, expense_date
-                FROM expenses
-                WHERE DATE(expense_date) = DATE('now', 'localtime')
-                ORDER BY expense_date DESC
-            """)
-            
-            self.expenses = cursor.fetchall()
-            self.update_expense_list()
-            self.calculate_total()
-            
+            self.summary = self.ledger.get_summary(start_date, end_date, category)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load expenses: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+            return
+        
+        self.page_cursors = [None]
+        self.load_page()
+    
+    def load_page(self):
+        """Load the page at the top of the cursor stack."""
+        start_date, end_date, category = self.get_filters()
+        try:
+            page = self.ledger.get_page(
+                start_date, end_date, category, after=self.page_cursors[-1]
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load expenses: {str(e)}")
+            return
+        
+        self.expenses = page["rows"]
+        self.next_cursor = page["next"]
+        self.update_expense_list()
+        self.calculate_total()
+        self.update_pagination()
+    
+    def next_page(self):
+        """Show older expenses."""
+        if self.next_cursor:
+            self.page_cursors.append(self.next_cursor)
+            self.load_page()
+    
+    def prev_page(self):
+        """Show newer expenses."""
+        if len(self.page_cursors) > 1:
+            self.page_cursors.pop()
+            self.load_page()
+    
+    def update_pagination(self):
+        """Update page buttons and the row range label."""
+        first = (len(self.page_cursors) - 1) * self.ledger.page_size
+        count = self.summary["count"] if self.summary else len(self.expenses)
+        if self.expenses:
+            self.page_label.configure(
+                text=f"Showing {first + 1:,}-{first + len(self.expenses):,} of {count:,}"
+            )
+        else:
+            self.page_label.configure(text="No expenses in this period")
+        
+        self.prev_button.configure(state="normal" if len(self.page_cursors) > 1 else "disabled")
+        self.next_button.configure(state="normal" if self.next_cursor else "disabled")
     
     def add_expense(self, name, category, title, quantity, price_per_unit):
         """Add new expense to database."""
@@ -851,6 +1160,7 @@ class ExpensesPage(ctk.CTkFrame):
             
             conn = self.db.connect()
             cursor = conn.cursor()
+            migrations.ensure_schema(conn)
             
             # Start transaction
             cursor.execute("BEGIN")
@@ -892,14 +1202,15 @@ class ExpensesPage(ctk.CTkFrame):
                 # Add to stock history
                 cursor.execute("""
                     INSERT INTO stock_history (
-                        item_id, change_quantity, operation_type
+                        item_id, change_quantity, operation_type, unit_cost
                     ) VALUES (
                         (SELECT id FROM bar_stock WHERE item_name = ?),
-                        ?, 'add'
+                        ?, 'add', ?
                     )
-                """, (name, quantity))
+                """, (name, quantity, price_per_unit))
             
             conn.commit()
+            StockAlerts.publish()
             self.load_expenses()  # Refresh list
             
         except Exception as e:
@@ -918,8 +1229,17 @@ class ExpensesPage(ctk.CTkFrame):
                 cursor = conn.cursor()
                 
                 cursor.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+                deleted = cursor.rowcount
                 conn.commit()
-                
+
+                # The list also shows archived months, which live in another file
+                if not deleted:
+                    messagebox.showwarning(
+                        "Archived Expense",
+                        "This expense is in an archived month and cannot be deleted."
+                    )
+                    return
+
                 messagebox.showinfo("Success", "Expense deleted successfully")
                 self.load_expenses()  # Refresh list
                 
@@ -937,52 +1257,24 @@ class ExpensesPage(ctk.CTkFrame):
     
     def update_expense_list(self):
         """Update expense list display."""
-        # Clear current list
-        for widget in self.expense_frame.winfo_children():
-            widget.destroy()
-        
-        # Add expenses to list
-        for row, expense in enumerate(self.expenses):
-            expense_frame = ctk.CTkFrame(self.expense_frame, fg_color="transparent")
-            expense_frame.grid(row=row, column=0, columnspan=8, sticky="ew", pady=2)
-            
-            # Configure columns
-            for i in range(8):
-                expense_frame.grid_columnconfigure(i, weight=1 if i < 3 else 0)
-            
-            # Add expense data
-            values = [
-                expense[1],  # Name
-                expense[2],  # Category
-                expense[3],  # Title
-                str(expense[4]),  # Quantity
-                f"₹{expense[5]:,.2f}",  # Price/Unit
-                f"₹{expense[6]:,.2f}",  # Total
-                expense[7]  # Date
-            ]
-            
-            for col, value in enumerate(values):
-                ctk.CTkLabel(
-                    expense_frame,
-                    text=value,
-                    font=FONTS["body"]
-                ).grid(row=0, column=col, padx=10, sticky="w")
-            
-            # Add delete button
-            ctk.CTkButton(
-                expense_frame,
-                text="Delete",
-                fg_color=COLORS["error"],
-                hover_color="#D32F2F",
-                width=80,
-                command=lambda id=expense[0]: self.delete_expense(id)
-            ).grid(row=0, column=7, padx=10)
+        self.expense_grid.set_rows(self.expenses)
     
     def calculate_total(self):
         """Calculate and update total expenses."""
-        self.total_expenses = sum(expense[6] for expense in self.expenses)
+        self.total_expenses = self.summary["total"] if self.summary else 0.0
+        
+        start_date, end_date, category = self.get_filters()
+        if start_date == end_date == datetime.now().strftime('%Y-%m-%d'):
+            period = "Today"
+        elif start_date == end_date:
+            period = start_date
+        else:
+            period = f"{start_date} to {end_date}"
+        if category:
+            period = f"{category} {period}"
+        
         self.total_label.configure(
-            text=f"Total Expenses Today: ₹{self.total_expenses:,.2f}"
+            text=f"Total Expenses {period}: ₹{self.total_expenses:,.2f}"
         )
     
     def show_bar_expense_dialog(self):
@@ -992,3 +1284,11 @@ class ExpensesPage(ctk.CTkFrame):
     def show_cigarette_expense_dialog(self):
         dialog = AddCigaretteExpenseDialog(self)
         dialog.grab_set()
+    
+    def show_export_dialog(self):
+        dialog = ExportDialog(self)
+        dialog.grab_set()
+    
+    def show_import_dialog(self):
+        dialog = ImportDialog(self, "expenses", on_complete=self.load_expenses)
+        dialog.grab_set()
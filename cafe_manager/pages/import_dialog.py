@@ -0,0 +1,169 @@
+import customtkinter as ctk
+from utils.bulk_import import BulkImporter, IMPORT_TYPES
+from utils.stock_alerts import StockAlerts
+from tkinter import messagebox, filedialog
+
+# Diff lines shown in the preview; the counts above it always cover every row
+PREVIEW_LIMIT = 300
+
+class ImportDialog(ctk.CTkToplevel):
+    """Preview and apply a bulk CSV import."""
+
+    def __init__(self, parent, kind, on_complete=None):
+        super().__init__(parent)
+        self.parent = parent
+        self.kind = kind
+        self.on_complete = on_complete
+        self.importer = BulkImporter(parent.db)
+        self.path = None
+
+        # Window setup
+        self.title(f"Import {kind.replace('_', ' ').title()}")
+        self.geometry("620x560")
+
+        self.setup_ui()
+        self.center_window()
+
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        # Title
+        ctk.CTkLabel(
+            main_frame,
+            text=self.title(),
+            font=("Helvetica", 20, "bold")
+        ).pack(pady=(0, 10))
+
+        spec = IMPORT_TYPES[self.kind]
+        columns = ", ".join(spec["required"] + [f"{c} (optional)" for c in spec["optional"]])
+        ctk.CTkLabel(
+            main_frame,
+            text=f"CSV columns: {columns}",
+            text_color="gray",
+            wraplength=560
+        ).pack(pady=(0, 10))
+
+        # File chooser
+        file_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        file_frame.pack(fill="x", pady=(0, 10))
+
+        self.file_label = ctk.CTkLabel(file_frame, text="No file selected", anchor="w")
+        self.file_label.pack(side="left", fill="x", expand=True)
+
+        ctk.CTkButton(
+            file_frame,
+            text="Choose CSV",
+            command=self.choose_file,
+            width=120
+        ).pack(side="right")
+
+        # Dry-run summary and diff
+        self.summary_label = ctk.CTkLabel(main_frame, text="", anchor="w", justify="left")
+        self.summary_label.pack(fill="x")
+
+        self.preview = ctk.CTkTextbox(main_frame, font=("Courier", 12))
+        self.preview.pack(fill="both", expand=True, pady=10)
+        self.preview.configure(state="disabled")
+
+        # Buttons
+        buttons_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        buttons_frame.pack(fill="x")
+
+        self.import_button = ctk.CTkButton(
+            buttons_frame,
+            text="Import",
+            command=self.apply_import,
+            width=140,
+            state="disabled",
+            fg_color="#10B981",
+            hover_color="#059669"
+        )
+        self.import_button.pack(side="left", padx=10, expand=True)
+
+        ctk.CTkButton(
+            buttons_frame,
+            text="Cancel",
+            command=self.destroy,
+            width=140,
+            fg_color="#EF4444",
+            hover_color="#DC2626"
+        ).pack(side="right", padx=10, expand=True)
+
+    def choose_file(self):
+        """Pick a CSV file and show what importing it would change."""
+        path = filedialog.askopenfilename(
+            title="Choose CSV file",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        self.path = path
+        self.file_label.configure(text=path)
+
+        try:
+            plan = self.importer.import_file(self.kind, path, dry_run=True)
+        except Exception as e:
+            self.import_button.configure(state="disabled")
+            messagebox.showerror("Error", f"Cannot read file: {str(e)}")
+            return
+
+        self.show_plan(plan)
+        has_changes = plan["inserts"] or plan["updates"]
+        self.import_button.configure(state="normal" if has_changes else "disabled")
+
+    def show_plan(self, plan):
+        """Render the dry-run counts, row errors, warnings and diff."""
+        summary = (
+            f"{plan['rows']} rows: {len(plan['inserts'])} new, "
+            f"{len(plan['updates'])} changed, {plan['unchanged']} unchanged, "
+            f"{len(plan['errors'])} with errors, {len(plan['warnings'])} to check"
+        )
+        if plan["new_categories"]:
+            summary += f"\nNew categories: {', '.join(plan['new_categories'])}"
+        self.summary_label.configure(text=summary)
+
+        lines = []
+        for line, message in plan["errors"]:
+            lines.append(f"! line {line}: {message}")
+        for line, message in plan["warnings"]:
+            lines.append(f"? line {line}: {message}")
+        for action, key, before, after in plan["diff"][:PREVIEW_LIMIT]:
+            if action == "insert":
+                lines.append(f"+ {key}: {after:,.2f}")
+            else:
+                lines.append(f"~ {key}: {before:,.2f} -> {after:,.2f}")
+        if len(plan["diff"]) > PREVIEW_LIMIT:
+            lines.append(f"... {len(plan['diff']) - PREVIEW_LIMIT} more changes")
+
+        self.preview.configure(state="normal")
+        self.preview.delete("1.0", "end")
+        self.preview.insert("1.0", "\n".join(lines) or "Nothing to change")
+        self.preview.configure(state="disabled")
+
+    def apply_import(self):
+        """Write the previewed rows in one transaction."""
+        try:
+            plan = self.importer.import_file(self.kind, self.path, dry_run=False)
+        except Exception as e:
+            messagebox.showerror("Error", f"Import failed: {str(e)}")
+            return
+        StockAlerts.publish()
+
+        message = f"Imported {len(plan['inserts'])} new and {len(plan['updates'])} changed rows."
+        if plan["errors"]:
+            message += f"\n{len(plan['errors'])} rows with errors were skipped."
+        messagebox.showinfo("Import Complete", message)
+
+        if self.on_complete:
+            self.on_complete()
+        self.destroy()
+
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
@@ -6,6 +6,14 @@ Handles menu items and categories management.
 import customtkinter as ctk
 from utils.constants import *
 from database import DatabaseManager
+import migrations
+from utils.menu_engineering import MenuEngineering
+from pages.import_dialog import ImportDialog
+from utils.data_grid import DataGrid
+from utils.recipes import RecipeBook
+from utils.menu_prices import MenuPrices
+from tkcalendar import DateEntry
+from datetime import datetime, timedelta
 from tkinter import messagebox
 import sqlite3
 
@@ -83,7 +91,7 @@ class MenuItemDialog(ctk.CTkToplevel):
         
         # Window setup
         self.title("Add Menu Item" if not item else "Edit Menu Item")
-        self.geometry("400x300")
+        self.geometry("400x380")
         self.resizable(False, False)
         
         # Center window
@@ -122,6 +130,11 @@ class MenuItemDialog(ctk.CTkToplevel):
         self.price_entry = ctk.CTkEntry(self, width=250)
         self.price_entry.pack(pady=5)
         
+        # Unit Cost Entry (optional, used by the menu engineering report)
+        ctk.CTkLabel(self, text="Unit Cost (optional):", font=FONTS["body"]).pack(pady=(10,5))
+        self.cost_entry = ctk.CTkEntry(self, width=250)
+        self.cost_entry.pack(pady=5)
+        
         # Fill data if editing
         if self.item:
             self.name_entry.insert(0, self.item[1])
@@ -163,9 +176,20 @@ class MenuItemDialog(ctk.CTkToplevel):
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid price")
                 return
+            
+            cost = self.cost_entry.get().strip()
+            if cost:
+                try:
+                    cost = float(cost)
+                    if cost < 0:
+                        raise ValueError()
+                except ValueError:
+                    messagebox.showerror("Error", "Please enter a valid unit cost")
+                    return
                 
             # Get category ID
             conn = self.parent.db.connect()
+            migrations.ensure_schema(conn)
             cursor = conn.cursor()
             
             cursor.execute("SELECT id FROM menu_categories WHERE name = ?", (category,))
@@ -175,15 +199,24 @@ class MenuItemDialog(ctk.CTkToplevel):
             if self.item:  # Editing existing item
                 cursor.execute("""
                     UPDATE menu_items
-                    SET name = ?, category_id = ?, price = ?
+                    SET name = ?, category_id = ?
                     WHERE id = ?
-                """, (name, category_id, price, self.item[0]))
+                """, (name, category_id, self.item[0]))
+                # Price changes are added to the item's price history
+                if price != self.item[3]:
+                    MenuPrices.set_price(cursor, self.item[0], price, note="Edited")
             else:  # Adding new item
                 cursor.execute("""
                     INSERT INTO menu_items (name, category_id, price)
                     VALUES (?, ?, ?)
                 """, (name, category_id, price))
             
+            # Record a new cost entry so past reports keep the old cost
+            if cost != "":
+                item_id = self.item[0] if self.item else cursor.lastrowid
+                migrations.ensure_schema(conn)
+                MenuEngineering.record_item_cost(cursor, item_id, cost)
+            
             conn.commit()
             
             # Refresh parent's menu list
@@ -196,6 +229,325 @@ class MenuItemDialog(ctk.CTkToplevel):
             if conn:
                 conn.close()
 
+class RecipeDialog(ctk.CTkToplevel):
+    def __init__(self, parent, item):
+        super().__init__(parent)
+        self.parent = parent
+        self.item = item
+        self.recipes = RecipeBook(parent.db)
+        self.stock_items = {}   # Display label -> stock item id
+        self.rows = []          # (frame, stock variable, quantity entry)
+        
+        # Window setup
+        self.title(f"Recipe - {item[1]}")
+        self.geometry("480x420")
+        self.resizable(False, False)
+        
+        # Center window
+        self.center_window()
+        
+        self.setup_ui()
+        self.load_recipe()
+    
+    def center_window(self):
+        """Center the dialog window on the screen"""
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'{width}x{height}+{x}+{y}')
+    
+    def setup_ui(self):
+        ctk.CTkLabel(
+            self,
+            text="Stock used per item sold:",
+            font=FONTS["body"]
+        ).pack(pady=(20, 5))
+        
+        self.rows_frame = ctk.CTkScrollableFrame(self, width=420, height=220)
+        self.rows_frame.pack(padx=20, pady=5, fill="both", expand=True)
+        
+        ctk.CTkButton(
+            self,
+            text="+ Add Ingredient",
+            command=self.add_row,
+            font=FONTS["body"]
+        ).pack(pady=5)
+        
+        ctk.CTkButton(
+            self,
+            text="Save Recipe",
+            command=self.save_recipe,
+            font=FONTS["body"]
+        ).pack(pady=(10, 20))
+    
+    def load_recipe(self):
+        """Load stock items and the item's current recipe"""
+        conn = None
+        try:
+            conn = self.parent.db.connect()
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT id, item_name, unit_type FROM bar_stock ORDER BY item_name")
+            for stock_id, name, unit_type in cursor.fetchall():
+                self.stock_items[f"{name} ({unit_type})"] = stock_id
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load stock items: {str(e)}")
+            return
+        finally:
+            if conn:
+                conn.close()
+        
+        try:
+            for _, name, unit_type, quantity in self.recipes.get_recipe(self.item[0]):
+                self.add_row(f"{name} ({unit_type})", quantity)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load recipe: {str(e)}")
+    
+    def add_row(self, stock_label=None, quantity=None):
+        """Add an ingredient row"""
+        if not self.stock_items:
+            messagebox.showerror("Error", "Please add stock items first")
+            return
+        
+        frame = ctk.CTkFrame(self.rows_frame, fg_color="transparent")
+        frame.pack(fill="x", pady=2)
+        
+        stock_var = ctk.StringVar(value=stock_label or next(iter(self.stock_items)))
+        ctk.CTkOptionMenu(
+            frame,
+            variable=stock_var,
+            values=list(self.stock_items),
+            width=220,
+            font=FONTS["body"]
+        ).pack(side="left", padx=5)
+        
+        quantity_entry = ctk.CTkEntry(frame, width=90, placeholder_text="Quantity")
+        quantity_entry.pack(side="left", padx=5)
+        if quantity is not None:
+            quantity_entry.insert(0, f"{quantity:g}")
+        
+        row = (frame, stock_var, quantity_entry)
+        ctk.CTkButton(
+            frame,
+            text="✕",
+            width=30,
+            fg_color="red",
+            hover_color="darkred",
+            command=lambda: self.remove_row(row)
+        ).pack(side="left", padx=5)
+        
+        self.rows.append(row)
+    
+    def remove_row(self, row):
+        """Remove an ingredient row"""
+        self.rows.remove(row)
+        row[0].destroy()
+    
+    def save_recipe(self):
+        """Save the recipe; an empty recipe restores default stock deduction"""
+        components = {}
+        for _, stock_var, quantity_entry in self.rows:
+            try:
+                quantity = float(quantity_entry.get().strip())
+                if quantity <= 0:
+                    raise ValueError()
+            except ValueError:
+                messagebox.showerror("Error", f"Please enter a valid quantity for {stock_var.get()}")
+                return
+            
+            stock_id = self.stock_items[stock_var.get()]
+            components[stock_id] = components.get(stock_id, 0) + quantity
+        
+        try:
+            self.recipes.set_recipe(self.item[0], list(components.items()))
+            self.destroy()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save recipe: {str(e)}")
+
+class PriceDialog(ctk.CTkToplevel):
+    def __init__(self, parent, item):
+        super().__init__(parent)
+        self.parent = parent
+        self.item = item
+        self.prices = MenuPrices(parent.db)
+        
+        # Window setup
+        self.title(f"Prices - {item[1]}")
+        self.geometry("680x560")
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_prices()
+    
+    def center_window(self):
+        """Center the dialog window on the screen"""
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'{width}x{height}+{x}+{y}')
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        self.history_grid = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Price", "value": 1, "format": lambda v: f"₹{v:.2f}", "width": 80},
+                {"title": "From", "value": 2, "width": 140},
+                {"title": "Until", "value": lambda p: p[3] or "", "width": 140,
+                 "text": lambda p: p[3] or "-"},
+                {"title": "Note", "value": lambda p: p[4] or "", "width": 120, "weight": 2},
+                {"title": "Status", "value": self.status, "width": 80,
+                 "color": lambda p: "#10B981" if self.status(p) == "Scheduled" else None}
+            ],
+            actions=[
+                {
+                    "text": "Cancel",
+                    "command": self.cancel_price,
+                    "width": 60,
+                    "fg_color": "red",
+                    "hover_color": "darkred",
+                    "visible": lambda p: self.status(p) == "Scheduled"
+                }
+            ],
+            empty_text="No prices recorded"
+        )
+        self.history_grid.pack(fill="both", expand=True)
+        
+        # Schedule a new price
+        form = ctk.CTkFrame(main_frame, fg_color="transparent")
+        form.pack(fill="x", pady=(10, 0))
+        
+        ctk.CTkLabel(form, text="New price:", font=FONTS["body"]).grid(row=0, column=0, sticky="w", padx=5)
+        self.price_entry = ctk.CTkEntry(form, width=100)
+        self.price_entry.grid(row=0, column=1, sticky="w", padx=5, pady=2)
+        
+        ctk.CTkLabel(form, text="Note:", font=FONTS["body"]).grid(row=0, column=2, sticky="w", padx=5)
+        self.note_entry = ctk.CTkEntry(form, width=200, placeholder_text="e.g. Happy hour")
+        self.note_entry.grid(row=0, column=3, columnspan=2, sticky="w", padx=5, pady=2)
+        
+        ctk.CTkLabel(form, text="From:", font=FONTS["body"]).grid(row=1, column=0, sticky="w", padx=5)
+        self.from_date = DateEntry(form, width=12, date_pattern='yyyy-mm-dd')
+        self.from_date.grid(row=1, column=1, sticky="w", padx=5, pady=2)
+        self.from_time = ctk.CTkEntry(form, width=70)
+        self.from_time.insert(0, datetime.now().strftime('%H:%M'))
+        self.from_time.grid(row=1, column=2, sticky="w", padx=5, pady=2)
+        
+        self.temporary_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            form,
+            text="Until:",
+            variable=self.temporary_var,
+            font=FONTS["body"]
+        ).grid(row=2, column=0, sticky="w", padx=5)
+        self.until_date = DateEntry(form, width=12, date_pattern='yyyy-mm-dd')
+        self.until_date.grid(row=2, column=1, sticky="w", padx=5, pady=2)
+        self.until_time = ctk.CTkEntry(form, width=70)
+        self.until_time.insert(0, (datetime.now() + timedelta(hours=2)).strftime('%H:%M'))
+        self.until_time.grid(row=2, column=2, sticky="w", padx=5, pady=2)
+        
+        ctk.CTkButton(
+            form,
+            text="Schedule Price",
+            command=self.schedule_price,
+            font=FONTS["body"]
+        ).grid(row=1, column=4, rowspan=2, padx=5)
+        
+        self.elasticity_label = ctk.CTkLabel(main_frame, text="", font=FONTS["body"], justify="left")
+        self.elasticity_label.pack(fill="x", pady=(10, 0))
+    
+    @staticmethod
+    def status(price):
+        """Describe a price entry relative to now"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if price[2] > now:
+            return "Scheduled"
+        if price[3] and price[3] <= now:
+            return "Ended"
+        return "Started"
+    
+    def load_prices(self):
+        """Load the item's price history and demand at each price over 90 days"""
+        try:
+            self.history_grid.set_rows(self.prices.get_history(self.item[0]))
+            
+            today = datetime.now()
+            report = self.prices.get_elasticity(
+                self.item[0],
+                (today - timedelta(days=90)).strftime('%Y-%m-%d'),
+                today.strftime('%Y-%m-%d')
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load prices: {str(e)}")
+            return
+        
+        lines = [
+            f"₹{level['price']:.2f}: {level['quantity']:g} sold in {level['hours']:.0f} h "
+            f"({level['per_hour']:.2f}/h)"
+            for level in report["levels"]
+        ]
+        lines += [
+            f"Elasticity ₹{low:.2f} → ₹{high:.2f}: {value:.2f}"
+            for low, high, value in report["elasticity"]
+        ]
+        self.elasticity_label.configure(
+            text="Last 90 days\n" + "\n".join(lines) if lines else "No sales in the last 90 days"
+        )
+    
+    def read_time(self, date_entry, time_entry):
+        """Combine a date picker and an HH:MM entry"""
+        hours, minutes = time_entry.get().strip().split(":")
+        return datetime.combine(date_entry.get_date(), datetime.min.time()).replace(
+            hour=int(hours), minute=int(minutes)
+        )
+    
+    def schedule_price(self):
+        """Add a price that applies from the chosen time"""
+        try:
+            price = float(self.price_entry.get().strip())
+            if price <= 0:
+                raise ValueError()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid price")
+            return
+        
+        try:
+            effective_from = self.read_time(self.from_date, self.from_time)
+            effective_until = None
+            if self.temporary_var.get():
+                effective_until = self.read_time(self.until_date, self.until_time)
+        except ValueError:
+            messagebox.showerror("Error", "Please enter times as HH:MM")
+            return
+        
+        try:
+            self.prices.schedule(
+                self.item[0], price, effective_from, effective_until,
+                self.note_entry.get().strip() or None
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to schedule price: {str(e)}")
+            return
+        
+        self.price_entry.delete(0, "end")
+        self.load_prices()
+        self.parent.load_menu_items()
+    
+    def cancel_price(self, price):
+        """Remove a price that has not started"""
+        try:
+            self.prices.cancel(price[0])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to cancel price: {str(e)}")
+            return
+        self.load_prices()
+
 class MenuPage(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color="transparent")
@@ -258,27 +610,53 @@ class MenuPage(ctk.CTkFrame):
             command=self.show_menu_item_dialog,
             font=FONTS["body"]
         ).pack(side="left", padx=5)
+        
+        # Import Menu Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Import CSV",
+            width=120,
+            command=self.show_import_dialog,
+            font=FONTS["body"],
+            fg_color=COLORS["secondary"]
+        ).pack(side="left", padx=5)
     
     def create_menu_table(self):
-        # Table container
-        self.table_frame = ctk.CTkFrame(self)
-        self.table_frame.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
-        self.table_frame.grid_columnconfigure(2, weight=1)
-        
-        # Headers
-        headers = ["Item Name", "Category", "Price", "Actions"]
-        for col, text in enumerate(headers):
-            ctk.CTkLabel(
-                self.table_frame,
-                text=text,
-                font=FONTS["body"]
-            ).grid(row=0, column=col, padx=10, pady=5, sticky="w")
-        
-        # Scrollable frame for menu items
-        self.menu_frame = ctk.CTkScrollableFrame(self.table_frame)
-        self.menu_frame.grid(row=1, column=0, columnspan=len(headers),
-                           sticky="nsew", padx=5, pady=5)
-        self.menu_frame.grid_columnconfigure(2, weight=1)
+        self.menu_grid = DataGrid(
+            self,
+            columns=[
+                {"title": "Item Name", "value": 1, "width": 160, "weight": 3, "font": FONTS["body"]},
+                {"title": "Category", "value": 2, "width": 120, "weight": 1, "font": FONTS["body"]},
+                {"title": "Price", "value": 3, "format": lambda v: f"₹{v:.2f}", "width": 100,
+                 "weight": 1, "font": FONTS["body"]}
+            ],
+            actions=[
+                {
+                    "text": "Edit",
+                    "command": self.show_menu_item_dialog,
+                    "width": 60
+                },
+                {
+                    "text": "Recipe",
+                    "command": self.show_recipe_dialog,
+                    "width": 70
+                },
+                {
+                    "text": "Prices",
+                    "command": self.show_price_dialog,
+                    "width": 70
+                },
+                {
+                    "text": "Delete",
+                    "command": lambda item: self.delete_menu_item(item[0]),
+                    "width": 60,
+                    "fg_color": "red",
+                    "hover_color": "darkred"
+                }
+            ],
+            empty_text="No menu items"
+        )
+        self.menu_grid.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
     
     def load_categories(self):
         """Load menu categories"""
@@ -302,6 +680,8 @@ class MenuPage(ctk.CTkFrame):
     def load_menu_items(self, category_id=None):
         """Load menu items"""
         try:
+            MenuPrices(self.db).sync()  # Show the prices in effect now
+            
             conn = self.db.connect()
             cursor = conn.cursor()
             
@@ -334,56 +714,7 @@ class MenuPage(ctk.CTkFrame):
     
     def update_menu_table(self):
         """Update menu items display"""
-        # Clear existing items
-        for widget in self.menu_frame.winfo_children():
-            widget.destroy()
-        
-        # Add menu items
-        for row, item in enumerate(self.menu_items):
-            # Item name
-            ctk.CTkLabel(
-                self.menu_frame,
-                text=item[1],
-                font=FONTS["body"]
-            ).grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Category
-            ctk.CTkLabel(
-                self.menu_frame,
-                text=item[2],
-                font=FONTS["body"]
-            ).grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            # Price
-            ctk.CTkLabel(
-                self.menu_frame,
-                text=f"₹{item[3]:.2f}",
-                font=FONTS["body"]
-            ).grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            # Actions Frame
-            actions_frame = ctk.CTkFrame(self.menu_frame, fg_color="transparent")
-            actions_frame.grid(row=row, column=3, padx=10, pady=5, sticky="e")
-            
-            # Edit button
-            ctk.CTkButton(
-                actions_frame,
-                text="Edit",
-                width=60,
-                command=lambda i=item: self.show_menu_item_dialog(i),
-                font=FONTS["body"]
-            ).pack(side="left", padx=2)
-            
-            # Delete button
-            ctk.CTkButton(
-                actions_frame,
-                text="Delete",
-                width=60,
-                fg_color="red",
-                hover_color="darkred",
-                command=lambda i=item: self.delete_menu_item(i[0]),
-                font=FONTS["body"]
-            ).pack(side="left", padx=2)
+        self.menu_grid.set_rows(self.menu_items)
     
     def filter_by_category(self, category_name):
         """Filter menu items by category"""
@@ -413,6 +744,26 @@ class MenuPage(ctk.CTkFrame):
         dialog = MenuItemDialog(self, self.categories, item)
         dialog.grab_set()  # Make dialog modal
     
+    def show_recipe_dialog(self, item):
+        """Show dialog to edit the stock a menu item consumes"""
+        dialog = RecipeDialog(self, item)
+        dialog.grab_set()  # Make dialog modal
+    
+    def show_price_dialog(self, item):
+        """Show dialog to view and schedule a menu item's prices"""
+        dialog = PriceDialog(self, item)
+        dialog.grab_set()  # Make dialog modal
+    
+    def show_import_dialog(self):
+        """Show dialog to import menu items from CSV"""
+        dialog = ImportDialog(self, "menu_items", on_complete=self.reload_menu)
+        dialog.grab_set()
+    
+    def reload_menu(self):
+        """Reload categories and items after an import"""
+        self.load_categories()
+        self.load_menu_items()
+    
     def add_category(self, name):
         """Add new category"""
         try:
@@ -437,6 +788,7 @@ class MenuPage(ctk.CTkFrame):
         """Add new menu item"""
         try:
             conn = self.db.connect()
+            migrations.ensure_schema(conn)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -454,16 +806,18 @@ class MenuPage(ctk.CTkFrame):
                 conn.close()
     
     def edit_menu_item(self, item_id, name, category_id, price):
-        """Edit existing menu item"""
+        """Edit existing menu item; a new price applies from now"""
         try:
             conn = self.db.connect()
+            migrations.ensure_schema(conn)
             cursor = conn.cursor()
             
             cursor.execute("""
                 UPDATE menu_items
-                SET name = ?, category_id = ?, price = ?
+                SET name = ?, category_id = ?
                 WHERE id = ?
-            """, (name, category_id, price, item_id))
+            """, (name, category_id, item_id))
+            MenuPrices.set_price(cursor, item_id, price, note="Edited")
             
             conn.commit()
             self.load_menu_items()
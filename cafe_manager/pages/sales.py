@@ -4,8 +4,11 @@ Handles table management and billing operations.
 """
 
 import customtkinter as ctk
+import logging
 from utils.constants import *
 from database import DatabaseManager
+from utils.sync import get_bill_service
+from utils.menu_prices import MenuPrices
 from datetime import datetime
 import sqlite3
 from tkinter import messagebox
@@ -224,6 +227,7 @@ class BillWindow(ctk.CTkToplevel):
         self.parent = parent
         self.table_number = table_number
         self.db = DatabaseManager()
+        self.bills = parent.bills
         
         # Window setup
         self.title(f"Table {table_number} - Bill")
@@ -236,8 +240,10 @@ class BillWindow(ctk.CTkToplevel):
         # Initialize variables
         self.menu_items = {}
         self.bill_items = {}
+        self.session_id = None  # Bill session shown; paying it twice is refused
         self.subtotal = 0.0
         self.total = 0.0
+        self.price_timer = None  # Reloads the menu when a scheduled price starts or ends
         
         # Initialize category menu variable
         self.category_menu = None
@@ -430,6 +436,8 @@ class BillWindow(ctk.CTkToplevel):
     def load_menu_items(self):
         """Load all menu items from database"""
         try:
+            self.schedule_price_reload(MenuPrices(self.db).sync())
+            
             conn = self.db.connect()
             cursor = conn.cursor()
             
@@ -470,6 +478,25 @@ class BillWindow(ctk.CTkToplevel):
             if conn:
                 conn.close()
     
+    def schedule_price_reload(self, next_change):
+        """Reload menu prices when the next scheduled price change is due"""
+        if self.price_timer:
+            self.after_cancel(self.price_timer)
+            self.price_timer = None
+        if next_change is None:
+            return
+        
+        # Check at least hourly; long timers are not worth holding
+        delay = (next_change - datetime.now()).total_seconds()
+        delay_ms = int(min(max(delay, 0), 3600) * 1000) + 1000
+        self.price_timer = self.after(delay_ms, self.load_menu_items)
+    
+    def destroy(self):
+        if self.price_timer:
+            self.after_cancel(self.price_timer)
+            self.price_timer = None
+        super().destroy()
+    
     def display_menu_items(self, category=None, search_text=None):
         """Display menu items in the menu list"""
         # Clear existing items
@@ -551,72 +578,20 @@ class BillWindow(ctk.CTkToplevel):
             return
         
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
-            # Start transaction
-            cursor.execute("BEGIN")
-            
-            # Add item with quantity
-            if item['id'] in self.bill_items:
-                new_quantity = self.bill_items[item['id']]['quantity'] + quantity
-                total_price = item['price'] * new_quantity
-                
-                # Update temporary_bills
-                cursor.execute("""
-                    UPDATE temporary_bills
-                    SET quantity = ?, total_price = ?
-                    WHERE table_number = ? AND menu_item_id = ?
-                """, (new_quantity, total_price, self.table_number, item['id']))
-                
-                self.bill_items[item['id']]['quantity'] = new_quantity
-            else:
-                total_price = item['price'] * quantity
-                
-                # Insert into temporary_bills
-                cursor.execute("""
-                    INSERT INTO temporary_bills (
-                        table_number, menu_item_id, quantity,
-                        price_per_unit, total_price
-                    ) VALUES (?, ?, ?, ?, ?)
-                """, (
-                    self.table_number,
-                    item['id'],
-                    quantity,
-                    item['price'],
-                    total_price
-                ))
-                
-                self.bill_items[item['id']] = {
-                    'name': item['name'],
-                    'price': item['price'],
-                    'quantity': quantity
-                }
-            
-            # Update table status if this is the first item
-            if len(self.bill_items) == 1:
-                cursor.execute("""
-                    UPDATE tables 
-                    SET status = 'occupied'
-                    WHERE table_number = ?
-                """, (self.table_number,))
-                
-                # Update table button color in parent
-                self.parent.update_table_status(self.table_number, "occupied")
-            
-            # Commit transaction
-            conn.commit()
-            
-            # Update display
-            self.update_bill_display()
+            # The service adds to whatever the table holds now, even if
+            # another terminal changed it since this window loaded
+            state = self.bills.add_item(self.table_number, item['id'], quantity)
+            self.apply_state(state)
+            self.parent.update_table_status(self.table_number, state["status"])
             
         except Exception as e:
-            if conn:
-                conn.rollback()
             messagebox.showerror("Error", f"Failed to add item: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+    
+    def apply_state(self, state):
+        """Show a table state from the bill service"""
+        self.bill_items = state["items"]
+        self.session_id = state.get("session_id")
+        self.update_bill_display()
     
     def update_bill_display(self):
         """Update the bill display"""
@@ -663,87 +638,24 @@ class BillWindow(ctk.CTkToplevel):
         """Remove item from bill"""
         if item_id in self.bill_items:
             try:
-                conn = self.db.connect()
-                cursor = conn.cursor()
-                
-                # Start transaction
-                cursor.execute("BEGIN")
-                
-                if self.bill_items[item_id]['quantity'] > 1:
-                    # Update quantity
-                    new_quantity = self.bill_items[item_id]['quantity'] - 1
-                    total_price = self.bill_items[item_id]['price'] * new_quantity
-                    
-                    cursor.execute("""
-                        UPDATE temporary_bills
-                        SET quantity = ?, total_price = ?
-                        WHERE table_number = ? AND menu_item_id = ?
-                    """, (new_quantity, total_price, self.table_number, item_id))
-                    
-                    self.bill_items[item_id]['quantity'] = new_quantity
-                else:
-                    # Remove item completely
-                    cursor.execute("""
-                        DELETE FROM temporary_bills
-                        WHERE table_number = ? AND menu_item_id = ?
-                    """, (self.table_number, item_id))
-                    
-                    del self.bill_items[item_id]
-                
-                # If no items left, update table status
-                if not self.bill_items:
-                    cursor.execute("""
-                        UPDATE tables
-                        SET status = 'vacant'
-                        WHERE table_number = ?
-                    """, (self.table_number,))
-                    self.parent.update_table_status(self.table_number, "vacant")
-                
-                # Commit transaction
-                conn.commit()
-                
-                # Update display
-                self.update_bill_display()
+                state = self.bills.remove_item(self.table_number, item_id)
+                self.apply_state(state)
+                self.parent.update_table_status(self.table_number, state["status"])
                 
             except Exception as e:
-                if conn:
-                    conn.rollback()
                 messagebox.showerror("Error", f"Failed to remove item: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
     
     def load_existing_items(self):
-        """Load any existing items for this table from temporary_bills"""
+        """Load any existing items for this table"""
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT tb.menu_item_id, mi.name, tb.quantity, 
-                       tb.price_per_unit, tb.total_price
-                FROM temporary_bills tb
-                JOIN menu_items mi ON tb.menu_item_id = mi.id
-                WHERE tb.table_number = ?
-            """, (self.table_number,))
-            
-            existing_items = cursor.fetchall()
-            
-            for item in existing_items:
-                self.bill_items[item[0]] = {
-                    'name': item[1],
-                    'quantity': item[2],
-                    'price': item[3]
-                }
-            
+            state = self.bills.get_state(self.table_number)
+            self.bill_items = state["items"]
+            self.session_id = state.get("session_id")
             if self.bill_items:
                 self.update_bill_display()
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load existing items: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
     
     def pay_bill(self):
         """Handle bill payment and stock reduction"""
@@ -751,179 +663,34 @@ class BillWindow(ctk.CTkToplevel):
             messagebox.showerror("Error", "Cannot process empty bill")
             return
             
+        # One payment at a time; a second click waits for the first
+        self.pay_bill_button.configure(state="disabled")
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
+            # Totals are recomputed from the stored bill by the service
+            sale = self.bills.pay(
+                self.table_number,
+                self.discount_type.get(),
+                float(self.discount_value.get() or 0),
+                session_id=self.session_id
+            )
             
-            # Start transaction
-            cursor.execute("BEGIN")
+            # Update table button color in parent
+            self.parent.update_table_status(self.table_number, sale["state"]["status"])
+            
+            # Show success message
+            if sale.get("duplicate"):
+                messagebox.showinfo("Already Paid", f"This bill was already paid as invoice {sale['invoice_no']}.")
+            elif sale.get("pending"):
+                messagebox.showinfo("Success", "Payment recorded; it will be sent to the server shortly.")
+            else:
+                messagebox.showinfo("Success", f"Payment processed successfully! Invoice {sale['invoice_no']}")
+            
+            # Close bill window
+            self.destroy()
             
-            try:
-                # First check stock for all items
-                for item_id, item in self.bill_items.items():
-                    # Get item category
-                    cursor.execute("""
-                        SELECT mc.name as category
-                        FROM menu_items mi
-                        JOIN menu_categories mc ON mi.category_id = mc.id
-                        WHERE mi.id = ?
-                    """, (item_id,))
-                    
-                    result = cursor.fetchone()
-                    if not result:
-                        continue
-                        
-                    category = result[0]
-                    
-                    # Only check stock for Bar and Cigarette items
-                    if category in ['Bar', 'Cigarette']:
-                        # Get current stock
-                        unit_type = 'PACKET' if category == 'Cigarette' else 'ML'
-                        cursor.execute("""
-                            SELECT id, quantity 
-                            FROM bar_stock 
-                            WHERE item_name = (
-                                SELECT name FROM menu_items WHERE id = ?
-                            ) AND unit_type = ?
-                        """, (item_id, unit_type))
-                        
-                        stock = cursor.fetchone()
-                        if not stock:
-                            raise Exception(f"No stock found for {item['name']}")
-                            
-                        stock_id, current_qty = stock
-                        
-                        # Calculate required quantity
-                        required_qty = item['quantity']
-                        if category == 'Cigarette':
-                            required_qty = required_qty / 20  # Convert pieces to packets
-                            
-                        if current_qty < required_qty:
-                            raise Exception(
-                                f"Insufficient stock for {item['name']}. "
-                                f"Required: {required_qty:.1f} {unit_type}, "
-                                f"Available: {current_qty:.1f} {unit_type}"
-                            )
-                
-                # Insert sale record
-                cursor.execute("""
-                    INSERT INTO sales (
-                        table_number, subtotal, discount_type,
-                        discount_value, total_amount, payment_status,
-                        created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, DATETIME('now', 'localtime'))
-                """, (
-                    self.table_number,
-                    self.subtotal,
-                    self.discount_type.get(),
-                    float(self.discount_value.get() or 0),
-                    self.total,
-                    "completed"
-                ))
-                
-                sale_id = cursor.lastrowid
-                
-                # Process each item
-                for item_id, item in self.bill_items.items():
-                    # Insert sale item
-                    cursor.execute("""
-                        INSERT INTO sale_items (
-                            sale_id, menu_item_id, quantity,
-                            price_per_unit, total_price
-                        ) VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        sale_id,
-                        item_id,
-                        item['quantity'],
-                        item['price'],
-                        item['price'] * item['quantity']
-                    ))
-                    
-                    # Get item category
-                    cursor.execute("""
-                        SELECT mc.name as category
-                        FROM menu_items mi
-                        JOIN menu_categories mc ON mi.category_id = mc.id
-                        WHERE mi.id = ?
-                    """, (item_id,))
-                    
-                    result = cursor.fetchone()
-                    if not result:
-                        continue
-                        
-                    category = result[0]
-                    
-                    # Update stock for Bar and Cigarette items
-                    if category in ['Bar', 'Cigarette']:
-                        unit_type = 'PACKET' if category == 'Cigarette' else 'ML'
-                        cursor.execute("""
-                            SELECT id, quantity 
-                            FROM bar_stock 
-                            WHERE item_name = (
-                                SELECT name FROM menu_items WHERE id = ?
-                            ) AND unit_type = ?
-                        """, (item_id, unit_type))
-                        
-                        stock = cursor.fetchone()
-                        if stock:
-                            stock_id, current_qty = stock
-                            
-                            # Calculate quantity to deduct
-                            deduct_qty = item['quantity']
-                            if category == 'Cigarette':
-                                deduct_qty = deduct_qty / 20  # Convert pieces to packets
-                            
-                            # Update stock
-                            new_qty = current_qty - deduct_qty
-                            cursor.execute("""
-                                UPDATE bar_stock 
-                                SET quantity = ?,
-                                    last_updated = DATETIME('now', 'localtime')
-                                WHERE id = ?
-                            """, (new_qty, stock_id))
-                            
-                            # Record in history
-                            cursor.execute("""
-                                INSERT INTO stock_history (
-                                    item_id, change_quantity, operation_type,
-                                    source, created_at
-                                ) VALUES (?, ?, 'remove', 'sale', DATETIME('now', 'localtime'))
-                            """, (stock_id, deduct_qty))
-                
-                # Clear temporary items
-                cursor.execute("""
-                    DELETE FROM temporary_bills
-                    WHERE table_number = ?
-                """, (self.table_number,))
-                
-                # Update table status back to vacant
-                cursor.execute("""
-                    UPDATE tables
-                    SET status = 'vacant'
-                    WHERE table_number = ?
-                """, (self.table_number,))
-                
-                # Commit transaction
-                conn.commit()
-                
-                # Update table button color in parent
-                self.parent.update_table_status(self.table_number, "vacant")
-                
-                # Show success message
-                messagebox.showinfo("Success", "Payment processed successfully!")
-                
-                # Close bill window
-                self.destroy()
-                
-            except Exception as e:
-                conn.rollback()
-                raise e
-                
         except Exception as e:
+            self.pay_bill_button.configure(state="normal")
             messagebox.showerror("Error", f"Failed to process payment: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
     
     def center_window(self):
         """Center the window on the screen"""
@@ -1277,6 +1044,8 @@ class SalesPage(ctk.CTkFrame):
         
         # Initialize variables
         self.db = DatabaseManager()
+        self.bills = get_bill_service(self.db)
+        self.bill_seq = 0   # Position in the bill change feed already shown
         self.table_buttons = {}
         self.active_bills = {}
         
@@ -1327,23 +1096,41 @@ class SalesPage(ctk.CTkFrame):
     def load_table_status(self):
         """Load current status of all tables."""
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT table_number, status
-                FROM tables
-                ORDER BY table_number
-            """)
-            
-            for table_number, status in cursor.fetchall():
+            self.bill_seq = self.bills.changes_since(0)["seq"]
+            for table_number, status in self.bills.get_tables():
                 self.update_table_status(table_number, status)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load table status: {str(e)}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
+    
+    def apply_changes(self):
+        """Show tables changed by other windows or terminals."""
+        changes = self.bills.changes_since(self.bill_seq)
+        self.bill_seq = changes["seq"]
+        for state in changes["events"]:
+            self.update_table_status(state["table_number"], state["status"])
+            window = self.active_bills.get(state["table_number"])
+            if window and window.winfo_exists():
+                window.apply_state(state)
+        
+        # Payments taken offline that the server could not record
+        rejected = self.bills.take_rejected_payments()
+        advice = {
+            "rejected": "Please enter them again",
+            "conflict": "The bills were already paid on another terminal; "
+                        "refund the customer if they paid twice"
+        }
+        for status, message in advice.items():
+            payments = [p for p in rejected if p.get("status", "rejected") == status]
+            if payments:
+                messagebox.showerror(
+                    "Payment Not Recorded",
+                    f"These payments were taken but the server did not record them. "
+                    f"{message}:\n\n" + "\n".join(
+                        f"Table {p['table_number']}, ₹{p['total']:,.2f} at {p['created_at']}: {p['detail']}"
+                        for p in payments
+                    )
+                )
     
     def update_table_status(self, table_number, status):
         """Update table status and appearance."""
@@ -1379,5 +1166,8 @@ class SalesPage(ctk.CTkFrame):
     
     def start_auto_refresh(self):
         """Start auto-refresh timer."""
-        self.load_table_status()
-        self.after(30000, self.start_auto_refresh)  # Refresh every 30 seconds
+        try:
+            self.apply_changes()
+        except Exception as e:
+            logging.error(f"Error refreshing tables: {e}")
+        self.after(SYNC_CONFIG["refresh_ms"], self.start_auto_refresh)
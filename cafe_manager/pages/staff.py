@@ -6,6 +6,10 @@ Handles staff management, salary tracking, and payment history.
 import customtkinter as ctk
 from utils.constants import *
 from database import DatabaseManager
+import migrations
+from utils.data_grid import DataGrid
+from utils.payroll import PayrollManager
+from utils.attendance import AttendanceManager
 from datetime import datetime
 from tkinter import messagebox
 import sqlite3
@@ -158,6 +162,315 @@ class AddStaffDialog(ctk.CTkToplevel):
         y = (self.winfo_screenheight() // 2) - (height // 2)
         self.geometry(f'+{x}+{y}')
 
+class PayrollDialog(ctk.CTkToplevel):
+    """Preview and pay a month's salaries for all active staff."""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.payroll = PayrollManager(parent.db)
+        self.dues = []
+        
+        # Window setup
+        self.title("Run Payroll")
+        self.geometry("720x520")
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_preview()
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        controls = ctk.CTkFrame(main_frame, fg_color="transparent")
+        controls.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(controls, text="Month:").pack(side="left", padx=(0, 5))
+        
+        # Current month and the eleven before it
+        today = datetime.now()
+        months = []
+        year, month = today.year, today.month
+        for _ in range(12):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        
+        self.period_var = ctk.StringVar(value=months[0])
+        ctk.CTkOptionMenu(
+            controls,
+            variable=self.period_var,
+            values=months,
+            command=lambda _: self.load_preview(),
+            width=120
+        ).pack(side="left")
+        
+        self.preview_grid = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Name", "value": lambda d: d["name"], "width": 120, "weight": 2},
+                {"title": "Position", "value": lambda d: d["title"], "width": 90},
+                {"title": "Salary", "value": lambda d: d["salary"], "width": 90,
+                 "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Days", "value": lambda d: d["days"], "width": 50, "weight": 0},
+                {"title": "Paid", "value": lambda d: d["paid"], "width": 90,
+                 "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Due", "value": lambda d: d["due"], "width": 90,
+                 "format": lambda v: f"₹{v:,.2f}",
+                 "font": ("Helvetica", 12, "bold"),
+                 "color": lambda d: None if d["due"] else "gray"}
+            ],
+            empty_text="No active staff for this month"
+        )
+        self.preview_grid.pack(fill="both", expand=True)
+        
+        self.total_label = ctk.CTkLabel(
+            main_frame,
+            text="",
+            font=("Helvetica", 14, "bold")
+        )
+        self.total_label.pack(pady=(10, 0))
+        
+        # Buttons Frame
+        buttons_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        buttons_frame.pack(fill="x", pady=(10, 0))
+        
+        self.pay_button = ctk.CTkButton(
+            buttons_frame,
+            text="Pay All",
+            command=self.run_payroll,
+            fg_color="#10B981",
+            hover_color="#059669",
+            width=140,
+            height=40
+        )
+        self.pay_button.pack(side="left", padx=10, expand=True)
+        
+        ctk.CTkButton(
+            buttons_frame,
+            text="Cancel",
+            command=self.destroy,
+            fg_color="#EF4444",
+            hover_color="#DC2626",
+            width=140,
+            height=40
+        ).pack(side="right", padx=10, expand=True)
+    
+    def load_preview(self):
+        """Compute dues for the selected month."""
+        try:
+            self.dues = self.payroll.preview(self.period_var.get())
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to compute payroll: {str(e)}")
+            return
+        
+        self.preview_grid.set_rows(self.dues)
+        total = sum(d["due"] for d in self.dues)
+        to_pay = sum(1 for d in self.dues if d["due"] > 0)
+        self.total_label.configure(text=f"To pay: ₹{total:,.2f} to {to_pay} staff")
+        self.pay_button.configure(state="normal" if to_pay else "disabled")
+    
+    def run_payroll(self):
+        """Pay all outstanding dues in one transaction."""
+        period = self.period_var.get()
+        total = sum(d["due"] for d in self.dues)
+        if not messagebox.askyesno(
+            "Run Payroll",
+            f"Pay ₹{total:,.2f} in salaries for {period}?",
+            parent=self
+        ):
+            return
+        
+        try:
+            result = self.payroll.run(period)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to run payroll: {str(e)}")
+            return
+        
+        messagebox.showinfo(
+            "Payroll Complete",
+            f"Paid ₹{result['total']:,.2f} to {len(result['payments'])} staff for {period}"
+        )
+        self.parent.load_staff_data()
+        self.destroy()
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
+class PaymentHistoryDialog(ctk.CTkToplevel):
+    """Salary payments per staff member and month."""
+    
+    def __init__(self, parent, staff_members):
+        super().__init__(parent)
+        self.parent = parent
+        self.payroll = PayrollManager(parent.db)
+        self.staff_ids = {"All Staff": None}
+        self.staff_ids.update({staff[1]: staff[0] for staff in staff_members})
+        
+        # Window setup
+        self.title("Payment History")
+        self.geometry("640x480")
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_history()
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        controls = ctk.CTkFrame(main_frame, fg_color="transparent")
+        controls.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(controls, text="Staff:").pack(side="left", padx=(0, 5))
+        self.staff_var = ctk.StringVar(value="All Staff")
+        ctk.CTkOptionMenu(
+            controls,
+            variable=self.staff_var,
+            values=list(self.staff_ids),
+            command=lambda _: self.load_history(),
+            width=180
+        ).pack(side="left")
+        
+        self.history_grid = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Month", "value": 2, "width": 80},
+                {"title": "Name", "value": 1, "width": 140, "weight": 2},
+                {"title": "Payments", "value": 3, "width": 80, "weight": 0},
+                {"title": "Amount", "value": 4, "width": 110, "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Last Paid", "value": 5, "width": 100}
+            ],
+            empty_text="No payments yet"
+        )
+        self.history_grid.pack(fill="both", expand=True)
+    
+    def load_history(self):
+        try:
+            rows = self.payroll.get_history(self.staff_ids[self.staff_var.get()])
+            self.history_grid.set_rows(rows)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load payment history: {str(e)}")
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
+class LaborAnalyticsDialog(ctk.CTkToplevel):
+    """Sales against staff hours by hour of day for a period."""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.attendance = AttendanceManager(parent.db)
+        
+        # Window setup
+        self.title("Labor Analytics")
+        self.geometry("820x560")
+        
+        self.setup_ui()
+        self.center_window()
+        self.load_profile()
+    
+    def setup_ui(self):
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        controls = ctk.CTkFrame(main_frame, fg_color="transparent")
+        controls.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(controls, text="From:").pack(side="left", padx=(0, 5))
+        self.start_entry = DateEntry(controls, width=12, date_pattern='yyyy-mm-dd')
+        self.start_entry.set_date(datetime.now().replace(day=1))
+        self.start_entry.pack(side="left", padx=(0, 5))
+        
+        ctk.CTkLabel(controls, text="to:").pack(side="left", padx=(0, 5))
+        self.end_entry = DateEntry(controls, width=12, date_pattern='yyyy-mm-dd')
+        self.end_entry.pack(side="left", padx=(0, 10))
+        
+        ctk.CTkButton(
+            controls,
+            text="Show",
+            command=self.load_profile,
+            width=80
+        ).pack(side="left")
+        
+        self.profile_grid = DataGrid(
+            main_frame,
+            columns=[
+                {"title": "Hour", "value": lambda h: h["hour"], "width": 60, "weight": 0,
+                 "format": lambda v: f"{v:02d}:00"},
+                {"title": "Days", "value": lambda h: h["days"], "width": 50, "weight": 0},
+                {"title": "Sales", "value": lambda h: h["sale_count"], "width": 60},
+                {"title": "Revenue", "value": lambda h: h["revenue"], "width": 100,
+                 "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Staff Hours", "value": lambda h: h["staff_hours"], "width": 90,
+                 "format": lambda v: f"{v:.1f}"},
+                {"title": "Avg Staff", "value": lambda h: h["avg_staff"], "width": 80,
+                 "format": lambda v: f"{v:.1f}"},
+                {"title": "Labor Cost", "value": lambda h: h["labor_cost"], "width": 100,
+                 "format": lambda v: f"₹{v:,.2f}"},
+                {"title": "Sales / Labor Hr", "value": lambda h: h["sales_per_labor_hour"] or 0,
+                 "width": 110,
+                 "text": lambda h: "-" if h["sales_per_labor_hour"] is None
+                 else f"₹{h['sales_per_labor_hour']:,.2f}",
+                 "font": ("Helvetica", 12, "bold")},
+                {"title": "Labor %", "value": lambda h: h["labor_percent"] or 0, "width": 70,
+                 "text": lambda h: "-" if h["labor_percent"] is None else f"{h['labor_percent']:.1f}%",
+                 "color": lambda h: "#EF4444" if (h["labor_percent"] or 0) > 35 else None}
+            ],
+            empty_text="No sales or shifts in this period"
+        )
+        self.profile_grid.pack(fill="both", expand=True)
+        
+        self.totals_label = ctk.CTkLabel(
+            main_frame,
+            text="",
+            font=("Helvetica", 14, "bold")
+        )
+        self.totals_label.pack(pady=(10, 0))
+    
+    def load_profile(self):
+        """Load sales and labor per hour of day for the selected period."""
+        start = self.start_entry.get_date().strftime('%Y-%m-%d')
+        end = self.end_entry.get_date().strftime('%Y-%m-%d')
+        if start > end:
+            messagebox.showerror("Error", "Start date must be before end date")
+            return
+        
+        try:
+            profile = self.attendance.get_hour_of_day_profile(start, end)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load labor analytics: {str(e)}")
+            return
+        
+        self.profile_grid.set_rows(profile)
+        revenue = sum(h["revenue"] for h in profile)
+        staff_hours = sum(h["staff_hours"] for h in profile)
+        labor_cost = sum(h["labor_cost"] for h in profile)
+        per_hour = f"₹{revenue / staff_hours:,.2f}" if staff_hours else "-"
+        self.totals_label.configure(
+            text=f"Revenue: ₹{revenue:,.2f}   Staff hours: {staff_hours:.1f}   "
+                 f"Labor cost: ₹{labor_cost:,.2f}   Sales per labor hour: {per_hour}"
+        )
+    
+    def center_window(self):
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'+{x}+{y}')
+
 class StaffPage(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color="transparent")
@@ -189,50 +502,114 @@ class StaffPage(ctk.CTkFrame):
             font=("Helvetica", 24, "bold")
         ).grid(row=0, column=0, sticky="w")
         
+        # Buttons frame
+        buttons_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
+        buttons_frame.grid(row=0, column=1, sticky="e")
+        
         # Add Staff Button
-        add_btn = ctk.CTkButton(
-            header_frame,
+        ctk.CTkButton(
+            buttons_frame,
             text="+ Add Staff",
             command=self.show_add_staff_dialog,
             width=150,
             height=40
-        )
-        add_btn.grid(row=0, column=1, sticky="e")
+        ).pack(side="right", padx=5)
+        
+        # Run Payroll Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Run Payroll",
+            command=self.show_payroll_dialog,
+            width=150,
+            height=40,
+            fg_color="#10B981",
+            hover_color="#059669"
+        ).pack(side="right", padx=5)
+        
+        # Payment History Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Payment History",
+            command=self.show_history_dialog,
+            width=150,
+            height=40,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
+        
+        # Labor Analytics Button
+        ctk.CTkButton(
+            buttons_frame,
+            text="Labor Analytics",
+            command=self.show_labor_dialog,
+            width=150,
+            height=40,
+            fg_color=COLORS["secondary"]
+        ).pack(side="right", padx=5)
         
         # Staff Table
-        self.table_frame = ctk.CTkFrame(self)
-        self.table_frame.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
-        self.table_frame.grid_columnconfigure(tuple(range(8)), weight=1)  # Give equal weight to all columns
-        self.table_frame.grid_rowconfigure(1, weight=1)  # Give weight to scrollable frame
-        
-        # Table Headers
-        headers = ["Name", "Position", "Contact", "Salary", "Join Date", "Last Paid", "Status", "Actions"]
-        for col, header in enumerate(headers):
-            ctk.CTkLabel(
-                self.table_frame,
-                text=header,
-                font=("Helvetica", 12, "bold")
-            ).grid(row=0, column=col, padx=10, pady=5, sticky="ew")
-        
-        # Scrollable frame for staff list
-        self.staff_frame = ctk.CTkScrollableFrame(self.table_frame)
-        self.staff_frame.grid(row=1, column=0, columnspan=len(headers), sticky="nsew")
-        
-        # Configure scrollable frame columns
-        for i in range(len(headers)):
-            self.staff_frame.grid_columnconfigure(i, weight=1)
+        self.staff_grid = DataGrid(
+            self,
+            columns=[
+                {"title": "Name", "value": 1, "width": 120, "weight": 2},
+                {"title": "Position", "value": 2, "width": 100},
+                {"title": "Contact", "value": 3, "width": 110},
+                {"title": "Salary", "value": 4, "format": lambda v: f"₹{v:,.2f}", "width": 100},
+                {"title": "Join Date", "value": 5, "width": 90},
+                {"title": "Last Paid", "value": 6, "format": lambda v: v or "Never", "width": 90},
+                {
+                    "title": "Status",
+                    "value": lambda staff: "Active" if staff[7] else "Inactive",
+                    "width": 80,
+                    "color": lambda staff: None if staff[7] else "gray"
+                },
+                {
+                    "title": "Shift",
+                    "value": lambda staff: staff[8] or "",
+                    "text": lambda staff: f"In since {staff[8][11:16]}" if staff[8] else "-",
+                    "width": 100,
+                    "color": lambda staff: "#10B981" if staff[8] else "gray"
+                }
+            ],
+            actions=[
+                {
+                    "text": lambda staff: "Clock Out" if staff[8] else "Clock In",
+                    "command": lambda staff: self.toggle_shift(staff[0], staff[8]),
+                    "width": 90,
+                    "fg_color": lambda staff: "#EF4444" if staff[8] else "#10B981",
+                    "visible": lambda staff: staff[7] or staff[8]
+                },
+                {
+                    "text": "Pay Salary",
+                    "command": lambda staff: self.record_payment(staff[0]),
+                    "width": 100,
+                    "visible": lambda staff: staff[7]
+                },
+                {
+                    "text": lambda staff: "Deactivate" if staff[7] else "Activate",
+                    "command": lambda staff: self.toggle_status(staff[0], staff[7]),
+                    "width": 100,
+                    "fg_color": lambda staff: "#EF4444" if staff[7] else "#10B981"
+                }
+            ],
+            empty_text="No staff members yet"
+        )
+        self.staff_grid.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
     
     def load_staff_data(self):
         """Load staff data from database"""
         try:
             conn = self.db.connect()
+            migrations.ensure_schema(conn)
             cursor = conn.cursor()
             
             cursor.execute("""
-                SELECT id, name, title, contact, salary, 
-                       join_date, last_paid_date, is_active
-                FROM staff
-                ORDER BY name
+                SELECT s.id, s.name, s.title, s.contact, s.salary, 
+                       s.join_date, s.last_paid_date, s.is_active,
+                       sh.clock_in
+                FROM staff s
+                LEFT JOIN staff_shifts sh
+                    ON sh.staff_id = s.id AND sh.clock_out IS NULL
+                ORDER BY s.name
             """)
             
             self.staff_members = cursor.fetchall()
@@ -246,112 +623,59 @@ class StaffPage(ctk.CTkFrame):
     
     def update_staff_list(self):
         """Update staff list display"""
-        # Clear current list
-        for widget in self.staff_frame.winfo_children():
-            widget.destroy()
-        
-        # Add staff members to list
-        for row, staff in enumerate(self.staff_members):
-            staff_id, name, title, contact, salary, join_date, last_paid, is_active = staff
-            
-            # Create a frame for this row
-            row_frame = ctk.CTkFrame(self.staff_frame, fg_color="transparent")
-            row_frame.grid(row=row, column=0, columnspan=8, sticky="ew", pady=2)
-            
-            # Configure row columns
-            for i in range(8):
-                row_frame.grid_columnconfigure(i, weight=1)
-            
-            # Add staff data
-            cols = [name, title, contact, f"₹{salary:,.2f}", join_date, 
-                   last_paid or "Never", "Active" if is_active else "Inactive"]
-            
-            for col, text in enumerate(cols):
-                ctk.CTkLabel(
-                    row_frame,
-                    text=str(text)
-                ).grid(row=0, column=col, padx=10, pady=5, sticky="ew")
-            
-            # Actions buttons
-            actions_frame = ctk.CTkFrame(row_frame, fg_color="transparent")
-            actions_frame.grid(row=0, column=7, padx=10, pady=5, sticky="ew")
-            
-            if is_active:
-                # Pay Salary button
-                ctk.CTkButton(
-                    actions_frame,
-                    text="Pay Salary",
-                    width=100,
-                    command=lambda s=staff_id: self.record_payment(s)
-                ).pack(side="left", padx=5)
-            
-            # Toggle Status button
-            ctk.CTkButton(
-                actions_frame,
-                text="Deactivate" if is_active else "Activate",
-                width=100,
-                fg_color="#EF4444" if is_active else "#10B981",
-                command=lambda s=staff_id, a=is_active: self.toggle_status(s, a)
-            ).pack(side="left", padx=5)
+        self.staff_grid.set_rows(self.staff_members)
     
     def show_add_staff_dialog(self):
         """Show dialog to add new staff member"""
         dialog = AddStaffDialog(self)
         dialog.grab_set()
     
+    def show_payroll_dialog(self):
+        """Show dialog to pay all staff for a month"""
+        dialog = PayrollDialog(self)
+        dialog.grab_set()
+    
+    def show_history_dialog(self):
+        """Show salary payments per staff member and month"""
+        dialog = PaymentHistoryDialog(self, self.staff_members)
+        dialog.grab_set()
+    
+    def show_labor_dialog(self):
+        """Show sales per labor hour by hour of day"""
+        dialog = LaborAnalyticsDialog(self)
+        dialog.grab_set()
+    
+    def toggle_shift(self, staff_id, clock_in):
+        """Clock a staff member in, or out of their open shift"""
+        attendance = AttendanceManager(self.db)
+        try:
+            if clock_in:
+                hours = attendance.clock_out(staff_id)
+                messagebox.showinfo("Clocked Out", f"Shift ended after {hours:.2f} hours")
+            else:
+                attendance.clock_in(staff_id)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to update shift: {str(e)}")
+            return
+        
+        self.load_staff_data()  # Refresh list
+    
     def record_payment(self, staff_id):
-        """Record salary payment for staff member"""
+        """Pay one staff member what is still due for the current month"""
+        period = datetime.now().strftime('%Y-%m')
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
-            # Get staff details
-            cursor.execute("""
-                SELECT name, salary FROM staff WHERE id = ?
-            """, (staff_id,))
-            
-            staff = cursor.fetchone()
-            if not staff:
-                raise Exception("Staff member not found")
-                
-            name, salary = staff
-            
-            # Start transaction
-            cursor.execute("BEGIN")
-            
-            # Record payment
-            cursor.execute("""
-                INSERT INTO staff_payments (
-                    staff_id, amount, payment_date
-                ) VALUES (?, ?, DATE('now', 'localtime'))
-            """, (staff_id, salary))
-            
-            # Update last paid date
-            cursor.execute("""
-                UPDATE staff
-                SET last_paid_date = DATE('now', 'localtime')
-                WHERE id = ?
-            """, (staff_id,))
-            
-            # Add to expenses
-            cursor.execute("""
-                INSERT INTO expenses (
-                    name, title, category, quantity,
-                    price_per_unit, total_price, expense_date
-                ) VALUES (?, ?, ?, ?, ?, ?, DATE('now', 'localtime'))
-            """, (name, "Salary Payment", "Management", 1, salary, salary))
-            
-            conn.commit()
-            messagebox.showinfo("Success", f"Salary paid to {name}")
-            
-            self.load_staff_data()  # Refresh list
-            
+            result = PayrollManager(self.db).run(period, staff_ids=[staff_id])
         except Exception as e:
-            conn.rollback()
             messagebox.showerror("Error", f"Failed to record payment: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+            return
+        
+        if not result["payments"]:
+            messagebox.showinfo("Salary", f"Salary for {period} is already paid")
+            return
+        
+        payment = result["payments"][0]
+        messagebox.showinfo("Success", f"Salary of ₹{payment['due']:,.2f} paid to {payment['name']}")
+        self.load_staff_data()  # Refresh list
     
     def toggle_status(self, staff_id, current_status):
         """Toggle staff member's active status"""
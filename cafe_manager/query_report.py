@@ -0,0 +1,86 @@
+"""
+Command line query timing report for the Cafe Management System.
+Reads the summary windows the app writes to QUERY_CONFIG["summary_file"] in
+the log directory and prints the statements that took the most time in one
+window, with the slow queries and their plans.
+
+Example:
+    python query_report.py --at "2025-03-01 21:00" --top 10
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from utils.app_logging import log_path
+from utils.constants import QUERY_CONFIG
+
+
+def load_windows(path):
+    """Read every summary window from the file, oldest first."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def pick_window(windows, at):
+    """Return the window containing at, or the latest window."""
+    if at is None:
+        return windows[-1]
+    stamp = at.strftime('%Y-%m-%d %H:%M:%S')
+    for window in windows:
+        if window["start"] <= stamp <= window["end"]:
+            return window
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show where database time went")
+    parser.add_argument("--file", default=log_path(QUERY_CONFIG["summary_file"]), help="Summary file to read")
+    parser.add_argument("--at", type=datetime.fromisoformat, help="Time inside the window to show (default: latest)")
+    parser.add_argument("--top", type=int, default=15, help="Statements to list")
+    parser.add_argument("--site", action="store_true", help="Total by call site instead of statement")
+    args = parser.parse_args()
+
+    try:
+        windows = load_windows(args.file)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read {args.file}: {e}")
+        sys.exit(1)
+
+    window = pick_window(windows, args.at) if windows else None
+    if window is None:
+        print("No summary window found")
+        sys.exit(1)
+
+    statements = window["statements"]
+    total_ms = sum(s["total_ms"] for s in statements)
+    print(f"{window['start']} - {window['end']}: {sum(s['calls'] for s in statements)} statements, {total_ms:.0f} ms")
+
+    if args.site:
+        sites = {}
+        for s in statements:
+            site = sites.setdefault(s["site"], [0, 0.0])
+            site[0] += s["calls"]
+            site[1] += s["total_ms"]
+        for site, (calls, ms) in sorted(sites.items(), key=lambda e: e[1][1], reverse=True)[:args.top]:
+            print(f"{ms:>10.1f} ms {calls:>7} calls  {site}")
+    else:
+        for s in statements[:args.top]:
+            print(
+                f"{s['total_ms']:>10.1f} ms {s['calls']:>7} calls {s['avg_ms']:>8.2f} avg "
+                f"{s['max_ms']:>8.1f} max {s['rows']:>8} rows  {s['site']}"
+            )
+            print(f"{'':>14}{s['sql'][:120]}")
+
+    if window["slow"]:
+        print(f"\nSlow queries ({len(window['slow'])}):")
+        for q in window["slow"]:
+            print(f"- {q['at']} {q['ms']:.0f} ms, {q['rows']} rows at {q['site']}")
+            print(f"  {q['sql'][:200]}")
+            for line in q["plan"] or []:
+                print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Order sync server for the Cafe Management System.
+Owns the database and serves table bills to every POS terminal on the LAN.
+Terminals point at it by setting CAFE_SYNC_URL and CAFE_SYNC_TOKEN before
+starting the app. It listens on 127.0.0.1 unless given a host, and only
+serves other machines with a token set.
+
+Example:
+    python sync_server.py --host 0.0.0.0 --port 8765 --token s3cret
+"""
+
+import argparse
+import asyncio
+import sys
+
+from utils.app_logging import setup_logging
+from utils.constants import SYNC_CONFIG
+from utils.sync import SyncServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve table bills to POS terminals")
+    parser.add_argument("--host", default=SYNC_CONFIG["host"], help="Address to listen on, e.g. 0.0.0.0 for the LAN")
+    parser.add_argument("--port", type=int, default=SYNC_CONFIG["port"])
+    parser.add_argument("--token", default=SYNC_CONFIG["token"], help="Shared secret terminals must send")
+    args = parser.parse_args()
+
+    setup_logging(console=True)
+    server = SyncServer(host=args.host, port=args.port, token=args.token)
+    print(f"Serving bills on {args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Sync server stopped")
+    except (OSError, ValueError) as e:
+        print(f"Cannot start sync server: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
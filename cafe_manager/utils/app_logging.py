@@ -0,0 +1,147 @@
+"""
+Application logging for the Cafe Management System.
+A log call only puts the record on a queue; a background listener formats and
+writes it, so logging costs the UI thread microseconds. The text log rotates
+by size; structured events (sales paid, stock adjusted, query timings) are
+also written as JSON lines to a file that rotates at midnight. Levels can be
+set per module in LOG_CONFIG.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+from utils.constants import LOG_CONFIG
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EVENT_LOGGER = "cafe_manager.events"
+
+_listener = None
+
+
+def log_path(name):
+    """Path of a file in the log directory, next to the database file."""
+    return os.path.join(APP_ROOT, LOG_CONFIG["directory"], name)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Log a structured event.
+
+    Example:
+        log_event("sale_paid", sale_id=12, table_number=4, total=450.0)
+    """
+    message = " ".join([event] + [f"{key}={value}" for key, value in fields.items()])
+    logging.getLogger(EVENT_LOGGER).log(
+        level, message, extra={"event": event, "data": fields}, stacklevel=2
+    )
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object, with an event's fields at the top level."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, '%Y-%m-%d %H:%M:%S') + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "module": record.module
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+            entry.update(record.data)
+        else:
+            entry["message"] = record.getMessage()
+        return json.dumps(entry, default=str)
+
+
+class ModuleLevelFilter(logging.Filter):
+    """Drops records below the level configured for their logger or module.
+
+    Named loggers (libraries, events) match their name and its parents; the
+    app's modules log through the root logger, so those match by module file
+    name (record.module).
+    """
+
+    def __init__(self, default, levels):
+        super().__init__()
+        self.default = default
+        self.levels = levels
+        self._cache = {}
+
+    def _level(self, name, module):
+        key = (name, module)
+        if key not in self._cache:
+            level = self.levels.get(module) if name == "root" else None
+            while level is None and name:
+                level = self.levels.get(name)
+                name = name.rpartition(".")[0]
+            self._cache[key] = self.default if level is None else level
+        return self._cache[key]
+
+    def filter(self, record):
+        return record.levelno >= self._level(record.name, record.module)
+
+
+def setup_logging(console=False):
+    """Route all logging through a queue to the rotating log files.
+
+    Safe to call more than once; only the first call sets up handlers.
+
+    Args:
+        console: Also print records to the terminal, for command line tools
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    os.makedirs(log_path(""), exist_ok=True)
+
+    text = logging.handlers.RotatingFileHandler(
+        log_path(LOG_CONFIG["file"]),
+        maxBytes=LOG_CONFIG["max_bytes"],
+        backupCount=LOG_CONFIG["backup_count"],
+        encoding="utf-8"
+    )
+    text.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(module)s - %(message)s'))
+
+    events = logging.handlers.TimedRotatingFileHandler(
+        log_path(LOG_CONFIG["events_file"]),
+        when=LOG_CONFIG["events_rotate"],
+        backupCount=LOG_CONFIG["events_keep"],
+        encoding="utf-8"
+    )
+    events.setFormatter(JsonFormatter())
+    events.addFilter(lambda record: hasattr(record, "event"))
+
+    handlers = [text, events]
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        handlers.append(stream)
+
+    default = logging.getLevelName(LOG_CONFIG["level"])
+    levels = {name: logging.getLevelName(level) for name, level in LOG_CONFIG["module_levels"].items()}
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(ModuleLevelFilter(default, levels))
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(min([default, *levels.values()]))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,417 @@
+"""
+Cold-data archival for the Cafe Management System.
+Moves closed months of sales, sale items, expenses and stock history into
+per-year archive databases, so the live file stays small for billing, and
+opens report connections that see hot and archived rows as the same tables.
+"""
+
+import logging
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+import migrations
+from database import DatabaseManager
+from utils.constants import ARCHIVE_CONFIG
+
+ARCHIVE_PREFIX = "cafe_manager-"
+
+# SQLite attaches at most 10 databases by default
+MAX_ARCHIVE_YEARS = 10
+
+# Archived tables in copy order: (table, month column, extra condition).
+# Rows of one month are selected between :start and :end; sale items follow
+# their sale. Expenses that menu costs point at stay hot so the link is kept,
+# and stock history is only moved once valuation and reorder have read it.
+ARCHIVED_TABLES = [
+    ("sales", "created_at", ""),
+    ("sale_items", None,
+     "sale_id IN (SELECT id FROM main.sales WHERE created_at >= :start AND created_at < :end)"),
+    ("expenses", "expense_date",
+     "id NOT IN (SELECT expense_id FROM main.menu_item_costs WHERE expense_id IS NOT NULL)"),
+    ("stock_history", "created_at", "id <= :history_id"),
+]
+
+
+def _where(column, extra):
+    """Build the condition selecting one month of a table."""
+    conditions = []
+    if column:
+        conditions.append(f"{column} >= :start AND {column} < :end")
+    if extra:
+        conditions.append(extra)
+    return " AND ".join(conditions)
+
+
+def month_bounds(period):
+    """Return the first day of a 'YYYY-MM' month and of the month after it."""
+    year, month = int(period[:4]), int(period[5:7])
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return f"{period}-01", following.isoformat()
+
+
+class ArchiveManager:
+    """Archives closed months and routes report queries across archives."""
+
+    def __init__(self, db=None, directory=None):
+        """Initialize the archive manager.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+            directory: Where archive databases live, defaults to ARCHIVE_CONFIG
+        """
+        self.db = db or DatabaseManager()
+        self.directory = directory or os.path.join(
+            os.path.dirname(self.db.db_path), ARCHIVE_CONFIG["directory"]
+        )
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the table recording which months have been archived."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archived_periods (
+                period TEXT PRIMARY KEY,        -- 'YYYY-MM'
+                archive_year INTEGER NOT NULL,
+                sales INTEGER NOT NULL DEFAULT 0,
+                sale_items INTEGER NOT NULL DEFAULT 0,
+                expenses INTEGER NOT NULL DEFAULT 0,
+                stock_history INTEGER NOT NULL DEFAULT 0,
+                archived_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+            )
+        """)
+
+    def archive_path(self, year):
+        """Return the archive database file for a year."""
+        return os.path.join(self.directory, f"{ARCHIVE_PREFIX}{int(year)}.db")
+
+    @staticmethod
+    def _columns(cursor, schema, table):
+        """Return (name, declared type, is primary key) for a table's columns."""
+        cursor.execute(f"PRAGMA {schema}.table_info({table})")
+        return [(row[1], row[2], row[5]) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _processed_history_id(cursor):
+        """Return the last stock_history id both valuation and reorder have read."""
+        cursor.execute("""
+            SELECT MIN(
+                COALESCE((SELECT last_history_id FROM stock_valuation_progress), 0),
+                COALESCE((SELECT last_history_id FROM reorder_progress), 0)
+            )
+        """)
+        return cursor.fetchone()[0]
+
+    def _prepare_archive(self, cursor):
+        """Create or extend the attached archive's tables to match the live ones.
+
+        Archive tables keep the live columns and indexes but no foreign keys,
+        since the tables they point at stay in the live database. Columns
+        added to the live tables since the archive was created are added too.
+        """
+        for table, _, _ in ARCHIVED_TABLES:
+            columns = self._columns(cursor, "main", table)
+            existing = {name for name, _, _ in self._columns(cursor, "archive", table)}
+
+            if not existing:
+                definitions = ", ".join(
+                    f"{name} {kind}{' PRIMARY KEY' if pk else ''}"
+                    for name, kind, pk in columns
+                )
+                cursor.execute(f"CREATE TABLE archive.{table} ({definitions})")
+            else:
+                for name, kind, _ in columns:
+                    if name not in existing:
+                        cursor.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {kind}")
+
+            cursor.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (table,)
+            )
+            for (sql,) in cursor.fetchall():
+                cursor.execute(re.sub(
+                    r"CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?",
+                    r"CREATE \1INDEX IF NOT EXISTS archive.",
+                    sql,
+                    count=1,
+                    flags=re.IGNORECASE
+                ))
+
+    def closed_months(self, today=None):
+        """Return months old enough to archive that still have hot rows.
+
+        A month is due once it is more than ARCHIVE_CONFIG["hot_months"]
+        months before the current one.
+
+        Returns:
+            list: 'YYYY-MM' periods, oldest first
+        """
+        today = today or date.today()
+        months = today.year * 12 + today.month - 1 - ARCHIVE_CONFIG["hot_months"]
+        cutoff = date(months // 12, months % 12 + 1, 1).isoformat()
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            params = {"cutoff": cutoff, "history_id": self._processed_history_id(cursor)}
+            selects = [
+                f"SELECT DISTINCT SUBSTR({column}, 1, 7) FROM main.{table} "
+                f"WHERE {column} < :cutoff{' AND ' + extra if extra else ''}"
+                for table, column, extra in ARCHIVED_TABLES if column
+            ]
+            cursor.execute(" UNION ".join(selects) + " ORDER BY 1", params)
+            return [row[0] for row in cursor.fetchall()]
+
+        finally:
+            if conn:
+                conn.close()
+
+    def close_open_days(self, period):
+        """Close every day of a month that has activity but no snapshot.
+
+        Archived months are read through daily_close snapshots, so each day
+        must be closed before its rows leave the live database.
+
+        Returns:
+            list: Days closed
+        """
+        # Imported here since day close audits read archived days through this module
+        from utils.day_close import DayCloseManager
+
+        start, end = month_bounds(period)
+        conn = None
+        try:
+            conn = self.db.connect()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT day FROM (
+                    SELECT DISTINCT DATE(created_at) as day FROM main.sales
+                    WHERE created_at >= :start AND created_at < :end
+                    UNION
+                    SELECT DISTINCT expense_date FROM main.expenses
+                    WHERE expense_date >= :start AND expense_date < :end
+                )
+                WHERE day NOT IN (SELECT close_date FROM daily_close)
+                ORDER BY day
+            """, {"start": start, "end": end})
+            days = [row[0] for row in cursor.fetchall()]
+        finally:
+            if conn:
+                conn.close()
+
+        day_close = DayCloseManager(self.db)
+        for day in days:
+            day_close.close_day(day, closed_by="archive")
+        return days
+
+    def archive_month(self, period):
+        """Move one closed month into its year's archive database.
+
+        Rows are copied and deleted in one transaction spanning both files,
+        and the copy is counted before anything is deleted. Hourly sales
+        totals are kept in the live database.
+
+        Returns:
+            dict: Rows moved per table
+        """
+        start, end = month_bounds(period)
+        year = int(period[:4])
+        os.makedirs(self.directory, exist_ok=True)
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("ATTACH DATABASE ? AS archive", (self.archive_path(year),))
+            self._prepare_archive(cursor)
+
+            cursor.execute("BEGIN IMMEDIATE")
+            params = {
+                "start": start,
+                "end": end,
+                "history_id": self._processed_history_id(cursor)
+            }
+
+            # Deleting sales would take them out of the hourly rollup
+            cursor.execute("""
+                SELECT hour, sale_count, revenue FROM sales_hourly
+                WHERE hour >= :start AND hour < :end
+            """, params)
+            hourly = cursor.fetchall()
+
+            moved = {}
+            for table, column, extra in ARCHIVED_TABLES:
+                where = _where(column, extra)
+                names = ", ".join(name for name, _, _ in self._columns(cursor, "main", table))
+
+                cursor.execute(f"SELECT COUNT(*) FROM main.{table} WHERE {where}", params)
+                moved[table] = cursor.fetchone()[0]
+
+                # OR IGNORE makes a rerun after an interrupted or restored archive safe
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO archive.{table} ({names})
+                    SELECT {names} FROM main.{table} WHERE {where}
+                """, params)
+                cursor.execute(f"""
+                    SELECT COUNT(*) FROM archive.{table}
+                    WHERE id IN (SELECT id FROM main.{table} WHERE {where})
+                """, params)
+                if cursor.fetchone()[0] != moved[table]:
+                    raise RuntimeError(f"Archive copy of {table} for {period} is incomplete")
+
+            for table, column, extra in reversed(ARCHIVED_TABLES):
+                cursor.execute(f"DELETE FROM main.{table} WHERE {_where(column, extra)}", params)
+
+            cursor.executemany("""
+                INSERT INTO sales_hourly (hour, sale_count, revenue)
+                VALUES (?, ?, ?)
+                ON CONFLICT(hour) DO UPDATE SET
+                    sale_count = excluded.sale_count,
+                    revenue = excluded.revenue
+            """, hourly)
+
+            cursor.execute("""
+                INSERT INTO archived_periods (
+                    period, archive_year, sales, sale_items, expenses, stock_history
+                ) VALUES (:period, :year, :sales, :sale_items, :expenses, :stock_history)
+                ON CONFLICT(period) DO UPDATE SET
+                    sales = sales + excluded.sales,
+                    sale_items = sale_items + excluded.sale_items,
+                    expenses = expenses + excluded.expenses,
+                    stock_history = stock_history + excluded.stock_history,
+                    archived_at = DATETIME('now', 'localtime')
+            """, dict(moved, period=period, year=year))
+
+            conn.commit()
+            logging.info(f"Archived {period} to {self.archive_path(year)}: {moved}")
+            return moved
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error archiving {period}: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def run(self, today=None, progress=None):
+        """Close and archive every month that is due.
+
+        Args:
+            today: Date the hot window is counted back from, defaults to today
+            progress: Optional callable(period, moved) after each month
+
+        Returns:
+            dict: Rows moved per table, by period
+        """
+        results = {}
+        for period in self.closed_months(today):
+            self.close_open_days(period)
+            results[period] = self.archive_month(period)
+            if progress:
+                progress(period, results[period])
+        return results
+
+    def vacuum(self):
+        """Rebuild the live database file to give back the archived space.
+
+        VACUUM locks the database for its whole run, so this is left to
+        quiet hours rather than done after every archive.
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            conn.execute("VACUUM")
+        finally:
+            if conn:
+                conn.close()
+
+    def get_archived_periods(self):
+        """Return archived months, newest first.
+
+        Returns:
+            list: (period, archive_year, sales, sale_items, expenses,
+            stock_history, archived_at) tuples
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT period, archive_year, sales, sale_items, expenses,
+                       stock_history, archived_at
+                FROM archived_periods
+                ORDER BY period DESC
+            """)
+            return cursor.fetchall()
+        finally:
+            if conn:
+                conn.close()
+
+    def connect(self, start_date=None, end_date=None):
+        """Open a read connection whose sales, sale_items, expenses and
+        stock_history include archived rows for a date range.
+
+        Archives of the years that overlap the range are attached read-only
+        and TEMP views named after the archived tables union them with the
+        live tables, so report queries run unchanged. When nothing in the
+        range is archived this is a plain connection. Do not write to the
+        archived tables through it.
+
+        Args:
+            start_date: First day reported on ('YYYY-MM-DD' or date), None for all history
+            end_date: Last day reported on, None for all history
+
+        Raises:
+            ValueError: If the range spans more archive years than can be attached
+        """
+        conn = self.db.connect()
+        try:
+            # Before the views exist, so migrations only ever see the live tables
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT DISTINCT archive_year FROM archived_periods
+                WHERE period BETWEEN ? AND ?
+                ORDER BY archive_year
+            """, (str(start_date or '0000-01')[:7], str(end_date or '9999-12')[:7]))
+            years = [row[0] for row in cursor.fetchall()]
+            if len(years) > MAX_ARCHIVE_YEARS - 1:
+                raise ValueError(
+                    f"The range spans {len(years)} archive years; "
+                    f"report on at most {MAX_ARCHIVE_YEARS - 1} at a time"
+                )
+
+            schemas = []
+            for year in years:
+                path = self.archive_path(year)
+                if not os.path.exists(path):
+                    logging.warning(f"Archive for {year} is missing: {path}")
+                    continue
+                schema = f"archive_{year}"
+                cursor.execute("ATTACH DATABASE ? AS " + schema, (Path(path).as_uri() + "?mode=ro",))
+                schemas.append(schema)
+
+            if schemas:
+                for table, _, _ in ARCHIVED_TABLES:
+                    columns = [name for name, _, _ in self._columns(cursor, "main", table)]
+                    selects = [f"SELECT {', '.join(columns)} FROM main.{table}"]
+                    for schema in schemas:
+                        present = {name for name, _, _ in self._columns(cursor, schema, table)}
+                        selects.append("SELECT " + ", ".join(
+                            name if name in present else f"NULL AS {name}" for name in columns
+                        ) + f" FROM {schema}.{table}")
+                    cursor.execute(f"CREATE TEMP VIEW {table} AS " + " UNION ALL ".join(selects))
+
+            return conn
+
+        except Exception:
+            conn.close()
+            raise
@@ -0,0 +1,362 @@
+"""
+Shift attendance and labor analytics for the Cafe Management System.
+Records clock-in/clock-out, spreads every finished shift over hourly labor
+buckets, keeps hourly sales buckets up to date with triggers, and compares
+the two to give sales per labor hour for any period.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+import migrations
+from database import DatabaseManager
+from utils.constants import LABOR_CONFIG
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+HOUR_FORMAT = '%Y-%m-%d %H:00:00'
+
+
+def split_into_hours(start, end):
+    """Split a time span into (hour bucket, hours) pieces.
+
+    Args:
+        start: Span start (datetime)
+        end: Span end (datetime)
+
+    Returns:
+        list: ('YYYY-MM-DD HH:00:00', fraction of an hour) pairs
+    """
+    pieces = []
+    current = start
+    while current < end:
+        hour = current.replace(minute=0, second=0, microsecond=0)
+        next_hour = hour + timedelta(hours=1)
+        piece_end = min(next_hour, end)
+        pieces.append((hour.strftime(HOUR_FORMAT), (piece_end - current).total_seconds() / 3600))
+        current = piece_end
+    return pieces
+
+
+class AttendanceManager:
+    """Records staff shifts and reports labor against sales by hour."""
+
+    def __init__(self, db=None):
+        """Initialize the manager.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create shifts, hourly labor and hourly sales buckets."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS staff_shifts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                staff_id INTEGER NOT NULL,
+                clock_in TIMESTAMP NOT NULL,
+                clock_out TIMESTAMP,
+                hourly_rate REAL NOT NULL,     -- Salary per hour when the shift started
+                FOREIGN KEY (staff_id) REFERENCES staff (id),
+                CHECK (clock_out IS NULL OR clock_out > clock_in)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_staff_shifts_staff
+            ON staff_shifts(staff_id, clock_in)
+        """)
+        # At most one open shift per staff member
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_staff_shifts_open
+            ON staff_shifts(staff_id) WHERE clock_out IS NULL
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS labor_hourly (
+                hour TIMESTAMP PRIMARY KEY,    -- 'YYYY-MM-DD HH:00:00'
+                staff_hours REAL NOT NULL,
+                labor_cost REAL NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sales_hourly (
+                hour TIMESTAMP PRIMARY KEY,
+                sale_count INTEGER NOT NULL,
+                revenue REAL NOT NULL
+            )
+        """)
+
+        # Sales buckets follow every insert, edit and delete of a sale
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS sales_hourly_added
+            AFTER INSERT ON sales
+            BEGIN
+                INSERT INTO sales_hourly (hour, sale_count, revenue)
+                VALUES (STRFTIME('%Y-%m-%d %H:00:00', NEW.created_at), 1, NEW.total_amount)
+                ON CONFLICT(hour) DO UPDATE SET
+                    sale_count = sale_count + 1,
+                    revenue = revenue + excluded.revenue;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS sales_hourly_changed
+            AFTER UPDATE OF total_amount, created_at ON sales
+            BEGIN
+                UPDATE sales_hourly
+                SET sale_count = sale_count - 1,
+                    revenue = revenue - OLD.total_amount
+                WHERE hour = STRFTIME('%Y-%m-%d %H:00:00', OLD.created_at);
+                INSERT INTO sales_hourly (hour, sale_count, revenue)
+                VALUES (STRFTIME('%Y-%m-%d %H:00:00', NEW.created_at), 1, NEW.total_amount)
+                ON CONFLICT(hour) DO UPDATE SET
+                    sale_count = sale_count + 1,
+                    revenue = revenue + excluded.revenue;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS sales_hourly_removed
+            AFTER DELETE ON sales
+            BEGIN
+                UPDATE sales_hourly
+                SET sale_count = sale_count - 1,
+                    revenue = revenue - OLD.total_amount
+                WHERE hour = STRFTIME('%Y-%m-%d %H:00:00', OLD.created_at);
+            END
+        """)
+
+        # Sales made before the buckets existed
+        cursor.execute("""
+            INSERT INTO sales_hourly (hour, sale_count, revenue)
+            SELECT STRFTIME('%Y-%m-%d %H:00:00', created_at), COUNT(*), SUM(total_amount)
+            FROM sales
+            WHERE NOT EXISTS (SELECT 1 FROM sales_hourly)
+            GROUP BY 1
+        """)
+
+    @staticmethod
+    def _book_hours(cursor, start, end, hourly_rate):
+        """Add a finished shift to the hourly labor buckets."""
+        cursor.executemany("""
+            INSERT INTO labor_hourly (hour, staff_hours, labor_cost)
+            VALUES (?, ?, ?)
+            ON CONFLICT(hour) DO UPDATE SET
+                staff_hours = staff_hours + excluded.staff_hours,
+                labor_cost = labor_cost + excluded.labor_cost
+        """, [
+            (hour, hours, hours * hourly_rate)
+            for hour, hours in split_into_hours(start, end)
+        ])
+
+    @staticmethod
+    def _hourly_rate(cursor, staff_id):
+        cursor.execute("SELECT salary FROM staff WHERE id = ?", (staff_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError("Staff member not found")
+        return row[0] / LABOR_CONFIG["hours_per_month"]
+
+    def _write(self, action):
+        """Run action(cursor) in a write transaction."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN IMMEDIATE")
+            result = action(cursor)
+            conn.commit()
+            return result
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def clock_in(self, staff_id, at=None):
+        """Open a shift for a staff member.
+
+        Raises:
+            ValueError: If the staff member is already clocked in
+        """
+        at = at or datetime.now()
+
+        def action(cursor):
+            cursor.execute(
+                "SELECT 1 FROM staff_shifts WHERE staff_id = ? AND clock_out IS NULL",
+                (staff_id,)
+            )
+            if cursor.fetchone():
+                raise ValueError("Already clocked in")
+            cursor.execute("""
+                INSERT INTO staff_shifts (staff_id, clock_in, hourly_rate)
+                VALUES (?, ?, ?)
+            """, (staff_id, at.strftime(TIMESTAMP_FORMAT), self._hourly_rate(cursor, staff_id)))
+            return cursor.lastrowid
+
+        shift_id = self._write(action)
+        logging.info(f"Staff {staff_id} clocked in (shift {shift_id})")
+        return shift_id
+
+    def clock_out(self, staff_id, at=None):
+        """Close a staff member's open shift and book its hours.
+
+        Returns:
+            float: Hours worked on the shift
+
+        Raises:
+            ValueError: If the staff member is not clocked in
+        """
+        at = at or datetime.now()
+
+        def action(cursor):
+            cursor.execute("""
+                SELECT id, clock_in, hourly_rate FROM staff_shifts
+                WHERE staff_id = ? AND clock_out IS NULL
+            """, (staff_id,))
+            shift = cursor.fetchone()
+            if not shift:
+                raise ValueError("Not clocked in")
+
+            shift_id, clock_in, hourly_rate = shift
+            start = datetime.strptime(clock_in, TIMESTAMP_FORMAT)
+            if at <= start:
+                raise ValueError("Clock-out must be after clock-in")
+
+            cursor.execute(
+                "UPDATE staff_shifts SET clock_out = ? WHERE id = ?",
+                (at.strftime(TIMESTAMP_FORMAT), shift_id)
+            )
+            self._book_hours(cursor, start, at, hourly_rate)
+            return (at - start).total_seconds() / 3600
+
+        hours = self._write(action)
+        logging.info(f"Staff {staff_id} clocked out after {hours:.2f} hours")
+        return hours
+
+    def add_shift(self, staff_id, clock_in, clock_out):
+        """Record a finished shift after the fact (e.g. a missed clock-in)."""
+        if clock_out <= clock_in:
+            raise ValueError("Clock-out must be after clock-in")
+
+        def action(cursor):
+            rate = self._hourly_rate(cursor, staff_id)
+            cursor.execute("""
+                INSERT INTO staff_shifts (staff_id, clock_in, clock_out, hourly_rate)
+                VALUES (?, ?, ?, ?)
+            """, (staff_id, clock_in.strftime(TIMESTAMP_FORMAT),
+                  clock_out.strftime(TIMESTAMP_FORMAT), rate))
+            self._book_hours(cursor, clock_in, clock_out, rate)
+            return cursor.lastrowid
+
+        return self._write(action)
+
+    def get_open_shifts(self):
+        """Return {staff_id: clock_in} for everyone currently clocked in."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT staff_id, clock_in FROM staff_shifts WHERE clock_out IS NULL")
+            return dict(cursor.fetchall())
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_hourly(self, start_date, end_date, now=None):
+        """Return sales against labor for every hour with either in a period.
+
+        Finished shifts come from labor_hourly; shifts still open count up to now.
+
+        Args:
+            start_date: First day ('YYYY-MM-DD')
+            end_date: Last day ('YYYY-MM-DD')
+
+        Returns:
+            dict: {'YYYY-MM-DD HH:00:00': [sale_count, revenue, staff_hours, labor_cost]}
+        """
+        now = now or datetime.now()
+        start = f"{start_date} 00:00:00"
+        end = f"{end_date} 23:59:59"
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            hours = {}
+            cursor.execute("""
+                SELECT hour, sale_count, revenue FROM sales_hourly
+                WHERE hour BETWEEN ? AND ? AND sale_count > 0
+            """, (start, end))
+            for hour, sale_count, revenue in cursor.fetchall():
+                hours[hour] = [sale_count, revenue, 0.0, 0.0]
+
+            cursor.execute("""
+                SELECT hour, staff_hours, labor_cost FROM labor_hourly
+                WHERE hour BETWEEN ? AND ?
+            """, (start, end))
+            for hour, staff_hours, labor_cost in cursor.fetchall():
+                bucket = hours.setdefault(hour, [0, 0.0, 0.0, 0.0])
+                bucket[2] += staff_hours
+                bucket[3] += labor_cost
+
+            cursor.execute("""
+                SELECT clock_in, hourly_rate FROM staff_shifts
+                WHERE clock_out IS NULL AND clock_in <= ?
+            """, (end,))
+            for clock_in, rate in cursor.fetchall():
+                for hour, worked in split_into_hours(datetime.strptime(clock_in, TIMESTAMP_FORMAT), now):
+                    if start <= hour <= end:
+                        bucket = hours.setdefault(hour, [0, 0.0, 0.0, 0.0])
+                        bucket[2] += worked
+                        bucket[3] += worked * rate
+
+            return hours
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_hour_of_day_profile(self, start_date, end_date):
+        """Summarize a period by hour of day to show where labor is short or idle.
+
+        Returns:
+            list: dicts per hour of day (0-23) with days, revenue, staff_hours,
+            labor_cost, sales_per_labor_hour and labor_percent; averages are
+            per day the hour had sales or staff
+        """
+        profile = {}
+        for hour, (sale_count, revenue, staff_hours, labor_cost) in self.get_hourly(start_date, end_date).items():
+            row = profile.setdefault(int(hour[11:13]), [0, 0, 0.0, 0.0, 0.0])
+            row[0] += 1
+            row[1] += sale_count
+            row[2] += revenue
+            row[3] += staff_hours
+            row[4] += labor_cost
+
+        result = []
+        for hour in sorted(profile):
+            days, sale_count, revenue, staff_hours, labor_cost = profile[hour]
+            result.append({
+                "hour": hour,
+                "days": days,
+                "sale_count": sale_count,
+                "revenue": revenue,
+                "avg_revenue": revenue / days,
+                "staff_hours": staff_hours,
+                "avg_staff": staff_hours / days,
+                "labor_cost": labor_cost,
+                "sales_per_labor_hour": revenue / staff_hours if staff_hours else None,
+                "labor_percent": labor_cost / revenue * 100 if revenue else None
+            })
+        return result
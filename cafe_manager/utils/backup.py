@@ -0,0 +1,323 @@
+"""
+Online backups for the Cafe Management System.
+Copies the live database with SQLite's backup API a few pages at a time, so
+billing keeps writing while a backup runs, then verifies, compresses and
+rotates the copies. Backups run on a background thread and can be verified
+and restored from the command line.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import migrations
+from database import DatabaseManager
+from utils.constants import BACKUP_CONFIG, DB_CONFIG
+
+BACKUP_PREFIX = "cafe_manager-"
+BACKUP_SUFFIX = ".db.gz"
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S'
+
+
+def file_checksum(path):
+    """Return the SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_integrity(path):
+    """Run SQLite's integrity check on a database file.
+
+    Returns:
+        str: 'ok', or the first problem found
+    """
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class BackupManager:
+    """Creates, verifies, rotates and restores database backups."""
+
+    def __init__(self, db=None, directory=None):
+        """Initialize the backup manager.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+            directory: Where backups are kept, defaults to BACKUP_CONFIG
+        """
+        self.db = db or DatabaseManager()
+        self.directory = directory or os.path.join(
+            os.path.dirname(self.db.db_path), BACKUP_CONFIG["directory"]
+        )
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()   # One backup or restore at a time
+
+    def _copy(self, target, progress=None):
+        """Copy the live database into target with the online backup API.
+
+        Each step copies BACKUP_CONFIG["pages_per_step"] pages under a short
+        read lock and then pauses, so billing writes get in between steps.
+        A write from another connection makes SQLite restart the copy; after
+        BACKUP_CONFIG["max_restarts"] restarts the pauses are dropped so a
+        busy till cannot keep the backup from ever finishing.
+        """
+        restarts = 0
+        last_remaining = None
+
+        def step(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+            last_remaining = remaining
+            if progress:
+                progress(status, remaining, total)
+            if remaining and restarts < BACKUP_CONFIG["max_restarts"]:
+                time.sleep(BACKUP_CONFIG["step_pause"])
+
+        source = sqlite3.connect(self.db.db_path, timeout=DB_CONFIG["timeout"])
+        destination = sqlite3.connect(target)
+        try:
+            source.backup(destination, pages=BACKUP_CONFIG["pages_per_step"], progress=step)
+        finally:
+            destination.close()
+            source.close()
+
+        if restarts:
+            logging.info(f"Backup copy restarted {restarts} times by concurrent writes")
+
+    def create(self, label="auto", progress=None):
+        """Back up the database to a verified, compressed file.
+
+        Args:
+            label: Kind of backup ('auto', 'manual', 'pre-restore', ...); only
+                'auto' backups are rotated
+            progress: Optional callable(status, remaining, total) per step
+
+        Returns:
+            str: Path of the new backup
+
+        Raises:
+            RuntimeError: If the copy fails its integrity check
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        path = os.path.join(self.directory, f"{BACKUP_PREFIX}{stamp}-{label}{BACKUP_SUFFIX}")
+
+        with self._lock:
+            started = time.perf_counter()
+            fd, snapshot = tempfile.mkstemp(suffix=".db", dir=self.directory)
+            os.close(fd)
+            try:
+                self._copy(snapshot, progress)
+
+                result = check_integrity(snapshot)
+                if result != "ok":
+                    raise RuntimeError(f"Backup failed integrity check: {result}")
+
+                partial = path + ".partial"
+                with open(snapshot, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                with open(path + ".sha256", "w") as f:
+                    f.write(file_checksum(partial))
+                os.replace(partial, path)
+
+            finally:
+                for leftover in (snapshot, path + ".partial"):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+
+            logging.info(
+                f"Backup written to {path} ({os.path.getsize(path)} bytes, "
+                f"{time.perf_counter() - started:.1f}s)"
+            )
+
+        if label == "auto":
+            self.rotate()
+        return path
+
+    def list_backups(self):
+        """Return backups, newest first.
+
+        Returns:
+            list: dicts with path, created (datetime), label and size
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        backups = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)):
+                continue
+            stem = name[len(BACKUP_PREFIX):-len(BACKUP_SUFFIX)]
+            try:
+                created = datetime.strptime(stem[:15], TIMESTAMP_FORMAT)
+            except ValueError:
+                continue
+            path = os.path.join(self.directory, name)
+            backups.append({
+                "path": path,
+                "created": created,
+                "label": stem[16:],
+                "size": os.path.getsize(path)
+            })
+
+        backups.sort(key=lambda b: b["created"], reverse=True)
+        return backups
+
+    def rotate(self, now=None):
+        """Delete automatic backups that fall outside the retention policy.
+
+        Keeps the newest BACKUP_CONFIG["keep_recent"] backups, plus the newest
+        backup of each of the last BACKUP_CONFIG["keep_daily"] days.
+
+        Returns:
+            list: Paths deleted
+        """
+        now = now or datetime.now()
+        daily_cutoff = (now - timedelta(days=BACKUP_CONFIG["keep_daily"])).date()
+
+        automatic = [b for b in self.list_backups() if b["label"] == "auto"]
+        keep = {b["path"] for b in automatic[:BACKUP_CONFIG["keep_recent"]]}
+        days_kept = set()
+        for backup in automatic:
+            day = backup["created"].date()
+            if day > daily_cutoff and day not in days_kept:
+                days_kept.add(day)
+                keep.add(backup["path"])
+
+        deleted = []
+        for backup in automatic:
+            if backup["path"] in keep:
+                continue
+            for path in (backup["path"], backup["path"] + ".sha256"):
+                if os.path.exists(path):
+                    os.remove(path)
+            deleted.append(backup["path"])
+
+        if deleted:
+            logging.info(f"Rotated out {len(deleted)} old backups")
+        return deleted
+
+    def _extract(self, path):
+        """Decompress a backup to a temporary file and return its path."""
+        fd, extracted = tempfile.mkstemp(suffix=".db", dir=self.directory)
+        os.close(fd)
+        with gzip.open(path, "rb") as src, open(extracted, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return extracted
+
+    def verify(self, path):
+        """Check a backup's checksum and the integrity of the database inside.
+
+        Returns:
+            tuple: (ok, message)
+        """
+        checksum_file = path + ".sha256"
+        if os.path.exists(checksum_file):
+            with open(checksum_file) as f:
+                if f.read().strip() != file_checksum(path):
+                    return False, "Checksum mismatch: the backup file is damaged"
+
+        extracted = None
+        try:
+            extracted = self._extract(path)
+            result = check_integrity(extracted)
+            if result != "ok":
+                return False, f"Integrity check failed: {result}"
+            conn = sqlite3.connect(extracted)
+            try:
+                version = migrations.get_version(conn)
+                sales = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+            finally:
+                conn.close()
+            return True, f"OK: schema version {version}, {sales} sales"
+
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            return False, f"Unreadable backup: {str(e)}"
+        finally:
+            if extracted and os.path.exists(extracted):
+                os.remove(extracted)
+
+    def restore(self, path):
+        """Replace the live database with a backup.
+
+        The backup is verified first and the current database is backed up
+        as 'pre-restore'. The copy goes through the backup API into the live
+        file, so other open connections see the restored data rather than a
+        swapped-out file. Backups from older versions are migrated forward.
+
+        Returns:
+            str: Path of the pre-restore backup
+
+        Raises:
+            ValueError: If the backup fails verification
+        """
+        ok, message = self.verify(path)
+        if not ok:
+            raise ValueError(message)
+
+        safety = self.create("pre-restore")
+
+        with self._lock:
+            extracted = self._extract(path)
+            try:
+                source = sqlite3.connect(extracted)
+                target = sqlite3.connect(self.db.db_path, timeout=DB_CONFIG["timeout"])
+                try:
+                    source.backup(target)
+                    migrations.migrate(target)
+                finally:
+                    target.close()
+                    source.close()
+            finally:
+                os.remove(extracted)
+
+        logging.info(f"Restored database from {path}; previous state saved to {safety}")
+        return safety
+
+    def next_due(self, now=None):
+        """Return when the next automatic backup is due."""
+        now = now or datetime.now()
+        latest = next((b for b in self.list_backups() if b["label"] == "auto"), None)
+        if not latest:
+            return now
+        return latest["created"] + timedelta(minutes=BACKUP_CONFIG["interval_minutes"])
+
+    def start(self):
+        """Take automatic backups on a background thread until stop()."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the schedule; a backup in progress finishes first."""
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            wait = (self.next_due() - datetime.now()).total_seconds()
+            if self._stop.wait(max(wait, 0)):
+                return
+            try:
+                self.create("auto")
+            except Exception as e:
+                logging.error(f"Scheduled backup failed: {str(e)}")
+                # Try again after a full interval rather than spinning
+                if self._stop.wait(BACKUP_CONFIG["interval_minutes"] * 60):
+                    return
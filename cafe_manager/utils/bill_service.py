@@ -0,0 +1,524 @@
+"""
+Open bill operations for the Cafe Management System.
+Adds and removes bill items and takes payment for a table, with every change
+recorded in a bill_events feed so other windows and terminals can follow the
+tables by sequence number instead of re-reading them.
+"""
+
+import logging
+import sqlite3
+
+import migrations
+from database import DatabaseManager
+from utils.app_logging import log_event
+from utils.bill_sessions import BillAlreadyPaid, BillSessions
+from utils.constants import SYNC_CONFIG
+from utils.order_events import OrderEvents
+from utils.recipes import InsufficientStockError, RecipeBook
+from utils.stock_alerts import StockAlerts
+
+
+class BillService:
+    """Runs bill operations against the database this process owns."""
+
+    def __init__(self, db=None):
+        """Initialize the service.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+        self._feed = None   # Kept open for changes_since, which is polled every second
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the bill_events feed and the triggers that fill it.
+
+        Triggers catch every change to open bills and table status, whichever
+        code path makes it, so the feed cannot miss one.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bill_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_number INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+            )
+        """)
+        for name, event, row in (
+            ("bill_event_item_added", "INSERT", "NEW"),
+            ("bill_event_item_changed", "UPDATE", "NEW"),
+            ("bill_event_item_removed", "DELETE", "OLD"),
+        ):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {name}
+                AFTER {event} ON temporary_bills
+                BEGIN
+                    INSERT INTO bill_events (table_number) VALUES ({row}.table_number);
+                END
+            """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS bill_event_table_status
+            AFTER UPDATE OF status ON tables
+            WHEN NEW.status IS NOT OLD.status
+            BEGIN
+                INSERT INTO bill_events (table_number) VALUES (NEW.table_number);
+            END
+        """)
+
+    @staticmethod
+    def _read_bill(cursor, table_number):
+        """Return a table's open bill as {menu_item_id: {'name', 'price', 'quantity'}}."""
+        cursor.execute("""
+            SELECT tb.menu_item_id, mi.name, tb.price_per_unit, tb.quantity
+            FROM temporary_bills tb
+            JOIN menu_items mi ON tb.menu_item_id = mi.id
+            WHERE tb.table_number = ?
+            ORDER BY tb.id
+        """, (table_number,))
+        return {
+            item_id: {'name': name, 'price': price, 'quantity': quantity}
+            for item_id, name, price, quantity in cursor.fetchall()
+        }
+
+    @classmethod
+    def _read_state(cls, cursor, table_number):
+        """Return a table's status and open bill as one event payload.
+
+        'acked' holds the last replicated operation applied from each
+        terminal, read in the same snapshot as the bill, so a terminal knows
+        which of its logged operations the state already includes.
+        'session_id' is the open bill session, which payment refers to.
+        """
+        cursor.execute("SELECT status FROM tables WHERE table_number = ?", (table_number,))
+        row = cursor.fetchone()
+        if not row:
+            raise LookupError(f"Table {table_number} does not exist")
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM bill_events")
+        seq = cursor.fetchone()[0]
+        cursor.execute("SELECT terminal_id, last_op_seq FROM terminal_progress")
+        return {
+            "seq": seq,
+            "table_number": table_number,
+            "status": row[0],
+            "acked": dict(cursor.fetchall()),
+            "items": cls._read_bill(cursor, table_number),
+            "session_id": BillSessions.open_session(cursor, table_number)
+        }
+
+    @staticmethod
+    def apply_discount(subtotal, discount_type, discount_value):
+        """Return the total after a discount, capped at the subtotal."""
+        discount_value = max(float(discount_value or 0), 0)
+        if discount_type == "percentage":
+            return subtotal - subtotal * min(discount_value, 100) / 100
+        return subtotal - min(discount_value, subtotal)
+
+    def get_tables(self):
+        """Return (table_number, status) for every table."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            cursor = conn.cursor()
+            cursor.execute("SELECT table_number, status FROM tables ORDER BY table_number")
+            return cursor.fetchall()
+        finally:
+            if conn:
+                conn.close()
+
+    def get_bill(self, table_number):
+        """Return a table's open bill as {menu_item_id: {'name', 'price', 'quantity'}}."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            return self._read_bill(conn.cursor(), table_number)
+        finally:
+            if conn:
+                conn.close()
+
+    def get_state(self, table_number):
+        """Return a table's status, open bill and bill session as one snapshot."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            state = self._read_state(cursor, table_number)
+            conn.commit()
+            return state
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _update_status(cursor, table_number):
+        """Mark a table occupied while it has an open bill, vacant otherwise."""
+        cursor.execute("""
+            UPDATE tables
+            SET status = CASE
+                WHEN EXISTS (SELECT 1 FROM temporary_bills WHERE table_number = ?)
+                THEN 'occupied' ELSE 'vacant'
+            END
+            WHERE table_number = ?
+        """, (table_number, table_number))
+
+    def _change(self, table_number, apply):
+        """Run apply(cursor) in one write transaction and return the table's new state."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            # Take the write lock up front so two terminals queue instead of deadlocking
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT 1 FROM tables WHERE table_number = ?", (table_number,))
+            if not cursor.fetchone():
+                raise LookupError(f"Table {table_number} does not exist")
+            result = apply(cursor)
+            self._update_status(cursor, table_number)
+
+            state = self._read_state(cursor, table_number)
+            conn.commit()
+            return state, result
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _add(cursor, table_number, menu_item_id, quantity):
+        """Add units to a bill line, creating it at the current menu price.
+
+        A line keeps the price it was first ordered at, and quantities are
+        added in SQL, so adds from several terminals all count.
+        """
+        cursor.execute("""
+            UPDATE temporary_bills
+            SET quantity = quantity + ?,
+                total_price = price_per_unit * (quantity + ?)
+            WHERE table_number = ? AND menu_item_id = ?
+        """, (quantity, quantity, table_number, menu_item_id))
+        if cursor.rowcount:
+            return
+
+        cursor.execute("SELECT price FROM menu_items WHERE id = ?", (menu_item_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise LookupError("This menu item no longer exists")
+        cursor.execute("""
+            INSERT INTO temporary_bills (
+                table_number, menu_item_id, quantity,
+                price_per_unit, total_price
+            ) VALUES (?, ?, ?, ?, ?)
+        """, (table_number, menu_item_id, quantity, row[0], row[0] * quantity))
+
+    @staticmethod
+    def _remove(cursor, table_number, menu_item_id, quantity):
+        """Take units off a bill line, never below zero, dropping it when empty.
+
+        Returns:
+            int: Units actually removed
+        """
+        cursor.execute("""
+            SELECT quantity FROM temporary_bills
+            WHERE table_number = ? AND menu_item_id = ?
+        """, (table_number, menu_item_id))
+        row = cursor.fetchone()
+        removed = min(quantity, row[0]) if row else 0
+        if removed:
+            cursor.execute("""
+                UPDATE temporary_bills
+                SET quantity = quantity - ?,
+                    total_price = price_per_unit * (quantity - ?)
+                WHERE table_number = ? AND menu_item_id = ?
+            """, (removed, removed, table_number, menu_item_id))
+            cursor.execute("""
+                DELETE FROM temporary_bills
+                WHERE table_number = ? AND menu_item_id = ? AND quantity <= 0
+            """, (table_number, menu_item_id))
+        return removed
+
+    @classmethod
+    def _settle(cls, cursor, table_number, discount_type, discount_value,
+                charged=None, created_at=None, session_id=None, allow_shortfall=False):
+        """Record a sale for a table and take what it paid for off the bill.
+
+        Args:
+            charged: Items the customer paid for, {menu_item_id: {'name',
+                'price', 'quantity'}}; None charges the whole open bill
+            created_at: When the payment was taken, defaults to now
+            session_id: The bill session the payment was taken for, if known
+            allow_shortfall: Record the sale even if stock goes negative, for
+                payments that were already collected
+
+        Returns:
+            dict: sale_id, invoice_no, session_id, subtotal, total,
+            shortfall (the stock that went negative, or None) and status:
+            'applied' when the bill matched, 'partial' when items are left on
+            the table, or 'conflict' when some charged items were no longer
+            on the bill
+
+        Raises:
+            BillAlreadyPaid: If session_id has been paid already
+            ValueError: If nothing is charged, or session_id is not the
+                table's open session (it would charge another bill)
+            InsufficientStockError: If stock would go negative
+        """
+        open_session = BillSessions.open_session(cursor, table_number)
+        if session_id is not None and session_id != open_session:
+            paid = BillSessions.paid_sale(cursor, session_id)
+            if paid:
+                raise BillAlreadyPaid(paid)
+            raise ValueError(f"This bill is no longer open on table {table_number}")
+
+        bill = cls._read_bill(cursor, table_number)
+        items = bill if charged is None else charged
+        if not items:
+            raise ValueError("Cannot process empty bill")
+
+        status = "applied"
+        if charged is not None:
+            for item_id in set(bill) | set(charged):
+                paid = charged.get(item_id, {}).get('quantity', 0)
+                open_quantity = bill.get(item_id, {}).get('quantity', 0)
+                if paid > open_quantity:
+                    status = "conflict"
+                    break
+                if paid < open_quantity:
+                    status = "partial"
+
+        subtotal = sum(item['price'] * item['quantity'] for item in items.values())
+        total = cls.apply_discount(subtotal, discount_type, discount_value)
+        invoice_no = BillSessions.next_invoice(cursor)
+
+        cursor.execute("""
+            INSERT INTO sales (
+                table_number, subtotal, discount_type,
+                discount_value, total_amount, payment_status,
+                created_at, session_id, invoice_no
+            ) VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, DATETIME('now', 'localtime')), ?, ?)
+        """, (
+            table_number,
+            subtotal,
+            discount_type,
+            float(discount_value or 0),
+            total,
+            "completed",
+            created_at,
+            open_session,
+            invoice_no
+        ))
+        sale_id = cursor.lastrowid
+
+        cursor.executemany("""
+            INSERT INTO sale_items (
+                sale_id, menu_item_id, quantity,
+                price_per_unit, total_price
+            ) VALUES (?, ?, ?, ?, ?)
+        """, [
+            (sale_id, item_id, item['quantity'], item['price'], item['price'] * item['quantity'])
+            for item_id, item in items.items()
+        ])
+
+        # Check and deduct stock for the whole bill in one batch
+        shortfall = None
+        try:
+            RecipeBook.deplete(cursor, items)
+        except InsufficientStockError as e:
+            if not allow_shortfall:
+                raise
+            RecipeBook.deplete(cursor, items, check=False)
+            shortfall = str(e)
+
+        if charged is None:
+            cursor.execute("DELETE FROM temporary_bills WHERE table_number = ?", (table_number,))
+        else:
+            for item_id, item in charged.items():
+                cls._remove(cursor, table_number, item_id, item['quantity'])
+
+        if open_session:
+            BillSessions.close(cursor, open_session, sale_id)
+            # Items left after a part payment are a new bill
+            if charged is not None and cls._read_bill(cursor, table_number):
+                BillSessions.start_session(cursor, table_number)
+                OrderEvents.carry_over(cursor, table_number)
+
+        cursor.execute("""
+            DELETE FROM bill_events
+            WHERE created_at < DATETIME('now', 'localtime', ?)
+        """, (f"-{SYNC_CONFIG['event_retention_hours']} hours",))
+
+        return {
+            "sale_id": sale_id,
+            "invoice_no": invoice_no,
+            "session_id": open_session,
+            "subtotal": subtotal,
+            "total": total,
+            "shortfall": shortfall,
+            "status": status
+        }
+
+    @staticmethod
+    def _record_expense(cursor, name, title, category, quantity, price_per_unit, expense_date=None):
+        """Insert an expense row dated expense_date (default today)."""
+        cursor.execute("""
+            INSERT INTO expenses (
+                name, title, category,
+                quantity, price_per_unit,
+                total_price, expense_date
+            ) VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, DATE('now', 'localtime')))
+        """, (
+            name, title or name, category,
+            quantity, price_per_unit,
+            quantity * price_per_unit,
+            expense_date
+        ))
+        return cursor.lastrowid
+
+    def add_item(self, table_number, menu_item_id, quantity):
+        """Add units of a menu item to a table's bill.
+
+        Returns:
+            dict: The table's new state (seq, table_number, status, items, acked)
+        """
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise ValueError("Please enter a valid quantity")
+
+        state, _ = self._change(
+            table_number,
+            lambda cursor: self._add(cursor, table_number, menu_item_id, quantity)
+        )
+        return state
+
+    def remove_item(self, table_number, menu_item_id, quantity=1):
+        """Take units of a menu item off a table's bill, dropping the line at zero.
+
+        Returns:
+            dict: The table's new state
+        """
+        state, _ = self._change(
+            table_number,
+            lambda cursor: self._remove(cursor, table_number, menu_item_id, quantity)
+        )
+        return state
+
+    def pay(self, table_number, discount_type=None, discount_value=0, session_id=None):
+        """Turn a table's open bill into a sale, deduct stock and free the table.
+
+        Totals are computed from the stored bill, not from what a terminal
+        last displayed. Passing the session_id the bill was shown with makes
+        the payment idempotent: paying it again returns the first sale with
+        'duplicate' set instead of writing another.
+
+        Returns:
+            dict: sale_id, invoice_no, subtotal, total and the table's new state
+
+        Raises:
+            ValueError: If the bill is empty, or session_id is a bill that
+                was closed without being paid
+            InsufficientStockError: If stock would go negative
+        """
+        try:
+            state, sale = self._change(
+                table_number,
+                lambda cursor: self._settle(
+                    cursor, table_number, discount_type, discount_value, session_id=session_id
+                )
+            )
+        except BillAlreadyPaid as e:
+            logging.warning(f"Table {table_number}: {str(e)}, not charged again")
+            return dict(e.sale, state=self.get_state(table_number), duplicate=True)
+
+        sale["state"] = state
+        StockAlerts.publish()
+        log_event(
+            "sale_paid",
+            sale_id=sale["sale_id"],
+            invoice_no=sale["invoice_no"],
+            table_number=table_number,
+            subtotal=sale["subtotal"],
+            total=sale["total"]
+        )
+        return sale
+
+    def add_expense(self, name, title, category, quantity, price_per_unit, expense_date=None):
+        """Record an expense without a stock movement.
+
+        Returns:
+            int: The new expense id
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            expense_id = self._record_expense(
+                cursor, name, title, category, quantity, price_per_unit, expense_date
+            )
+            conn.commit()
+            return expense_id
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def take_rejected_payments(self):
+        """Payments are recorded directly here, so none are ever refused later."""
+        return []
+
+    def changes_since(self, seq):
+        """Return the current state of every table changed after seq.
+
+        Asking from 0, or from further back than the retained feed, returns
+        every table.
+
+        Returns:
+            dict: 'events' (table states, oldest change first) and 'seq'
+            (the position to ask from next time)
+        """
+        if self._feed is None:
+            self._feed = sqlite3.connect(self.db.db_path, isolation_level=None)
+            migrations.ensure_schema(self._feed)
+        cursor = self._feed.cursor()
+
+        # One read transaction, so every state matches the same seq
+        cursor.execute("BEGIN")
+        try:
+            return self._read_changes(cursor, seq)
+        finally:
+            cursor.execute("COMMIT")
+
+    @classmethod
+    def _read_changes(cls, cursor, seq):
+        """Read the table states changed after seq; see changes_since."""
+        cursor.execute("SELECT COALESCE(MIN(seq), 0), COALESCE(MAX(seq), 0) FROM bill_events")
+        oldest, latest = cursor.fetchone()
+        if seq and latest <= seq:
+            return {"events": [], "seq": max(latest, seq)}
+
+        if not seq or oldest > seq + 1:
+            cursor.execute("SELECT table_number FROM tables ORDER BY table_number")
+        else:
+            cursor.execute("""
+                SELECT table_number FROM bill_events
+                WHERE seq > ?
+                GROUP BY table_number
+                ORDER BY MAX(seq)
+            """, (seq,))
+        changed = [row[0] for row in cursor.fetchall()]
+
+        events = []
+        for table_number in changed:
+            state = cls._read_state(cursor, table_number)
+            state["seq"] = latest
+            events.append(state)
+        return {"events": events, "seq": latest}
@@ -0,0 +1,152 @@
+"""
+Bill sessions and invoice numbers for the Cafe Management System.
+A session starts when the first item goes onto a table's empty bill and ends
+when the bill is paid or emptied. A sale records the session it paid and
+each session can be paid once (a unique index on sales.session_id), so a
+second click on Pay or a retried request finds the earlier sale instead of
+writing another. Invoice numbers come from a one-row counter bumped inside
+the payment transaction, so a rolled-back payment leaves no gap.
+"""
+
+import migrations
+
+# Columns read for a paid sale
+SALE_COLUMNS = "id, invoice_no, subtotal, total_amount, session_id"
+
+
+class BillAlreadyPaid(ValueError):
+    """Raised when paying a bill session that already has a sale."""
+
+    def __init__(self, sale):
+        super().__init__(f"This bill was already paid as invoice {sale['invoice_no']}")
+        self.sale = sale
+
+
+class BillSessions:
+    """Opens, closes and looks up bill sessions, and numbers invoices."""
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create sessions, the invoice counter, and number existing sales."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bill_sessions (
+                id TEXT PRIMARY KEY,
+                table_number INTEGER NOT NULL,
+                opened_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+                closed_at TIMESTAMP,
+                sale_id INTEGER                 -- Set when paid; no key, sales get archived
+            )
+        """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_bill_sessions_open
+            ON bill_sessions(table_number) WHERE closed_at IS NULL
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS invoice_sequence (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                last_no INTEGER NOT NULL
+            )
+        """)
+
+        migrations.add_column(cursor, "sales", "session_id", "TEXT")
+        if migrations.add_column(cursor, "sales", "invoice_no", "INTEGER"):
+            # Earlier sales keep their id as invoice number, and numbering
+            # continues after the highest id ever used (archived sales too)
+            cursor.execute("UPDATE sales SET invoice_no = id")
+        cursor.execute("""
+            INSERT OR IGNORE INTO invoice_sequence (id, last_no)
+            SELECT 1, MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'sales'), 0),
+                COALESCE((SELECT MAX(invoice_no) FROM sales), 0)
+            )
+        """)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_session ON sales(session_id)")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_invoice ON sales(invoice_no)")
+
+        # Bills already open get a session
+        cursor.execute("""
+            INSERT INTO bill_sessions (id, table_number)
+            SELECT LOWER(HEX(RANDOMBLOB(16))), table_number
+            FROM temporary_bills
+            WHERE table_number NOT IN (
+                SELECT table_number FROM bill_sessions WHERE closed_at IS NULL
+            )
+            GROUP BY table_number
+        """)
+
+        # Triggers, so every code path that fills or empties a bill is covered
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS bill_session_open
+            AFTER INSERT ON temporary_bills
+            WHEN NOT EXISTS (
+                SELECT 1 FROM bill_sessions
+                WHERE table_number = NEW.table_number AND closed_at IS NULL
+            )
+            BEGIN
+                INSERT INTO bill_sessions (id, table_number)
+                VALUES (LOWER(HEX(RANDOMBLOB(16))), NEW.table_number);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS bill_session_close
+            AFTER DELETE ON temporary_bills
+            WHEN NOT EXISTS (
+                SELECT 1 FROM temporary_bills WHERE table_number = OLD.table_number
+            )
+            BEGIN
+                UPDATE bill_sessions
+                SET closed_at = DATETIME('now', 'localtime')
+                WHERE table_number = OLD.table_number AND closed_at IS NULL;
+            END
+        """)
+
+    @staticmethod
+    def open_session(cursor, table_number):
+        """Return the id of a table's open session, or None."""
+        cursor.execute("""
+            SELECT id FROM bill_sessions
+            WHERE table_number = ? AND closed_at IS NULL
+        """, (table_number,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def start_session(cursor, table_number):
+        """Open a new session for items still on a bill after a part payment."""
+        cursor.execute("""
+            INSERT INTO bill_sessions (id, table_number)
+            VALUES (LOWER(HEX(RANDOMBLOB(16))), ?)
+        """, (table_number,))
+
+    @staticmethod
+    def paid_sale(cursor, session_id):
+        """Return the sale that paid a session, or None."""
+        cursor.execute(f"SELECT {SALE_COLUMNS} FROM sales WHERE session_id = ?", (session_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        sale_id, invoice_no, subtotal, total, session_id = row
+        return {
+            "sale_id": sale_id,
+            "invoice_no": invoice_no,
+            "subtotal": subtotal,
+            "total": total,
+            "session_id": session_id
+        }
+
+    @staticmethod
+    def next_invoice(cursor):
+        """Take the next invoice number inside the caller's write transaction."""
+        cursor.execute("UPDATE invoice_sequence SET last_no = last_no + 1 WHERE id = 1")
+        cursor.execute("SELECT last_no FROM invoice_sequence WHERE id = 1")
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def close(cursor, session_id, sale_id):
+        """Mark a session paid by a sale."""
+        cursor.execute("""
+            UPDATE bill_sessions
+            SET closed_at = COALESCE(closed_at, DATETIME('now', 'localtime')),
+                sale_id = ?
+            WHERE id = ?
+        """, (sale_id, session_id))
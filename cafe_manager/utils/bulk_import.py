@@ -0,0 +1,497 @@
+"""
+Bulk CSV import for the Cafe Management System.
+Validates a CSV of menu items, expenses or opening stock, maps categories and
+writes every valid row in one transaction with executemany.
+"""
+
+import csv
+import logging
+import math
+from datetime import datetime
+
+import migrations
+from database import DatabaseManager
+from utils.constants import EXPENSE_CATEGORIES
+
+# Columns each import type needs; optional columns may be missing or blank
+IMPORT_TYPES = {
+    "menu_items": {
+        "required": ["name", "category", "price"],
+        "optional": ["unit_cost"]
+    },
+    "expenses": {
+        "required": ["name", "category", "quantity", "price_per_unit", "expense_date"],
+        # id is the expense's id in an export; rows whose id exists are skipped
+        "optional": ["title", "id"]
+    },
+    "opening_stock": {
+        "required": ["item_name", "unit_type", "quantity", "min_threshold"],
+        "optional": []
+    }
+}
+
+# Common spellings seen in spreadsheets, mapped to the names the app uses
+CATEGORY_ALIASES = {
+    "cigarettes": "Cigarette",
+    "cigarette": "Cigarette",
+    "drinks": "Bar",
+    "liquor": "Bar",
+    "alcohol": "Bar",
+    "misc": "Miscellaneous",
+    "food": "Kitchen"
+}
+
+UNIT_TYPE_ALIASES = {
+    "ml": "ML",
+    "piece": "PIECE",
+    "pieces": "PIECE",
+    "pcs": "PIECE",
+    "packet": "PACKET",
+    "packets": "PACKET",
+    "pkt": "PACKET"
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+
+
+class ImportRowError(ValueError):
+    """A single CSV row that cannot be imported."""
+
+
+class BulkImporter:
+    """Plans and applies CSV imports.
+
+    Every import is planned against the current data first. A dry run returns
+    the plan (inserts, updates, unchanged rows, row errors and warnings)
+    without writing;
+    a real run computes the same plan inside the write transaction, so what
+    was previewed is exactly what gets written. Rows with errors are skipped.
+    """
+
+    def __init__(self, db=None):
+        """Initialize the importer.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def read_csv(path, kind):
+        """Read a CSV file into (line number, row dict) pairs.
+
+        Header names are matched case-insensitively, with spaces treated as
+        underscores.
+
+        Raises:
+            ValueError: If the import type is unknown or required columns are missing
+        """
+        if kind not in IMPORT_TYPES:
+            raise ValueError(f"Unknown import type: {kind}")
+
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                raise ValueError("The file is empty")
+
+            columns = [h.strip().lower().replace(" ", "_") for h in header]
+            missing = [c for c in IMPORT_TYPES[kind]["required"] if c not in columns]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+            rows = []
+            for values in reader:
+                # Skip blank lines, typical at the end of exported spreadsheets
+                if not any(v.strip() for v in values):
+                    continue
+                rows.append((reader.line_num, {
+                    column: value.strip() for column, value in zip(columns, values)
+                }))
+            return rows
+
+    def import_file(self, kind, path, dry_run=True):
+        """Import a CSV file.
+
+        Args:
+            kind: Key of IMPORT_TYPES
+            path: CSV file path
+            dry_run: Only return the plan, without writing anything
+
+        Returns:
+            dict: The plan with 'inserts', 'updates', 'unchanged', 'errors' and
+            'warnings' (line, message) and 'diff' (action, key, before, after)
+            entries
+        """
+        rows = self.read_csv(path, kind)
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            if kind == "menu_items":
+                migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            # Plan and write under one lock so the preview cannot go stale
+            cursor.execute("BEGIN IMMEDIATE")
+
+            planner = getattr(self, f"_plan_{kind}")
+            plan = {
+                "kind": kind,
+                "rows": len(rows),
+                "inserts": [],
+                "updates": [],
+                "unchanged": 0,
+                "errors": [],
+                "warnings": [],
+                "diff": [],
+                "new_categories": [],
+                "applied": False
+            }
+            planner(cursor, rows, plan)
+
+            if dry_run:
+                conn.rollback()
+                return plan
+
+            getattr(self, f"_apply_{kind}")(cursor, plan)
+            conn.commit()
+            plan["applied"] = True
+
+            logging.info(
+                f"Imported {kind} from {path}: {len(plan['inserts'])} inserted, "
+                f"{len(plan['updates'])} updated, {len(plan['errors'])} rejected"
+            )
+            return plan
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error importing {kind} from {path}: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    # Menu items
+
+    def _plan_menu_items(self, cursor, rows, plan):
+        cursor.execute("SELECT name FROM menu_categories")
+        categories = {name.lower(): name for (name,) in cursor.fetchall()}
+
+        cursor.execute("""
+            SELECT mi.id, mi.name, mc.name, mi.price
+            FROM menu_items mi
+            JOIN menu_categories mc ON mi.category_id = mc.id
+        """)
+        existing = {
+            (name.lower(), category.lower()): (item_id, price)
+            for item_id, name, category, price in cursor.fetchall()
+        }
+
+        # Latest recorded cost per item, so re-importing the same costs is a no-op
+        cursor.execute("""
+            SELECT menu_item_id, unit_cost
+            FROM menu_item_costs
+            ORDER BY effective_from, id
+        """)
+        latest_costs = dict(cursor.fetchall())
+
+        plan["costs"] = []
+        seen = {}
+        for line, row in rows:
+            try:
+                name = self._require(row, "name")
+                category = self._require(row, "category")
+                price = self._number(row, "price", minimum=0, allow_zero=False)
+                unit_cost = self._number(row, "unit_cost", minimum=0, optional=True)
+            except ImportRowError as e:
+                plan["errors"].append((line, str(e)))
+                continue
+
+            # Existing categories win over the file's spelling
+            category = categories.get(category.lower(), category)
+            if category.lower() not in categories:
+                categories[category.lower()] = category
+                plan["new_categories"].append(category)
+
+            key = (name.lower(), category.lower())
+            if key in seen:
+                plan["errors"].append((line, f"Duplicate of line {seen[key]}"))
+                continue
+            seen[key] = line
+
+            label = f"{name} ({category})"
+            if key not in existing:
+                plan["inserts"].append((name, category, price))
+                plan["diff"].append(("insert", label, None, price))
+                if unit_cost is not None:
+                    plan["costs"].append((key, unit_cost))
+                continue
+
+            item_id, old_price = existing[key]
+            old_cost = latest_costs.get(item_id)
+            price_changed = abs(old_price - price) > 0.005
+            cost_changed = unit_cost is not None and (
+                old_cost is None or abs(old_cost - unit_cost) > 0.005
+            )
+            if not (price_changed or cost_changed):
+                plan["unchanged"] += 1
+                continue
+
+            plan["updates"].append((price, item_id))
+            if price_changed:
+                plan["diff"].append(("update", label, old_price, price))
+            if cost_changed:
+                plan["diff"].append(("update", f"{label} cost", old_cost or 0, unit_cost))
+                plan["costs"].append((key, unit_cost))
+
+    def _apply_menu_items(self, cursor, plan):
+        cursor.executemany(
+            "INSERT INTO menu_categories (name) VALUES (?)",
+            [(name,) for name in plan["new_categories"]]
+        )
+        cursor.executemany("""
+            INSERT INTO menu_items (name, category_id, price)
+            VALUES (?, (SELECT id FROM menu_categories WHERE name = ?), ?)
+        """, [(name, category, price) for name, category, price in plan["inserts"]])
+        cursor.executemany(
+            "UPDATE menu_items SET price = ? WHERE id = ?",
+            plan["updates"]
+        )
+
+        if not plan["costs"]:
+            return
+
+        # Resolve ids of new and existing items in one pass
+        cursor.execute("""
+            SELECT mi.id, mi.name, mc.name
+            FROM menu_items mi
+            JOIN menu_categories mc ON mi.category_id = mc.id
+        """)
+        ids = {}
+        for item_id, name, category in cursor.fetchall():
+            ids.setdefault((name.lower(), category.lower()), []).append(item_id)
+
+        cursor.executemany("""
+            INSERT INTO menu_item_costs (menu_item_id, unit_cost, source, effective_from)
+            VALUES (?, ?, 'manual', DATETIME('now', 'localtime'))
+        """, [
+            (item_id, unit_cost)
+            for key, unit_cost in plan["costs"]
+            for item_id in ids.get(key, [])
+        ])
+
+    # Expenses
+
+    def _plan_expenses(self, cursor, rows, plan):
+        valid = []
+        for line, row in rows:
+            try:
+                name = self._require(row, "name")
+                category = self._expense_category(self._require(row, "category"))
+                quantity = self._number(row, "quantity", minimum=0, allow_zero=False)
+                price = self._number(row, "price_per_unit", minimum=0)
+                expense_date = self._date(row, "expense_date")
+                expense_id = self._number(row, "id", minimum=1, optional=True)
+            except ImportRowError as e:
+                plan["errors"].append((line, str(e)))
+                continue
+
+            if expense_id is not None and not expense_id.is_integer():
+                plan["errors"].append((line, f"id must be a whole number, got '{row['id']}'"))
+                continue
+
+            quantity = int(quantity) if float(quantity).is_integer() else quantity
+            title = row.get("title") or name
+            valid.append((line, (
+                name, title, category, quantity, price, quantity * price, expense_date,
+                None if expense_id is None else int(expense_id)
+            )))
+
+        if not valid:
+            return
+
+        # Only an explicit id makes a row a re-import; two real expenses can
+        # look identical, so lookalikes are imported and flagged instead
+        ids = [params[7] for _, params in valid if params[7] is not None]
+        existing_ids = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(
+                f"SELECT id FROM expenses WHERE id IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            )
+            existing_ids.update(expense_id for (expense_id,) in cursor.fetchall())
+
+        dates = [params[6] for _, params in valid]
+        cursor.execute("""
+            SELECT name, title, category, quantity, price_per_unit, total_price, expense_date
+            FROM expenses
+            WHERE expense_date BETWEEN ? AND ?
+        """, (min(dates), max(dates)))
+        existing = {self._expense_key(r) for r in cursor.fetchall()}
+
+        seen_ids = {}
+        seen = {}
+        for line, params in valid:
+            expense_id = params[7]
+            if expense_id is not None:
+                if expense_id in existing_ids:
+                    plan["unchanged"] += 1
+                    continue
+                if expense_id in seen_ids:
+                    plan["errors"].append((line, f"id {expense_id} repeats line {seen_ids[expense_id]}"))
+                    continue
+                seen_ids[expense_id] = line
+
+            key = self._expense_key(params)
+            if key in existing:
+                plan["warnings"].append((line, "Matches an expense already recorded"))
+            elif key in seen:
+                plan["warnings"].append((line, f"Same as line {seen[key]}"))
+            seen.setdefault(key, line)
+
+            plan["inserts"].append(params)
+            plan["diff"].append(("insert", f"{params[6]} {params[0]}", None, params[5]))
+
+    def _apply_expenses(self, cursor, plan):
+        # A NULL id lets SQLite assign the next one
+        cursor.executemany("""
+            INSERT INTO expenses (
+                name, title, category, quantity, price_per_unit,
+                total_price, expense_date, id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, plan["inserts"])
+
+    @staticmethod
+    def _expense_key(params):
+        name, title, category, quantity, price, total, expense_date = params[:7]
+        return (name, title, category, float(quantity), round(price, 2), expense_date)
+
+    @staticmethod
+    def _expense_category(value):
+        for category in EXPENSE_CATEGORIES:
+            if category.lower() == value.lower():
+                return category
+        if value.lower() in CATEGORY_ALIASES:
+            return CATEGORY_ALIASES[value.lower()]
+        raise ImportRowError(f"Unknown expense category: {value}")
+
+    # Opening stock
+
+    def _plan_opening_stock(self, cursor, rows, plan):
+        cursor.execute("""
+            SELECT id, item_name, unit_type, quantity, min_threshold
+            FROM bar_stock
+        """)
+        existing = {row[1].lower(): row for row in cursor.fetchall()}
+
+        plan["history"] = []
+        seen = {}
+        for line, row in rows:
+            try:
+                name = self._require(row, "item_name")
+                unit_type = UNIT_TYPE_ALIASES.get(self._require(row, "unit_type").lower())
+                if not unit_type:
+                    raise ImportRowError(f"Unknown unit type: {row['unit_type']}")
+                quantity = self._number(row, "quantity", minimum=0)
+                threshold = self._number(row, "min_threshold", minimum=0)
+            except ImportRowError as e:
+                plan["errors"].append((line, str(e)))
+                continue
+
+            key = name.lower()
+            if key in seen:
+                plan["errors"].append((line, f"Duplicate of line {seen[key]}"))
+                continue
+            seen[key] = line
+
+            if key not in existing:
+                plan["inserts"].append((
+                    name, unit_type, 20 if unit_type == "PACKET" else None,
+                    quantity, quantity, threshold
+                ))
+                plan["diff"].append(("insert", name, None, quantity))
+                if quantity:
+                    plan["history"].append((name, quantity, "add"))
+                continue
+
+            item_id, stock_name, old_unit, old_quantity, old_threshold = existing[key]
+            if old_unit != unit_type:
+                plan["errors"].append((line, f"{stock_name} is tracked in {old_unit}, not {unit_type}"))
+                continue
+
+            delta = quantity - old_quantity
+            if abs(delta) < 0.0001 and abs(threshold - old_threshold) < 0.0001:
+                plan["unchanged"] += 1
+                continue
+
+            plan["updates"].append((quantity, threshold, item_id))
+            plan["diff"].append(("update", stock_name, old_quantity, quantity))
+            if abs(delta) >= 0.0001:
+                # Record the correction so stock history still adds up
+                plan["history"].append((stock_name, abs(delta), "add" if delta > 0 else "remove"))
+
+    def _apply_opening_stock(self, cursor, plan):
+        cursor.executemany("""
+            INSERT INTO bar_stock (
+                item_name, unit_type, pieces_per_packet,
+                quantity, original_quantity, min_threshold
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, plan["inserts"])
+        cursor.executemany("""
+            UPDATE bar_stock
+            SET quantity = ?,
+                min_threshold = ?,
+                last_updated = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, plan["updates"])
+        cursor.executemany("""
+            INSERT INTO stock_history (
+                item_id, change_quantity, operation_type, source
+            ) VALUES (
+                (SELECT id FROM bar_stock WHERE item_name = ?),
+                ?, ?, 'import'
+            )
+        """, plan["history"])
+
+    # Field parsing
+
+    @staticmethod
+    def _require(row, column):
+        value = row.get(column, "")
+        if not value:
+            raise ImportRowError(f"{column} is required")
+        return value
+
+    @staticmethod
+    def _number(row, column, minimum=None, allow_zero=True, optional=False):
+        value = row.get(column, "")
+        if not value:
+            if optional:
+                return None
+            raise ImportRowError(f"{column} is required")
+        try:
+            number = float(value.replace(",", ""))
+        except ValueError:
+            raise ImportRowError(f"{column} must be a number, got '{value}'")
+        if not math.isfinite(number):
+            raise ImportRowError(f"{column} must be a finite number, got '{value}'")
+        if minimum is not None and number < minimum:
+            raise ImportRowError(f"{column} cannot be negative")
+        if not allow_zero and number == 0:
+            raise ImportRowError(f"{column} must be greater than zero")
+        return number
+
+    @staticmethod
+    def _date(row, column):
+        value = row.get(column, "")
+        if not value:
+            raise ImportRowError(f"{column} is required")
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        raise ImportRowError(f"{column} must be a date (YYYY-MM-DD), got '{value}'")
@@ -0,0 +1,65 @@
+"""
+Trigger-maintained change counters for the Cafe Management System.
+Caches that compile data from several tables (the depletion map, menu
+engineering, the dashboard) key on a counter the database bumps whenever a
+column they read changes, whichever screen or process made the change.
+"""
+
+# Edited or deleted sales; new sales show up in MAX(id) without a write per bill
+SALES_EDITS = "sales_edits"
+
+
+class ChangeCounters:
+    """Named version numbers kept current by triggers."""
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the counter table."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_counters (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    @staticmethod
+    def add_sales_edits(cursor):
+        """Count sales whose total or time changed, or that were deleted."""
+        ChangeCounters.watch(
+            cursor, SALES_EDITS, "sales", ["total_amount", "created_at"], inserts=False
+        )
+
+    @staticmethod
+    def watch(cursor, counter, table, columns=None, inserts=True):
+        """Bump a counter on inserts, deletes and updates of some columns.
+
+        Args:
+            cursor: Cursor inside the migration
+            counter: Counter name, usually the cache that reads it
+            table: Table to watch
+            columns: Columns whose updates count, or None for any update
+            inserts: Whether inserts count; callers keying on MAX(id) skip them
+        """
+        cursor.execute(
+            "INSERT OR IGNORE INTO change_counters (name) VALUES (?)", (counter,)
+        )
+        bump = f"UPDATE change_counters SET version = version + 1 WHERE name = '{counter}';"
+        updated = f"UPDATE OF {', '.join(columns)}" if columns else "UPDATE"
+        events = [("deleted", "DELETE"), ("updated", updated)]
+        if inserts:
+            events.append(("inserted", "INSERT"))
+        for event, when in events:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {counter}_{table}_{event}
+                AFTER {when} ON {table}
+                BEGIN
+                    {bump}
+                END
+            """)
+
+    @staticmethod
+    def version(cursor, counter):
+        """Return a counter's current value (0 before anything changed)."""
+        cursor.execute("SELECT version FROM change_counters WHERE name = ?", (counter,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
@@ -87,6 +87,9 @@ PAGES = {
     }
 }
 
+# Expense categories, including those added by the bar and cigarette dialogs
+EXPENSE_CATEGORIES = ['Management', 'Miscellaneous', 'Bar', 'Kitchen', 'Cigarette']
+
 # Database Configuration
 DB_CONFIG = {
     "filename": "cafe_manager.db",
@@ -94,6 +97,79 @@ DB_CONFIG = {
     "check_same_thread": False
 }
 
+# Application logging
+LOG_CONFIG = {
+    "directory": "logs",           # Next to the database file
+    "level": "INFO",               # Default level
+    "module_levels": {             # Overrides by module file name or logger name (and its children)
+        "PIL": "WARNING",
+        "matplotlib": "WARNING"
+    },
+    "file": "cafe_manager.log",
+    "max_bytes": 5 * 1024 * 1024,  # Text log rotates at this size
+    "backup_count": 5,             # Rotated text logs kept
+    "events_file": "events.jsonl", # Structured events, one JSON object per line
+    "events_rotate": "midnight",   # When the events file rotates
+    "events_keep": 30              # Rotated events files kept
+}
+
+# Query timing
+QUERY_CONFIG = {
+    "enabled": True,               # Time statements on DatabaseManager connections
+    "slow_ms": 100,                # Statements slower than this go to the slow-query log
+    "slow_log_size": 200,          # Slow statements kept per summary window
+    "explain": True,               # Capture EXPLAIN QUERY PLAN for slow statements
+    "summary_file": "query_summary.jsonl",  # In the log directory, one JSON line per window
+    "summary_minutes": 15          # Length of a summary window
+}
+
+# UI responsiveness monitor
+UI_MONITOR_CONFIG = {
+    "enabled": True,               # Time Tk callbacks and event-loop drift
+    "interval_ms": 100,            # Heartbeat used to measure event-loop drift
+    "frame_budget_ms": 50,         # Callbacks or drift over this count as a stall
+    "samples": 600,                # Recent drift samples kept for percentiles
+    "trace_file": "ui_trace.csv",  # In the log directory
+    "trace_min_ms": 16,            # Only callbacks and drift at least this long are traced
+    "flush_seconds": 5,            # How often the trace is written out
+    "overlay_key": "<F12>"         # Shows or hides the debug overlay
+}
+
+# Backups
+BACKUP_CONFIG = {
+    "directory": "backups",    # Next to the database file
+    "interval_minutes": 60,    # Automatic backup every hour
+    "keep_recent": 24,         # Newest automatic backups kept
+    "keep_daily": 30,          # Plus the last backup of each of these days
+    "pages_per_step": 256,     # Pages copied per lock (1 MB at 4 KB pages)
+    "step_pause": 0.05,        # Seconds between steps, for writers to get in
+    "max_restarts": 3          # Copy without pauses after this many restarts
+}
+
+# Archival of closed months
+ARCHIVE_CONFIG = {
+    "directory": "archive",    # Per-year archive databases, next to the database file
+    "hot_months": 12           # Months kept in the live database besides the current one
+}
+
+# Multi-terminal order sync
+SYNC_CONFIG = {
+    "server_url": os.environ.get("CAFE_SYNC_URL"),  # e.g. http://192.168.1.10:8765; unset runs standalone
+    "token": os.environ.get("CAFE_SYNC_TOKEN", ""), # Shared secret sent by terminals
+    "host": "127.0.0.1",           # Address the sync server listens on; other than loopback needs a token
+    "port": 8765,
+    "request_timeout": 5,          # Seconds a terminal waits for the server
+    "poll_interval": 0.5,          # Seconds between server checks for changes made elsewhere
+    "keepalive": 15,               # Seconds between keepalives on the event stream
+    "reconnect_delay": 3,          # Seconds before a terminal reconnects its event stream
+    "refresh_ms": 1000,            # How often the table screen applies changes
+    "event_retention_hours": 24,   # bill_events older than this are pruned on payment
+    "terminal_id": os.environ.get("CAFE_TERMINAL_ID"),  # Names this terminal's operations; defaults to the host name
+    "oplog": "terminal_oplog.db",  # Terminal's operation log, next to its database
+    "ship_interval": 2,            # Seconds between attempts to send logged operations
+    "ship_batch": 200              # Operations sent per request
+}
+
 # Error Messages
 ERROR_MESSAGES = {
     "login": {
@@ -124,11 +200,28 @@ APP_PATHS = {
 
 # Notification Settings
 NOTIFICATION_CONFIG = {
-    "check_interval": 300000,  # 5 minutes in milliseconds
     "display_time": 5000,      # 5 seconds in milliseconds
+    "poll_interval": 5000,     # Check for alerts raised by other processes every 5 seconds
     "stock_threshold": 10      # Minimum stock level for notifications
 }
 
+# Reorder Suggestions
+REORDER_CONFIG = {
+    "lead_time_days": 3,  # Days between ordering and receiving stock
+    "review_days": 7,     # Days each order should cover after it arrives
+    "smoothing": 0.3      # Weight of the latest day in the usage average
+}
+
+# Labor Analytics
+LABOR_CONFIG = {
+    "hours_per_month": 208  # Working hours a monthly salary pays for (48h x 52 / 12)
+}
+
+# Stock Valuation
+VALUATION_CONFIG = {
+    "method": "fifo"  # 'fifo' or 'average'
+}
+
 # Input Validation
 VALIDATION = {
     "username": {
@@ -144,7 +237,6 @@ VALIDATION = {
 # Layout Dimensions
 SIDEBAR_WIDTH = 250
 HEADER_HEIGHT = 60
-NOTIFICATION_CHECK_INTERVAL = 300000  # 5 minutes in milliseconds
 
 # Animation Settings
 ANIMATION = {
@@ -0,0 +1,372 @@
+"""
+Virtualized data grid for the Cafe Management System.
+Renders only the rows that fit on screen, reusing a small pool of row widgets
+while scrolling, so tables of any length cost the same to load and draw.
+"""
+
+from operator import itemgetter
+
+import customtkinter as ctk
+
+from utils.constants import FONTS
+
+ROW_HEIGHT = 36
+HEADER_HEIGHT = 32
+
+# Approximate glyph width used to trim text that would overflow its column
+CHAR_WIDTH = 8
+
+
+class DataGrid(ctk.CTkFrame):
+    """Scrollable, sortable table that only builds widgets for visible rows.
+
+    Columns are dicts with:
+        title: Header text
+        value: Row index or callable(row) giving the cell value (also the sort key)
+        format: Optional callable(value) -> display text
+        text: Optional callable(row) -> display text, when it needs more than the value
+        width: Minimum width in pixels (default 100)
+        weight: Share of any extra width (default 1)
+        color: Optional callable(row) -> text color
+        font: Optional cell font
+        sortable: Whether clicking the header sorts (default True)
+
+    Actions are dicts shown as buttons at the end of every row:
+        text: Button text, or callable(row)
+        command: callable(row)
+        width: Button width (default 80)
+        fg_color, hover_color: Colors, fg_color may be callable(row)
+        visible: Optional callable(row) -> bool
+    """
+
+    def __init__(self, parent, columns, actions=None, row_height=ROW_HEIGHT,
+                 sort_column=None, sort_reverse=False, empty_text="Nothing to show", **kwargs):
+        super().__init__(parent, **kwargs)
+
+        self.columns = [self._normalize_column(c) for c in columns]
+        self.actions = actions or []
+        self.row_height = row_height
+        self.sort_column = sort_column
+        self.sort_reverse = sort_reverse
+
+        self.rows = []      # Rows in display order
+        self.offset = 0     # Index of the first visible row
+        self.pool = []      # Reusable row widgets, one per visible line
+        self.widths = [c["width"] for c in self.columns]
+        self.positions = []
+        self.body_height = 0
+        self.actions_width = sum(a.get("width", 80) + 10 for a in self.actions)
+
+        self.default_text_color = ctk.ThemeManager.theme["CTkLabel"]["text_color"]
+        self.default_button_color = ctk.ThemeManager.theme["CTkButton"]["fg_color"]
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Header
+        self.header = ctk.CTkFrame(self, fg_color="transparent", height=HEADER_HEIGHT)
+        self.header.grid(row=0, column=0, sticky="ew", padx=5, pady=(5, 0))
+
+        self.header_labels = []
+        for index, column in enumerate(self.columns):
+            label = ctk.CTkLabel(
+                self.header,
+                text=column["title"],
+                font=("Helvetica", 12, "bold"),
+                anchor="w",
+                width=column["width"],
+                height=HEADER_HEIGHT
+            )
+            if column["sortable"]:
+                label.configure(cursor="hand2")
+                label.bind("<Button-1>", lambda e, i=index: self.sort_by(i))
+            self.header_labels.append(label)
+
+        self.actions_label = None
+        if self.actions:
+            self.actions_label = ctk.CTkLabel(
+                self.header,
+                text="Actions",
+                font=("Helvetica", 12, "bold"),
+                anchor="w",
+                width=self.actions_width,
+                height=HEADER_HEIGHT
+            )
+
+        # Body and scrollbar
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", pady=5)
+
+        self.empty_label = ctk.CTkLabel(self.body, text=empty_text, text_color="gray")
+
+        self.body.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.body)
+
+        self.update_header()
+
+    @staticmethod
+    def _normalize_column(column):
+        """Fill in column defaults."""
+        column = dict(column)
+        if isinstance(column.get("value"), int):
+            column["value"] = itemgetter(column["value"])
+        column.setdefault("format", None)
+        column.setdefault("text", None)
+        column.setdefault("width", 100)
+        column.setdefault("weight", 1)
+        column.setdefault("color", None)
+        column.setdefault("font", FONTS["default"])
+        column.setdefault("sortable", True)
+        return column
+
+    # Data
+
+    def set_rows(self, rows):
+        """Replace the grid's rows, keeping the current sort and scroll position."""
+        self.rows = list(rows)
+        self.sort_rows()
+        self.offset = min(self.offset, self.max_offset())
+        self.render()
+
+    def sort_by(self, index):
+        """Sort by a column, toggling direction when it is already the sort column."""
+        if self.sort_column == index:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = index
+            self.sort_reverse = False
+
+        self.sort_rows()
+        self.offset = 0
+        self.update_header()
+        self.render()
+
+    def sort_rows(self):
+        if self.sort_column is None:
+            return
+
+        value = self.columns[self.sort_column]["value"]
+
+        def key(row):
+            v = value(row)
+            if isinstance(v, str):
+                v = v.lower()
+            # Empty values sort after everything else
+            return (v is None, v if v is not None else 0)
+
+        self.rows.sort(key=key, reverse=self.sort_reverse)
+
+    # Layout
+
+    def on_resize(self, event):
+        """Recompute column widths and the size of the row pool."""
+        # Events report screen pixels; widget sizes and positions are unscaled
+        scaling = self._get_widget_scaling()
+        self.body_height = int(event.height / scaling)
+        self.layout_columns(int(event.width / scaling))
+
+        needed = self.visible_count() + 1
+        while len(self.pool) < needed:
+            self.pool.append(self.create_row())
+        while len(self.pool) > needed:
+            self.pool.pop()["frame"].destroy()
+
+        for line in self.pool:
+            self.place_cells(line)
+
+        self.offset = min(self.offset, self.max_offset())
+        self.render()
+
+    def layout_columns(self, width):
+        """Share the available width between columns by weight."""
+        available = max(width - self.actions_width, 0)
+        minimum = sum(c["width"] for c in self.columns)
+        extra = max(available - minimum, 0)
+        total_weight = sum(c["weight"] for c in self.columns) or 1
+
+        self.widths = [
+            int(c["width"] + extra * c["weight"] / total_weight)
+            for c in self.columns
+        ]
+        self.positions = []
+        x = 0
+        for w in self.widths:
+            self.positions.append(x)
+            x += w
+
+        self.update_header()
+
+    def update_header(self):
+        """Place header labels and show the sort direction."""
+        x = 0
+        for index, (label, column) in enumerate(zip(self.header_labels, self.columns)):
+            width = self.widths[index]
+            text = column["title"]
+            if index == self.sort_column:
+                text += " ▼" if self.sort_reverse else " ▲"
+            label.configure(text=text, width=width)
+            label.place(x=x, y=0)
+            x += width
+
+        if self.actions_label:
+            self.actions_label.place(x=x, y=0)
+
+    def create_row(self):
+        """Build one reusable row of cell labels and action buttons."""
+        frame = ctk.CTkFrame(self.body, fg_color="transparent", height=self.row_height)
+
+        cells = []
+        for column in self.columns:
+            label = ctk.CTkLabel(
+                frame,
+                text="",
+                font=column["font"],
+                anchor="w",
+                height=self.row_height
+            )
+            self.bind_wheel(label)
+            cells.append(label)
+
+        buttons = []
+        actions_frame = None
+        if self.actions:
+            actions_frame = ctk.CTkFrame(frame, fg_color="transparent", height=self.row_height)
+            for index, action in enumerate(self.actions):
+                button = ctk.CTkButton(
+                    actions_frame,
+                    text=action["text"] if isinstance(action["text"], str) else "",
+                    width=action.get("width", 80),
+                    height=self.row_height - 6,
+                    hover_color=action.get("hover_color")
+                )
+                button.grid(row=0, column=index, padx=5)
+                buttons.append(button)
+
+        self.bind_wheel(frame)
+        return {"frame": frame, "cells": cells, "actions": actions_frame,
+                "buttons": buttons, "row": None, "texts": [None] * len(cells)}
+
+    def place_cells(self, line):
+        """Position a pooled row's cells for the current column widths."""
+        for index, label in enumerate(line["cells"]):
+            label.configure(width=self.widths[index])
+            label.place(x=self.positions[index], y=0)
+        if line["actions"] is not None:
+            line["actions"].place(x=sum(self.widths), y=0)
+        # Widths changed, so trimmed texts must be recomputed
+        line["texts"] = [None] * len(line["cells"])
+        line["row"] = None
+
+    def visible_count(self):
+        """Number of rows that fit fully in the body."""
+        return max(self.body_height // self.row_height, 1)
+
+    def max_offset(self):
+        return max(len(self.rows) - self.visible_count(), 0)
+
+    # Rendering
+
+    def render(self):
+        """Bind the visible slice of rows to the row pool."""
+        if self.rows:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, rely=0.3, anchor="center")
+
+        for i, line in enumerate(self.pool):
+            index = self.offset + i
+            if index < len(self.rows):
+                self.bind_row(line, self.rows[index])
+                line["frame"].place(x=0, y=i * self.row_height, relwidth=1)
+            else:
+                line["frame"].place_forget()
+                line["row"] = None
+
+        self.update_scrollbar()
+
+    def bind_row(self, line, row):
+        """Show a row in a pooled line, touching only widgets whose content changed."""
+        if line["row"] is row:
+            return
+        line["row"] = row
+
+        for index, (label, column) in enumerate(zip(line["cells"], self.columns)):
+            value = column["value"](row)
+            if column["text"]:
+                text = column["text"](row)
+            elif column["format"]:
+                text = column["format"](value)
+            else:
+                text = "" if value is None else str(value)
+
+            max_chars = max(self.widths[index] // CHAR_WIDTH, 3)
+            if len(text) > max_chars:
+                text = text[:max_chars - 1] + "…"
+
+            if line["texts"][index] != text:
+                label.configure(text=text)
+                line["texts"][index] = text
+
+            if column["color"]:
+                label.configure(text_color=column["color"](row) or self.default_text_color)
+
+        for button, action in zip(line["buttons"], self.actions):
+            visible = action.get("visible")
+            if visible and not visible(row):
+                button.grid_remove()
+                continue
+
+            text = action["text"](row) if callable(action["text"]) else action["text"]
+            fg_color = action.get("fg_color") or self.default_button_color
+            if callable(fg_color):
+                fg_color = fg_color(row)
+            button.configure(
+                text=text,
+                fg_color=fg_color,
+                command=lambda r=row, a=action: a["command"](r)
+            )
+            button.grid()
+
+    # Scrolling
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def update_scrollbar(self):
+        count = len(self.rows)
+        if count == 0:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(
+            self.offset / count,
+            min((self.offset + self.visible_count()) / count, 1)
+        )
+
+    def on_scrollbar(self, *args):
+        """Handle scrollbar drags ('moveto') and clicks ('scroll')."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            amount = int(float(args[1]))
+            if len(args) > 2 and args[2] == "pages":
+                amount *= max(self.visible_count() - 1, 1)
+            self.scroll_to(self.offset + amount)
+
+    def on_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_wheel)
+        widget.bind("<Button-4>", self.on_wheel)
+        widget.bind("<Button-5>", self.on_wheel)
@@ -0,0 +1,461 @@
+"""
+End-of-day closing (Z-report) for the Cafe Management System.
+Freezes a day's totals into immutable daily_close snapshots and audits late edits.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+
+import migrations
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+
+# Scalar totals stored on every snapshot, compared field by field when auditing
+SNAPSHOT_TOTALS = [
+    "sale_count",
+    "subtotal",
+    "discount_total",
+    "revenue",
+    "expenses",
+    "items_sold"
+]
+
+# Breakdown columns stored as JSON
+SNAPSHOT_BREAKDOWNS = [
+    "per_item",
+    "per_category",
+    "per_table",
+    "expenses_by_category",
+    "stock_deltas"
+]
+
+# Highest row ids a snapshot includes; later rows of the day are reported by
+# the audit. NULL on days closed before the markers existed.
+SNAPSHOT_MARKERS = [
+    "last_sale_id",
+    "last_expense_id"
+]
+
+
+class DayCloseManager:
+    """Closes business days and serves their frozen totals."""
+
+    def __init__(self, db=None):
+        """Initialize the manager.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+        self.archive = ArchiveManager(self.db)
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the daily_close table and the triggers that freeze it."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_close (
+                close_date DATE PRIMARY KEY,
+                closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                closed_by TEXT,
+                sale_count INTEGER NOT NULL,
+                subtotal REAL NOT NULL,
+                discount_total REAL NOT NULL,
+                revenue REAL NOT NULL,
+                expenses REAL NOT NULL,
+                items_sold REAL NOT NULL,
+                per_item TEXT NOT NULL,
+                per_category TEXT NOT NULL,
+                per_table TEXT NOT NULL,
+                expenses_by_category TEXT NOT NULL,
+                stock_deltas TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS daily_close_no_update
+            BEFORE UPDATE ON daily_close
+            BEGIN
+                SELECT RAISE(ABORT, 'Closed days cannot be modified');
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS daily_close_no_delete
+            BEFORE DELETE ON daily_close
+            BEGIN
+                SELECT RAISE(ABORT, 'Closed days cannot be deleted');
+            END
+        """)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales(created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(expense_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_stock_history_created ON stock_history(created_at)')
+
+    @staticmethod
+    def add_row_markers(cursor):
+        """Record the last sale and expense ids a snapshot includes.
+
+        Rows added to a closed day after its close (e.g. sales a terminal
+        took offline and shipped late) have higher ids, so the audit can
+        tell them apart from edits.
+        """
+        migrations.add_column(cursor, "daily_close", "last_sale_id", "INTEGER")
+        migrations.add_column(cursor, "daily_close", "last_expense_id", "INTEGER")
+
+    @staticmethod
+    def compute_day(cursor, close_date):
+        """Compute a day's totals from the raw sales, expense and stock rows.
+
+        Args:
+            cursor: Database cursor
+            close_date: Business day ('YYYY-MM-DD')
+
+        Returns:
+            dict: Totals and breakdowns keyed like the daily_close columns
+        """
+        day_range = (close_date, close_date)
+
+        cursor.execute("""
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(subtotal), 0),
+                COALESCE(SUM(subtotal - total_amount), 0),
+                COALESCE(SUM(total_amount), 0)
+            FROM sales
+            WHERE created_at >= ? AND created_at < DATE(?, '+1 day')
+        """, day_range)
+        sale_count, subtotal, discount_total, revenue = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT
+                si.menu_item_id,
+                COALESCE(m.name, 'Deleted item'),
+                COALESCE(mc.name, 'Other'),
+                SUM(si.quantity),
+                SUM(si.total_price)
+            FROM sales s
+            JOIN sale_items si ON si.sale_id = s.id
+            LEFT JOIN menu_items m ON m.id = si.menu_item_id
+            LEFT JOIN menu_categories mc ON mc.id = m.category_id
+            WHERE s.created_at >= ? AND s.created_at < DATE(?, '+1 day')
+            GROUP BY si.menu_item_id
+            ORDER BY si.menu_item_id
+        """, day_range)
+
+        per_item = {}
+        per_category = {}
+        items_sold = 0
+        for item_id, name, category, quantity, total in cursor.fetchall():
+            per_item[str(item_id)] = {"name": name, "quantity": quantity, "revenue": total}
+            bucket = per_category.setdefault(category, {"quantity": 0, "revenue": 0.0})
+            bucket["quantity"] += quantity
+            bucket["revenue"] += total
+            items_sold += quantity
+
+        cursor.execute("""
+            SELECT table_number, COUNT(*), SUM(total_amount)
+            FROM sales
+            WHERE created_at >= ? AND created_at < DATE(?, '+1 day')
+            GROUP BY table_number
+            ORDER BY table_number
+        """, day_range)
+        per_table = {
+            str(table): {"sales": count, "revenue": total}
+            for table, count, total in cursor.fetchall()
+        }
+
+        cursor.execute("""
+            SELECT COALESCE(category, 'Other'), SUM(total_price)
+            FROM expenses
+            WHERE expense_date = ?
+            GROUP BY category
+            ORDER BY category
+        """, (close_date,))
+        expenses_by_category = dict(cursor.fetchall())
+        expenses = sum(expenses_by_category.values())
+
+        cursor.execute("""
+            SELECT
+                sh.item_id,
+                COALESCE(bs.item_name, 'Deleted item'),
+                SUM(CASE WHEN sh.operation_type = 'add' THEN sh.change_quantity ELSE 0 END),
+                SUM(CASE WHEN sh.operation_type = 'remove' THEN sh.change_quantity ELSE 0 END)
+            FROM stock_history sh
+            LEFT JOIN bar_stock bs ON bs.id = sh.item_id
+            WHERE sh.created_at >= ? AND sh.created_at < DATE(?, '+1 day')
+            GROUP BY sh.item_id
+            ORDER BY sh.item_id
+        """, day_range)
+        stock_deltas = {
+            str(item_id): {"name": name, "added": added, "removed": removed}
+            for item_id, name, added, removed in cursor.fetchall()
+        }
+
+        return {
+            "close_date": close_date,
+            "sale_count": sale_count,
+            "subtotal": subtotal,
+            "discount_total": discount_total,
+            "revenue": revenue,
+            "expenses": expenses,
+            "items_sold": items_sold,
+            "per_item": per_item,
+            "per_category": per_category,
+            "per_table": per_table,
+            "expenses_by_category": expenses_by_category,
+            "stock_deltas": stock_deltas
+        }
+
+    def close_day(self, close_date=None, closed_by=None):
+        """Freeze a day's totals into daily_close.
+
+        Only days that have ended can be closed, so sales taken later the
+        same day are not left out of the snapshot.
+
+        Args:
+            close_date: Day to close ('YYYY-MM-DD'), defaults to yesterday
+            closed_by: Name of the user closing the day
+
+        Returns:
+            dict: The stored snapshot
+
+        Raises:
+            ValueError: If the day is already closed or has not ended yet
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        close_date = close_date or (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        if close_date >= today:
+            raise ValueError(f"{close_date} is still open; it can be closed once the day has ended")
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            # Read and write in one transaction so the snapshot is consistent
+            cursor.execute("BEGIN IMMEDIATE")
+
+            cursor.execute("SELECT 1 FROM daily_close WHERE close_date = ?", (close_date,))
+            if cursor.fetchone():
+                raise ValueError(f"{close_date} is already closed")
+
+            snapshot = self.compute_day(cursor, close_date)
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM sales")
+            snapshot["last_sale_id"] = cursor.fetchone()[0]
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM expenses")
+            snapshot["last_expense_id"] = cursor.fetchone()[0]
+
+            columns = ["close_date"] + SNAPSHOT_TOTALS + SNAPSHOT_BREAKDOWNS + SNAPSHOT_MARKERS
+            values = [snapshot["close_date"]]
+            values += [snapshot[c] for c in SNAPSHOT_TOTALS]
+            values += [json.dumps(snapshot[c], sort_keys=True) for c in SNAPSHOT_BREAKDOWNS]
+            values += [snapshot[c] for c in SNAPSHOT_MARKERS]
+
+            cursor.execute(f"""
+                INSERT INTO daily_close (
+                    {", ".join(columns)}, closed_by, closed_at
+                ) VALUES ({", ".join("?" for _ in columns)}, ?, DATETIME('now', 'localtime'))
+            """, values + [closed_by])
+
+            conn.commit()
+            logging.info(f"Closed business day {close_date}: revenue {snapshot['revenue']:.2f}")
+            return snapshot
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error closing day {close_date}: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def get_snapshot(self, close_date):
+        """Return the frozen snapshot for a day, or None if it is still open."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT * FROM daily_close WHERE close_date = ?", (close_date,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            snapshot = dict(zip([d[0] for d in cursor.description], row))
+            for column in SNAPSHOT_BREAKDOWNS:
+                snapshot[column] = json.loads(snapshot[column])
+            return snapshot
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_open_days(self, limit=30):
+        """Return past days that have sales or expenses but no snapshot."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT day FROM (
+                    SELECT DISTINCT DATE(created_at) as day FROM sales
+                    UNION
+                    SELECT DISTINCT expense_date FROM expenses
+                )
+                WHERE day < DATE('now', 'localtime')
+                  AND day NOT IN (SELECT close_date FROM daily_close)
+                ORDER BY day DESC
+                LIMIT ?
+            """, (limit,))
+            return [row[0] for row in cursor.fetchall()]
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_period_totals(self, start_date, end_date):
+        """Return (revenue, expenses, sale_count) for a date range.
+
+        Closed days cost one snapshot row each and report exactly what was
+        closed; rows that reached them later show up in audit_day. Days that
+        are still open are aggregated from raw rows.
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT
+                    COALESCE(SUM(revenue), 0),
+                    COALESCE(SUM(expenses), 0),
+                    COALESCE(SUM(sale_count), 0)
+                FROM daily_close
+                WHERE close_date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            revenue, expenses, sale_count = cursor.fetchone()
+
+            cursor.execute("""
+                SELECT COALESCE(SUM(total_amount), 0), COUNT(*)
+                FROM sales
+                WHERE created_at >= ? AND created_at < DATE(?, '+1 day')
+                  AND DATE(created_at) NOT IN (
+                      SELECT close_date FROM daily_close WHERE close_date BETWEEN ? AND ?
+                  )
+            """, (start_date, end_date, start_date, end_date))
+            open_revenue, open_count = cursor.fetchone()
+
+            cursor.execute("""
+                SELECT COALESCE(SUM(total_price), 0)
+                FROM expenses
+                WHERE expense_date BETWEEN ? AND ?
+                  AND expense_date NOT IN (
+                      SELECT close_date FROM daily_close WHERE close_date BETWEEN ? AND ?
+                  )
+            """, (start_date, end_date, start_date, end_date))
+            open_expenses = cursor.fetchone()[0]
+
+            return (
+                revenue + open_revenue,
+                expenses + open_expenses,
+                sale_count + open_count
+            )
+
+        finally:
+            if conn:
+                conn.close()
+
+    def audit_day(self, close_date):
+        """Compare a closed day's snapshot with the current raw rows.
+
+        Sales and expenses that reached the day after it was closed are
+        listed first as 'late_sales' and 'late_expenses' (row count and
+        amount). Days closed before row markers were kept cannot tell late
+        rows from edits; their late rows show in the total differences only.
+
+        Returns:
+            list: (field, snapshot value, current value) for every difference,
+            empty if nothing changed since the day was closed
+        """
+        snapshot = self.get_snapshot(close_date)
+        if not snapshot:
+            raise ValueError(f"{close_date} has not been closed")
+
+        differences = []
+        conn = None
+        try:
+            conn = self.archive.connect(close_date, close_date)
+            cursor = conn.cursor()
+            current = self.compute_day(cursor, close_date)
+
+            if snapshot["last_sale_id"] is not None:
+                cursor.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(total_amount), 0)
+                    FROM sales
+                    WHERE created_at >= ? AND created_at < DATE(?, '+1 day') AND id > ?
+                """, (close_date, close_date, snapshot["last_sale_id"]))
+                count, amount = cursor.fetchone()
+                if count:
+                    differences.append(("late_sales", 0, count))
+                    differences.append(("late_sales_revenue", 0, amount))
+
+            if snapshot["last_expense_id"] is not None:
+                cursor.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(total_price), 0)
+                    FROM expenses
+                    WHERE expense_date = ? AND id > ?
+                """, (close_date, snapshot["last_expense_id"]))
+                count, amount = cursor.fetchone()
+                if count:
+                    differences.append(("late_expenses", 0, count))
+                    differences.append(("late_expenses_total", 0, amount))
+        finally:
+            if conn:
+                conn.close()
+
+        for field in SNAPSHOT_TOTALS:
+            if abs((snapshot[field] or 0) - (current[field] or 0)) > 0.005:
+                differences.append((field, snapshot[field], current[field]))
+
+        for field in SNAPSHOT_BREAKDOWNS:
+            # Round-trip through JSON so both sides have the same key types
+            frozen = snapshot[field]
+            live = json.loads(json.dumps(current[field], sort_keys=True))
+            for key in sorted(set(frozen) | set(live)):
+                if frozen.get(key) != live.get(key):
+                    differences.append((f"{field}.{key}", frozen.get(key), live.get(key)))
+
+        return differences
+
+    def audit_period(self, start_date, end_date):
+        """Audit every closed day in a date range.
+
+        Returns:
+            dict: {close_date: differences (see audit_day)} for the closed
+            days that changed since they were closed
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT close_date FROM daily_close
+                WHERE close_date BETWEEN ? AND ?
+                ORDER BY close_date
+            """, (start_date, end_date))
+            days = [row[0] for row in cursor.fetchall()]
+        finally:
+            if conn:
+                conn.close()
+
+        changed = {}
+        for day in days:
+            differences = self.audit_day(day)
+            if differences:
+                changed[day] = differences
+        return changed
@@ -0,0 +1,152 @@
+"""
+Expense ledger queries for the Cafe Management System.
+Pages through expenses of any period with keyset pagination and computes
+running totals in SQL, so browsing cost stays flat as the ledger grows.
+"""
+
+import migrations
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+
+PAGE_SIZE = 50
+
+
+class ExpenseLedger:
+    """Reads pages of expenses, newest first, for a date range and category."""
+
+    def __init__(self, db=None, page_size=PAGE_SIZE):
+        """Initialize the ledger.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+            page_size: Rows per page
+        """
+        self.db = db or DatabaseManager()
+        self.archive = ArchiveManager(self.db)
+        self.page_size = page_size
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the indexes the ledger pages are read through.
+
+        category and total_price are included so period totals and the
+        per-category summary are read from the index alone.
+        """
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_expenses_date_id
+            ON expenses(expense_date, id, category, total_price)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_expenses_category_date_id
+            ON expenses(category, expense_date, id, total_price)
+        """)
+
+    @staticmethod
+    def _filters(start_date, end_date, category):
+        """Build the shared WHERE clause and parameters."""
+        clause = "expense_date BETWEEN ? AND ?"
+        params = [start_date, end_date]
+        if category:
+            clause += " AND category = ?"
+            params.append(category)
+        return clause, params
+
+    def get_page(self, start_date, end_date, category=None, after=None):
+        """Return one page of expenses, newest first.
+
+        Args:
+            start_date: First day ('YYYY-MM-DD')
+            end_date: Last day ('YYYY-MM-DD')
+            category: Optional expense category
+            after: The 'next' cursor of the previous page, or None for the first page
+
+        Returns:
+            dict: 'rows' (id, name, category, title, quantity, price_per_unit,
+            total_price, expense_date, running_total), 'next' (cursor for the
+            following page, or None on the last page)
+        """
+        where, params = self._filters(start_date, end_date, category)
+
+        conn = None
+        try:
+            conn = self.archive.connect(start_date, end_date)
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            if after:
+                # The cursor carries the running total where the previous page
+                # stopped, so later pages never re-sum the rows before them
+                after_date, after_id, top_total = after
+                where += " AND (expense_date, id) < (?, ?)"
+                params += [after_date, after_id]
+            else:
+                # Period total, read from the covering index
+                cursor.execute(f"SELECT COALESCE(SUM(total_price), 0) FROM expenses WHERE {where}", params)
+                top_total = cursor.fetchone()[0]
+
+            # Running total (oldest to newest) = total up to the newest row on
+            # the page minus everything newer than each row
+            cursor.execute(f"""
+                SELECT
+                    id, name, category, title, quantity, price_per_unit,
+                    total_price, expense_date,
+                    ? - COALESCE(SUM(total_price) OVER (
+                        ORDER BY expense_date DESC, id DESC
+                        ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                    ), 0) as running_total
+                FROM expenses
+                WHERE {where}
+                ORDER BY expense_date DESC, id DESC
+                LIMIT ?
+            """, [top_total] + params + [self.page_size + 1])
+
+            rows = cursor.fetchall()
+
+            # One extra row tells us whether another page follows
+            next_cursor = None
+            if len(rows) > self.page_size:
+                rows = rows[:self.page_size]
+                last = rows[-1]
+                next_cursor = (last[7], last[0], last[8] - last[6])
+
+            return {"rows": rows, "next": next_cursor}
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_summary(self, start_date, end_date, category=None):
+        """Return totals for the whole filtered period.
+
+        Returns:
+            dict: 'count', 'total' and 'by_category' {category: total}
+        """
+        where, params = self._filters(start_date, end_date, category)
+
+        conn = None
+        try:
+            conn = self.archive.connect(start_date, end_date)
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT category, COUNT(*), SUM(total_price)
+                FROM expenses
+                WHERE {where}
+                GROUP BY category
+                ORDER BY SUM(total_price) DESC
+            """, params)
+
+            by_category = {}
+            count = 0
+            total = 0.0
+            for name, rows, amount in cursor.fetchall():
+                by_category[name] = amount
+                count += rows
+                total += amount
+
+            return {"count": count, "total": total, "by_category": by_category}
+
+        finally:
+            if conn:
+                conn.close()
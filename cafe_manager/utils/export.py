@@ -0,0 +1,309 @@
+"""
+Data export for the Cafe Management System.
+Streams sales, sale items, expenses and stock history to CSV, JSON Lines or
+Parquet in fixed-size chunks so memory stays flat for multi-year exports.
+"""
+
+import csv
+import json
+import logging
+import os
+
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+    pq = None
+
+CHUNK_SIZE = 5000
+
+# Each dataset is a query with a date-range filter on an indexed column.
+# Ordering by id keeps chunks stable and matches the primary key order.
+# "types" overrides the declared SQLite type of columns whose stored values
+# do not match it.
+EXPORT_DATASETS = {
+    "sales": {
+        "query": """
+            SELECT id, invoice_no, session_id, table_number, subtotal,
+                   discount_type, discount_value, total_amount, payment_status,
+                   created_at
+            FROM sales
+            WHERE created_at >= ? AND created_at < DATE(?, '+1 day')
+            ORDER BY id
+        """,
+        "count": """
+            SELECT COUNT(*) FROM sales
+            WHERE created_at >= ? AND created_at < DATE(?, '+1 day')
+        """
+    },
+    "sale_items": {
+        "query": """
+            SELECT si.id, si.sale_id, si.menu_item_id, m.name as item_name,
+                   si.quantity, si.price_per_unit, si.total_price, s.created_at
+            FROM sales s
+            JOIN sale_items si ON si.sale_id = s.id
+            LEFT JOIN menu_items m ON m.id = si.menu_item_id
+            WHERE s.created_at >= ? AND s.created_at < DATE(?, '+1 day')
+            ORDER BY si.id
+        """,
+        "count": """
+            SELECT COUNT(*)
+            FROM sales s
+            JOIN sale_items si ON si.sale_id = s.id
+            WHERE s.created_at >= ? AND s.created_at < DATE(?, '+1 day')
+        """
+    },
+    "expenses": {
+        "query": """
+            SELECT id, name, title, category, quantity, price_per_unit,
+                   total_price, expense_date, created_at
+            FROM expenses
+            WHERE expense_date BETWEEN ? AND ?
+            ORDER BY id
+        """,
+        # Bar purchases store fractional ML in this INTEGER column
+        "types": {"quantity": "REAL"},
+        "count": """
+            SELECT COUNT(*) FROM expenses
+            WHERE expense_date BETWEEN ? AND ?
+        """
+    },
+    "stock_history": {
+        "query": """
+            SELECT sh.id, sh.item_id, bs.item_name, bs.unit_type,
+                   sh.change_quantity, sh.operation_type, sh.source, sh.created_at
+            FROM stock_history sh
+            LEFT JOIN bar_stock bs ON bs.id = sh.item_id
+            WHERE sh.created_at >= ? AND sh.created_at < DATE(?, '+1 day')
+            ORDER BY sh.id
+        """,
+        "count": """
+            SELECT COUNT(*) FROM stock_history
+            WHERE created_at >= ? AND created_at < DATE(?, '+1 day')
+        """
+    }
+}
+
+# Parquet types by SQLite type affinity; dates and timestamps are stored as text
+PARQUET_AFFINITIES = [
+    ("INT", "int64"),
+    ("CHAR", "string"),
+    ("CLOB", "string"),
+    ("TEXT", "string"),
+    ("BLOB", "binary"),
+    ("REAL", "float64"),
+    ("FLOA", "float64"),
+    ("DOUB", "float64")
+]
+
+EXPORT_FORMATS = {
+    "csv": ".csv",
+    "jsonl": ".jsonl",
+    "parquet": ".parquet"
+}
+
+
+def available_formats():
+    """Return the export formats usable in this installation."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or pyarrow is not None]
+
+
+class CSVExportWriter:
+    """Writes rows to a CSV file with a header line."""
+
+    def __init__(self, path, columns, types=None):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JSONLinesExportWriter:
+    """Writes one JSON object per row."""
+
+    def __init__(self, path, columns, types=None):
+        self.file = open(path, "w", encoding="utf-8")
+        self.columns = columns
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False))
+            self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    """Writes each chunk as a Parquet row group.
+
+    The schema comes from the declared column types, not from the first
+    chunk, so a column that starts out all NULL keeps its real type.
+    """
+
+    def __init__(self, path, columns, types=None):
+        if pyarrow is None:
+            raise RuntimeError("Parquet export requires pyarrow to be installed")
+        self.columns = columns
+        self.schema = pyarrow.schema([
+            (column, self.arrow_type(declared))
+            for column, declared in zip(columns, types or [""] * len(columns))
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    @staticmethod
+    def arrow_type(declared):
+        """Map a declared SQLite column type to a Parquet type by its affinity."""
+        declared = (declared or "").upper()
+        for marker, arrow_type in PARQUET_AFFINITIES:
+            if marker in declared:
+                return getattr(pyarrow, arrow_type)()
+        return pyarrow.string()
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        self.writer.write_table(pyarrow.Table.from_pylist(
+            [dict(zip(self.columns, row)) for row in rows], schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+EXPORT_WRITERS = {
+    "csv": CSVExportWriter,
+    "jsonl": JSONLinesExportWriter,
+    "parquet": ParquetExportWriter
+}
+
+
+class DataExporter:
+    """Streams query results to export files."""
+
+    def __init__(self, db=None, chunk_size=CHUNK_SIZE):
+        """Initialize the exporter.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+            chunk_size: Rows fetched and written per step
+        """
+        self.db = db or DatabaseManager()
+        self.archive = ArchiveManager(self.db)
+        self.chunk_size = chunk_size
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop a running export after the current chunk."""
+        self.cancelled = True
+
+    def export(self, dataset, path, fmt="csv", start_date=None, end_date=None, progress=None):
+        """Export one dataset to a file.
+
+        Args:
+            dataset: Key of EXPORT_DATASETS
+            path: Output file path
+            fmt: 'csv', 'jsonl' or 'parquet'
+            start_date: First day to include ('YYYY-MM-DD'), None for all history
+            end_date: Last day to include ('YYYY-MM-DD'), None for all history
+            progress: Optional callback(dataset, rows_written, total_rows)
+
+        Returns:
+            int: Number of rows written
+        """
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        if fmt not in EXPORT_WRITERS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        spec = EXPORT_DATASETS[dataset]
+        # DATE('9999-12-31', '+1 day') is out of range (NULL), so open ends stop a day earlier
+        params = (start_date or '0000-01-01', end_date or '9999-12-30')
+
+        conn = None
+        writer = None
+        written = 0
+        try:
+            conn = self.archive.connect(start_date, end_date)
+            cursor = conn.cursor()
+
+            cursor.execute(spec["count"], params)
+            total = cursor.fetchone()[0]
+
+            types = self.declared_types(cursor, spec)
+
+            cursor.execute(spec["query"], params)
+            columns = [d[0] for d in cursor.description]
+            writer = EXPORT_WRITERS[fmt](path, columns, [types.get(c, "") for c in columns])
+
+            if progress:
+                progress(dataset, 0, total)
+
+            # fetchmany keeps only one chunk in memory at a time
+            while not self.cancelled:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                writer.write_rows(rows)
+                written += len(rows)
+                if progress:
+                    progress(dataset, written, total)
+
+            logging.info(f"Exported {written} {dataset} rows to {path}")
+            return written
+
+        except Exception as e:
+            logging.error(f"Error exporting {dataset}: {str(e)}")
+            raise
+        finally:
+            if writer:
+                writer.close()
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def declared_types(cursor, spec):
+        """Return the declared SQLite type of each column a dataset query returns.
+
+        The query is wrapped in a temporary view, whose columns carry the
+        types of the table columns they select.
+        """
+        cursor.execute(
+            "CREATE TEMP VIEW export_columns AS " + spec["query"].replace("?", "NULL")
+        )
+        try:
+            cursor.execute("PRAGMA temp.table_info(export_columns)")
+            types = {row[1]: row[2] for row in cursor.fetchall()}
+        finally:
+            cursor.execute("DROP VIEW temp.export_columns")
+        types.update(spec.get("types", {}))
+        return types
+
+    def export_all(self, directory, fmt="csv", start_date=None, end_date=None,
+                   datasets=None, progress=None):
+        """Export several datasets into one directory.
+
+        Returns:
+            dict: Output path and row count per dataset
+        """
+        os.makedirs(directory, exist_ok=True)
+        suffix = ""
+        if start_date or end_date:
+            suffix = f"-{start_date or 'start'}-to-{end_date or 'end'}"
+
+        results = {}
+        for dataset in datasets or EXPORT_DATASETS:
+            if self.cancelled:
+                break
+            path = os.path.join(directory, f"{dataset}{suffix}{EXPORT_FORMATS[fmt]}")
+            results[dataset] = (path, self.export(dataset, path, fmt, start_date, end_date, progress))
+        return results
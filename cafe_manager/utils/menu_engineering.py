@@ -0,0 +1,255 @@
+"""
+Menu engineering analysis for the Cafe Management System.
+Classifies menu items by popularity and contribution margin over any period.
+"""
+
+import logging
+from datetime import datetime
+
+import migrations
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+from utils.change_counters import ChangeCounters
+
+# Change counter bumped whenever a report input changes
+COUNTER = "menu_engineering"
+
+# Columns the report reads, by table (None = every column)
+REPORT_INPUTS = {
+    "sales": ["created_at"],
+    "sale_items": None,
+    "menu_item_costs": None,
+    "menu_items": ["name", "category_id", "price"],
+    "menu_categories": ["name"]
+}
+
+# Kasavana-Smith popularity rule: an item is popular when its share of the
+# sales mix reaches 70% of an even share across all items.
+POPULARITY_FACTOR = 0.7
+
+CLASSIFICATIONS = {
+    "star": "High popularity, high margin",
+    "plowhorse": "High popularity, low margin",
+    "puzzle": "Low popularity, high margin",
+    "dog": "Low popularity, low margin"
+}
+
+
+class MenuEngineering:
+    """Builds the popularity x margin matrix for the menu."""
+
+    def __init__(self, db=None):
+        """Initialize the engine.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+        self.archive = ArchiveManager(self.db)
+        self._cache = {}
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the item cost table and the indexes the report relies on."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS menu_item_costs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                menu_item_id INTEGER NOT NULL,
+                unit_cost REAL NOT NULL,
+                source TEXT CHECK(source IN ('manual', 'expense')) DEFAULT 'manual',
+                expense_id INTEGER,
+                effective_from TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (menu_item_id) REFERENCES menu_items (id) ON DELETE CASCADE,
+                FOREIGN KEY (expense_id) REFERENCES expenses (id) ON DELETE SET NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_menu_item_costs_item
+            ON menu_item_costs(menu_item_id, effective_from)
+        """)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales(created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)')
+
+    @staticmethod
+    def add_change_counter(cursor):
+        """Count changes to everything the report is computed from."""
+        for table, columns in REPORT_INPUTS.items():
+            ChangeCounters.watch(cursor, COUNTER, table, columns)
+
+    @staticmethod
+    def record_item_cost(cursor, menu_item_id, unit_cost, source="manual", expense_id=None):
+        """Record a new unit cost for a menu item.
+
+        Costs are appended rather than overwritten so that reports over past
+        periods keep using the cost that applied at the time.
+        """
+        cursor.execute("""
+            INSERT INTO menu_item_costs (
+                menu_item_id, unit_cost, source, expense_id, effective_from
+            ) VALUES (?, ?, ?, ?, DATETIME('now', 'localtime'))
+        """, (menu_item_id, unit_cost, source, expense_id))
+
+    @classmethod
+    def record_purchase_cost(cls, cursor, item_name, category, unit_cost, expense_id=None):
+        """Attach a stock purchase cost to the menu items it is sold as.
+
+        Args:
+            cursor: Cursor inside the purchase transaction
+            item_name: Stock item name, matched against menu_items.name
+            category: Menu category the item is sold under ('Bar', 'Cigarette')
+            unit_cost: Cost per unit the menu item is sold in (ML, piece)
+            expense_id: Expense row the cost came from
+        """
+        cursor.execute("""
+            SELECT mi.id
+            FROM menu_items mi
+            JOIN menu_categories mc ON mi.category_id = mc.id
+            WHERE mi.name = ? AND mc.name = ?
+        """, (item_name, category))
+
+        for (menu_item_id,) in cursor.fetchall():
+            cls.record_item_cost(cursor, menu_item_id, unit_cost, "expense", expense_id)
+
+    def invalidate(self):
+        """Drop all cached reports."""
+        self._cache.clear()
+
+    def get_fingerprint(self, cursor):
+        """Return a marker that changes whenever report inputs change.
+
+        Triggers bump the counter on new, edited or archived sales and sale
+        lines, new costs, and menu item name, category or price edits.
+        """
+        return ChangeCounters.version(cursor, COUNTER)
+
+    def analyze(self, start_date, end_date=None):
+        """Classify every menu item over a period.
+
+        Args:
+            start_date: First day of the period ('YYYY-MM-DD'), or None for all history
+            end_date: Last day of the period ('YYYY-MM-DD'), defaults to today
+
+        Returns:
+            dict: 'items' (one dict per menu item), 'popularity_threshold',
+            'margin_threshold' and period totals
+        """
+        end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+        start_date = start_date or '0000-01-01'
+
+        conn = None
+        try:
+            conn = self.archive.connect(start_date, end_date)
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            key = (start_date, end_date)
+            fingerprint = self.get_fingerprint(cursor)
+            cached = self._cache.get(key)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+            # One aggregated pass over the sales in range; created_at is compared
+            # as text so idx_sales_created_at can be used for the range scan.
+            cursor.execute("""
+                WITH sold AS (
+                    SELECT
+                        si.menu_item_id,
+                        SUM(si.quantity) as quantity,
+                        SUM(si.total_price) as revenue
+                    FROM sales s
+                    JOIN sale_items si ON si.sale_id = s.id
+                    WHERE s.created_at >= ? AND s.created_at < DATE(?, '+1 day')
+                    GROUP BY si.menu_item_id
+                )
+                SELECT
+                    m.id,
+                    m.name,
+                    COALESCE(mc.name, 'Other') as category,
+                    m.price,
+                    COALESCE(sold.quantity, 0),
+                    COALESCE(sold.revenue, 0),
+                    (
+                        SELECT c.unit_cost
+                        FROM menu_item_costs c
+                        WHERE c.menu_item_id = m.id
+                          AND c.effective_from < DATE(?, '+1 day')
+                        ORDER BY c.effective_from DESC, c.id DESC
+                        LIMIT 1
+                    ) as unit_cost
+                FROM menu_items m
+                LEFT JOIN menu_categories mc ON m.category_id = mc.id
+                LEFT JOIN sold ON sold.menu_item_id = m.id
+                ORDER BY m.name
+            """, (start_date, end_date, end_date))
+
+            report = self.classify(cursor.fetchall())
+            report["start_date"] = start_date
+            report["end_date"] = end_date
+
+            self._cache[key] = (fingerprint, report)
+            return report
+
+        except Exception as e:
+            logging.error(f"Error running menu engineering report: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def classify(rows):
+        """Apply the popularity x margin matrix to aggregated item rows."""
+        items = []
+        total_quantity = 0
+        total_margin = 0.0
+
+        for item_id, name, category, price, quantity, revenue, unit_cost in rows:
+            # Realized price includes any per-line price changes over the period
+            avg_price = revenue / quantity if quantity else price
+            cost = unit_cost or 0.0
+            unit_margin = avg_price - cost
+            item_margin = unit_margin * quantity
+
+            total_quantity += quantity
+            total_margin += item_margin
+
+            items.append({
+                "id": item_id,
+                "name": name,
+                "category": category,
+                "quantity": quantity,
+                "revenue": revenue,
+                "avg_price": avg_price,
+                "unit_cost": cost,
+                "has_cost": unit_cost is not None,
+                "unit_margin": unit_margin,
+                "total_margin": item_margin
+            })
+
+        item_count = len(items)
+        popularity_threshold = (
+            POPULARITY_FACTOR / item_count if item_count else 0.0
+        )
+        margin_threshold = total_margin / total_quantity if total_quantity else 0.0
+
+        for item in items:
+            item["mix_share"] = item["quantity"] / total_quantity if total_quantity else 0.0
+            popular = total_quantity > 0 and item["mix_share"] >= popularity_threshold
+            profitable = item["unit_margin"] >= margin_threshold
+
+            if popular and profitable:
+                item["classification"] = "star"
+            elif popular:
+                item["classification"] = "plowhorse"
+            elif profitable:
+                item["classification"] = "puzzle"
+            else:
+                item["classification"] = "dog"
+
+        return {
+            "items": items,
+            "total_quantity": total_quantity,
+            "total_margin": total_margin,
+            "popularity_threshold": popularity_threshold,
+            "margin_threshold": margin_threshold
+        }
@@ -0,0 +1,425 @@
+"""
+Effective-dated menu prices for the Cafe Management System.
+Every price a menu item has had or will have is kept with the time it applies
+from (and optionally until), so scheduled changes such as happy hours or a new
+season's prices take effect on their own. menu_items.price is kept as a cache
+of the price in effect now, which is what billing reads.
+"""
+
+import bisect
+import logging
+from datetime import datetime, timedelta
+
+import migrations
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Price of menu item `item` at time `at`: the latest-starting entry that has
+# started and not yet ended (a temporary price falls back to the one before it)
+PRICE_AT = """
+    SELECT p.price FROM menu_item_prices p
+    WHERE p.menu_item_id = {item}
+      AND p.effective_from <= {at}
+      AND (p.effective_until IS NULL OR p.effective_until > {at})
+    ORDER BY p.effective_from DESC, p.id DESC
+    LIMIT 1
+"""
+
+
+class MenuPrices:
+    """Records price history and keeps the current-price cache in sync."""
+
+    _next_change = None     # When the cache next needs syncing; None = now
+
+    def __init__(self, db=None):
+        """Initialize the price book.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+        self.archive = ArchiveManager(self.db)
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the price history, the live price view and the triggers."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS menu_item_prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                menu_item_id INTEGER NOT NULL,
+                price REAL NOT NULL CHECK(price > 0),
+                effective_from TIMESTAMP NOT NULL,
+                effective_until TIMESTAMP,      -- NULL for a lasting change
+                note TEXT,
+                created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+                FOREIGN KEY (menu_item_id) REFERENCES menu_items (id) ON DELETE CASCADE,
+                CHECK (effective_until IS NULL OR effective_until > effective_from)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_menu_item_prices_item
+            ON menu_item_prices(menu_item_id, effective_from)
+        """)
+
+        cursor.execute(f"""
+            CREATE VIEW IF NOT EXISTS menu_current_prices AS
+            SELECT m.id as menu_item_id,
+                   ({PRICE_AT.format(item="m.id", at="DATETIME('now', 'localtime')")}) as price
+            FROM menu_items m
+        """)
+
+        # Items added by any screen or import start with their entered price
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS menu_price_item_added
+            AFTER INSERT ON menu_items
+            BEGIN
+                INSERT INTO menu_item_prices (menu_item_id, price, effective_from, note)
+                VALUES (NEW.id, NEW.price, DATETIME('now', 'localtime'), 'Added');
+            END
+        """)
+
+        # A direct edit of the cached price (e.g. a bulk import) becomes a new
+        # entry; syncing the cache to the price in effect does not
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS menu_price_item_edited
+            AFTER UPDATE OF price ON menu_items
+            WHEN NEW.price IS NOT OLD.price
+             AND NEW.price IS NOT ({PRICE_AT.format(item="NEW.id", at="DATETIME('now', 'localtime')")})
+            BEGIN
+                INSERT INTO menu_item_prices (menu_item_id, price, effective_from, note)
+                VALUES (NEW.id, NEW.price, DATETIME('now', 'localtime'), 'Edited');
+            END
+        """)
+
+        # Existing items: their current price applies from their first sale
+        cursor.execute("""
+            INSERT INTO menu_item_prices (menu_item_id, price, effective_from, note)
+            SELECT m.id, m.price,
+                   COALESCE((
+                       SELECT MIN(s.created_at)
+                       FROM sale_items si
+                       JOIN sales s ON s.id = si.sale_id
+                       WHERE si.menu_item_id = m.id
+                   ), DATETIME('now', 'localtime')),
+                   'Opening price'
+            FROM menu_items m
+            WHERE NOT EXISTS (
+                SELECT 1 FROM menu_item_prices p WHERE p.menu_item_id = m.id
+            )
+        """)
+
+    @staticmethod
+    def _timestamp(value):
+        return value.strftime(TIMESTAMP_FORMAT) if isinstance(value, datetime) else value
+
+    @classmethod
+    def set_price(cls, cursor, menu_item_id, price, effective_from=None,
+                  effective_until=None, note=None):
+        """Add a price entry and bring the item's cached price up to date.
+
+        Args:
+            cursor: Cursor inside the caller's transaction
+            menu_item_id: Menu item to price
+            price: New price
+            effective_from: When the price starts (datetime or timestamp), defaults to now
+            effective_until: When a temporary price ends, or None to keep it
+
+        Returns:
+            int: Id of the new price entry
+        """
+        if price <= 0:
+            raise ValueError("Price must be greater than zero")
+        now = datetime.now()
+        effective_from = cls._timestamp(effective_from or now)
+        effective_until = cls._timestamp(effective_until)
+        if effective_until and effective_until <= effective_from:
+            raise ValueError("A price must end after it starts")
+
+        cursor.execute("""
+            INSERT INTO menu_item_prices (
+                menu_item_id, price, effective_from, effective_until, note
+            ) VALUES (?, ?, ?, ?, ?)
+        """, (menu_item_id, price, effective_from, effective_until, note))
+        price_id = cursor.lastrowid
+
+        cls.sync_cache(cursor, [menu_item_id])
+        cls._next_change = None
+        return price_id
+
+    @staticmethod
+    def sync_cache(cursor, menu_item_ids=None):
+        """Copy the price in effect now into menu_items.price.
+
+        Uses SQLite's clock, which is fixed for the whole statement, so the
+        edit trigger sees the same "now" and does not record the sync.
+
+        Returns:
+            int: Number of items whose price changed
+        """
+        where = ""
+        if menu_item_ids:
+            where = f"AND m.id IN ({', '.join(str(int(i)) for i in menu_item_ids)})"
+
+        cursor.execute(f"""
+            WITH current AS (
+                SELECT m.id, ({PRICE_AT.format(item="m.id", at="DATETIME('now', 'localtime')")}) as price
+                FROM menu_items m
+                WHERE 1 = 1 {where}
+            )
+            UPDATE menu_items
+            SET price = current.price
+            FROM current
+            WHERE current.id = menu_items.id
+              AND current.price IS NOT NULL
+              AND current.price != menu_items.price
+        """)
+        return cursor.rowcount
+
+    @staticmethod
+    def next_change(cursor):
+        """Return when the next scheduled price starts or ends, or None."""
+        cursor.execute("""
+            SELECT MIN(t) FROM (
+                SELECT MIN(effective_from) as t FROM menu_item_prices
+                WHERE effective_from > DATETIME('now', 'localtime')
+                UNION ALL
+                SELECT MIN(effective_until) FROM menu_item_prices
+                WHERE effective_until > DATETIME('now', 'localtime')
+            )
+        """)
+        value = cursor.fetchone()[0]
+        return datetime.strptime(value, TIMESTAMP_FORMAT) if value else None
+
+    def sync(self):
+        """Apply any scheduled price changes that have come due.
+
+        Does nothing until the next scheduled start or end is reached.
+
+        Returns:
+            datetime: When the next scheduled change is due, or None
+        """
+        cls = type(self)
+        if cls._next_change is not None and datetime.now() < cls._next_change:
+            return None if cls._next_change == datetime.max else cls._next_change
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN IMMEDIATE")
+            changed = self.sync_cache(cursor)
+            next_change = self.next_change(cursor)
+            conn.commit()
+
+            if changed:
+                logging.info(f"Applied scheduled prices to {changed} menu items")
+            # A far-off sentinel when nothing is scheduled, so idle syncs stay free
+            cls._next_change = next_change or datetime.max
+            return next_change
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def schedule(self, menu_item_id, price, effective_from=None, effective_until=None, note=None):
+        """Add a price entry for one item in its own transaction."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN IMMEDIATE")
+            price_id = self.set_price(cursor, menu_item_id, price, effective_from, effective_until, note)
+            conn.commit()
+            return price_id
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def cancel(self, price_id):
+        """Remove a price entry that has not started yet.
+
+        Raises:
+            ValueError: If the entry has already taken effect
+        """
+        now = datetime.now()
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                DELETE FROM menu_item_prices
+                WHERE id = ? AND effective_from > ?
+            """, (price_id, now.strftime(TIMESTAMP_FORMAT)))
+            if not cursor.rowcount:
+                raise ValueError("Only prices that have not started can be cancelled")
+            conn.commit()
+            type(self)._next_change = None
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def get_history(self, menu_item_id):
+        """Return an item's price entries, latest start first.
+
+        Returns:
+            list: (id, price, effective_from, effective_until, note)
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT id, price, effective_from, effective_until, note
+                FROM menu_item_prices
+                WHERE menu_item_id = ?
+                ORDER BY effective_from DESC, id DESC
+            """, (menu_item_id,))
+            return cursor.fetchall()
+
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def price_timeline(entries, start, end):
+        """Work out which price applied when over a period.
+
+        Args:
+            entries: (id, price, effective_from, effective_until) rows
+            start: Period start timestamp
+            end: Period end timestamp (exclusive)
+
+        Returns:
+            list: (from, until, price) spans, with None where no price applied
+        """
+        points = {start, end}
+        for _, _, effective_from, effective_until in entries:
+            for point in (effective_from, effective_until):
+                if point and start < point < end:
+                    points.add(point)
+        points = sorted(points)
+
+        spans = []
+        for span_start, span_end in zip(points, points[1:]):
+            active = [
+                (effective_from, price_id, price)
+                for price_id, price, effective_from, effective_until in entries
+                if effective_from <= span_start and (effective_until is None or effective_until > span_start)
+            ]
+            price = max(active)[2] if active else None
+            if spans and spans[-1][2] == price:
+                spans[-1] = (spans[-1][0], span_end, price)
+            else:
+                spans.append((span_start, span_end, price))
+        return spans
+
+    def get_elasticity(self, menu_item_id, start_date, end_date):
+        """Compare demand at each price an item had over a period.
+
+        Demand is measured as quantity sold per hour the price was in effect.
+        Elasticity between neighbouring price levels is the arc elasticity
+        (% change in demand / % change in price, both against the midpoint).
+
+        Args:
+            start_date: First day ('YYYY-MM-DD')
+            end_date: Last day ('YYYY-MM-DD')
+
+        Returns:
+            dict: 'levels' (price, hours, quantity, revenue, per_hour), cheapest
+            first, and 'elasticity' (low price, high price, elasticity) pairs
+        """
+        start = f"{start_date} 00:00:00"
+        end = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime(TIMESTAMP_FORMAT)
+
+        conn = None
+        try:
+            conn = self.archive.connect(start_date, end_date)
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            # Entries that can apply in the period: one range on the item index
+            cursor.execute("""
+                SELECT id, price, effective_from, effective_until
+                FROM menu_item_prices
+                WHERE menu_item_id = ? AND effective_from < ?
+                ORDER BY effective_from
+            """, (menu_item_id, end))
+            spans = [
+                span for span in self.price_timeline(cursor.fetchall(), start, end)
+                if span[2] is not None
+            ]
+
+            cursor.execute("""
+                SELECT s.created_at, si.quantity, si.total_price
+                FROM sales s
+                JOIN sale_items si ON si.sale_id = s.id
+                WHERE s.created_at >= ? AND s.created_at < ?
+                  AND si.menu_item_id = ?
+            """, (start, end, menu_item_id))
+            sales = cursor.fetchall()
+
+        finally:
+            if conn:
+                conn.close()
+
+        levels = {}
+        for span_start, span_end, price in spans:
+            hours = (datetime.strptime(span_end, TIMESTAMP_FORMAT)
+                     - datetime.strptime(span_start, TIMESTAMP_FORMAT)).total_seconds() / 3600
+            level = levels.setdefault(price, [0.0, 0, 0.0])
+            level[0] += hours
+
+        span_starts = [span[0] for span in spans]
+        for created_at, quantity, total_price in sales:
+            index = bisect.bisect_right(span_starts, created_at) - 1
+            if index < 0 or created_at >= spans[index][1]:
+                continue
+            level = levels[spans[index][2]]
+            level[1] += quantity
+            level[2] += total_price
+
+        result = [
+            {
+                "price": price,
+                "hours": hours,
+                "quantity": quantity,
+                "revenue": revenue,
+                "per_hour": quantity / hours if hours else 0.0
+            }
+            for price, (hours, quantity, revenue) in sorted(levels.items())
+        ]
+
+        elasticity = []
+        for low, high in zip(result, result[1:]):
+            demand_change = high["per_hour"] - low["per_hour"]
+            demand_mid = (high["per_hour"] + low["per_hour"]) / 2
+            price_change = (high["price"] - low["price"]) / ((high["price"] + low["price"]) / 2)
+            if demand_mid:
+                elasticity.append((low["price"], high["price"], demand_change / demand_mid / price_change))
+
+        return {"levels": result, "elasticity": elasticity}
@@ -0,0 +1,481 @@
+"""
+Order history for the Cafe Management System.
+Every bill session is also kept as an append-only list of order events:
+opened, item added, item removed, discount applied, paid and voided.
+Open bills still live in temporary_bills; the events record what happened to
+them, including items ordered and then taken off, and stay after payment.
+Triggers write the events, so every code path that changes a bill is
+covered. A session's bill can be rebuilt in memory by replaying its events,
+and table turns and voids are read with indexed range queries.
+"""
+
+import logging
+from datetime import datetime
+
+import migrations
+from database import DatabaseManager
+
+EVENT_KINDS = ("opened", "item_added", "item_removed", "discount_applied", "paid", "voided")
+
+# The newest session of a table: the open one, or the one just closed
+# by the statement that fired the trigger
+LATEST_SESSION = """
+    (SELECT id FROM bill_sessions
+     WHERE table_number = {row}.table_number
+     ORDER BY rowid DESC LIMIT 1)
+"""
+
+# Bill changes made while a session is being paid are covered by the paid event
+NOT_PAYING = "NOT EXISTS (SELECT 1 FROM sales WHERE session_id = b.id)"
+
+# One row per session opened in [start, end]: the opened events are found
+# through idx_order_events_kind, the rest of each session through
+# idx_order_events_session
+SESSIONS = """
+    SELECT
+        o.session_id,
+        o.table_number,
+        o.created_at AS opened_at,
+        MIN(CASE WHEN e.kind = 'item_added' THEN e.created_at END) AS first_order_at,
+        MAX(CASE WHEN e.kind IN ('paid', 'voided') THEN e.created_at END) AS closed_at,
+        COALESCE(MAX(CASE WHEN e.kind IN ('paid', 'voided') THEN e.kind END), 'open') AS status,
+        SUM(e.total) AS total,
+        (JULIANDAY(MIN(CASE WHEN e.kind = 'item_added' THEN e.created_at END))
+            - JULIANDAY(o.created_at)) * 1440 AS minutes_to_order,
+        (JULIANDAY(MAX(CASE WHEN e.kind IN ('paid', 'voided') THEN e.created_at END))
+            - JULIANDAY(o.created_at)) * 1440 AS minutes_seated
+    FROM order_events o
+    JOIN order_events e ON e.session_id = o.session_id
+    WHERE o.kind = 'opened'
+      AND o.created_at >= ? AND o.created_at < DATE(?, '+1 day')
+    GROUP BY o.id
+"""
+
+
+class OrderEvents:
+    """Records order events and answers session, table-turn and void questions."""
+
+    def __init__(self, db=None):
+        """Initialize the engine.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the order_events log, its indexes and the triggers that fill it."""
+        kinds = ", ".join(f"'{kind}'" for kind in EVENT_KINDS)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS order_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                table_number INTEGER NOT NULL,
+                kind TEXT NOT NULL CHECK(kind IN ({kinds})),
+                menu_item_id INTEGER,           -- Item events
+                quantity INTEGER,               -- Units added or removed
+                price REAL,                     -- Unit price on the bill
+                discount_type TEXT,             -- discount_applied
+                discount_value REAL,
+                sale_id INTEGER,                -- paid; no key, sales get archived
+                total REAL,                     -- paid: amount charged
+                created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_order_events_session
+            ON order_events(session_id, kind)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_order_events_kind
+            ON order_events(kind, created_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_bill_sessions_table
+            ON bill_sessions(table_number)
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS order_event_opened
+            AFTER INSERT ON bill_sessions
+            BEGIN
+                INSERT INTO order_events (session_id, table_number, kind, created_at)
+                VALUES (NEW.id, NEW.table_number, 'opened', NEW.opened_at);
+            END
+        """)
+        # Opens the session itself when this trigger runs before
+        # bill_session_open; both are replaced by one trigger in merge_session_open
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS order_event_item_added
+            AFTER INSERT ON temporary_bills
+            BEGIN
+                INSERT INTO bill_sessions (id, table_number)
+                SELECT LOWER(HEX(RANDOMBLOB(16))), NEW.table_number
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM bill_sessions
+                    WHERE table_number = NEW.table_number AND closed_at IS NULL
+                );
+                INSERT INTO order_events (
+                    session_id, table_number, kind, menu_item_id, quantity, price
+                )
+                SELECT id, NEW.table_number, 'item_added', NEW.menu_item_id,
+                       NEW.quantity, NEW.price_per_unit
+                FROM bill_sessions
+                WHERE table_number = NEW.table_number AND closed_at IS NULL;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS order_event_quantity_changed
+            AFTER UPDATE OF quantity ON temporary_bills
+            WHEN NEW.quantity <> OLD.quantity
+            BEGIN
+                INSERT INTO order_events (
+                    session_id, table_number, kind, menu_item_id, quantity, price
+                )
+                SELECT b.id, NEW.table_number,
+                       CASE WHEN NEW.quantity > OLD.quantity THEN 'item_added' ELSE 'item_removed' END,
+                       NEW.menu_item_id, ABS(NEW.quantity - OLD.quantity), NEW.price_per_unit
+                FROM {LATEST_SESSION.format(row="NEW")} AS b
+                WHERE {NOT_PAYING};
+            END
+        """)
+        # Emptying a bill without paying it voids the session
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS order_event_item_deleted
+            AFTER DELETE ON temporary_bills
+            BEGIN
+                INSERT INTO order_events (
+                    session_id, table_number, kind, menu_item_id, quantity, price
+                )
+                SELECT b.id, OLD.table_number, 'item_removed',
+                       OLD.menu_item_id, OLD.quantity, OLD.price_per_unit
+                FROM {LATEST_SESSION.format(row="OLD")} AS b
+                WHERE OLD.quantity > 0 AND {NOT_PAYING};
+
+                INSERT INTO order_events (session_id, table_number, kind)
+                SELECT b.id, OLD.table_number, 'voided'
+                FROM {LATEST_SESSION.format(row="OLD")} AS b
+                WHERE {NOT_PAYING}
+                  AND NOT EXISTS (SELECT 1 FROM temporary_bills WHERE table_number = OLD.table_number);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS order_event_paid
+            AFTER INSERT ON sales
+            WHEN NEW.session_id IS NOT NULL
+            BEGIN
+                INSERT INTO order_events (
+                    session_id, table_number, kind, discount_type, discount_value
+                )
+                SELECT NEW.session_id, NEW.table_number, 'discount_applied',
+                       NEW.discount_type, NEW.discount_value
+                WHERE NEW.discount_value > 0;
+
+                INSERT INTO order_events (session_id, table_number, kind, sale_id, total)
+                VALUES (NEW.session_id, NEW.table_number, 'paid', NEW.id, NEW.total_amount);
+            END
+        """)
+
+        # Bills open now start their history with what is on them
+        cursor.execute("""
+            INSERT INTO order_events (session_id, table_number, kind, created_at)
+            SELECT id, table_number, 'opened', opened_at
+            FROM bill_sessions
+            WHERE closed_at IS NULL
+              AND id NOT IN (SELECT session_id FROM order_events)
+        """)
+        cursor.execute("""
+            INSERT INTO order_events (
+                session_id, table_number, kind, menu_item_id, quantity, price, created_at
+            )
+            SELECT b.id, b.table_number, 'item_added', tb.menu_item_id,
+                   tb.quantity, tb.price_per_unit, b.opened_at
+            FROM bill_sessions b
+            JOIN temporary_bills tb ON tb.table_number = b.table_number
+            WHERE b.closed_at IS NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM order_events
+                  WHERE session_id = b.id AND kind = 'item_added'
+              )
+            ORDER BY tb.id
+        """)
+
+    @staticmethod
+    def merge_session_open(cursor):
+        """Open the session and record the added item in one trigger.
+
+        SQLite runs a table's triggers newest first, so order_event_item_added
+        ran before bill_session_open and had to be able to open sessions too.
+        One trigger doing both in order leaves a single place sessions are
+        opened from.
+        """
+        cursor.execute("DROP TRIGGER IF EXISTS order_event_item_added")
+        cursor.execute("DROP TRIGGER IF EXISTS bill_session_open")
+        cursor.execute("""
+            CREATE TRIGGER bill_session_open
+            AFTER INSERT ON temporary_bills
+            BEGIN
+                INSERT INTO bill_sessions (id, table_number)
+                SELECT LOWER(HEX(RANDOMBLOB(16))), NEW.table_number
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM bill_sessions
+                    WHERE table_number = NEW.table_number AND closed_at IS NULL
+                );
+                INSERT INTO order_events (
+                    session_id, table_number, kind, menu_item_id, quantity, price
+                )
+                SELECT id, NEW.table_number, 'item_added', NEW.menu_item_id,
+                       NEW.quantity, NEW.price_per_unit
+                FROM bill_sessions
+                WHERE table_number = NEW.table_number AND closed_at IS NULL;
+            END
+        """)
+
+    @staticmethod
+    def carry_over(cursor, table_number):
+        """Record the items left after a part payment as the new session's order."""
+        cursor.execute("""
+            INSERT INTO order_events (
+                session_id, table_number, kind, menu_item_id, quantity, price
+            )
+            SELECT b.id, tb.table_number, 'item_added', tb.menu_item_id,
+                   tb.quantity, tb.price_per_unit
+            FROM temporary_bills tb
+            JOIN bill_sessions b
+              ON b.table_number = tb.table_number AND b.closed_at IS NULL
+            WHERE tb.table_number = ?
+            ORDER BY tb.id
+        """, (table_number,))
+
+    @staticmethod
+    def project(events):
+        """Replay a session's events, oldest first, into its bill.
+
+        Args:
+            events: dicts with the order_events columns, plus 'name'
+
+        Returns:
+            dict: session_id, table_number, status ('open', 'paid' or
+            'voided'), opened_at, first_order_at, closed_at, items and
+            removed ({menu_item_id: {'name', 'price', 'quantity'}}, items in
+            the shape BillService returns), discount_type, discount_value,
+            sale_id and total
+        """
+        bill = {
+            "session_id": None,
+            "table_number": None,
+            "status": "open",
+            "opened_at": None,
+            "first_order_at": None,
+            "closed_at": None,
+            "items": {},
+            "removed": {},
+            "discount_type": None,
+            "discount_value": 0,
+            "sale_id": None,
+            "total": None
+        }
+        for event in events:
+            kind = event["kind"]
+            bill["session_id"] = event["session_id"]
+            bill["table_number"] = event["table_number"]
+
+            if kind == "opened":
+                bill["opened_at"] = event["created_at"]
+            elif kind == "item_added":
+                bill["first_order_at"] = bill["first_order_at"] or event["created_at"]
+                line = bill["items"].setdefault(
+                    event["menu_item_id"],
+                    {"name": event["name"], "price": event["price"], "quantity": 0}
+                )
+                line["quantity"] += event["quantity"]
+            elif kind == "item_removed":
+                line = bill["items"].get(event["menu_item_id"])
+                if line:
+                    line["quantity"] -= event["quantity"]
+                    if line["quantity"] <= 0:
+                        del bill["items"][event["menu_item_id"]]
+                removed = bill["removed"].setdefault(
+                    event["menu_item_id"],
+                    {"name": event["name"], "price": event["price"], "quantity": 0}
+                )
+                removed["quantity"] += event["quantity"]
+            elif kind == "discount_applied":
+                bill["discount_type"] = event["discount_type"]
+                bill["discount_value"] = event["discount_value"]
+            elif kind in ("paid", "voided"):
+                bill["status"] = kind
+                bill["closed_at"] = event["created_at"]
+                if kind == "paid":
+                    bill["sale_id"] = event["sale_id"]
+                    bill["total"] = event["total"]
+        return bill
+
+    @staticmethod
+    def _read_events(cursor, session_id):
+        """Return a session's events oldest first, with item names."""
+        cursor.execute("""
+            SELECT e.*, m.name
+            FROM order_events e
+            LEFT JOIN menu_items m ON e.menu_item_id = m.id
+            WHERE e.session_id = ?
+            ORDER BY e.id
+        """, (session_id,))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_session(self, session_id):
+        """Return a bill session rebuilt from its events; see project."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            return self.project(self._read_events(conn.cursor(), session_id))
+        finally:
+            if conn:
+                conn.close()
+
+    def get_open_bill(self, table_number):
+        """Return a table's open session rebuilt from its events.
+
+        Returns:
+            dict: See project, or None when the table has no open bill
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id FROM bill_sessions
+                WHERE table_number = ? AND closed_at IS NULL
+            """, (table_number,))
+            row = cursor.fetchone()
+            return self.project(self._read_events(cursor, row[0])) if row else None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_sessions(self, start_date, end_date=None):
+        """Return the bill sessions opened in a period, oldest first.
+
+        Args:
+            start_date: First day of the period ('YYYY-MM-DD')
+            end_date: Last day of the period, defaults to today
+
+        Returns:
+            list: dicts with session_id, table_number, opened_at,
+            first_order_at, closed_at, status, total, minutes_to_order
+            and minutes_seated (None while the session is open)
+        """
+        end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM ({SESSIONS}) ORDER BY opened_at", (start_date, end_date))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logging.error(f"Error reading bill sessions: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def table_turns(self, start_date, end_date=None):
+        """Summarize how each table was used over a period.
+
+        Args:
+            start_date: First day of the period ('YYYY-MM-DD')
+            end_date: Last day of the period, defaults to today
+
+        Returns:
+            list: dicts per table with sessions, paid, voided, revenue,
+            avg_minutes_seated and avg_minutes_to_order, by table number
+        """
+        end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT
+                    table_number,
+                    COUNT(*) AS sessions,
+                    SUM(status = 'paid') AS paid,
+                    SUM(status = 'voided') AS voided,
+                    COALESCE(SUM(total), 0) AS revenue,
+                    AVG(CASE WHEN status = 'paid' THEN minutes_seated END) AS avg_minutes_seated,
+                    AVG(minutes_to_order) AS avg_minutes_to_order
+                FROM ({SESSIONS})
+                GROUP BY table_number
+                ORDER BY table_number
+            """, (start_date, end_date))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logging.error(f"Error reading table turns: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def voids(self, start_date, end_date=None):
+        """Summarize items taken off bills and bills voided over a period.
+
+        Args:
+            start_date: First day of the period ('YYYY-MM-DD')
+            end_date: Last day of the period, defaults to today
+
+        Returns:
+            dict: 'items' (menu_item_id, name, quantity, value and bills per
+            removed item, highest value first), 'quantity', 'value' and
+            'voided_bills'
+        """
+        end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    e.menu_item_id,
+                    COALESCE(m.name, 'Deleted item') AS name,
+                    SUM(e.quantity) AS quantity,
+                    SUM(e.quantity * e.price) AS value,
+                    COUNT(DISTINCT e.session_id) AS bills
+                FROM order_events e
+                LEFT JOIN menu_items m ON e.menu_item_id = m.id
+                WHERE e.kind = 'item_removed'
+                  AND e.created_at >= ? AND e.created_at < DATE(?, '+1 day')
+                GROUP BY e.menu_item_id
+                ORDER BY value DESC
+            """, (start_date, end_date))
+            columns = [column[0] for column in cursor.description]
+            items = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+            cursor.execute("""
+                SELECT COUNT(*) FROM order_events
+                WHERE kind = 'voided'
+                  AND created_at >= ? AND created_at < DATE(?, '+1 day')
+            """, (start_date, end_date))
+            return {
+                "items": items,
+                "quantity": sum(item["quantity"] for item in items),
+                "value": sum(item["value"] for item in items),
+                "voided_bills": cursor.fetchone()[0]
+            }
+
+        except Exception as e:
+            logging.error(f"Error reading voids: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
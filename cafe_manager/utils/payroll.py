@@ -0,0 +1,252 @@
+"""
+Payroll for the Cafe Management System.
+Works out what every active staff member is owed for a month, pays them all
+in one transaction, and serves payment history and salary cost by period.
+"""
+
+import calendar
+import logging
+from datetime import date, datetime
+
+import migrations
+from database import DatabaseManager
+
+SALARY_EXPENSE_CATEGORY = "Management"
+SALARY_EXPENSE_TITLE = "Salary Payment"
+
+
+def month_bounds(period):
+    """Return the first and last day of a 'YYYY-MM' period."""
+    year, month = (int(part) for part in period.split("-"))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+class PayrollManager:
+    """Computes salary dues and records payroll runs."""
+
+    def __init__(self, db=None):
+        """Initialize the payroll manager.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create payroll runs and link payments to the month they cover."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS payroll_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                period TEXT NOT NULL,           -- 'YYYY-MM'
+                staff_count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+            )
+        """)
+
+        cursor.execute("PRAGMA table_info(staff_payments)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if "period" not in columns:
+            cursor.execute("ALTER TABLE staff_payments ADD COLUMN period TEXT")
+            # Payments made before runs existed cover the month they were paid in
+            cursor.execute("""
+                UPDATE staff_payments
+                SET period = STRFTIME('%Y-%m', payment_date)
+                WHERE period IS NULL
+            """)
+        if "run_id" not in columns:
+            cursor.execute("ALTER TABLE staff_payments ADD COLUMN run_id INTEGER REFERENCES payroll_runs(id)")
+
+        # Dues and history per staff member and month; salary cost by date
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_staff_payments_staff_period
+            ON staff_payments(staff_id, period, amount)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_staff_payments_date
+            ON staff_payments(payment_date, amount)
+        """)
+
+    @staticmethod
+    def compute_dues(cursor, period, staff_ids=None):
+        """Work out what each active staff member is owed for a month.
+
+        Staff who joined during the month are paid for the days they worked.
+        Anything already paid for the month is deducted.
+
+        Returns:
+            list: dicts with staff_id, name, title, salary, days, gross, paid, due
+        """
+        first, last = month_bounds(period)
+        days_in_month = last.day
+
+        where = "s.is_active = 1 AND s.join_date <= ?"
+        params = [period, last.isoformat()]
+        if staff_ids:
+            where += f" AND s.id IN ({', '.join('?' for _ in staff_ids)})"
+            params += list(staff_ids)
+
+        cursor.execute(f"""
+            SELECT
+                s.id, s.name, s.title, s.salary, s.join_date,
+                COALESCE((
+                    SELECT SUM(p.amount) FROM staff_payments p
+                    WHERE p.staff_id = s.id AND p.period = ?
+                ), 0)
+            FROM staff s
+            WHERE {where}
+            ORDER BY s.name
+        """, params)
+
+        dues = []
+        for staff_id, name, title, salary, join_date, paid in cursor.fetchall():
+            start = max(first, datetime.strptime(join_date[:10], '%Y-%m-%d').date())
+            days = (last - start).days + 1
+            gross = round(salary * days / days_in_month, 2)
+            dues.append({
+                "staff_id": staff_id,
+                "name": name,
+                "title": title,
+                "salary": salary,
+                "days": days,
+                "gross": gross,
+                "paid": paid,
+                "due": max(round(gross - paid, 2), 0)
+            })
+        return dues
+
+    def preview(self, period, staff_ids=None):
+        """Return the dues a payroll run for the month would pay."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            return self.compute_dues(conn.cursor(), period, staff_ids)
+
+        finally:
+            if conn:
+                conn.close()
+
+    def run(self, period, staff_ids=None, payment_date=None):
+        """Pay every outstanding due for the month in one transaction.
+
+        Dues are recomputed inside the transaction, so running the same month
+        twice never pays anyone twice.
+
+        Args:
+            period: Month to pay ('YYYY-MM')
+            staff_ids: Optional subset of staff to pay
+            payment_date: Date recorded on payments and expenses, defaults to today
+
+        Returns:
+            dict: 'run_id' (None when nothing was due), 'payments' (paid dues), 'total'
+        """
+        payment_date = payment_date or date.today().isoformat()
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN IMMEDIATE")
+
+            payments = [d for d in self.compute_dues(cursor, period, staff_ids) if d["due"] > 0]
+            if not payments:
+                conn.rollback()
+                return {"run_id": None, "payments": [], "total": 0.0}
+
+            total = round(sum(d["due"] for d in payments), 2)
+            cursor.execute("""
+                INSERT INTO payroll_runs (period, staff_count, total)
+                VALUES (?, ?, ?)
+            """, (period, len(payments), total))
+            run_id = cursor.lastrowid
+
+            cursor.executemany("""
+                INSERT INTO staff_payments (staff_id, amount, payment_date, period, run_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(d["staff_id"], d["due"], payment_date, period, run_id) for d in payments])
+
+            cursor.execute(f"""
+                UPDATE staff
+                SET last_paid_date = ?
+                WHERE id IN ({', '.join('?' for _ in payments)})
+            """, [payment_date] + [d["staff_id"] for d in payments])
+
+            # Salaries stay visible in the expense ledger and daily totals
+            cursor.executemany("""
+                INSERT INTO expenses (
+                    name, title, category, quantity,
+                    price_per_unit, total_price, expense_date
+                ) VALUES (?, ?, ?, 1, ?, ?, ?)
+            """, [
+                (d["name"], SALARY_EXPENSE_TITLE, SALARY_EXPENSE_CATEGORY, d["due"], d["due"], payment_date)
+                for d in payments
+            ])
+
+            conn.commit()
+            logging.info(f"Payroll run {run_id} for {period}: {len(payments)} payments, {total:.2f}")
+            return {"run_id": run_id, "payments": payments, "total": total}
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Payroll run for {period} failed: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def get_history(self, staff_id=None, limit=120):
+        """Return payments per staff member and month, newest month first.
+
+        Returns:
+            list: (staff_id, name, period, payment_count, amount, last_payment_date)
+        """
+        where = ""
+        params = []
+        if staff_id:
+            where = "WHERE p.staff_id = ?"
+            params.append(staff_id)
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT p.staff_id, s.name, p.period, COUNT(*), SUM(p.amount), MAX(p.payment_date)
+                FROM staff_payments p
+                JOIN staff s ON s.id = p.staff_id
+                {where}
+                GROUP BY p.staff_id, p.period
+                ORDER BY p.period DESC, s.name
+                LIMIT ?
+            """, params + [limit])
+            return cursor.fetchall()
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_salary_cost(self, start_date, end_date):
+        """Return salaries paid between two dates (inclusive), read from the index."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT COALESCE(SUM(amount), 0)
+                FROM staff_payments
+                WHERE payment_date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            return cursor.fetchone()[0]
+
+        finally:
+            if conn:
+                conn.close()
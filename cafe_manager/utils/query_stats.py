@@ -0,0 +1,300 @@
+"""
+Query timing for the Cafe Management System.
+Connections opened by DatabaseManager.connect() time every statement: how long
+it ran including fetching its rows, how many rows it returned, and which page
+or engine method issued it. Totals are kept per statement and call site in
+windows of QUERY_CONFIG["summary_minutes"]; each window is appended to a
+summary file, and statements slower than QUERY_CONFIG["slow_ms"] go to a
+rolling slow-query log together with their query plan.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+from utils.app_logging import log_event, log_path
+from utils.constants import QUERY_CONFIG
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Frames in these files are the database layer, not the caller
+DB_LAYER = {
+    os.path.join(APP_DIR, "database.py"),
+    os.path.abspath(__file__)
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Collapse whitespace so one statement is counted under one key."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def call_site():
+    """Return the nearest application frame outside the database layer.
+
+    Returns:
+        str: e.g. 'pages/sales.py:SalesPage.load_table_status'
+    """
+    frame = sys._getframe(2)
+    while frame:
+        code = frame.f_code
+        if code.co_filename.startswith(APP_DIR) and code.co_filename not in DB_LAYER:
+            name = getattr(code, "co_qualname", code.co_name)
+            return f"{os.path.relpath(code.co_filename, APP_DIR)}:{name}"
+        frame = frame.f_back
+    return "?"
+
+
+class QueryStats:
+    """Statement timings for this process, shared by every timed connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        """Start a new summary window."""
+        with self._lock:
+            self.started = datetime.now()
+            self.totals = {}        # (site, sql) -> [calls, seconds, max seconds, rows]
+            self.slow = deque(maxlen=QUERY_CONFIG["slow_log_size"])
+            self._plans = {}        # sql -> query plan lines
+
+    def record(self, conn, sql, params, site, seconds, rows):
+        """Add one finished statement to the totals."""
+        with self._lock:
+            total = self.totals.setdefault((site, sql), [0, 0.0, 0.0, 0])
+            total[0] += 1
+            total[1] += seconds
+            total[2] = max(total[2], seconds)
+            total[3] += rows
+
+        ms = seconds * 1000
+        if ms < QUERY_CONFIG["slow_ms"]:
+            return
+        plan = self._plan(conn, sql, params) if QUERY_CONFIG["explain"] else None
+        with self._lock:
+            self.slow.append({
+                "at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "ms": round(ms, 1),
+                "rows": rows,
+                "site": site,
+                "sql": sql,
+                "plan": plan
+            })
+        log_event("slow_query", logging.WARNING, ms=round(ms, 1), rows=rows, site=site, sql=sql[:500])
+
+    def _plan(self, conn, sql, params):
+        """EXPLAIN QUERY PLAN for a statement, once per statement and window."""
+        if sql in self._plans:
+            return self._plans[sql]
+        plan = None
+        if params is not None:
+            try:
+                # A plain cursor, so capturing the plan is not timed itself
+                rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+                plan = [row[3] for row in rows]
+            except sqlite3.Error:
+                pass
+        self._plans[sql] = plan
+        return plan
+
+    def summary(self, limit=20):
+        """Return statements by total time spent, most expensive first."""
+        with self._lock:
+            totals = list(self.totals.items())
+        totals.sort(key=lambda entry: entry[1][1], reverse=True)
+        return [
+            {
+                "site": site,
+                "sql": sql,
+                "calls": calls,
+                "total_ms": round(seconds * 1000, 1),
+                "avg_ms": round(seconds * 1000 / calls, 2),
+                "max_ms": round(longest * 1000, 1),
+                "rows": rows
+            }
+            for (site, sql), (calls, seconds, longest, rows) in totals[:limit]
+        ]
+
+    def dump(self, path=None):
+        """Append the current window to the summary file and start a new one.
+
+        Returns:
+            str: The summary file, or None if nothing ran in the window
+        """
+        path = path or log_path(QUERY_CONFIG["summary_file"])
+        with self._lock:
+            started, slow, empty = self.started, list(self.slow), not self.totals
+        if empty:
+            return None
+        window = {
+            "start": started.strftime('%Y-%m-%d %H:%M:%S'),
+            "end": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "statements": self.summary(limit=None),
+            "slow": slow
+        }
+        self.reset()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(window) + "\n")
+
+        statements = window["statements"]
+        log_event(
+            "query_window",
+            start=window["start"],
+            end=window["end"],
+            statements=sum(s["calls"] for s in statements),
+            total_ms=round(sum(s["total_ms"] for s in statements), 1),
+            slow=len(slow),
+            top_site=statements[0]["site"]
+        )
+        return path
+
+    def start(self):
+        """Write a summary every window on a background thread until stop()."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="query-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the schedule and write the window in progress."""
+        self._stop.set()
+        try:
+            self.dump()
+        except OSError as e:
+            logging.error(f"Could not write query summary: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(QUERY_CONFIG["summary_minutes"] * 60):
+            try:
+                self.dump()
+            except OSError as e:
+                logging.error(f"Could not write query summary: {str(e)}")
+
+
+query_stats = QueryStats()
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to query_stats once its rows are read."""
+
+    _pending = None     # [sql, params, site, seconds, rows] of the open statement
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            query_stats.record(self.connection, *pending)
+
+    def _fetched(self, start, rows, done=False):
+        if self._pending:
+            self._pending[3] += time.perf_counter() - start
+            self._pending[4] += rows
+            if done:
+                self._finish()
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [normalize(sql), parameters, site, time.perf_counter() - start, 0]
+            if self.description is None:
+                # Not a query: nothing left to fetch
+                self._finish()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_stats.record(self.connection, normalize(sql), None, site, time.perf_counter() - start, 0)
+
+    def executescript(self, sql_script):
+        self._finish()
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            query_stats.record(self.connection, normalize(sql_script), None, site, time.perf_counter() - start, 0)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, done=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), done=not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), done=True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, done=True)
+            raise
+        self._fetched(start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those behind conn.execute(), are timed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory=TimedCursor):
+        cursor = super().cursor(factory)
+        self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def close(self):
+        # Statements whose rows were never read to the end count from here
+        for cursor in list(self._cursors):
+            if isinstance(cursor, TimedCursor):
+                cursor._finish()
+        super().close()
@@ -0,0 +1,281 @@
+"""
+Recipes (bills of materials) for the Cafe Management System.
+Maps each menu item to the stock it consumes and deducts a whole bill's stock
+in one batched statement at checkout.
+"""
+
+import logging
+
+import migrations
+from database import DatabaseManager
+from utils.change_counters import ChangeCounters
+
+# Change counter bumped whenever a depletion map input changes
+COUNTER = "recipes"
+
+# Columns the depletion map reads, by table (None = every column)
+MAP_INPUTS = {
+    "menu_item_recipes": None,
+    "menu_items": ["name", "category_id"],
+    "menu_categories": ["name"],
+    "bar_stock": ["item_name", "unit_type", "pieces_per_packet"]
+}
+
+# Categories that deplete the stock item of the same name when no recipe is set
+DEFAULT_DEPLETION = {
+    "Bar": "ML",          # Sold in ML, stocked in ML
+    "Cigarette": "PACKET"  # Sold in pieces, stocked in packets
+}
+
+
+class InsufficientStockError(Exception):
+    """Raised when a bill needs more stock than is available."""
+
+
+class RecipeBook:
+    """Stores recipes and serves the compiled depletion map.
+
+    The depletion map ({menu_item_id: [(stock_item_id, quantity per unit)]})
+    is compiled once and shared by every bill window until recipes, menu
+    items or stock items change.
+    """
+
+    _depletion_map = None
+    _fingerprint = None
+
+    def __init__(self, db=None):
+        """Initialize the recipe book.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the recipe table."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS menu_item_recipes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                menu_item_id INTEGER NOT NULL,
+                stock_item_id INTEGER NOT NULL,
+                quantity REAL NOT NULL CHECK(quantity > 0),  -- In the stock item's unit
+                UNIQUE(menu_item_id, stock_item_id),
+                FOREIGN KEY (menu_item_id) REFERENCES menu_items (id) ON DELETE CASCADE,
+                FOREIGN KEY (stock_item_id) REFERENCES bar_stock (id) ON DELETE CASCADE
+            )
+        """)
+
+    @staticmethod
+    def add_change_counter(cursor):
+        """Count changes to everything the depletion map is compiled from."""
+        for table, columns in MAP_INPUTS.items():
+            ChangeCounters.watch(cursor, COUNTER, table, columns)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the compiled depletion map."""
+        cls._depletion_map = None
+        cls._fingerprint = None
+
+    @staticmethod
+    def get_fingerprint(cursor):
+        """Return a marker that changes whenever the map inputs change.
+
+        Triggers bump the counter on any recipe change, menu item or category
+        renames and recategorisations, and stock item renames or unit changes.
+        """
+        return ChangeCounters.version(cursor, COUNTER)
+
+    @classmethod
+    def get_depletion_map(cls, cursor):
+        """Return the compiled depletion map, rebuilding it only when stale.
+
+        Explicit recipes win. Bar and Cigarette items without a recipe keep
+        depleting the stock item of the same name, and map to None when that
+        stock item is missing.
+        """
+        fingerprint = cls.get_fingerprint(cursor)
+        if cls._depletion_map is not None and fingerprint == cls._fingerprint:
+            return cls._depletion_map
+
+        depletion = {}
+
+        cursor.execute("""
+            SELECT menu_item_id, stock_item_id, quantity
+            FROM menu_item_recipes
+            ORDER BY menu_item_id, stock_item_id
+        """)
+        for menu_item_id, stock_item_id, quantity in cursor.fetchall():
+            depletion.setdefault(menu_item_id, []).append((stock_item_id, quantity))
+
+        placeholders = ", ".join("?" for _ in DEFAULT_DEPLETION)
+        cursor.execute(f"""
+            SELECT
+                mi.id,
+                bs.id,
+                CASE WHEN bs.unit_type = 'PACKET'
+                     THEN 1.0 / COALESCE(bs.pieces_per_packet, 20)
+                     ELSE 1.0 END
+            FROM menu_items mi
+            JOIN menu_categories mc ON mi.category_id = mc.id
+            LEFT JOIN bar_stock bs ON bs.item_name = mi.name AND bs.unit_type = CASE mc.name
+                {" ".join(f"WHEN '{category}' THEN '{unit}'" for category, unit in DEFAULT_DEPLETION.items())}
+            END
+            WHERE mc.name IN ({placeholders})
+              AND mi.id NOT IN (SELECT menu_item_id FROM menu_item_recipes)
+        """, list(DEFAULT_DEPLETION))
+        for menu_item_id, stock_item_id, quantity in cursor.fetchall():
+            depletion[menu_item_id] = [(stock_item_id, quantity)] if stock_item_id else None
+
+        cls._depletion_map = depletion
+        cls._fingerprint = fingerprint
+        return depletion
+
+    def get_recipe(self, menu_item_id):
+        """Return a menu item's recipe.
+
+        Returns:
+            list: (stock_item_id, item_name, unit_type, quantity) tuples
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT r.stock_item_id, bs.item_name, bs.unit_type, r.quantity
+                FROM menu_item_recipes r
+                JOIN bar_stock bs ON bs.id = r.stock_item_id
+                WHERE r.menu_item_id = ?
+                ORDER BY bs.item_name
+            """, (menu_item_id,))
+            return cursor.fetchall()
+
+        finally:
+            if conn:
+                conn.close()
+
+    def set_recipe(self, menu_item_id, components):
+        """Replace a menu item's recipe.
+
+        Args:
+            menu_item_id: Menu item the recipe belongs to
+            components: (stock_item_id, quantity per unit sold) pairs; an empty
+                        list removes the recipe
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN")
+            cursor.execute("DELETE FROM menu_item_recipes WHERE menu_item_id = ?", (menu_item_id,))
+            cursor.executemany("""
+                INSERT INTO menu_item_recipes (menu_item_id, stock_item_id, quantity)
+                VALUES (?, ?, ?)
+            """, [(menu_item_id, stock_item_id, quantity) for stock_item_id, quantity in components])
+            conn.commit()
+
+            self.invalidate()
+            logging.info(f"Saved recipe for menu item {menu_item_id} with {len(components)} components")
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error saving recipe for menu item {menu_item_id}: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    @classmethod
+    def requirements(cls, cursor, bill_items):
+        """Total the stock a bill consumes.
+
+        Args:
+            cursor: Database cursor
+            bill_items: {menu_item_id: {'name': ..., 'quantity': ...}}
+
+        Returns:
+            dict: {stock_item_id: quantity}
+
+        Raises:
+            InsufficientStockError: If a Bar or Cigarette item has no stock item
+        """
+        depletion = cls.get_depletion_map(cursor)
+        needed = {}
+
+        for menu_item_id, item in bill_items.items():
+            if menu_item_id not in depletion:
+                continue
+            components = depletion[menu_item_id]
+            if components is None:
+                raise InsufficientStockError(f"No stock found for {item['name']}")
+            for stock_item_id, per_unit in components:
+                needed[stock_item_id] = needed.get(stock_item_id, 0) + per_unit * item['quantity']
+
+        return needed
+
+    @classmethod
+    def deplete(cls, cursor, bill_items, source="sale", check=True):
+        """Check and deduct all stock for a bill inside the caller's transaction.
+
+        Stock is read in one query, deducted in one UPDATE and logged to
+        stock_history in one INSERT, however many items the bill has.
+
+        Args:
+            check: False deducts even if stock goes negative, for sales that
+                were already taken and paid for
+
+        Returns:
+            dict: {stock_item_id: quantity deducted}
+
+        Raises:
+            InsufficientStockError: If any stock item would go negative
+        """
+        needed = cls.requirements(cursor, bill_items)
+        if not needed:
+            return needed
+
+        values = ", ".join("(?, ?)" for _ in needed)
+        params = [v for pair in needed.items() for v in pair]
+
+        if check:
+            cursor.execute(f"""
+                WITH needs(stock_id, quantity) AS (VALUES {values})
+                SELECT bs.item_name, bs.unit_type, bs.quantity, needs.quantity
+                FROM needs
+                JOIN bar_stock bs ON bs.id = needs.stock_id
+                WHERE bs.quantity < needs.quantity
+            """, params)
+            short = cursor.fetchall()
+            if short:
+                raise InsufficientStockError("\n".join(
+                    f"Insufficient stock for {name}. "
+                    f"Required: {required:.1f} {unit_type}, Available: {available:.1f} {unit_type}"
+                    for name, unit_type, available, required in short
+                ))
+
+        cursor.execute(f"""
+            WITH needs(stock_id, quantity) AS (VALUES {values})
+            UPDATE bar_stock
+            SET quantity = quantity - (
+                    SELECT quantity FROM needs WHERE stock_id = bar_stock.id
+                ),
+                last_updated = DATETIME('now', 'localtime')
+            WHERE id IN (SELECT stock_id FROM needs)
+        """, params)
+
+        cursor.execute(f"""
+            WITH needs(stock_id, quantity) AS (VALUES {values})
+            INSERT INTO stock_history (
+                item_id, change_quantity, operation_type, source, created_at
+            )
+            SELECT stock_id, quantity, 'remove', ?, DATETIME('now', 'localtime')
+            FROM needs
+        """, params + [source])
+
+        return needed
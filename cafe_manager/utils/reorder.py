@@ -0,0 +1,285 @@
+"""
+Reorder suggestions for the Cafe Management System.
+Keeps an exponentially smoothed daily usage per stock item, updated from the
+stock_history rows added since the last refresh, and turns it into days of
+cover and suggested order quantities for a given lead time.
+"""
+
+import math
+from datetime import date, datetime
+
+import migrations
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+from utils.constants import REORDER_CONFIG
+from utils.stock_valuation import CONSUMPTION_SOURCES
+
+# Usage per day below this is treated as none (long-idle averages decay towards zero)
+MIN_VELOCITY = 0.001
+
+
+def _parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def close_day(velocity, usage, day, until, alpha):
+    """Fold a finished day's usage into the average and decay through idle days.
+
+    Args:
+        velocity: Smoothed usage before `day`, or None if `day` is the first day seen
+        usage: Usage on `day`
+        day: The day being closed
+        until: The next day with usage (or today); days in between had none
+        alpha: Smoothing factor
+
+    Returns:
+        float: Smoothed usage per day as of `until`
+    """
+    velocity = usage if velocity is None else alpha * usage + (1 - alpha) * velocity
+    idle_days = (until - day).days - 1
+    if idle_days > 0:
+        velocity *= (1 - alpha) ** idle_days
+    return velocity
+
+
+class ReorderEngine:
+    """Maintains usage velocity per stock item and suggests purchase orders."""
+
+    def __init__(self, db=None, smoothing=None):
+        """Initialize the engine.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+            smoothing: Smoothing factor (0-1), defaults to REORDER_CONFIG
+        """
+        self.db = db or DatabaseManager()
+        self.alpha = REORDER_CONFIG["smoothing"] if smoothing is None else smoothing
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the cached usage state."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reorder_state (
+                item_id INTEGER PRIMARY KEY,
+                velocity REAL,              -- Smoothed usage per day before last_day
+                last_day DATE NOT NULL,     -- Latest day with usage
+                day_usage REAL NOT NULL     -- Usage on last_day so far
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reorder_progress (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                last_history_id INTEGER NOT NULL,
+                smoothing REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def reset_usage(cursor):
+        """Drop the cached usage so the next refresh rebuilds it from consumption only."""
+        cursor.execute("DELETE FROM reorder_state")
+        cursor.execute("DELETE FROM reorder_progress")
+
+    def refresh(self, cursor):
+        """Fold stock_history rows added since the last refresh into the cache.
+
+        Reads only history after the stored id, grouped by item and day.
+        Only removals by sales count as usage; corrections and write-offs do
+        not raise reorder points. Changing the smoothing factor rebuilds the
+        cache from the start.
+
+        Returns:
+            int: Number of items whose usage changed
+        """
+        cursor.execute("SELECT last_history_id, smoothing FROM reorder_progress WHERE id = 1")
+        progress = cursor.fetchone()
+        last_id = 0
+        if progress:
+            last_id, smoothing = progress
+            if smoothing != self.alpha:
+                cursor.execute("DELETE FROM reorder_state")
+                last_id = 0
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_history")
+        upto = cursor.fetchone()[0]
+
+        usage = self._usage(cursor, last_id, upto) if upto > last_id else []
+
+        changed = {}
+        if usage:
+            item_ids = sorted({row[0] for row in usage})
+            placeholders = ", ".join("?" for _ in item_ids)
+            cursor.execute(f"""
+                SELECT item_id, velocity, last_day, day_usage
+                FROM reorder_state
+                WHERE item_id IN ({placeholders})
+            """, item_ids)
+            state = {
+                item_id: [velocity, _parse_day(last_day), day_usage]
+                for item_id, velocity, last_day, day_usage in cursor.fetchall()
+            }
+
+            for item_id, day, quantity in usage:
+                day = _parse_day(day)
+                current = state.get(item_id)
+                if current is None:
+                    state[item_id] = [None, day, quantity]
+                elif day > current[1]:
+                    current[0] = close_day(current[0], current[2], current[1], day, self.alpha)
+                    current[1] = day
+                    current[2] = quantity
+                else:
+                    # Same day, or a late row for an earlier day
+                    current[2] += quantity
+                changed[item_id] = state[item_id]
+
+            cursor.executemany("""
+                INSERT INTO reorder_state (item_id, velocity, last_day, day_usage)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(item_id) DO UPDATE SET
+                    velocity = excluded.velocity,
+                    last_day = excluded.last_day,
+                    day_usage = excluded.day_usage
+            """, [
+                (item_id, velocity, last_day.isoformat(), day_usage)
+                for item_id, (velocity, last_day, day_usage) in changed.items()
+            ])
+
+        cursor.execute("""
+            INSERT INTO reorder_progress (id, last_history_id, smoothing)
+            VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                last_history_id = excluded.last_history_id,
+                smoothing = excluded.smoothing
+        """, (upto, self.alpha))
+
+        return len(changed)
+
+    def _usage(self, cursor, last_id, upto):
+        """Return (item_id, day, quantity) sold between two history ids.
+
+        A rebuild starts from id 0 and reads through the archive, since
+        archived months have left the live stock_history table.
+        """
+        sources = ", ".join("?" for _ in CONSUMPTION_SOURCES)
+        query = f"""
+            SELECT item_id, DATE(created_at) as day, SUM(change_quantity)
+            FROM stock_history
+            WHERE id > ? AND id <= ?
+              AND operation_type = 'remove'
+              AND source IN ({sources})
+              AND item_id IS NOT NULL
+            GROUP BY item_id, day
+            ORDER BY item_id, day
+        """
+        params = (last_id, upto, *CONSUMPTION_SOURCES)
+        if last_id:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+        conn = ArchiveManager(self.db).connect()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def velocity(self, velocity, last_day, day_usage, today):
+        """Smoothed usage per day as of today from a cached state row."""
+        last_day = _parse_day(last_day)
+        if today > last_day:
+            return close_day(velocity, day_usage, last_day, today, self.alpha)
+        # Today is still in progress; until a full day is seen, use what we have
+        return day_usage if velocity is None else velocity
+
+    def get_suggestions(self, lead_time_days=None, review_days=None, today=None):
+        """Refresh the cache and suggest what to order.
+
+        An item needs ordering when its stock will not last the lead time on
+        top of its warning level. The order brings it up to enough for the
+        lead time plus the review period.
+
+        Args:
+            lead_time_days: Days until an order arrives
+            review_days: Days each order should cover after arrival
+            today: Date to evaluate at, defaults to today
+
+        Returns:
+            list: dicts with item_id, item_name, unit_type, quantity,
+            min_threshold, velocity, days_of_cover, reorder_point,
+            order_quantity, sorted with the most urgent first
+        """
+        if lead_time_days is None:
+            lead_time_days = REORDER_CONFIG["lead_time_days"]
+        if review_days is None:
+            review_days = REORDER_CONFIG["review_days"]
+        today = today or date.today()
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("BEGIN IMMEDIATE")
+            self.refresh(cursor)
+            conn.commit()
+
+            cursor.execute("""
+                SELECT
+                    bs.id, bs.item_name, bs.unit_type, bs.quantity, bs.min_threshold,
+                    rs.velocity, rs.last_day, rs.day_usage
+                FROM bar_stock bs
+                LEFT JOIN reorder_state rs ON rs.item_id = bs.id
+                ORDER BY bs.item_name
+            """)
+
+            suggestions = []
+            for (item_id, name, unit_type, quantity, threshold,
+                 velocity, last_day, day_usage) in cursor.fetchall():
+                per_day = 0.0
+                if last_day is not None:
+                    per_day = self.velocity(velocity, last_day, day_usage, today)
+                    if per_day < MIN_VELOCITY:
+                        per_day = 0.0
+
+                days_of_cover = quantity / per_day if per_day > 0 else None
+                reorder_point = per_day * lead_time_days + threshold
+
+                order_quantity = 0
+                if quantity <= reorder_point:
+                    target = per_day * (lead_time_days + review_days) + threshold
+                    order_quantity = max(math.ceil(target - quantity), 0)
+
+                suggestions.append({
+                    "item_id": item_id,
+                    "item_name": name,
+                    "unit_type": unit_type,
+                    "quantity": quantity,
+                    "min_threshold": threshold,
+                    "velocity": per_day,
+                    "days_of_cover": days_of_cover,
+                    "reorder_point": reorder_point,
+                    "order_quantity": order_quantity
+                })
+
+            # Items to order first, soonest to run out first
+            suggestions.sort(key=lambda s: (
+                s["order_quantity"] == 0,
+                s["days_of_cover"] if s["days_of_cover"] is not None else math.inf
+            ))
+            return suggestions
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def get_purchase_order(self, lead_time_days=None, review_days=None, today=None):
+        """Return only the suggestions with something to order."""
+        return [
+            s for s in self.get_suggestions(lead_time_days, review_days, today)
+            if s["order_quantity"] > 0
+        ]
@@ -0,0 +1,449 @@
+"""
+Operation-log replication for the Cafe Management System.
+Terminals append every bill change to a local log and show it straight away;
+the log is shipped to the sync server in batches whenever the server can be
+reached. The server applies each terminal's operations exactly once, in the
+order they were logged, with fixed rules for changes that meet on one bill:
+
+- add_item always applies; quantities from every terminal add up.
+- remove_item takes off at most what is still on the bill ('skipped' if
+  the item is already gone).
+- pay records a sale for exactly what the customer was charged and takes
+  that off the bill. Items added elsewhere meanwhile stay on the table
+  ('partial'); items that were already gone are still recorded as paid
+  ('conflict'), so money that was collected never goes missing. For the
+  same reason a payment is recorded even when stock has run out: stock goes
+  negative and the shortfall is kept in the operation's detail and logged
+  as a stock_shortfall event to reconcile. A session paid elsewhere in the
+  meantime is a 'conflict' with no sale: the customer may have paid twice.
+- expense always applies.
+
+An operation the rules cannot apply at all (e.g. an unknown item) is
+recorded as 'rejected' and is not retried. The terminal keeps payments the
+server recorded no sale for and shows them to staff, to enter again or, for
+a bill already paid, to refund.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+
+import migrations
+from database import DatabaseManager
+from utils.app_logging import log_event
+from utils.bill_service import BillService
+from utils.bill_sessions import BillAlreadyPaid
+from utils.recipes import InsufficientStockError
+from utils.stock_alerts import StockAlerts
+
+OP_KINDS = ("add_item", "remove_item", "pay", "expense")
+
+
+def items_to_list(items):
+    """Turn {menu_item_id: item} into a JSON-safe list."""
+    return [dict(item, menu_item_id=item_id) for item_id, item in items.items()]
+
+
+def items_from_list(items):
+    """Turn a JSON item list back into {menu_item_id: item}."""
+    result = {}
+    for item in items:
+        item = dict(item)
+        result[item.pop("menu_item_id")] = item
+    return result
+
+
+def replay(items, ops):
+    """Apply logged operations to a copy of a bill the way the server will.
+
+    Args:
+        items: {menu_item_id: {'name', 'price', 'quantity'}}
+        ops: Operations for this table, oldest first
+
+    Returns:
+        dict: The bill after the operations
+    """
+    items = {item_id: dict(item) for item_id, item in items.items()}
+
+    def take(item_id, quantity):
+        line = items.get(item_id)
+        if line:
+            line['quantity'] -= min(quantity, line['quantity'])
+            if line['quantity'] <= 0:
+                del items[item_id]
+
+    for op in ops:
+        payload = op["payload"]
+        if op["kind"] == "add_item":
+            line = items.setdefault(payload["menu_item_id"], {
+                'name': payload["name"],
+                'price': payload["price"],
+                'quantity': 0
+            })
+            line['quantity'] += payload["quantity"]
+        elif op["kind"] == "remove_item":
+            take(payload["menu_item_id"], payload["quantity"])
+        elif op["kind"] == "pay":
+            for item in payload["items"]:
+                take(item["menu_item_id"], item["quantity"])
+    return items
+
+
+class ReplicationLog:
+    """Applies batches of logged operations from terminals on the server."""
+
+    def __init__(self, db=None):
+        """Initialize the replication log.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create per-terminal progress and the record of applied operations."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS terminal_progress (
+                terminal_id TEXT PRIMARY KEY,
+                last_op_seq INTEGER NOT NULL,   -- Operations up to here are applied
+                last_seen TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS replicated_ops (
+                terminal_id TEXT NOT NULL,
+                op_seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                table_number INTEGER,
+                status TEXT NOT NULL CHECK(status IN (
+                    'applied', 'partial', 'conflict', 'skipped', 'rejected'
+                )),
+                detail TEXT,
+                sale_id INTEGER,
+                created_at TIMESTAMP,           -- When the terminal logged it
+                applied_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime')),
+                PRIMARY KEY (terminal_id, op_seq)
+            )
+        """)
+
+    @staticmethod
+    def _apply(cursor, op):
+        """Apply one operation by the rules above.
+
+        Returns:
+            tuple: (status, detail, sale_id)
+        """
+        kind, table_number, payload = op["kind"], op.get("table_number"), op["payload"]
+
+        if kind == "add_item":
+            quantity = int(payload["quantity"])
+            if quantity <= 0:
+                raise ValueError("Quantity must be positive")
+            BillService._add(cursor, table_number, payload["menu_item_id"], quantity)
+            return "applied", None, None
+
+        if kind == "remove_item":
+            removed = BillService._remove(
+                cursor, table_number, payload["menu_item_id"], int(payload["quantity"])
+            )
+            if not removed:
+                return "skipped", "Item was no longer on the bill", None
+            return "applied", None, None
+
+        if kind == "pay":
+            try:
+                sale = BillService._settle(
+                    cursor, table_number,
+                    payload.get("discount_type"), payload.get("discount_value", 0),
+                    charged=items_from_list(payload["items"]),
+                    created_at=op.get("created_at"),
+                    session_id=payload.get("session_id"),
+                    allow_shortfall=True
+                )
+            except BillAlreadyPaid as e:
+                # Paid from another terminal while this one was offline
+                return "conflict", f"{str(e)}; this payment was not recorded", None
+            detail = {
+                "partial": "Items added elsewhere were left on the table",
+                "conflict": "Some paid items were already off the bill"
+            }.get(sale["status"])
+            if sale["shortfall"]:
+                log_event(
+                    "stock_shortfall",
+                    logging.WARNING,
+                    sale_id=sale["sale_id"],
+                    table_number=table_number,
+                    detail=sale["shortfall"]
+                )
+                detail = "; ".join(filter(None, [detail, "Recorded with stock short: " + sale["shortfall"]]))
+            return sale["status"], detail, sale["sale_id"]
+
+        if kind == "expense":
+            BillService._record_expense(
+                cursor, payload["name"], payload.get("title"), payload["category"],
+                payload["quantity"], payload["price_per_unit"], payload.get("expense_date")
+            )
+            return "applied", None, None
+
+        raise ValueError(f"Unknown operation: {kind}")
+
+    def apply_batch(self, terminal_id, ops):
+        """Apply a terminal's logged operations, each exactly once.
+
+        Each operation gets its own transaction together with its record
+        and the terminal's progress, so a resent batch skips what already
+        applied.
+
+        Returns:
+            dict: 'results' (op_seq, status, detail, sale_id per operation)
+            and 'states' (new state of every table the batch touched)
+        """
+        conn = None
+        results = []
+        touched = []
+        paid = False
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            for op in sorted(ops, key=lambda o: o["op_seq"]):
+                table_number = op.get("table_number")
+                cursor.execute("BEGIN IMMEDIATE")
+
+                cursor.execute(
+                    "SELECT last_op_seq FROM terminal_progress WHERE terminal_id = ?",
+                    (terminal_id,)
+                )
+                row = cursor.fetchone()
+                if row and op["op_seq"] <= row[0]:
+                    cursor.execute("""
+                        SELECT status, detail, sale_id FROM replicated_ops
+                        WHERE terminal_id = ? AND op_seq = ?
+                    """, (terminal_id, op["op_seq"]))
+                    done = cursor.fetchone() or ("applied", "Already applied", None)
+                    conn.rollback()
+                    results.append(dict(zip(("status", "detail", "sale_id"), done), op_seq=op["op_seq"]))
+                    continue
+
+                cursor.execute("SAVEPOINT op")
+                try:
+                    status, detail, sale_id = self._apply(cursor, op)
+                    cursor.execute("RELEASE op")
+                except (ValueError, LookupError, KeyError, InsufficientStockError, sqlite3.IntegrityError) as e:
+                    cursor.execute("ROLLBACK TO op")
+                    cursor.execute("RELEASE op")
+                    status, detail, sale_id = "rejected", str(e), None
+
+                if table_number is not None:
+                    BillService._update_status(cursor, table_number)
+                    if table_number not in touched:
+                        touched.append(table_number)
+
+                cursor.execute("""
+                    INSERT INTO replicated_ops (
+                        terminal_id, op_seq, kind, table_number,
+                        status, detail, sale_id, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    terminal_id, op["op_seq"], op["kind"], table_number,
+                    status, detail, sale_id, op.get("created_at")
+                ))
+                cursor.execute("""
+                    INSERT INTO terminal_progress (terminal_id, last_op_seq, last_seen)
+                    VALUES (?, ?, DATETIME('now', 'localtime'))
+                    ON CONFLICT(terminal_id) DO UPDATE SET
+                        last_op_seq = excluded.last_op_seq,
+                        last_seen = excluded.last_seen
+                """, (terminal_id, op["op_seq"]))
+                conn.commit()
+
+                if op["kind"] == "pay" and sale_id is not None:
+                    paid = True
+                    log_event(
+                        "sale_paid",
+                        sale_id=sale_id,
+                        table_number=table_number,
+                        terminal_id=terminal_id,
+                        op_seq=op["op_seq"],
+                        status=status
+                    )
+                results.append({"op_seq": op["op_seq"], "status": status, "detail": detail, "sale_id": sale_id})
+                if status not in ("applied", "skipped"):
+                    logging.warning(f"Operation {terminal_id}#{op['op_seq']} ({op['kind']}): {status}, {detail}")
+
+            cursor.execute("BEGIN")
+            states = [BillService._read_state(cursor, n) for n in touched]
+            conn.commit()
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error applying operations from {terminal_id}: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+        if paid:
+            StockAlerts.publish()
+        return {"results": results, "states": states}
+
+
+class OpLog:
+    """A terminal's local log of operations not yet applied by the server,
+    plus the last table states it received, so it works across restarts
+    and while offline."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS oplog (
+                op_seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                table_number INTEGER,
+                payload TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+            );
+            CREATE INDEX IF NOT EXISTS idx_oplog_table ON oplog(table_number, op_seq);
+            CREATE TABLE IF NOT EXISTS table_state (
+                table_number INTEGER PRIMARY KEY,
+                state TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rejected_ops (
+                op_seq INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                table_number INTEGER,
+                payload TEXT NOT NULL,
+                created_at TIMESTAMP,
+                detail TEXT,
+                shown INTEGER NOT NULL DEFAULT 0    -- Set once staff have been told
+            );
+        """)
+        # 'rejected', or 'conflict' for a bill that was already paid
+        migrations.add_column(
+            self.conn.cursor(), "rejected_ops", "status", "TEXT NOT NULL DEFAULT 'rejected'"
+        )
+
+    @staticmethod
+    def _op(row):
+        op_seq, kind, table_number, payload, created_at = row
+        return {
+            "op_seq": op_seq,
+            "kind": kind,
+            "table_number": table_number,
+            "payload": json.loads(payload),
+            "created_at": created_at
+        }
+
+    def append(self, kind, table_number, payload):
+        """Log an operation and return it."""
+        if kind not in OP_KINDS:
+            raise ValueError(f"Unknown operation: {kind}")
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO oplog (kind, table_number, payload) VALUES (?, ?, ?)",
+                (kind, table_number, json.dumps(payload))
+            )
+            cursor.execute(
+                "SELECT op_seq, kind, table_number, payload, created_at FROM oplog WHERE op_seq = ?",
+                (cursor.lastrowid,)
+            )
+            return self._op(cursor.fetchone())
+
+    def pending(self, table_number=None, after=0, limit=None):
+        """Return logged operations, oldest first, optionally for one table."""
+        query = "SELECT op_seq, kind, table_number, payload, created_at FROM oplog WHERE op_seq > ?"
+        params = [after]
+        if table_number is not None:
+            query += " AND table_number = ?"
+            params.append(table_number)
+        query += " ORDER BY op_seq"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self.lock:
+            return [self._op(row) for row in self.conn.execute(query, params)]
+
+    def acknowledge(self, op_seqs=None, table_number=None, up_to=None):
+        """Forget operations the server has applied.
+
+        Either pass op_seqs, or table_number and up_to to drop a table's
+        operations that a received state already includes.
+        """
+        with self.lock:
+            if op_seqs:
+                self.conn.executemany("DELETE FROM oplog WHERE op_seq = ?", [(s,) for s in op_seqs])
+            elif up_to:
+                self.conn.execute(
+                    "DELETE FROM oplog WHERE table_number = ? AND op_seq <= ?",
+                    (table_number, up_to)
+                )
+
+    def advance(self, op_seq):
+        """Make new operations number after op_seq.
+
+        The server skips numbers it has already applied from this terminal,
+        so a terminal whose log file was replaced continues after them.
+        """
+        with self.lock:
+            current = self.conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'oplog'"
+            ).fetchone()
+            if current is None:
+                self.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('oplog', ?)", (op_seq,))
+            elif current[0] < op_seq:
+                self.conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'oplog'", (op_seq,))
+
+    def reject(self, op, detail, status="rejected"):
+        """Keep an operation the server refused, with its reason."""
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR IGNORE INTO rejected_ops (
+                    op_seq, kind, table_number, payload, created_at, detail, status
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                op["op_seq"], op["kind"], op["table_number"],
+                json.dumps(op["payload"]), op["created_at"], detail, status
+            ))
+
+    def take_rejected(self):
+        """Return refused operations staff have not been shown yet, and mark them shown."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute("""
+                    SELECT op_seq, kind, table_number, payload, created_at, detail, status
+                    FROM rejected_ops
+                    WHERE shown = 0
+                    ORDER BY op_seq
+                """).fetchall()
+                self.conn.executemany(
+                    "UPDATE rejected_ops SET shown = 1 WHERE op_seq = ?", [(row[0],) for row in rows]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [dict(self._op(row[:5]), detail=row[5], status=row[6]) for row in rows]
+
+    def save_state(self, state):
+        """Keep the last state received for a table."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO table_state (table_number, state) VALUES (?, ?)",
+                (state["table_number"], json.dumps(dict(state, items=items_to_list(state["items"]))))
+            )
+
+    def load_states(self):
+        """Return the saved table states by table number."""
+        with self.lock:
+            rows = self.conn.execute("SELECT state FROM table_state").fetchall()
+        states = {}
+        for (data,) in rows:
+            state = json.loads(data)
+            state["items"] = items_from_list(state["items"])
+            states[state["table_number"]] = state
+        return states
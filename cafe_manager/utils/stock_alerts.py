@@ -0,0 +1,208 @@
+"""
+Low-stock alert queue for the Cafe Management System.
+Triggers on bar_stock append an alert whenever an item crosses its threshold,
+and screens publish after committing stock changes so the notifier reads only
+the new alerts, as soon as the change is made. Changes made by other
+processes (the sync server, another terminal on the same file) are picked up
+by the notifier polling latest_id.
+"""
+
+import logging
+
+import migrations
+from database import DatabaseManager
+
+# Columns read for an alert
+ALERT_COLUMNS = "id, item_id, item_name, kind, quantity, min_threshold, created_at"
+
+
+class StockAlerts:
+    """Fills and reads the stock alert queue."""
+
+    _listeners = []
+
+    def __init__(self, db=None):
+        """Initialize the alert queue.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the alert queue and the triggers that fill it."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id INTEGER NOT NULL,
+                item_name TEXT NOT NULL,
+                kind TEXT NOT NULL CHECK(kind IN ('low', 'out', 'cleared')),
+                quantity REAL NOT NULL,
+                min_threshold REAL NOT NULL,
+                created_at TIMESTAMP NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_stock_alerts_item
+            ON stock_alerts(item_id, id)
+        """)
+
+        # New items that start at or below their threshold
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_alert_item_added
+            AFTER INSERT ON bar_stock
+            WHEN NEW.quantity <= NEW.min_threshold
+            BEGIN
+                INSERT INTO stock_alerts (
+                    item_id, item_name, kind, quantity, min_threshold, created_at
+                ) VALUES (
+                    NEW.id, NEW.item_name,
+                    CASE WHEN NEW.quantity <= 0 THEN 'out' ELSE 'low' END,
+                    NEW.quantity, NEW.min_threshold, DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        # Falling to the threshold, or running out (or partly refilled) while low
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_alert_item_low
+            AFTER UPDATE OF quantity, min_threshold ON bar_stock
+            WHEN NEW.quantity <= NEW.min_threshold
+             AND (OLD.quantity > OLD.min_threshold OR (NEW.quantity <= 0) != (OLD.quantity <= 0))
+            BEGIN
+                INSERT INTO stock_alerts (
+                    item_id, item_name, kind, quantity, min_threshold, created_at
+                ) VALUES (
+                    NEW.id, NEW.item_name,
+                    CASE WHEN NEW.quantity <= 0 THEN 'out' ELSE 'low' END,
+                    NEW.quantity, NEW.min_threshold, DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        # Restocked above the threshold
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_alert_item_restocked
+            AFTER UPDATE OF quantity, min_threshold ON bar_stock
+            WHEN NEW.quantity > NEW.min_threshold AND OLD.quantity <= OLD.min_threshold
+            BEGIN
+                INSERT INTO stock_alerts (
+                    item_id, item_name, kind, quantity, min_threshold, created_at
+                ) VALUES (
+                    NEW.id, NEW.item_name, 'cleared',
+                    NEW.quantity, NEW.min_threshold, DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_alert_item_deleted
+            AFTER DELETE ON bar_stock
+            WHEN OLD.quantity <= OLD.min_threshold
+            BEGIN
+                INSERT INTO stock_alerts (
+                    item_id, item_name, kind, quantity, min_threshold, created_at
+                ) VALUES (
+                    OLD.id, OLD.item_name, 'cleared',
+                    OLD.quantity, OLD.min_threshold, DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        # Items already low before the queue existed
+        cursor.execute("""
+            INSERT INTO stock_alerts (
+                item_id, item_name, kind, quantity, min_threshold, created_at
+            )
+            SELECT id, item_name,
+                   CASE WHEN quantity <= 0 THEN 'out' ELSE 'low' END,
+                   quantity, min_threshold, DATETIME('now', 'localtime')
+            FROM bar_stock
+            WHERE quantity <= min_threshold
+              AND id NOT IN (SELECT DISTINCT item_id FROM stock_alerts)
+        """)
+
+    @classmethod
+    def subscribe(cls, callback):
+        """Call callback() whenever a screen commits a stock change."""
+        if callback not in cls._listeners:
+            cls._listeners.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback):
+        if callback in cls._listeners:
+            cls._listeners.remove(callback)
+
+    @classmethod
+    def publish(cls):
+        """Tell listeners that stock changed; call after committing."""
+        for callback in list(cls._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Stock alert listener failed: {str(e)}")
+
+    def get_active(self):
+        """Return the open alert of every item currently at or below its threshold.
+
+        Returns:
+            tuple: (alerts, last_id) where alerts are rows of ALERT_COLUMNS and
+            last_id is the position to read new alerts from
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            # The latest alert per item says whether it is still low
+            cursor.execute(f"""
+                SELECT {ALERT_COLUMNS}
+                FROM stock_alerts
+                WHERE id IN (SELECT MAX(id) FROM stock_alerts GROUP BY item_id)
+                  AND kind != 'cleared'
+                ORDER BY id
+            """)
+            alerts = cursor.fetchall()
+
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_alerts")
+            return alerts, cursor.fetchone()[0]
+
+        finally:
+            if conn:
+                conn.close()
+
+    def latest_id(self):
+        """Return the id of the newest alert, or 0 (a single index lookup)."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_alerts")
+            return cursor.fetchone()[0]
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_since(self, last_id):
+        """Return alerts raised after last_id, oldest first (one primary key seek)."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {ALERT_COLUMNS}
+                FROM stock_alerts
+                WHERE id > ?
+                ORDER BY id
+            """, (last_id,))
+            return cursor.fetchall()
+
+        finally:
+            if conn:
+                conn.close()
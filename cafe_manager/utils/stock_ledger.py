@@ -0,0 +1,487 @@
+"""
+Running-balance stock ledger for the Cafe Management System.
+Every change to bar_stock.quantity is appended to stock_ledger by triggers,
+together with the balance after the change and cumulative in/out totals, so
+stock at any moment and movement over any period are single index seeks.
+"""
+
+import logging
+from datetime import datetime
+
+import migrations
+from database import DatabaseManager
+
+# Balances closer than this are treated as equal (quantities are REAL)
+TOLERANCE = 0.0001
+
+# Columns read for a ledger position
+POSITION_COLUMNS = "id, balance, total_in, total_out, created_at"
+
+
+class StockLedger:
+    """Appends and queries running stock balances."""
+
+    def __init__(self, db=None):
+        """Initialize the ledger.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+        """
+        self.db = db or DatabaseManager()
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create the ledger, its checkpoints and the triggers that feed it."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id INTEGER NOT NULL,
+                change_quantity REAL NOT NULL,
+                balance REAL NOT NULL,         -- Quantity after this change
+                total_in REAL NOT NULL,        -- Everything ever added, up to this entry
+                total_out REAL NOT NULL,       -- Everything ever removed, up to this entry
+                source TEXT,                   -- Taken from the matching stock_history row
+                history_id INTEGER,
+                created_at TIMESTAMP NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_stock_ledger_item_time
+            ON stock_ledger(item_id, created_at, id)
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_checkpoints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id INTEGER NOT NULL,
+                ledger_id INTEGER NOT NULL,
+                balance REAL NOT NULL,
+                total_in REAL NOT NULL,
+                total_out REAL NOT NULL,
+                created_at TIMESTAMP NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_stock_checkpoints_item
+            ON stock_checkpoints(item_id, id)
+        """)
+
+        # New items open the ledger with their initial quantity
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_ledger_item_added
+            AFTER INSERT ON bar_stock
+            BEGIN
+                INSERT INTO stock_ledger (
+                    item_id, change_quantity, balance, total_in, total_out, created_at
+                ) VALUES (
+                    NEW.id, NEW.quantity, NEW.quantity,
+                    MAX(NEW.quantity, 0), MAX(-NEW.quantity, 0),
+                    DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        # Every quantity change, whichever screen made it
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_ledger_quantity_changed
+            AFTER UPDATE OF quantity ON bar_stock
+            WHEN NEW.quantity IS NOT OLD.quantity
+            BEGIN
+                INSERT INTO stock_ledger (
+                    item_id, change_quantity, balance, total_in, total_out, created_at
+                ) VALUES (
+                    NEW.id,
+                    NEW.quantity - OLD.quantity,
+                    NEW.quantity,
+                    COALESCE((
+                        SELECT total_in FROM stock_ledger WHERE item_id = NEW.id
+                        ORDER BY created_at DESC, id DESC LIMIT 1
+                    ), 0) + MAX(NEW.quantity - OLD.quantity, 0),
+                    COALESCE((
+                        SELECT total_out FROM stock_ledger WHERE item_id = NEW.id
+                        ORDER BY created_at DESC, id DESC LIMIT 1
+                    ), 0) + MAX(OLD.quantity - NEW.quantity, 0),
+                    DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_ledger_item_deleted
+            AFTER DELETE ON bar_stock
+            WHEN OLD.quantity != 0
+            BEGIN
+                INSERT INTO stock_ledger (
+                    item_id, change_quantity, balance, total_in, total_out,
+                    source, created_at
+                ) VALUES (
+                    OLD.id,
+                    -OLD.quantity,
+                    0,
+                    COALESCE((
+                        SELECT total_in FROM stock_ledger WHERE item_id = OLD.id
+                        ORDER BY created_at DESC, id DESC LIMIT 1
+                    ), 0) + MAX(-OLD.quantity, 0),
+                    COALESCE((
+                        SELECT total_out FROM stock_ledger WHERE item_id = OLD.id
+                        ORDER BY created_at DESC, id DESC LIMIT 1
+                    ), 0) + MAX(OLD.quantity, 0),
+                    'deleted',
+                    DATETIME('now', 'localtime')
+                );
+            END
+        """)
+
+        # Screens write the stock_history row right after changing the quantity;
+        # use it to label the unlabelled ledger entry it belongs to
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stock_ledger_history_logged
+            AFTER INSERT ON stock_history
+            BEGIN
+                UPDATE stock_ledger
+                SET source = NEW.source,
+                    history_id = NEW.id
+                WHERE id = (
+                    SELECT id FROM stock_ledger WHERE item_id = NEW.item_id
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                )
+                AND source IS NULL;
+            END
+        """)
+
+        # Items that existed before the ledger start from their current quantity
+        cursor.execute("""
+            INSERT INTO stock_ledger (
+                item_id, change_quantity, balance, total_in, total_out,
+                source, created_at
+            )
+            SELECT id, quantity, quantity, MAX(quantity, 0), MAX(-quantity, 0),
+                   'opening', DATETIME('now', 'localtime')
+            FROM bar_stock
+            WHERE id NOT IN (SELECT DISTINCT item_id FROM stock_ledger)
+        """)
+
+    @staticmethod
+    def add_history_marker(cursor):
+        """Record how far stock_history had got at each checkpoint.
+
+        Reconciliation replays stock_history after the marker, so every item
+        gets a checkpoint with one to start from.
+        """
+        migrations.add_column(cursor, "stock_checkpoints", "history_id", "INTEGER")
+        cursor.execute("""
+            INSERT INTO stock_checkpoints (
+                item_id, ledger_id, balance, total_in, total_out,
+                history_id, created_at
+            )
+            SELECT l.item_id, l.id, l.balance, l.total_in, l.total_out,
+                   (SELECT COALESCE(MAX(id), 0) FROM stock_history),
+                   DATETIME('now', 'localtime')
+            FROM stock_ledger l
+            WHERE l.id = (
+                SELECT id FROM stock_ledger WHERE item_id = l.item_id
+                ORDER BY created_at DESC, id DESC LIMIT 1
+            )
+            AND l.item_id IN (SELECT id FROM bar_stock)
+        """)
+
+    @staticmethod
+    def _position(cursor, item_id, before):
+        """Return the last ledger entry strictly before a timestamp.
+
+        One seek on idx_stock_ledger_item_time.
+        """
+        cursor.execute(f"""
+            SELECT {POSITION_COLUMNS}
+            FROM stock_ledger
+            WHERE item_id = ? AND created_at < ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        """, (item_id, before))
+        return cursor.fetchone()
+
+    @staticmethod
+    def _as_bound(value, end_of_day=False):
+        """Turn a date or timestamp into an exclusive upper bound for created_at."""
+        if isinstance(value, datetime):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        if len(value) == 10:
+            # A bare date means the start of the day, or all of it for period ends
+            return value + (' 24:00:00' if end_of_day else ' 00:00:00')
+        # Timestamps are inclusive of their last second
+        return value + '.999'
+
+    def balance_at(self, item_id, at):
+        """Return an item's stock at a moment.
+
+        Args:
+            item_id: bar_stock id
+            at: Timestamp ('YYYY-MM-DD HH:MM:SS' or datetime), inclusive
+
+        Returns:
+            float: Balance, or None if the item had no ledger entries yet
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            position = self._position(conn.cursor(), item_id, self._as_bound(at))
+            return position[1] if position else None
+        finally:
+            if conn:
+                conn.close()
+
+    def stock_at(self, at):
+        """Return every item's stock at a moment.
+
+        Returns:
+            list: (item_id, item_name, unit_type, balance) for current items
+        """
+        bound = self._as_bound(at)
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            # One index seek per item
+            cursor.execute("""
+                SELECT
+                    bs.id, bs.item_name, bs.unit_type,
+                    (
+                        SELECT balance FROM stock_ledger l
+                        WHERE l.item_id = bs.id AND l.created_at < ?
+                        ORDER BY l.created_at DESC, l.id DESC
+                        LIMIT 1
+                    )
+                FROM bar_stock bs
+                ORDER BY bs.item_name
+            """, (bound,))
+            return cursor.fetchall()
+
+        finally:
+            if conn:
+                conn.close()
+
+    def movement(self, item_id, start_date, end_date):
+        """Return an item's movement over a period from two ledger seeks.
+
+        Args:
+            item_id: bar_stock id
+            start_date: First day ('YYYY-MM-DD') or timestamp
+            end_date: Last day ('YYYY-MM-DD') or timestamp, inclusive
+
+        Returns:
+            dict: 'opening', 'added', 'removed' and 'closing' quantities
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            opening = self._position(cursor, item_id, self._as_bound(start_date))
+            closing = self._position(cursor, item_id, self._as_bound(end_date, end_of_day=True))
+            return self._movement(opening, closing)
+        finally:
+            if conn:
+                conn.close()
+
+    def movements(self, start_date, end_date):
+        """Return movement over a period for every current item.
+
+        Returns:
+            list: (item_id, item_name, unit_type, movement dict)
+        """
+        start = self._as_bound(start_date)
+        end = self._as_bound(end_date, end_of_day=True)
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT id, item_name, unit_type FROM bar_stock ORDER BY item_name")
+            items = cursor.fetchall()
+
+            return [
+                (item_id, name, unit_type, self._movement(
+                    self._position(cursor, item_id, start),
+                    self._position(cursor, item_id, end)
+                ))
+                for item_id, name, unit_type in items
+            ]
+
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _movement(opening, closing):
+        """Difference two ledger positions."""
+        zero = (None, 0, 0, 0, None)
+        opening = opening or zero
+        closing = closing or zero
+        return {
+            "opening": opening[1],
+            "added": closing[2] - opening[2],
+            "removed": closing[3] - opening[3],
+            "closing": closing[1]
+        }
+
+    @staticmethod
+    def _replay(cursor):
+        """Replay stock_history for every item from its last checkpoint.
+
+        Items added since the last checkpoint start from their first ledger
+        entry, which holds the quantity they were created with.
+
+        Returns:
+            list: (item_id, item_name, stock, replayed, ledger_id, history_id),
+            where ledger_id and history_id are the replay's starting point and
+            replayed is None for items with no ledger entries
+        """
+        cursor.execute("""
+            SELECT
+                bs.id,
+                bs.item_name,
+                bs.quantity,
+                COALESCE(cp.balance, first.balance),
+                COALESCE(cp.ledger_id, first.id),
+                COALESCE(cp.history_id, first.history_id, 0)
+            FROM bar_stock bs
+            LEFT JOIN stock_checkpoints cp ON cp.id = (
+                SELECT MAX(id) FROM stock_checkpoints
+                WHERE item_id = bs.id AND history_id IS NOT NULL
+            )
+            LEFT JOIN stock_ledger first ON first.id = (
+                SELECT id FROM stock_ledger WHERE item_id = bs.id
+                ORDER BY created_at, id LIMIT 1
+            )
+            ORDER BY bs.item_name
+        """)
+        items = cursor.fetchall()
+
+        replays = []
+        for item_id, name, stock, base, ledger_id, history_id in items:
+            cursor.execute("""
+                SELECT COALESCE(SUM(
+                    CASE WHEN operation_type = 'add'
+                         THEN change_quantity ELSE -change_quantity END
+                ), 0)
+                FROM stock_history
+                WHERE item_id = ? AND id > ?
+            """, (item_id, history_id))
+            changes = cursor.fetchone()[0]
+            replayed = None if base is None else base + changes
+            replays.append((item_id, name, stock, replayed, ledger_id, history_id))
+        return replays
+
+    def checkpoint(self):
+        """Snapshot each item's replayed balance and latest ledger position.
+
+        The balance carried forward is the stock_history replay rather than
+        bar_stock.quantity, so a mismatch stays visible after the checkpoint
+        and reconciliation only needs to replay stock_history written since.
+
+        Returns:
+            int: Number of items checkpointed
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_history")
+            last_history_id = cursor.fetchone()[0]
+
+            count = 0
+            for item_id, _, _, replayed, ledger_id, history_id in self._replay(cursor):
+                if replayed is None:
+                    continue
+                cursor.execute("""
+                    SELECT id, total_in, total_out FROM stock_ledger WHERE item_id = ?
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                """, (item_id,))
+                latest_id, total_in, total_out = cursor.fetchone()
+
+                # Nothing moved since the last checkpoint
+                if latest_id == ledger_id and history_id == last_history_id:
+                    continue
+
+                cursor.execute("""
+                    INSERT INTO stock_checkpoints (
+                        item_id, ledger_id, balance, total_in, total_out,
+                        history_id, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, DATETIME('now', 'localtime'))
+                """, (item_id, latest_id, replayed, total_in, total_out, last_history_id))
+                count += 1
+            conn.commit()
+
+            logging.info(f"Stock ledger checkpoint written for {count} items")
+            return count
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error writing stock checkpoint: {str(e)}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def reconcile(self):
+        """Replay stock_history since the last checkpoint and compare with bar_stock.
+
+        The ledger copies every quantity change, so it always agrees with
+        bar_stock; stock_history is written separately by each screen, and
+        is what shows a quantity changed without being recorded (or the
+        other way round).
+
+        Returns:
+            list: One dict per item with 'item_id', 'item_name', 'stock'
+            (bar_stock.quantity), 'replayed' (checkpoint balance plus later
+            stock_history), 'unlogged' (ledger changes with no stock_history
+            row) and 'issues' (list of problems, empty when clean)
+        """
+        conn = None
+        try:
+            conn = self.db.connect()
+            migrations.ensure_schema(conn)
+            cursor = conn.cursor()
+
+            report = []
+            for item_id, name, stock, replayed, ledger_id, _ in self._replay(cursor):
+                cursor.execute("""
+                    SELECT COUNT(*) FROM stock_ledger
+                    WHERE item_id = ? AND id > ? AND source IS NULL
+                """, (item_id, ledger_id or 0))
+                unlogged = cursor.fetchone()[0]
+
+                issues = []
+                if replayed is None:
+                    issues.append("No ledger entries")
+                elif abs(replayed - stock) > TOLERANCE:
+                    issues.append(
+                        f"Stock history adds up to {replayed:g}, but stock is {stock:g}"
+                    )
+                if unlogged:
+                    issues.append(f"{unlogged} changes without a stock history entry")
+
+                report.append({
+                    "item_id": item_id,
+                    "item_name": name,
+                    "stock": stock,
+                    "replayed": replayed,
+                    "unlogged": unlogged,
+                    "issues": issues
+                })
+
+            return report
+
+        finally:
+            if conn:
+                conn.close()
@@ -0,0 +1,373 @@
+"""
+Stock valuation for the Cafe Management System.
+Turns stock purchases into cost lots and costs every removal FIFO or at
+weighted average as stock_history grows, keeping per-item inventory value,
+daily cost of goods sold and daily shrinkage in tables that reports read
+directly.
+"""
+
+from collections import deque
+
+import migrations
+from database import DatabaseManager
+from utils.archive import ArchiveManager
+from utils.constants import VALUATION_CONFIG
+
+VALUATION_METHODS = ("fifo", "average")
+
+# stock_history sources whose removals are goods sold; every other removal
+# (import corrections, manual edits) is an adjustment booked as shrinkage
+CONSUMPTION_SOURCES = ("sale",)
+
+# Tables rebuilt from the start of history when the method changes
+VALUATION_TABLES = ("stock_lots", "stock_valuation", "stock_cogs_daily", "stock_shrinkage_daily")
+
+# Quantities smaller than this are treated as zero (quantities are REAL)
+TOLERANCE = 0.0001
+
+
+class StockValuation:
+    """Maintains stock lots, inventory value and COGS incrementally."""
+
+    def __init__(self, db=None, method=None):
+        """Initialize the valuation engine.
+
+        Args:
+            db: Optional DatabaseManager to reuse
+            method: 'fifo' or 'average', defaults to VALUATION_CONFIG
+        """
+        self.db = db or DatabaseManager()
+        self.method = method or VALUATION_CONFIG["method"]
+        if self.method not in VALUATION_METHODS:
+            raise ValueError(f"Unknown valuation method: {self.method}")
+
+    @staticmethod
+    def create_tables(cursor):
+        """Create lots, valuation state and COGS tables."""
+        # Purchases record what they paid per unit on their stock_history row
+        cursor.execute("PRAGMA table_info(stock_history)")
+        if "unit_cost" not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE stock_history ADD COLUMN unit_cost REAL")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_lots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id INTEGER NOT NULL,
+                history_id INTEGER NOT NULL UNIQUE,
+                quantity REAL NOT NULL,
+                remaining REAL NOT NULL,
+                unit_cost REAL NOT NULL,
+                cost_known INTEGER NOT NULL DEFAULT 1,  -- 0 when the cost was estimated
+                created_at TIMESTAMP NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_stock_lots_open
+            ON stock_lots(item_id, id) WHERE remaining > 0
+        """)
+
+        # Current quantity and value of every item, as costed so far
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_valuation (
+                item_id INTEGER PRIMARY KEY,
+                quantity REAL NOT NULL,
+                value REAL NOT NULL,
+                last_unit_cost REAL NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_cogs_daily (
+                day DATE NOT NULL,
+                item_id INTEGER NOT NULL,
+                quantity REAL NOT NULL,
+                cost REAL NOT NULL,
+                PRIMARY KEY (day, item_id)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_valuation_progress (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                last_history_id INTEGER NOT NULL,
+                method TEXT NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def add_shrinkage(cursor):
+        """Keep stock adjustments out of cost of goods sold."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_shrinkage_daily (
+                day DATE NOT NULL,
+                item_id INTEGER NOT NULL,
+                quantity REAL NOT NULL,
+                cost REAL NOT NULL,
+                PRIMARY KEY (day, item_id)
+            )
+        """)
+        # Rebuild on the next refresh, so past adjustments move out of COGS
+        cursor.execute("UPDATE stock_valuation_progress SET method = 'rebuild'")
+
+    def refresh(self, cursor):
+        """Cost the stock_history rows added since the last refresh.
+
+        Additions open lots at their recorded unit cost (or the item's current
+        cost when none was recorded). Removals use up lots oldest first and are
+        costed FIFO or at the item's average cost; sales are booked as COGS and
+        other removals as shrinkage. Changing the method rebuilds everything
+        from the start of history, archived months included.
+
+        Returns:
+            int: Number of history rows processed
+        """
+        cursor.execute("SELECT last_history_id, method FROM stock_valuation_progress WHERE id = 1")
+        progress = cursor.fetchone()
+        last_id = 0
+        rebuild = False
+        if progress:
+            last_id, method = progress
+            if method != self.method:
+                for table in VALUATION_TABLES:
+                    cursor.execute(f"DELETE FROM {table}")
+                last_id = 0
+                rebuild = True
+
+        history = self._history(cursor, last_id, rebuild)
+        if not history:
+            if rebuild:
+                self._save_progress(cursor, last_id)
+            return 0
+
+        item_ids = sorted({row[1] for row in history})
+        placeholders = ", ".join("?" for _ in item_ids)
+
+        cursor.execute(f"""
+            SELECT item_id, quantity, value, last_unit_cost
+            FROM stock_valuation
+            WHERE item_id IN ({placeholders})
+        """, item_ids)
+        state = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+
+        # Open lots as [id, remaining, unit_cost]; new lots have no id yet
+        cursor.execute(f"""
+            SELECT id, item_id, remaining, unit_cost
+            FROM stock_lots
+            WHERE item_id IN ({placeholders}) AND remaining > 0
+            ORDER BY item_id, id
+        """, item_ids)
+        lots = {}
+        for lot_id, item_id, remaining, unit_cost in cursor.fetchall():
+            lots.setdefault(item_id, deque()).append([lot_id, remaining, unit_cost])
+
+        new_lots = []
+        touched = {}    # Existing lots used in this batch, by id
+        cogs = {}
+        shrinkage = {}
+
+        for history_id, item_id, change, operation, unit_cost, source, created_at, day in history:
+            quantity, value, last_cost = state.setdefault(item_id, [0.0, 0.0, 0.0])
+            item_lots = lots.setdefault(item_id, deque())
+
+            if operation == "add":
+                cost_known = unit_cost is not None
+                if not cost_known:
+                    unit_cost = value / quantity if quantity > TOLERANCE else last_cost
+                lot = [None, change, unit_cost]
+                item_lots.append(lot)
+                new_lots.append((lot, item_id, history_id, change, unit_cost, cost_known, created_at))
+                state[item_id] = [quantity + change, value + change * unit_cost, unit_cost]
+                continue
+
+            # Use up lots oldest first; this is the physical flow for both methods
+            fifo_cost = 0.0
+            needed = change
+            while needed > TOLERANCE and item_lots:
+                lot = item_lots[0]
+                used = min(lot[1], needed)
+                lot[1] -= used
+                fifo_cost += used * lot[2]
+                needed -= used
+                if lot[0] is not None:
+                    touched[lot[0]] = lot
+                if lot[1] <= TOLERANCE:
+                    lot[1] = 0.0
+                    item_lots.popleft()
+            # Stock sold beyond recorded purchases is costed at the last cost
+            fifo_cost += max(needed, 0) * last_cost
+
+            if self.method == "fifo":
+                cost = fifo_cost
+            else:
+                average = value / quantity if quantity > TOLERANCE else last_cost
+                cost = change * average
+
+            state[item_id] = [quantity - change, value - cost, last_cost]
+            booked = cogs if source in CONSUMPTION_SOURCES else shrinkage
+            key = (day, item_id)
+            day_quantity, day_cost = booked.get(key, (0.0, 0.0))
+            booked[key] = (day_quantity + change, day_cost + cost)
+
+        cursor.executemany("""
+            INSERT INTO stock_lots (
+                item_id, history_id, quantity, remaining, unit_cost, cost_known, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (item_id, history_id, quantity, lot[1], unit_cost, int(cost_known), created_at)
+            for lot, item_id, history_id, quantity, unit_cost, cost_known, created_at in new_lots
+        ])
+
+        cursor.executemany("UPDATE stock_lots SET remaining = ? WHERE id = ?", [
+            (max(lot[1], 0), lot_id) for lot_id, lot in touched.items()
+        ])
+
+        cursor.executemany("""
+            INSERT INTO stock_valuation (item_id, quantity, value, last_unit_cost)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(item_id) DO UPDATE SET
+                quantity = excluded.quantity,
+                value = excluded.value,
+                last_unit_cost = excluded.last_unit_cost
+        """, [(item_id, *values) for item_id, values in state.items()])
+
+        for table, booked in (("stock_cogs_daily", cogs), ("stock_shrinkage_daily", shrinkage)):
+            cursor.executemany(f"""
+                INSERT INTO {table} (day, item_id, quantity, cost)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(day, item_id) DO UPDATE SET
+                    quantity = quantity + excluded.quantity,
+                    cost = cost + excluded.cost
+            """, [(day, item_id, quantity, cost) for (day, item_id), (quantity, cost) in booked.items()])
+
+        self._save_progress(cursor, history[-1][0])
+        return len(history)
+
+    def _history(self, cursor, last_id, rebuild):
+        """Return stock_history rows after last_id, in id order.
+
+        Months that have been archived are only left out of the live table
+        once valuation has read them, so a rebuild reads through the archive
+        to start again from the real beginning.
+        """
+        query = """
+            SELECT id, item_id, change_quantity, operation_type, unit_cost, source,
+                   created_at, DATE(created_at)
+            FROM stock_history
+            WHERE id > ? AND item_id IS NOT NULL
+            ORDER BY id
+        """
+        if not rebuild:
+            cursor.execute(query, (last_id,))
+            return cursor.fetchall()
+
+        conn = ArchiveManager(self.db).connect()
+        try:
+            return conn.execute(query, (last_id,)).fetchall()
+        finally:
+            conn.close()
+
+    def _save_progress(self, cursor, last_id):
+        cursor.execute("""
+            INSERT INTO stock_valuation_progress (id, last_history_id, method)
+            VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                last_history_id = excluded.last_history_id,
+                method = excluded.method
+        """, (last_id, self.method))
+
+    def _refreshed(self):
+        """Open a connection with valuation brought up to date."""
+        conn = self.db.connect()
+        migrations.ensure_schema(conn)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            self.refresh(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
+        return conn
+
+    def get_inventory_value(self):
+        """Return the value of stock on hand.
+
+        Stock on hand that has no recorded purchase (opening stock, manual
+        edits) is valued at the item's current unit cost.
+
+        Returns:
+            dict: 'total' and 'items' (item_id, item_name, unit_type, quantity,
+            unit_cost, value)
+        """
+        conn = None
+        try:
+            conn = self._refreshed()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT
+                    bs.id, bs.item_name, bs.unit_type, bs.quantity,
+                    CASE WHEN sv.quantity > ? THEN sv.value / sv.quantity
+                         ELSE COALESCE(sv.last_unit_cost, 0) END as unit_cost
+                FROM bar_stock bs
+                LEFT JOIN stock_valuation sv ON sv.item_id = bs.id
+                ORDER BY bs.item_name
+            """, (TOLERANCE,))
+
+            items = [
+                (item_id, name, unit_type, quantity, unit_cost, max(quantity, 0) * unit_cost)
+                for item_id, name, unit_type, quantity, unit_cost in cursor.fetchall()
+            ]
+            return {"total": sum(item[5] for item in items), "items": items}
+
+        finally:
+            if conn:
+                conn.close()
+
+    def get_cogs(self, start_date, end_date):
+        """Return cost of goods sold per item for a period.
+
+        Args:
+            start_date: First day ('YYYY-MM-DD')
+            end_date: Last day ('YYYY-MM-DD')
+
+        Returns:
+            dict: 'total' and 'items' (item_id, item_name, unit_type, quantity, cost)
+        """
+        return self._period_costs("stock_cogs_daily", start_date, end_date)
+
+    def get_shrinkage(self, start_date, end_date):
+        """Return stock adjusted away (not sold) per item for a period.
+
+        Args:
+            start_date: First day ('YYYY-MM-DD')
+            end_date: Last day ('YYYY-MM-DD')
+
+        Returns:
+            dict: 'total' and 'items' (item_id, item_name, unit_type, quantity, cost)
+        """
+        return self._period_costs("stock_shrinkage_daily", start_date, end_date)
+
+    def _period_costs(self, table, start_date, end_date):
+        conn = None
+        try:
+            conn = self._refreshed()
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT c.item_id, COALESCE(bs.item_name, 'Deleted item'), bs.unit_type,
+                       SUM(c.quantity), SUM(c.cost)
+                FROM {table} c
+                LEFT JOIN bar_stock bs ON bs.id = c.item_id
+                WHERE c.day BETWEEN ? AND ?
+                GROUP BY c.item_id
+                ORDER BY SUM(c.cost) DESC
+            """, (start_date, end_date))
+
+            items = cursor.fetchall()
+            return {"total": sum(item[4] for item in items), "items": items}
+
+        finally:
+            if conn:
+                conn.close()
@@ -0,0 +1,597 @@
+"""
+Multi-terminal order sync for the Cafe Management System.
+One machine runs SyncServer, which owns the database and serves the bill
+operations over HTTP on the LAN. Terminals use RemoteBillService, which keeps
+a local copy of every table's state and receives changes pushed over a
+long-lived event stream, so the table screen never waits on the network.
+Terminal changes go through an operation log (see utils.replication), so a
+terminal keeps taking orders while the server is unreachable.
+"""
+
+import asyncio
+import datetime
+import hmac
+import http.client
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib import error, request
+from urllib.parse import parse_qs, urlsplit
+
+from database import DatabaseManager
+from utils.app_logging import log_event
+from utils.bill_service import BillService
+from utils.constants import SYNC_CONFIG
+from utils.menu_prices import MenuPrices
+from utils.recipes import InsufficientStockError
+from utils.replication import OpLog, ReplicationLog, items_from_list, items_to_list, replay
+
+HTTP_STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    409: "Conflict",
+    500: "Internal Server Error"
+}
+
+
+class SyncError(Exception):
+    """Raised on a terminal when the sync server refuses or cannot be reached."""
+
+
+def encode_state(state):
+    """Make a table state JSON-safe (item ids become a list field)."""
+    return dict(state, items=items_to_list(state["items"]))
+
+
+def decode_state(state):
+    """Turn a JSON table state back into {menu_item_id: item} form."""
+    return dict(state, items=items_from_list(state["items"]))
+
+
+def is_loopback(host):
+    """True if host only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class SyncServer:
+    """Serves bill operations and pushes table changes to terminals.
+
+    All database work runs on one worker thread, so terminals never contend
+    for SQLite locks with each other; the asyncio loop only moves JSON.
+    """
+
+    def __init__(self, db=None, host=None, port=None, token=None):
+        self.service = BillService(db)
+        self.replication = ReplicationLog(self.service.db)
+        self.host = host or SYNC_CONFIG["host"]
+        self.port = port or SYNC_CONFIG["port"]
+        self.token = SYNC_CONFIG["token"] if token is None else token
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-db")
+        self.seq = 0
+        self.subscribers = set()
+        self.server = None
+        self._publishing = None
+
+    async def _db(self, func, *args):
+        """Run a blocking database call on the worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def start(self):
+        """Start listening and watching for changes.
+
+        Raises:
+            ValueError: If listening beyond this machine without a token
+        """
+        if not self.token and not is_loopback(self.host):
+            raise ValueError(
+                f"Refusing to serve bills on {self.host} without a token; "
+                "set CAFE_SYNC_TOKEN or --token, or listen on 127.0.0.1"
+            )
+        self._publishing = asyncio.Lock()
+        self.seq = (await self._db(self.service.changes_since, 0))["seq"]
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        asyncio.get_running_loop().create_task(self._watch())
+        logging.info(f"Sync server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _watch(self):
+        """Publish changes made outside the server, such as on its own screen."""
+        prices = MenuPrices(self.service.db)
+        while True:
+            await asyncio.sleep(SYNC_CONFIG["poll_interval"])
+            try:
+                await self._db(prices.sync)
+                await self.publish()
+            except Exception as e:
+                logging.error(f"Sync watch failed: {str(e)}")
+
+    async def publish(self):
+        """Push table states changed since the last publish to every stream."""
+        async with self._publishing:
+            changes = await self._db(self.service.changes_since, self.seq)
+            if not changes["events"]:
+                return
+            self.seq = changes["seq"]
+            lines = "".join(json.dumps(encode_state(e)) + "\n" for e in changes["events"]).encode()
+            for queue in list(self.subscribers):
+                queue.put_nowait(lines)
+
+    async def _handle(self, reader, writer):
+        """Serve one request per connection."""
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length") or 0))
+
+            url = urlsplit(target)
+            if self.token and not hmac.compare_digest(headers.get("x-cafe-token", ""), self.token):
+                status, payload = 401, {"error": "Invalid sync token"}
+            elif method == "GET" and url.path == "/events":
+                since = int(parse_qs(url.query).get("since", ["0"])[0])
+                await self._stream(writer, since)
+                return
+            else:
+                status, payload = await self._route(method, url.path, json.loads(body or b"{}"))
+
+        except (ValueError, json.JSONDecodeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        """Dispatch a request to the bill service.
+
+        Returns:
+            tuple: (HTTP status, JSON payload)
+        """
+        parts = [p for p in path.split("/") if p]
+        try:
+            if method == "GET" and parts == ["tables"]:
+                changes = await self._db(self.service.changes_since, 0)
+                return 200, {"tables": [encode_state(e) for e in changes["events"]], "seq": changes["seq"]}
+
+            if method == "POST" and parts == ["ops"]:
+                batch = await self._db(self.replication.apply_batch, body["terminal_id"], body["ops"])
+                await self.publish()
+                return 200, {
+                    "results": batch["results"],
+                    "states": [encode_state(s) for s in batch["states"]]
+                }
+
+            if len(parts) >= 2 and parts[0] == "bills":
+                table_number = int(parts[1])
+                if method == "POST" and parts[2:] == ["items"]:
+                    result = await self._db(
+                        self.service.add_item, table_number, int(body["menu_item_id"]), body["quantity"]
+                    )
+                elif method == "DELETE" and len(parts) == 4 and parts[2] == "items":
+                    result = await self._db(
+                        self.service.remove_item, table_number, int(parts[3]), int(body.get("quantity", 1))
+                    )
+                elif method == "POST" and parts[2:] == ["pay"]:
+                    result = await self._db(
+                        self.service.pay, table_number, body.get("discount_type"),
+                        body.get("discount_value", 0), body.get("session_id")
+                    )
+                    result["state"] = encode_state(result["state"])
+                else:
+                    return 404, {"error": f"No route for {method} {path}"}
+
+                await self.publish()
+                return 200, result if "sale_id" in result else encode_state(result)
+
+            return 404, {"error": f"No route for {method} {path}"}
+
+        except InsufficientStockError as e:
+            return 409, {"error": str(e)}
+        except (LookupError, KeyError) as e:
+            return 404, {"error": str(e)}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            logging.error(f"Sync request {method} {path} failed: {str(e)}")
+            return 500, {"error": str(e)}
+
+    async def _stream(self, writer, since):
+        """Send table states as newline-delimited JSON until the terminal goes away."""
+        queue = asyncio.Queue()
+        # Subscribe before reading the backlog so no change falls in between
+        self.subscribers.add(queue)
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/x-ndjson\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            backlog = await self._db(self.service.changes_since, since)
+            for event in backlog["events"]:
+                writer.write(json.dumps(encode_state(event)).encode() + b"\n")
+            await writer.drain()
+
+            while True:
+                try:
+                    lines = await asyncio.wait_for(queue.get(), SYNC_CONFIG["keepalive"])
+                except asyncio.TimeoutError:
+                    lines = b"\n"
+                writer.write(lines)
+                await writer.drain()
+
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(queue)
+            writer.close()
+
+
+class RemoteBillService:
+    """BillService for a terminal, backed by the sync server.
+
+    Every change is appended to the terminal's operation log and shown at
+    once: a table's view is the last state the server sent with this
+    terminal's not-yet-applied operations replayed on top. One background
+    thread ships the log to the server, another follows its event stream;
+    both keep retrying while the server is away, so orders taken offline
+    reach the server when it returns.
+    """
+
+    def __init__(self, url, db=None, token=None, terminal_id=None):
+        self.url = url.rstrip("/")
+        self.db = db or DatabaseManager()
+        self.token = SYNC_CONFIG["token"] if token is None else token
+        self.terminal_id = terminal_id or SYNC_CONFIG["terminal_id"] or socket.gethostname()
+        self.log = OpLog(os.path.join(os.path.dirname(self.db.db_path), SYNC_CONFIG["oplog"]))
+        self.tables = self.log.load_states()    # table_number -> last state from the server
+        self.server_seq = max((s["seq"] for s in self.tables.values()), default=0)
+        self.version = 0                        # Position of the last local view change
+        self.changed = {}                       # table_number -> version it last changed at
+        self.connected = False
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        self._shipping = True
+
+    def _request(self, method, path, payload=None):
+        """Send one JSON request and return the decoded response."""
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = request.Request(self.url + path, data=data, method=method)
+        req.add_header("Content-Type", "application/json")
+        if self.token:
+            req.add_header("X-Cafe-Token", self.token)
+        try:
+            with request.urlopen(req, timeout=SYNC_CONFIG["request_timeout"]) as response:
+                return json.loads(response.read())
+        except error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise SyncError(message) from None
+        except (error.URLError, OSError) as e:
+            raise SyncError(f"Cannot reach the sync server at {self.url}: {e}") from None
+
+    def _acked(self, state):
+        """Last operation of this terminal that a server state includes."""
+        return state.get("acked", {}).get(self.terminal_id, 0) if state else 0
+
+    def _touch(self, table_number):
+        self.version += 1
+        self.changed[table_number] = self.version
+
+    def _receive(self, state):
+        """Cache a server state unless a newer one is already cached, and
+        forget the logged operations it includes."""
+        with self._lock:
+            table_number = state["table_number"]
+            current = self.tables.get(table_number)
+            if current is None or state["seq"] >= current["seq"]:
+                self.tables[table_number] = state
+                self.log.save_state(state)
+                acked = self._acked(state)
+                self.log.acknowledge(table_number=table_number, up_to=acked)
+                self.log.advance(acked)
+                self._touch(table_number)
+            self.server_seq = max(self.server_seq, state["seq"])
+
+    def _view(self, table_number):
+        """The table as this terminal shows it: server state plus pending operations."""
+        state = self.tables.get(table_number)
+        ops = self.log.pending(table_number, after=self._acked(state))
+        items = replay(state["items"] if state else {}, ops)
+        if state and not ops:
+            status = state["status"]
+        else:
+            status = "occupied" if items else "vacant"
+        return {
+            "seq": self.changed.get(table_number, 0),
+            "table_number": table_number,
+            "status": status,
+            "items": items,
+            "pending": len(ops),
+            "session_id": state.get("session_id") if state else None
+        }
+
+    def _refresh(self):
+        for state in self._request("GET", "/tables")["tables"]:
+            self._receive(decode_state(state))
+
+    def _log(self, kind, table_number, payload):
+        """Log an operation, wake the shipping thread and return the table's new view."""
+        with self._lock:
+            self.log.append(kind, table_number, payload)
+            view = None
+            if table_number is not None:
+                self._touch(table_number)
+                view = self._view(table_number)
+        self._wake.set()
+        return view
+
+    def _menu_item(self, menu_item_id):
+        """Name and price of a menu item from this terminal's database."""
+        conn = None
+        try:
+            conn = self.db.connect()
+            cursor = conn.cursor()
+            cursor.execute("SELECT name, price FROM menu_items WHERE id = ?", (menu_item_id,))
+            row = cursor.fetchone()
+            if not row:
+                raise LookupError("This menu item no longer exists")
+            return row
+        finally:
+            if conn:
+                conn.close()
+
+    def get_tables(self):
+        if not self.tables and not self.connected:
+            try:
+                self._refresh()
+            except SyncError as e:
+                logging.warning(f"Showing tables without the sync server: {str(e)}")
+
+        conn = None
+        try:
+            conn = self.db.connect()
+            cursor = conn.cursor()
+            cursor.execute("SELECT table_number FROM tables")
+            numbers = {row[0] for row in cursor.fetchall()}
+        finally:
+            if conn:
+                conn.close()
+
+        with self._lock:
+            return [(n, self._view(n)["status"]) for n in sorted(numbers | set(self.tables))]
+
+    def get_bill(self, table_number):
+        with self._lock:
+            return self._view(table_number)["items"]
+
+    def get_state(self, table_number):
+        with self._lock:
+            return self._view(table_number)
+
+    def add_item(self, table_number, menu_item_id, quantity):
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise ValueError("Please enter a valid quantity")
+
+        with self._lock:
+            line = self._view(table_number)["items"].get(menu_item_id)
+        name, price = (line["name"], line["price"]) if line else self._menu_item(menu_item_id)
+        return self._log("add_item", table_number, {
+            "menu_item_id": menu_item_id,
+            "name": name,
+            "price": price,
+            "quantity": quantity
+        })
+
+    def remove_item(self, table_number, menu_item_id, quantity=1):
+        return self._log("remove_item", table_number, {
+            "menu_item_id": menu_item_id,
+            "quantity": quantity
+        })
+
+    def pay(self, table_number, discount_type=None, discount_value=0, session_id=None):
+        """Log a payment for the bill as this terminal shows it.
+
+        The server records the sale when the operation arrives, so
+        'sale_id' is None and 'pending' is True here. If the session was
+        paid elsewhere meanwhile, the server records no sale and the payment
+        comes back from take_rejected_payments as a conflict.
+        """
+        with self._lock:
+            view = self._view(table_number)
+            items = view["items"]
+            if not items:
+                raise ValueError("Cannot process empty bill")
+            subtotal = sum(item['price'] * item['quantity'] for item in items.values())
+            total = BillService.apply_discount(subtotal, discount_type, discount_value)
+            state = self._log("pay", table_number, {
+                "items": items_to_list(items),
+                "discount_type": discount_type,
+                "discount_value": float(discount_value or 0),
+                "session_id": session_id or view["session_id"]
+            })
+        return {"sale_id": None, "subtotal": subtotal, "total": total, "state": state, "pending": True}
+
+    def add_expense(self, name, title, category, quantity, price_per_unit, expense_date=None):
+        """Log an expense for the server to record."""
+        self._log("expense", None, {
+            "name": name,
+            "title": title,
+            "category": category,
+            "quantity": quantity,
+            "price_per_unit": price_per_unit,
+            "expense_date": expense_date or datetime.date.today().isoformat()
+        })
+
+    def take_rejected_payments(self):
+        """Return payments the server recorded no sale for that staff have not been shown yet.
+
+        Returns:
+            list: dicts with table_number, total, created_at, detail and
+            status: 'rejected' (enter it again) or 'conflict' (the bill was
+            already paid, so the customer may need a refund)
+        """
+        payments = []
+        for op in self.log.take_rejected():
+            items = items_from_list(op["payload"]["items"])
+            subtotal = sum(item['price'] * item['quantity'] for item in items.values())
+            payments.append({
+                "table_number": op["table_number"],
+                "total": BillService.apply_discount(
+                    subtotal, op["payload"].get("discount_type"), op["payload"].get("discount_value", 0)
+                ),
+                "created_at": op["created_at"],
+                "detail": op["detail"],
+                "status": op["status"]
+            })
+        return payments
+
+    def changes_since(self, seq):
+        """Return table views changed after seq, like BillService.changes_since."""
+        with self._lock:
+            tables = sorted((v, n) for n, v in self.changed.items() if v > seq)
+            return {"events": [self._view(n) for _, n in tables], "seq": max(self.version, seq)}
+
+    def start(self):
+        """Ship the operation log and follow the event stream on background threads."""
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._follow, name="sync-events", daemon=True),
+            threading.Thread(target=self._ship, name="sync-ship", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _ship(self):
+        """Send logged operations in order until the log is empty, then wait for more."""
+        while not self._stop.is_set():
+            ops = self.log.pending(limit=SYNC_CONFIG["ship_batch"])
+            if ops:
+                try:
+                    batch = self._request("POST", "/ops", {"terminal_id": self.terminal_id, "ops": ops})
+                except SyncError as e:
+                    if self._shipping:
+                        logging.warning(f"Keeping operations in the log until the server is back: {str(e)}")
+                    self._shipping = False
+                else:
+                    self._shipping = True
+                    with self._lock:
+                        for state in batch["states"]:
+                            self._receive(decode_state(state))
+                        self.log.acknowledge(op_seqs=[r["op_seq"] for r in batch["results"]])
+                        for table_number in {op["table_number"] for op in ops} - {None}:
+                            self._touch(table_number)
+                    sent = {op["op_seq"]: op for op in ops}
+                    for result in batch["results"]:
+                        if result["status"] in ("partial", "conflict", "rejected"):
+                            logging.warning(
+                                f"Operation {result['op_seq']} was {result['status']}: {result['detail']}"
+                            )
+                        if (result["status"] in ("conflict", "rejected")
+                                and result["sale_id"] is None
+                                and sent[result["op_seq"]]["kind"] == "pay"):
+                            # Money was taken but no sale recorded, so staff must sort it out
+                            self.log.reject(sent[result["op_seq"]], result["detail"], result["status"])
+                            log_event(
+                                "payment_rejected",
+                                logging.ERROR,
+                                terminal_id=self.terminal_id,
+                                op_seq=result["op_seq"],
+                                table_number=sent[result["op_seq"]]["table_number"],
+                                status=result["status"],
+                                detail=result["detail"]
+                            )
+                    continue
+            self._wake.wait(SYNC_CONFIG["ship_interval"])
+            self._wake.clear()
+
+    def _follow(self):
+        url = urlsplit(self.url)
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = http.client.HTTPConnection(
+                    url.hostname, url.port or 80, timeout=SYNC_CONFIG["keepalive"] * 2
+                )
+                headers = {"X-Cafe-Token": self.token} if self.token else {}
+                conn.request("GET", f"/events?since={self.server_seq}", headers=headers)
+                response = conn.getresponse()
+                if response.status != 200:
+                    raise SyncError(f"Event stream refused: {response.status} {response.reason}")
+
+                self.connected = True
+                self._wake.set()
+                while not self._stop.is_set():
+                    line = response.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        self._receive(decode_state(json.loads(line)))
+
+            except Exception as e:
+                logging.warning(f"Sync event stream lost: {str(e)}")
+            finally:
+                self.connected = False
+                if conn:
+                    conn.close()
+            self._stop.wait(SYNC_CONFIG["reconnect_delay"])
+
+
+_remote = None
+
+
+def get_bill_service(db=None):
+    """Return the bill service for this process.
+
+    With SYNC_CONFIG["server_url"] set this is a shared RemoteBillService
+    following the server; otherwise bills are written to the local database.
+    """
+    global _remote
+    if not SYNC_CONFIG["server_url"]:
+        return BillService(db)
+    if _remote is None:
+        _remote = RemoteBillService(SYNC_CONFIG["server_url"], db)
+        _remote.start()
+    return _remote
@@ -0,0 +1,183 @@
+"""
+Time-series helpers for the Cafe Management System charts.
+Picks a bucket size from the visible range and chart width, aggregates in SQL
+and decimates the result so long ranges stay fast without dropping spikes.
+"""
+
+from datetime import datetime, timedelta
+
+# Candidate bucket sizes in seconds, smallest first
+BUCKET_SIZES = [
+    60,             # 1 minute
+    5 * 60,         # 5 minutes
+    15 * 60,        # 15 minutes
+    60 * 60,        # 1 hour
+    3 * 60 * 60,    # 3 hours
+    6 * 60 * 60,    # 6 hours
+    24 * 60 * 60,   # 1 day
+    7 * 24 * 60 * 60  # 1 week
+]
+
+# Aim for at most one point every this many pixels
+PIXELS_PER_POINT = 2
+
+DEFAULT_CHART_WIDTH = 800
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def max_points_for_width(pixel_width):
+    """Return how many points a chart of the given width can show."""
+    if not pixel_width or pixel_width <= 1:
+        pixel_width = DEFAULT_CHART_WIDTH
+    return max(2, int(pixel_width // PIXELS_PER_POINT))
+
+
+def choose_bucket(start, end, pixel_width):
+    """Choose the smallest bucket that keeps the series within the chart width.
+
+    Args:
+        start: Range start (datetime)
+        end: Range end (datetime)
+        pixel_width: Width of the plot area in pixels
+
+    Returns:
+        int: Bucket size in seconds
+    """
+    span = max((end - start).total_seconds(), 1)
+    max_points = max_points_for_width(pixel_width)
+
+    for size in BUCKET_SIZES:
+        if span / size <= max_points:
+            return size
+    return BUCKET_SIZES[-1]
+
+
+def fetch_bucketed(cursor, table, time_column, value_expr, start, end, bucket_seconds, where=""):
+    """Aggregate a table into fixed-size time buckets in one query.
+
+    Timestamps are compared as text so an index on time_column is used for the
+    range scan. Each bucket carries its sum, count, min and max so spikes inside
+    a bucket can still be drawn.
+
+    Returns:
+        list: (bucket_start datetime, total, count, minimum, maximum) tuples
+    """
+    query = f"""
+        SELECT
+            (CAST(strftime('%s', {time_column}) AS INTEGER) / ?) * ? as bucket,
+            SUM({value_expr}),
+            COUNT(*),
+            MIN({value_expr}),
+            MAX({value_expr})
+        FROM {table}
+        WHERE {time_column} >= ? AND {time_column} < ?
+        {"AND " + where if where else ""}
+        GROUP BY bucket
+        ORDER BY bucket
+    """
+    cursor.execute(query, (
+        bucket_seconds, bucket_seconds,
+        start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+    ))
+
+    # strftime('%s') treats the stored local time as UTC, so convert back the same way
+    return [
+        (datetime(1970, 1, 1) + timedelta(seconds=bucket), total, count, low, high)
+        for bucket, total, count, low, high in cursor.fetchall()
+    ]
+
+
+def lttb(points, threshold):
+    """Downsample (x, y) points with Largest-Triangle-Three-Buckets.
+
+    LTTB keeps the overall shape of the series, including isolated peaks,
+    while reducing it to `threshold` points. x values may be datetimes.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    xs = [_as_number(x) for x, _ in points]
+    ys = [float(y) for _, y in points]
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        span = max(next_end - next_start, 1)
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # Pick the point in this bucket forming the largest triangle
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs(
+                (xs[a] - avg_x) * (ys[j] - ys[a])
+                - (xs[a] - xs[j]) * (avg_y - ys[a])
+            )
+            if area > best_area:
+                best_area = area
+                best = j
+
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax_decimate(points, threshold):
+    """Downsample (x, y) points keeping the min and max of each bucket."""
+    count = len(points)
+    if threshold >= count or threshold < 2:
+        return list(points)
+
+    buckets = max(threshold // 2, 1)
+    size = count / buckets
+    sampled = []
+
+    for i in range(buckets):
+        chunk = points[int(i * size):int((i + 1) * size)]
+        if not chunk:
+            continue
+        low = min(chunk, key=lambda p: p[1])
+        high = max(chunk, key=lambda p: p[1])
+        # Keep the two extremes in time order
+        sampled.extend(sorted({low, high}, key=lambda p: _as_number(p[0])))
+
+    return sampled
+
+
+def build_series(cursor, table, time_column, value_expr, start, end, pixel_width,
+                 where="", method="lttb"):
+    """Fetch a chart-ready series for any range.
+
+    Returns:
+        tuple: (list of (datetime, total) points, bucket size in seconds)
+    """
+    bucket = choose_bucket(start, end, pixel_width)
+    rows = fetch_bucketed(cursor, table, time_column, value_expr, start, end, bucket, where)
+    points = [(row[0], row[1] or 0) for row in rows]
+
+    threshold = max_points_for_width(pixel_width)
+    if method == "minmax":
+        points = minmax_decimate(points, threshold)
+    else:
+        points = lttb(points, threshold)
+
+    return points, bucket
+
+
+def _as_number(x):
+    """Convert an x value to a float for geometry."""
+    if isinstance(x, datetime):
+        return x.timestamp()
+    return float(x)
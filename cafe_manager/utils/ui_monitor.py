@@ -0,0 +1,253 @@
+"""
+UI responsiveness monitor for the Cafe Management System.
+Measures how long the Tk event loop is kept from running: a heartbeat
+scheduled with after() records how late it fires, and every Python callback
+Tk runs (button commands, bindings, after() jobs such as
+DashboardPage.load_data) is timed by name. Widget counts are recorded per
+page. Stalls over the frame budget go to a CSV trace, and F12 shows a live
+overlay.
+"""
+
+import csv
+import logging
+import os
+import time
+import tkinter
+import types
+from collections import deque
+from datetime import datetime
+
+import customtkinter as ctk
+
+from utils.app_logging import log_event, log_path
+from utils.constants import COLORS, PADDING, UI_MONITOR_CONFIG
+
+# value is milliseconds, or a count for "widgets" rows
+TRACE_FIELDS = ["time", "kind", "name", "value", "page"]
+
+_original_call = tkinter.CallWrapper.__call__
+
+
+def _timed_call(wrapper, *args):
+    """CallWrapper.__call__ that reports how long the callback ran."""
+    monitor = UIMonitor.active
+    if monitor is None:
+        return _original_call(wrapper, *args)
+    start = time.perf_counter()
+    try:
+        return _original_call(wrapper, *args)
+    finally:
+        monitor.record_callback(wrapper.func, time.perf_counter() - start)
+
+
+def callback_name(func):
+    """Name a Tk callback after the function it runs.
+
+    after() wraps its function in a local 'callit'; the real function is
+    taken from its closure.
+    """
+    if getattr(func, "__qualname__", "").endswith("after.<locals>.callit"):
+        for cell in func.__closure__ or ():
+            inner = cell.cell_contents
+            if isinstance(inner, (types.FunctionType, types.MethodType)):
+                func = inner
+                break
+    return getattr(func, "__qualname__", None) or type(func).__name__
+
+
+def count_widgets(widget):
+    """Count a widget and everything inside it."""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class UIMonitor:
+    """Measures event-loop drift and callback time for one Tk root."""
+
+    active = None       # The installed monitor, used by _timed_call
+
+    def __init__(self, root):
+        """Initialize the monitor.
+
+        Args:
+            root: The application's Tk root
+        """
+        self.root = root
+        self.page = None
+        self.drift = deque(maxlen=UI_MONITOR_CONFIG["samples"])
+        self.callbacks = {}     # name -> [calls, seconds, max seconds, stalls]
+        self.widgets = {}       # page -> widget count when last shown
+        self.pages = {}         # page -> seconds to build when last shown
+        self.overlay = None
+        self._trace = []
+        self._expected = None
+        self._job = None
+        self._last_flush = time.monotonic()
+
+    def start(self):
+        """Start timing callbacks registered from now on, and the heartbeat."""
+        if not UI_MONITOR_CONFIG["enabled"] or UIMonitor.active is self:
+            return
+        UIMonitor.active = self
+        tkinter.CallWrapper.__call__ = _timed_call
+        self.root.bind_all(UI_MONITOR_CONFIG["overlay_key"], lambda e: self.toggle_overlay(), add="+")
+        self._schedule()
+
+    def stop(self):
+        """Stop measuring and write out the trace."""
+        if UIMonitor.active is not self:
+            return
+        UIMonitor.active = None
+        tkinter.CallWrapper.__call__ = _original_call
+        if self._job:
+            try:
+                self.root.after_cancel(self._job)
+            except tkinter.TclError:
+                pass
+        self.flush()
+
+        log_event(
+            "ui_summary",
+            drift_p95_ms=round(self.drift_ms(0.95), 1),
+            drift_max_ms=round(self.drift_ms(1.0), 1),
+            widgets=self.widgets,
+            slowest={name: round(max_ms, 1) for name, _, _, max_ms, _ in self.summary(limit=5)}
+        )
+
+    def _schedule(self):
+        interval = UI_MONITOR_CONFIG["interval_ms"]
+        self._expected = time.perf_counter() + interval / 1000
+        self._job = self.root.after(interval, self._tick)
+
+    def _tick(self):
+        """Heartbeat: how late the event loop got round to this."""
+        late = max(0.0, time.perf_counter() - self._expected)
+        self.drift.append(late)
+        if late * 1000 >= UI_MONITOR_CONFIG["trace_min_ms"]:
+            self._add_trace("drift", "event loop", late)
+        if time.monotonic() - self._last_flush >= UI_MONITOR_CONFIG["flush_seconds"]:
+            self.flush()
+        if self.overlay is not None and self.overlay.winfo_exists():
+            self.overlay.refresh()
+        self._schedule()
+
+    def record_callback(self, func, seconds):
+        """Add one callback run to the totals."""
+        name = callback_name(func)
+        if name == "UIMonitor._tick":
+            return
+        total = self.callbacks.setdefault(name, [0, 0.0, 0.0, 0])
+        total[0] += 1
+        total[1] += seconds
+        total[2] = max(total[2], seconds)
+        if seconds * 1000 >= UI_MONITOR_CONFIG["frame_budget_ms"]:
+            total[3] += 1
+        if seconds * 1000 >= UI_MONITOR_CONFIG["trace_min_ms"]:
+            self._add_trace("callback", name, seconds)
+
+    def page_shown(self, page_id, page, seconds):
+        """Record how long a page took to build and, once drawn, its widget count."""
+        self.page = page_id
+        self.pages[page_id] = seconds
+        self._add_trace("page", page_id, seconds)
+
+        def count():
+            if page.winfo_exists():
+                self.widgets[page_id] = count_widgets(page)
+                self._trace.append([
+                    datetime.now().isoformat(timespec="milliseconds"),
+                    "widgets", page_id, self.widgets[page_id], page_id
+                ])
+        self.root.after_idle(count)
+
+    def _add_trace(self, kind, name, seconds):
+        self._trace.append([
+            datetime.now().isoformat(timespec="milliseconds"),
+            kind, name, round(seconds * 1000, 1), self.page
+        ])
+
+    def flush(self):
+        """Append traced events to the CSV trace."""
+        self._last_flush = time.monotonic()
+        if not self._trace:
+            return
+        rows, self._trace = self._trace, []
+        path = log_path(UI_MONITOR_CONFIG["trace_file"])
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            new_file = not os.path.exists(path)
+            with open(path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(TRACE_FIELDS)
+                writer.writerows(rows)
+        except OSError as e:
+            logging.error(f"Could not write UI trace: {str(e)}")
+
+    def drift_ms(self, fraction):
+        """Event-loop drift at a percentile of recent heartbeats, in ms."""
+        return percentile(self.drift, fraction) * 1000
+
+    def summary(self, limit=10):
+        """Return callbacks by total time spent, most expensive first.
+
+        Returns:
+            list: (name, calls, total ms, max ms, stalls) tuples
+        """
+        totals = sorted(self.callbacks.items(), key=lambda e: e[1][1], reverse=True)
+        return [
+            (name, calls, seconds * 1000, longest * 1000, stalls)
+            for name, (calls, seconds, longest, stalls) in totals[:limit]
+        ]
+
+    def toggle_overlay(self):
+        """Show or hide the debug overlay."""
+        if self.overlay is not None and self.overlay.winfo_exists():
+            self.overlay.destroy()
+            self.overlay = None
+        else:
+            self.overlay = MonitorOverlay(self)
+
+
+class MonitorOverlay(ctk.CTkToplevel):
+    """Small always-on-top window with live monitor figures."""
+
+    def __init__(self, monitor):
+        super().__init__(monitor.root)
+        self.monitor = monitor
+        self.title("UI Monitor")
+        self.attributes("-topmost", True)
+        self.resizable(False, False)
+        self.protocol("WM_DELETE_WINDOW", monitor.toggle_overlay)
+
+        self.text = ctk.CTkLabel(
+            self,
+            text="",
+            font=("Courier", 12),
+            text_color=COLORS["text"]["primary"],
+            justify="left",
+            anchor="w"
+        )
+        self.text.pack(fill="both", expand=True, padx=PADDING["medium"], pady=PADDING["medium"])
+        self.refresh()
+
+    def refresh(self):
+        monitor = self.monitor
+        page = monitor.page
+        lines = [
+            f"Event loop drift  p50 {monitor.drift_ms(0.5):6.1f} ms"
+            f"  p95 {monitor.drift_ms(0.95):6.1f} ms  max {monitor.drift_ms(1.0):6.1f} ms",
+            f"Page {page or '-'}: built in {monitor.pages.get(page, 0) * 1000:.0f} ms, "
+            f"{monitor.widgets.get(page, '?')} widgets",
+            "",
+            f"{'callback':<44}{'calls':>7}{'total ms':>10}{'max ms':>9}{'stalls':>7}"
+        ]
+        for name, calls, total_ms, max_ms, stalls in monitor.summary(limit=12):
+            lines.append(f"{name[-44:]:<44}{calls:>7}{total_ms:>10.0f}{max_ms:>9.1f}{stalls:>7}")
+        self.text.configure(text="\n".join(lines))
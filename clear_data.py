@@ -1,10 +1,20 @@
 import sqlite3
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cafe_manager'))
+
+from utils.backup import BackupManager
 
 def clear_data():
+    conn = None
     try:
+        # Keep a copy of everything that is about to be deleted
+        backups = BackupManager()
+        print(f"Saved a backup to {backups.create('pre-clear')}")
+        
         # Connect to the database
-        conn = sqlite3.connect('cafe_manager.db')
+        conn = sqlite3.connect(backups.db.db_path)
         cursor = conn.cursor()
         
         # Enable foreign keys
@@ -47,6 +57,8 @@ def clear_data():
             
     except sqlite3.Error as e:
         print(f"Database error: {str(e)}")
+    except RuntimeError as e:
+        print(f"{str(e)}; no data was cleared")
     finally:
         if conn:
             conn.close()
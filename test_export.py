@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cafe_manager"))
+
+from utils.constants import LOG_CONFIG
+
+
+def test_parquet_keeps_types_when_nulls_come_first(tmp_path):
+    LOG_CONFIG["directory"] = str(tmp_path / "logs")
+
+    import migrations
+    from database import DatabaseManager
+    from utils.export import DataExporter
+
+    db = DatabaseManager()
+    db.db_path = str(tmp_path / "cafe.db")
+    conn = db.connect()
+    migrations.migrate(conn)
+    conn.execute("INSERT OR IGNORE INTO tables (table_number) VALUES (1)")
+    # Sales from before bill sessions have no session or invoice number
+    conn.executemany("""
+        INSERT INTO sales (
+            table_number, subtotal, total_amount, payment_status,
+            created_at, session_id, invoice_no
+        ) VALUES (1, ?, ?, 'completed', ?, ?, ?)
+    """, [
+        (100, 100, "2025-01-01 10:00:00", None, None),
+        (200, 200, "2025-01-02 10:00:00", None, None),
+        (300, 300, "2025-01-03 10:00:00", "a1b2", 1),
+    ])
+    conn.commit()
+    conn.close()
+
+    path = tmp_path / "sales.parquet"
+    written = DataExporter(db, chunk_size=1).export("sales", str(path), "parquet")
+
+    table = pq.read_table(path)
+    assert written == 3
+    assert str(table.schema.field("session_id").type) == "string"
+    assert str(table.schema.field("invoice_no").type) == "int64"
+    assert table.column("session_id").to_pylist() == [None, None, "a1b2"]
+    assert table.column("invoice_no").to_pylist() == [None, None, 1]